@@ -0,0 +1,34 @@
+"""Add derived_table_builds markers for the token index and sales rollup builds
+
+Revision ID: 20261016_derived_table_builds
+Revises: 20261016_supplier_url_indexes
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_derived_table_builds'
+down_revision = '20261016_supplier_url_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per completed full build. The flush listeners write rows
+    # before the first build, so an empty-table check cannot replace this.
+    op.create_table(
+        'derived_table_builds',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('name'),
+        schema='app'
+    )
+
+
+def downgrade():
+    op.drop_table('derived_table_builds', schema='app')
@@ -0,0 +1,108 @@
+"""Create the eMAG category and reference data mirror tables
+
+Revision ID: 20261016_emag_category_mirror
+Revises: 20261016_emag_stock_index
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_emag_category_mirror'
+down_revision = '20261016_emag_stock_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The tables were only ever created by create_missing_reference_tables.sql,
+    # so create them when missing and add the columns that script lacks.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app.emag_categories (
+            id INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            is_allowed INTEGER NOT NULL DEFAULT 0,
+            parent_id INTEGER,
+            is_ean_mandatory INTEGER NOT NULL DEFAULT 0,
+            is_warranty_mandatory INTEGER NOT NULL DEFAULT 0,
+            characteristics JSONB,
+            family_types JSONB,
+            language VARCHAR(5) NOT NULL DEFAULT 'ro',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_synced_at TIMESTAMP
+        )
+        """
+    )
+    op.execute(
+        """
+        ALTER TABLE app.emag_categories
+            ADD COLUMN IF NOT EXISTS characteristics_detailed JSONB,
+            ADD COLUMN IF NOT EXISTS family_types_detailed JSONB,
+            ADD COLUMN IF NOT EXISTS characteristics_synced_at TIMESTAMP
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_categories_parent "
+        "ON app.emag_categories (parent_id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_categories_allowed "
+        "ON app.emag_categories (is_allowed)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_categories_name "
+        "ON app.emag_categories (name)"
+    )
+
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app.emag_vat_rates (
+            id INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            rate FLOAT NOT NULL,
+            country VARCHAR(2) NOT NULL DEFAULT 'RO',
+            is_active BOOLEAN NOT NULL DEFAULT true,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_synced_at TIMESTAMP
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_vat_country ON app.emag_vat_rates (country)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_vat_active ON app.emag_vat_rates (is_active)"
+    )
+
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app.emag_handling_times (
+            id INTEGER PRIMARY KEY,
+            value INTEGER NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT true,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_synced_at TIMESTAMP
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_handling_time_value "
+        "ON app.emag_handling_times (value)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emag_handling_time_active "
+        "ON app.emag_handling_times (is_active)"
+    )
+
+
+def downgrade():
+    # The tables may predate this revision; only drop what it added to them
+    op.execute(
+        "ALTER TABLE app.emag_categories DROP COLUMN IF EXISTS characteristics_synced_at"
+    )
@@ -0,0 +1,51 @@
+"""Add emag_offer_outbox for coalesced eMAG offer updates
+
+Revision ID: 20261016_emag_offer_outbox
+Revises: 20261016_updated_at_indexes
+Create Date: 2026-10-16 22:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_emag_offer_outbox'
+down_revision = '20261016_updated_at_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Price and stock changes waiting for offer/save, one row per offer;
+    # repeated edits are merged into the pending payload.
+    op.create_table(
+        'emag_offer_outbox',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('account_type', sa.String(length=10), nullable=False),
+        sa.Column('offer_id', sa.Integer(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('claimed_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_type', 'offer_id', name='uq_emag_offer_outbox_offer'),
+        schema='app'
+    )
+    op.create_index(
+        'idx_emag_offer_outbox_due',
+        'emag_offer_outbox',
+        ['account_type', 'status', 'next_attempt_at'],
+        schema='app'
+    )
+
+
+def downgrade():
+    op.drop_index('idx_emag_offer_outbox_due', table_name='emag_offer_outbox', schema='app')
+    op.drop_table('emag_offer_outbox', schema='app')
@@ -0,0 +1,30 @@
+"""Add content_hash to emag_products_v2
+
+Revision ID: 20261016_emag_content_hash
+Revises: 20251021_eliminated_suggest
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_emag_content_hash'
+down_revision = '20251021_eliminated_suggest'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fingerprint of the normalized eMAG payload, used by product sync to
+    # skip rewriting rows whose content did not change
+    op.add_column('emag_products_v2',
+        sa.Column('content_hash', sa.String(length=64), nullable=True,
+                  comment='SHA-256 of the normalized eMAG payload'),
+        schema='app'
+    )
+
+
+def downgrade():
+    op.drop_column('emag_products_v2', 'content_hash', schema='app')
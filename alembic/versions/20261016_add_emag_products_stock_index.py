@@ -0,0 +1,38 @@
+"""Index eMAG product stock for SQL-side inventory statistics
+
+Revision ID: 20261016_emag_stock_index
+Revises: 20261016_emag_offer_outbox
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_emag_stock_index'
+down_revision = '20261016_emag_offer_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Inventory statistics aggregate stock and price per account, and the
+    # low stock readers filter and order by stock; with price included both
+    # are answered from the index alone.
+    op.create_index(
+        'idx_emag_products_stock',
+        'emag_products_v2',
+        ['account_type', 'stock_quantity'],
+        schema='app',
+        postgresql_include=['price'],
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'idx_emag_products_stock',
+        table_name='emag_products_v2',
+        schema='app',
+        if_exists=True,
+    )
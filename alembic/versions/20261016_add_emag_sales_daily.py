@@ -0,0 +1,48 @@
+"""Roll up eMAG sales per product reference instead of per resolved product
+
+Revision ID: 20261016_emag_sales_daily
+Revises: 20261016_derived_table_builds
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_emag_sales_daily'
+down_revision = '20261016_derived_table_builds'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # eMAG order lines are rolled up under the part_number_key/SKU they
+    # carry and resolved to products when read, so orders for products
+    # mapped later are not lost.
+    op.create_table(
+        'emag_sales_daily',
+        sa.Column('sale_key', sa.String(length=100), nullable=False),
+        sa.Column('sale_date', sa.Date(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('sale_key', 'sale_date'),
+        schema='app'
+    )
+    op.create_index(
+        'idx_emag_sales_daily_day',
+        'emag_sales_daily',
+        ['sale_date'],
+        schema='app'
+    )
+    # Drop the per-product eMAG rows and the build marker, so the next read
+    # rebuilds the rollup into the new table
+    op.execute("DELETE FROM app.product_sales_daily WHERE source = 'emag'")
+    op.execute("DELETE FROM app.derived_table_builds WHERE name = 'product_sales_daily'")
+
+
+def downgrade():
+    op.drop_index('idx_emag_sales_daily_day', table_name='emag_sales_daily', schema='app')
+    op.drop_table('emag_sales_daily', schema='app')
+    op.execute("DELETE FROM app.derived_table_builds WHERE name = 'product_sales_daily'")
@@ -0,0 +1,37 @@
+"""Add emag_sync_cursors for incremental order ingestion
+
+Revision ID: 20261016_emag_sync_cursors
+Revises: 20261016_product_sales_daily
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_emag_sync_cursors'
+down_revision = '20261016_product_sales_daily'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Latest eMAG "modified" timestamp ingested per account and resource;
+    # incremental order sync requests only orders modified after it.
+    op.create_table(
+        'emag_sync_cursors',
+        sa.Column('account_type', sa.String(length=10), nullable=False),
+        sa.Column('resource', sa.String(length=50), nullable=False),
+        sa.Column('high_water_mark', sa.DateTime(), nullable=True),
+        sa.Column('last_run_at', sa.DateTime(), nullable=True),
+        sa.Column('last_run_items', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('account_type', 'resource'),
+        schema='app'
+    )
+
+
+def downgrade():
+    op.drop_table('emag_sync_cursors', schema='app')
@@ -0,0 +1,43 @@
+"""Add product_name_tokens inverted index for jieba matching
+
+Revision ID: 20261016_product_name_tokens
+Revises: 20261016_emag_content_hash
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_product_name_tokens'
+down_revision = '20261016_emag_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Posting lists: jieba token -> product / supplier product ids.
+    # Filled lazily by JiebaTokenIndex on first search, then kept up to date
+    # on every ORM flush that changes an indexed name.
+    op.create_table(
+        'product_name_tokens',
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('token', sa.String(length=100), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('entity_type', 'token', 'entity_id'),
+        schema='app'
+    )
+    op.create_index(
+        'idx_product_name_tokens_entity',
+        'product_name_tokens',
+        ['entity_type', 'entity_id'],
+        schema='app'
+    )
+
+
+def downgrade():
+    op.drop_index('idx_product_name_tokens_entity', table_name='product_name_tokens', schema='app')
+    op.drop_table('product_name_tokens', schema='app')
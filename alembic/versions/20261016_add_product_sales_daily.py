@@ -0,0 +1,44 @@
+"""Add product_sales_daily rollup for sales statistics
+
+Revision ID: 20261016_product_sales_daily
+Revises: 20261016_supplier_image_phash
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_product_sales_daily'
+down_revision = '20261016_supplier_image_phash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sold quantity per product, day and order source. Filled lazily by
+    # SalesRollup on first read, then kept up to date on every ORM flush
+    # that writes eMAG orders, sales orders or generic orders.
+    op.create_table(
+        'product_sales_daily',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('sale_date', sa.Date(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('product_id', 'sale_date', 'source'),
+        schema='app'
+    )
+    op.create_index(
+        'idx_product_sales_daily_day',
+        'product_sales_daily',
+        ['sale_date', 'source'],
+        schema='app'
+    )
+
+
+def downgrade():
+    op.drop_index('idx_product_sales_daily_day', table_name='product_sales_daily', schema='app')
+    op.drop_table('product_sales_daily', schema='app')
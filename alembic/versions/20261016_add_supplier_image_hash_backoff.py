@@ -0,0 +1,36 @@
+"""Back off hashing of supplier images that cannot be fetched or decoded
+
+Revision ID: 20261016_image_hash_backoff
+Revises: 20261016_emag_sales_daily
+Create Date: 2026-10-16 23:45:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_image_hash_backoff'
+down_revision = '20261016_emag_sales_daily'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Failed images are skipped by the scheduled hashing stage until
+    # image_hash_retry_at instead of being downloaded again on every run.
+    op.add_column(
+        'supplier_raw_products',
+        sa.Column('image_hash_attempts', sa.Integer(), nullable=False, server_default='0'),
+        schema='app',
+    )
+    op.add_column(
+        'supplier_raw_products',
+        sa.Column('image_hash_retry_at', sa.DateTime(), nullable=True),
+        schema='app',
+    )
+
+
+def downgrade():
+    op.drop_column('supplier_raw_products', 'image_hash_retry_at', schema='app')
+    op.drop_column('supplier_raw_products', 'image_hash_attempts', schema='app')
@@ -0,0 +1,36 @@
+"""Add integer perceptual image hashes to supplier_raw_products
+
+Revision ID: 20261016_supplier_image_phash
+Revises: 20261016_product_name_tokens
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_supplier_image_phash'
+down_revision = '20261016_product_name_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 64-bit dHash / pHash stored as signed BIGINT; filled by the background
+    # image hashing stage and loaded into a BK-tree for near-duplicate search.
+    op.add_column(
+        'supplier_raw_products',
+        sa.Column('image_dhash', sa.BigInteger(), nullable=True),
+        schema='app',
+    )
+    op.add_column(
+        'supplier_raw_products',
+        sa.Column('image_phash', sa.BigInteger(), nullable=True),
+        schema='app',
+    )
+
+
+def downgrade():
+    op.drop_column('supplier_raw_products', 'image_phash', schema='app')
+    op.drop_column('supplier_raw_products', 'image_dhash', schema='app')
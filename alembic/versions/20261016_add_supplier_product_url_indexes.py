@@ -0,0 +1,52 @@
+"""Index supplier product URLs for set-based duplicate checks
+
+Revision ID: 20261016_supplier_url_indexes
+Revises: 20261016_emag_category_mirror
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_supplier_url_indexes'
+down_revision = '20261016_emag_category_mirror'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The Excel import looks up the URLs of a whole chunk at once. URLs can
+    # exceed the btree entry size, and only equality is ever needed, so the
+    # indexes are hash indexes.
+    op.create_index(
+        'idx_supplier_raw_product_url',
+        'supplier_raw_products',
+        ['product_url'],
+        schema='app',
+        postgresql_using='hash',
+        if_not_exists=True,
+    )
+    op.create_index(
+        'idx_supplier_products_url',
+        'supplier_products',
+        ['supplier_product_url'],
+        schema='app',
+        postgresql_using='hash',
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'idx_supplier_products_url',
+        table_name='supplier_products',
+        schema='app',
+        if_exists=True,
+    )
+    op.drop_index(
+        'idx_supplier_raw_product_url',
+        table_name='supplier_raw_products',
+        schema='app',
+        if_exists=True,
+    )
@@ -0,0 +1,34 @@
+"""Index updated_at on tables backing version-based list ETags
+
+Revision ID: 20261016_updated_at_indexes
+Revises: 20261016_emag_sync_cursors
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261016_updated_at_indexes'
+down_revision = '20261016_emag_sync_cursors'
+branch_labels = None
+depends_on = None
+
+# List endpoints derive their ETag from max(updated_at) (plus a delete
+# counter kept outside the database); with these indexes it is a single
+# index probe.
+INDEXES = [
+    ('idx_products_updated_at', 'products'),
+    ('idx_supplier_products_updated_at', 'supplier_products'),
+    ('idx_emag_products_updated_at', 'emag_products_v2'),
+]
+
+
+def upgrade():
+    for name, table in INDEXES:
+        op.create_index(name, table, ['updated_at'], schema='app', if_not_exists=True)
+
+
+def downgrade():
+    for name, table in INDEXES:
+        op.drop_index(name, table_name=table, schema='app', if_exists=True)
@@ -14,15 +14,21 @@ from sqlalchemy.orm import Session
 from app.core.rate_limiting import RateLimiter
 
 from ..core.config import settings
+from ..core.tiered_cache import get_tiered_cache
 from ..db import get_db
+from ..db.session import AsyncSessionLocal
 from ..schemas.category import CategoryCreate, CategoryResponse, CategoryUpdate
-from ..services.infrastructure.redis import CacheManager
 
 # Response models are defined in the function signatures
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+# Cached category lists and details, all dropped by any category change
+CATEGORIES_CACHE_TAG = "categories"
+CATEGORIES_CACHE_TTL = 60
+CATEGORIES_STALE_TTL = 60
+
 # Rate limit configuration
 rate_limit = RateLimiter(
     times=settings.RATE_LIMIT_DEFAULT.split("/")[0],
@@ -196,13 +202,13 @@ async def list_categories(
         description="Maximum number of items to return",
     ),
     q: str | None = Query(None, description="Search query for category names"),
-    db: Session = Depends(get_db),
 ):
     """List all categories (simplified for frontend dropdown).
 
     Returns a simple list of categories for use in forms and dropdowns.
     """
-    try:
+
+    async def load() -> list[dict[str, Any]]:
         # Simple query without pagination for dropdown usage
         query = """
             SELECT c.id, c.name
@@ -217,11 +223,22 @@ async def list_categories(
 
         query += " ORDER BY c.name ASC LIMIT :limit"
 
-        result = await db.execute(text(query), params)
-        rows = result.fetchall()
+        # Own session: the list may be reloaded in the background
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text(query), params)
+            rows = result.fetchall()
 
         return [{"id": row.id, "name": row.name} for row in rows]
 
+    try:
+        return await get_tiered_cache().get_or_load(
+            f"categories:list:{limit}:{(q or '').strip().lower()}",
+            load,
+            CATEGORIES_CACHE_TTL,
+            stale_ttl=CATEGORIES_STALE_TTL,
+            tags=[CATEGORIES_CACHE_TAG],
+        )
+
     except Exception as e:
         logger.error(f"Error fetching categories: {e!s}", exc_info=True)
         raise HTTPException(
@@ -235,39 +252,34 @@ async def list_categories(
 async def get_category(
     request: Request,
     category_id: int,
-    db: Session = Depends(get_db),
 ):
     # Apply rate limiting
     await rate_limit(request)
 
-    # Generate cache key
-    cache_key = f"categories:detail:{category_id}"
-
-    # Try to get from cache
-    cached = await CacheManager.get_json(cache_key)
-    if cached is not None:
-        return CategoryResponse(**cached)
-
-    # Cache miss, fetch from database
-    query = text(
-        """
-        SELECT id, name, created_at
-        FROM app.categories
-        WHERE id = :category_id
-    """,
+    async def load() -> dict[str, Any] | None:
+        query = text(
+            """
+            SELECT id, name, created_at
+            FROM app.categories
+            WHERE id = :category_id
+        """,
+        )
+        async with AsyncSessionLocal() as session:
+            result = (await session.execute(query, {"category_id": category_id})).first()
+        if not result:
+            return None
+        return CategoryResponse(id=result.id, name=result.name).model_dump()
+
+    cached = await get_tiered_cache().get_or_load(
+        f"categories:detail:{category_id}",
+        load,
+        CATEGORIES_CACHE_TTL,
+        tags=[CATEGORIES_CACHE_TAG],
     )
-    result = db.execute(query, {"category_id": category_id}).first()
-
-    if not result:
+    if cached is None:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    # Prepare response
-    response = CategoryResponse(id=result.id, name=result.name)
-
-    # Cache the response for 60 seconds
-    await CacheManager.set_json(cache_key, response.dict(), ttl=60)
-
-    return response
+    return CategoryResponse(**cached)
 
 
 @router.post("", response_model=CategoryResponse, status_code=201)
@@ -298,7 +310,7 @@ async def create_category(
         db.commit()
 
         # Invalidate relevant caches
-        await CacheManager.delete_matching("categories:list:*")
+        await get_tiered_cache().invalidate_tags(CATEGORIES_CACHE_TAG)
 
         return CategoryResponse(id=created_category.id, name=created_category.name)
 
@@ -357,8 +369,7 @@ async def update_category(
         db.commit()
 
         # Invalidate caches
-        await CacheManager.delete_matching("categories:list:*")
-        await CacheManager.delete(f"categories:detail:{category_id}")
+        await get_tiered_cache().invalidate_tags(CATEGORIES_CACHE_TAG)
 
         return CategoryResponse(id=updated_category.id, name=updated_category.name)
 
@@ -405,8 +416,7 @@ async def delete_category(
         db.commit()
 
         # Invalidate caches
-        await CacheManager.delete_matching("categories:list:*")
-        await CacheManager.delete(f"categories:detail:{category_id}")
+        await get_tiered_cache().invalidate_tags(CATEGORIES_CACHE_TAG)
 
     except Exception as e:
         db.rollback()
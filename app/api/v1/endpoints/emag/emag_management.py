@@ -142,6 +142,7 @@ async def create_backup(
     include_orders: bool = True,
     include_sync_logs: bool = True,
     compress: bool = True,
+    incremental: bool = False,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -154,6 +155,7 @@ async def create_backup(
         include_orders: Include orders in backup
         include_sync_logs: Include sync logs in backup
         compress: Compress backup with gzip
+        incremental: Only back up rows changed since the previous backup
 
     Returns:
         Backup information including path and size
@@ -166,6 +168,7 @@ async def create_backup(
         include_orders=include_orders,
         include_sync_logs=include_sync_logs,
         compress=compress,
+        incremental=incremental,
     )
 
     if not result["success"]:
@@ -229,7 +232,7 @@ async def restore_backup(
     Restore data from a backup file.
 
     Args:
-        backup_path: Path to the backup file
+        backup_path: Path to the backup directory
 
     Returns:
         Restore results
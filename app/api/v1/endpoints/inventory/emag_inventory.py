@@ -11,7 +11,7 @@ from datetime import datetime
 from io import BytesIO
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -27,8 +27,18 @@ except ImportError:
 from app.core.logging import get_logger
 from app.core.utils.account_utils import normalize_account_type
 from app.db import get_db
+from app.db.session import AsyncSessionLocal
+from app.middleware.cache_headers import check_not_modified
 from app.models.emag_models import EmagProductV2
 from app.security.jwt import get_current_user
+from app.services.inventory.inventory_stats_service import (
+    ALERT_INFO_THRESHOLD,
+    ALERT_WARNING_THRESHOLD,
+    LOW_STOCK_COLUMNS,
+    compute_inventory_statistics,
+    fetch_low_stock_export_rows,
+    fetch_stock_alert_rows,
+)
 
 logger = get_logger(__name__)
 
@@ -104,12 +114,14 @@ async def get_inventory_statistics(
     account_type: str | None = Query(
         None, description="Filter by account type: main or fbe"
     ),
-    db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ) -> dict[str, Any]:
     """
     Get inventory statistics for eMAG products.
 
+    Computed in the database by one aggregate query (see
+    ``inventory_stats_service``).
+
     Returns:
         - Total products
         - Low stock count
@@ -117,103 +129,30 @@ async def get_inventory_statistics(
         - Average stock level
         - Statistics by account type
 
-    Caching: Results are cached for 5 minutes to reduce database load.
+    Caching: Results are cached for 5 minutes, and served for one more
+    minute while they are recomputed, to reduce database load.
     """
     try:
         # Normalize account_type using utility function
         account_type = normalize_account_type(account_type)
+        computed = False
 
-        # Try to get from cache first
-        if CACHE_AVAILABLE:
-            cache = get_inventory_cache()
-            cached_stats = await cache.get_statistics(account_type)
-            if cached_stats:
-                logger.debug(f"Cache hit for statistics (account_type={account_type})")
-                return {"status": "success", "data": cached_stats, "cached": True}
-        # Base query
-        query = select(EmagProductV2)
-
-        if account_type:
-            query = query.where(EmagProductV2.account_type == account_type)
-
-        # Get all products
-        result = await db.execute(query)
-        products = result.scalars().all()
+        async def compute_statistics() -> dict[str, Any]:
+            nonlocal computed
+            computed = True
+            # Own session: the result is shared with concurrent requests and
+            # may be recomputed in the background after this request ends
+            async with AsyncSessionLocal() as db:
+                return await compute_inventory_statistics(db, account_type)
 
-        # Calculate statistics
-        total_products = len(products)
-        low_stock_count = 0
-        out_of_stock_count = 0
-        critical_count = 0
-        total_stock = 0
-        total_value = 0.0
-
-        # Define thresholds
-        CRITICAL_THRESHOLD = 5
-        LOW_STOCK_THRESHOLD = 10
-
-        for product in products:
-            stock = product.stock_quantity or 0
-            price = product.price or 0
-            total_stock += stock
-            total_value += stock * price
-
-            if stock == 0:
-                out_of_stock_count += 1
-            elif stock <= CRITICAL_THRESHOLD:
-                critical_count += 1
-            elif stock <= LOW_STOCK_THRESHOLD:
-                low_stock_count += 1
-
-        avg_stock = total_stock / total_products if total_products > 0 else 0
-        in_stock_count = total_products - out_of_stock_count
-        stock_health = (
-            (in_stock_count / total_products * 100) if total_products > 0 else 0
-        )
-
-        # Get statistics by account type
-        main_query = select(func.count(EmagProductV2.id)).where(
-            EmagProductV2.account_type == "main"
-        )
-        main_result = await db.execute(main_query)
-        main_count = main_result.scalar() or 0
-
-        fbe_query = select(func.count(EmagProductV2.id)).where(
-            EmagProductV2.account_type == "fbe"
-        )
-        fbe_result = await db.execute(fbe_query)
-        fbe_count = fbe_result.scalar() or 0
-
-        # Calculate needs_reorder (products with stock <= LOW_STOCK_THRESHOLD)
-        needs_reorder = out_of_stock_count + critical_count + low_stock_count
-
-        statistics_data = {
-            "total_items": total_products,
-            "out_of_stock": out_of_stock_count,
-            "critical": critical_count,
-            "low_stock": low_stock_count,
-            "in_stock": in_stock_count,
-            "needs_reorder": needs_reorder,
-            "total_value": round(total_value, 2),
-            "stock_health_percentage": round(stock_health, 2),
-            "average_stock_level": round(avg_stock, 2),
-            "by_account": {
-                "main": main_count,
-                "fbe": fbe_count,
-            },
-            "thresholds": {
-                "critical": CRITICAL_THRESHOLD,
-                "low_stock": LOW_STOCK_THRESHOLD,
-            },
-        }
-
-        # Cache the results
         if CACHE_AVAILABLE:
-            cache = get_inventory_cache()
-            await cache.set_statistics(statistics_data, account_type)
-            logger.debug(f"Cached statistics (account_type={account_type})")
+            statistics_data = await get_inventory_cache().get_or_compute_statistics(
+                compute_statistics, account_type
+            )
+        else:
+            statistics_data = await compute_statistics()
 
-        return {"status": "success", "data": statistics_data, "cached": False}
+        return {"status": "success", "data": statistics_data, "cached": not computed}
 
     except Exception as e:
         logger.error(f"Error fetching inventory statistics: {e}", exc_info=True)
@@ -225,6 +164,8 @@ async def get_inventory_statistics(
 
 @router.get("/low-stock")
 async def get_low_stock_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(20, ge=1, le=100, description="Maximum number of records"),
     account_type: str | None = Query(
@@ -250,9 +191,14 @@ async def get_low_stock_products(
         threshold: Stock level threshold
 
     Returns:
-        List of products with low stock
+        List of products with low stock, or 304 when If-None-Match still
+        matches the current data version
     """
     try:
+        not_modified = await check_not_modified(request, response, db, EmagProductV2)
+        if not_modified is not None:
+            return not_modified
+
         # Normalize account_type using utility function
         account_type = normalize_account_type(account_type)
 
@@ -267,8 +213,8 @@ async def get_low_stock_products(
         if account_type:
             filters.append(EmagProductV2.account_type == account_type)
 
-        # Base query for low stock products
-        query = select(EmagProductV2).where(and_(*filters))
+        # Base query for low stock products, only the rendered columns
+        query = select(*LOW_STOCK_COLUMNS).where(and_(*filters))
 
         # Order by stock level (lowest first)
         query = query.order_by(EmagProductV2.stock_quantity.asc().nulls_first())
@@ -283,7 +229,7 @@ async def get_low_stock_products(
 
         # Execute query
         result = await db.execute(query)
-        products = result.scalars().all()
+        products = result.all()
 
         # Format response
         products_data = []
@@ -440,53 +386,7 @@ async def get_stock_alerts(
         # Normalize account_type using utility function
         account_type = normalize_account_type(account_type)
 
-        # Define thresholds
-        CRITICAL_THRESHOLD = 0
-        WARNING_THRESHOLD = 10
-        INFO_THRESHOLD = 50
-
-        # Build query based on severity
-        if severity == "critical":
-            query = select(EmagProductV2).where(
-                or_(
-                    EmagProductV2.stock_quantity == CRITICAL_THRESHOLD,
-                    EmagProductV2.stock_quantity.is_(None),
-                )
-            )
-        elif severity == "warning":
-            query = select(EmagProductV2).where(
-                and_(
-                    EmagProductV2.stock_quantity > CRITICAL_THRESHOLD,
-                    EmagProductV2.stock_quantity <= WARNING_THRESHOLD,
-                )
-            )
-        elif severity == "info":
-            query = select(EmagProductV2).where(
-                and_(
-                    EmagProductV2.stock_quantity > WARNING_THRESHOLD,
-                    EmagProductV2.stock_quantity <= INFO_THRESHOLD,
-                )
-            )
-        else:
-            # All alerts
-            query = select(EmagProductV2).where(
-                or_(
-                    EmagProductV2.stock_quantity <= INFO_THRESHOLD,
-                    EmagProductV2.stock_quantity.is_(None),
-                )
-            )
-
-        if account_type:
-            query = query.where(EmagProductV2.account_type == account_type)
-
-        # Order by stock level
-        query = query.order_by(EmagProductV2.stock_quantity.asc().nulls_first()).limit(
-            limit
-        )
-
-        # Execute query
-        result = await db.execute(query)
-        products = result.scalars().all()
+        products = await fetch_stock_alert_rows(db, severity, account_type, limit)
 
         # Format alerts
         alerts = []
@@ -497,7 +397,7 @@ async def get_stock_alerts(
             if stock == 0:
                 alert_severity = "critical"
                 message = f"Out of stock: {product.name}"
-            elif stock <= WARNING_THRESHOLD:
+            elif stock <= ALERT_WARNING_THRESHOLD:
                 alert_severity = "warning"
                 message = f"Low stock ({stock} units): {product.name}"
             else:
@@ -530,9 +430,9 @@ async def get_stock_alerts(
                 "count": len(alerts),
                 "severity_filter": severity,
                 "thresholds": {
-                    "critical": CRITICAL_THRESHOLD,
-                    "warning": WARNING_THRESHOLD,
-                    "info": INFO_THRESHOLD,
+                    "critical": 0,
+                    "warning": ALERT_WARNING_THRESHOLD,
+                    "info": ALERT_INFO_THRESHOLD,
                 },
             },
         }
@@ -576,47 +476,8 @@ async def export_low_stock_to_excel(
         # Normalize account_type using utility function
         account_type = normalize_account_type(account_type)
 
-        # Build query for low stock products
-        LOW_STOCK_THRESHOLD = 20
-
-        query = select(EmagProductV2).where(
-            or_(
-                EmagProductV2.stock_quantity <= LOW_STOCK_THRESHOLD,
-                EmagProductV2.stock_quantity.is_(None),
-            )
-        )
-
-        if account_type:
-            query = query.where(EmagProductV2.account_type == account_type)
-
-        # Filter by status
-        if stock_status == "out_of_stock":
-            query = query.where(
-                or_(
-                    EmagProductV2.stock_quantity == 0,
-                    EmagProductV2.stock_quantity.is_(None),
-                )
-            )
-        elif stock_status == "critical":
-            query = query.where(
-                and_(
-                    EmagProductV2.stock_quantity > 0, EmagProductV2.stock_quantity <= 10
-                )
-            )
-        elif stock_status == "low_stock":
-            query = query.where(
-                and_(
-                    EmagProductV2.stock_quantity > 10,
-                    EmagProductV2.stock_quantity <= LOW_STOCK_THRESHOLD,
-                )
-            )
-
-        # Order by stock level (lowest first)
-        query = query.order_by(EmagProductV2.stock_quantity.asc().nulls_first())
-
-        # Execute query
-        result = await db.execute(query)
-        products = result.scalars().all()
+        # Low stock products, only the exported columns
+        products = await fetch_low_stock_export_rows(db, account_type, stock_status)
 
         if not products:
             raise HTTPException(
@@ -5,14 +5,13 @@ This endpoint provides low stock products with all available suppliers,
 allowing users to select suppliers and export filtered data.
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from io import BytesIO
 
-import requests
 from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from PIL import Image
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -28,16 +27,16 @@ except ImportError:
     EXCEL_AVAILABLE = False
 
 from app.db import get_db
-from app.models.emag_models import EmagOrder, EmagProductV2
+from app.models.emag_models import EmagProductV2
 from app.models.inventory import InventoryItem, Warehouse
-from app.models.order import OrderLine
 from app.models.product import Product
 from app.models.product_supplier_sheet import ProductSupplierSheet
 from app.models.purchase import PurchaseOrder, PurchaseOrderItem
-from app.models.sales import SalesOrderLine
 from app.models.supplier import SupplierProduct
 from app.models.user import User
 from app.security.jwt import get_current_user
+from app.services.inventory.sales_rollup_service import SalesRollup
+from app.services.inventory.thumbnail_cache import ThumbnailCache
 
 router = APIRouter(prefix="/inventory", tags=["low-stock-suppliers"])
 
@@ -93,7 +92,8 @@ async def calculate_sold_quantity_last_6_months(
     """
     Calculate quantity sold in the last 6 months for each product.
 
-    Aggregates data from:
+    Reads the daily sales rollups (``app.product_sales_daily`` and
+    ``app.emag_sales_daily``), which aggregate data from:
     1. eMAG Orders (from products JSONB field)
     2. Sales Orders (SalesOrderLine)
     3. Generic Orders (OrderLine)
@@ -104,165 +104,14 @@ async def calculate_sold_quantity_last_6_months(
     if not product_ids:
         return {}
 
-    six_months_ago = datetime.now() - timedelta(days=180)
-    sold_data = dict.fromkeys(
-        product_ids, {"total_sold": 0, "avg_monthly": 0.0, "sources": {}}
-    )
-    # Initialize each product with its own dict
-    sold_data = {
-        pid: {"total_sold": 0, "avg_monthly": 0.0, "sources": {}}
-        for pid in product_ids
-    }
-
-    # Get product SKUs mapping
-    # CRITICAL: We need to map both Product.sku AND emag part_number_key to product_id
-    # because emag_orders uses part_number_key (e.g., DVX0FSYBM) not Product.sku (e.g., EMG463)
-    products_query = select(Product.id, Product.sku).where(Product.id.in_(product_ids))
-    products_result = await db.execute(products_query)
-    product_sku_map = {pid: sku for pid, sku in products_result.all()}
-    sku_to_id_map = {sku: pid for pid, sku in product_sku_map.items()}
-
-    # CRITICAL FIX: Also map emag part_number_key to product_id
-    # Query emag_products_v2 to get part_number_key for our products
-    try:
-        from app.models.emag_models import EmagProductV2
-        emag_products_query = (
-            select(EmagProductV2.sku, EmagProductV2.part_number_key)
-            .where(EmagProductV2.sku.in_(list(product_sku_map.values())))
-        )
-        emag_products_result = await db.execute(emag_products_query)
-
-        # Map part_number_key -> product_id
-        for local_sku, part_number_key in emag_products_result.all():
-            if part_number_key and local_sku in sku_to_id_map:
-                product_id = sku_to_id_map[local_sku]
-                # Add part_number_key mapping
-                sku_to_id_map[part_number_key] = product_id
-                logging.debug(
-                    "Mapped eMAG part_number_key %s -> product_id %s (local SKU: %s)",
-                    part_number_key,
-                    product_id,
-                    local_sku,
-                )
-    except Exception as e:
-        logging.warning(f"Error mapping eMAG part_number_keys: {e}")
-
-    # 1. Query eMAG Orders (products stored in JSONB)
-    # We need to extract product quantities from the JSONB products field
-    # NOTE: Table may not exist in all environments - handle gracefully
-    try:
-        emag_orders_query = (
-            select(EmagOrder.products, EmagOrder.order_date)
-            .where(
-                and_(
-                    EmagOrder.order_date >= six_months_ago,
-                    EmagOrder.status.in_([3, 4]),  # 3=prepared, 4=finalized
-                    EmagOrder.products.isnot(None),
-                )
-            )
-        )
-        emag_result = await db.execute(emag_orders_query)
-        emag_orders = emag_result.all()
-
-        # Process eMAG orders
-        for products_json, _ in emag_orders:
-            if not products_json or not isinstance(products_json, list):
-                continue
-
-            for product_item in products_json:
-                # eMAG products structure: {"part_number_key": "SKU", "quantity": 1, ...}
-                sku = product_item.get("part_number_key") or product_item.get("sku")
-                quantity = product_item.get("quantity", 0)
-
-                if sku and sku in sku_to_id_map:
-                    product_id = sku_to_id_map[sku]
-                    sold_data[product_id]["total_sold"] += quantity
-                    sold_data[product_id]["sources"]["emag"] = (
-                        sold_data[product_id]["sources"].get("emag", 0) + quantity
-                    )
-    except Exception as e:
-        logging.warning(f"Error querying eMAG orders (table may not exist): {e}")
-
-    # 2. Query Sales Orders
-    sales_query = (
-        select(SalesOrderLine.product_id, func.sum(SalesOrderLine.quantity))
-        .join(
-            SalesOrderLine.sales_order
-        )
-        .where(
-            and_(
-                SalesOrderLine.product_id.in_(product_ids),
-                SalesOrderLine.sales_order.has(
-                    and_(
-                        func.date(
-                            SalesOrderLine.sales_order.property.mapper.class_.order_date
-                        )
-                        >= six_months_ago,
-                        SalesOrderLine.sales_order.property.mapper.class_.status.in_(
-                            ["confirmed", "processing", "shipped", "delivered"]
-                        ),
-                    )
-                ),
-            )
-        )
-        .group_by(SalesOrderLine.product_id)
-    )
-
-    try:
-        sales_result = await db.execute(sales_query)
-        for product_id, quantity in sales_result.all():
-            if product_id in sold_data:
-                qty = int(quantity or 0)
-                sold_data[product_id]["total_sold"] += qty
-                sold_data[product_id]["sources"]["sales_orders"] = qty
-    except Exception as e:
-        logging.warning(f"Error querying sales orders: {e}")
-
-    # 3. Query Generic Orders
-    orders_query = (
-        select(OrderLine.product_id, func.sum(OrderLine.quantity))
-        .join(OrderLine.order)
-        .where(
-            and_(
-                OrderLine.product_id.in_(product_ids),
-                OrderLine.order.has(
-                    and_(
-                        func.date(
-                            OrderLine.order.property.mapper.class_.order_date
-                        )
-                        >= six_months_ago,
-                        OrderLine.order.property.mapper.class_.status.in_(
-                            [
-                                "confirmed",
-                                "processing",
-                                "shipped",
-                                "delivered",
-                                "completed",
-                            ]
-                        ),
-                    )
-                ),
-            )
-        )
-        .group_by(OrderLine.product_id)
-    )
-
     try:
-        orders_result = await db.execute(orders_query)
-        for product_id, quantity in orders_result.all():
-            if product_id in sold_data:
-                qty = int(quantity or 0)
-                sold_data[product_id]["total_sold"] += qty
-                sold_data[product_id]["sources"]["orders"] = qty
+        return await SalesRollup(db).get_sold_quantities(product_ids, days=180)
     except Exception as e:
-        logging.warning(f"Error querying generic orders: {e}")
-
-    # Calculate average monthly sales
-    for product_id in sold_data:
-        total = sold_data[product_id]["total_sold"]
-        sold_data[product_id]["avg_monthly"] = round(total / 6.0, 2)
-
-    return sold_data
+        logging.warning(f"Error reading daily sales rollup: {e}")
+        return {
+            pid: {"total_sold": 0, "avg_monthly": 0.0, "sources": {}}
+            for pid in product_ids
+        }
 
 
 # ============================================================================
@@ -665,107 +514,19 @@ async def get_low_stock_with_suppliers(
     }
 
 
-@router.post("/export/low-stock-by-supplier")
-async def export_low_stock_by_supplier(
-    selected_products: list[dict] = Body(
-        ..., description="List of products with selected supplier IDs"
-    ),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+def _build_low_stock_workbook(
+    products_by_supplier_name: dict,
+    products_data: dict,
+    supplier_sheets: dict,
+    supplier_products_map: dict,
+    thumbnails: dict[str, bytes],
+) -> BytesIO:
     """
-    Export low stock products grouped by selected suppliers to Excel.
-
-    Request body format:
-    [
-        {
-            "product_id": 123,
-            "sku": "PROD-001",
-            "supplier_id": "sheet_45",
-            "reorder_quantity": 50
-        },
-        ...
-    ]
+    Build the low stock Excel workbook (one sheet per supplier).
 
-    Creates separate sheets for each supplier in the Excel file.
+    Pure CPU work on already loaded data, run in a worker thread so large
+    exports do not block the event loop.
     """
-
-    # Validation: Check Excel library
-    if not EXCEL_AVAILABLE:
-        raise HTTPException(
-            status_code=500,
-            detail="Excel export not available. Please install openpyxl",
-        )
-
-    # Validation: Check if products selected
-    if not selected_products:
-        raise HTTPException(status_code=400, detail="No products selected for export")
-
-    # Validation: Check reasonable limit (prevent abuse)
-    if len(selected_products) > 1000:
-        raise HTTPException(
-            status_code=400,
-            detail="Too many products selected. Maximum 1000 products per export",
-        )
-
-    # First pass: collect all supplier IDs and map to names
-    supplier_id_to_name = {}
-    for item in selected_products:
-        supplier_id = item.get("supplier_id")
-        supplier_name = item.get("supplier_name", "Unknown")
-        if supplier_id:
-            supplier_id_to_name[supplier_id] = supplier_name
-
-    # Group products by supplier NAME (not ID) to merge same suppliers from different sources
-    products_by_supplier_name = {}
-    for item in selected_products:
-        supplier_id = item.get("supplier_id")
-        supplier_name = item.get("supplier_name", "Unknown")
-
-        if supplier_name:
-            if supplier_name not in products_by_supplier_name:
-                products_by_supplier_name[supplier_name] = {
-                    "products": [],
-                    "supplier_ids": [],  # Track all IDs for this supplier
-                }
-            products_by_supplier_name[supplier_name]["products"].append(item)
-            if (
-                supplier_id
-                not in products_by_supplier_name[supplier_name]["supplier_ids"]
-            ):
-                products_by_supplier_name[supplier_name]["supplier_ids"].append(
-                    supplier_id
-                )
-
-    # Get product and supplier details from database
-    product_ids = [item["product_id"] for item in selected_products]
-
-    # Get products with inventory
-    products_query = (
-        select(Product, InventoryItem, Warehouse)
-        .join(InventoryItem, Product.id == InventoryItem.product_id)
-        .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
-        .where(Product.id.in_(product_ids))
-    )
-    products_result = await db.execute(products_query)
-    products_data = {p.id: (p, inv, wh) for p, inv, wh in products_result.all()}
-
-    # Get all supplier sheet data
-    supplier_sheets_query = select(ProductSupplierSheet)
-    supplier_sheets_result = await db.execute(supplier_sheets_query)
-    supplier_sheets = {
-        f"sheet_{s.id}": s for s in supplier_sheets_result.scalars().all()
-    }
-
-    # Get all 1688 supplier data
-    supplier_products_query = select(SupplierProduct).options(
-        selectinload(SupplierProduct.supplier)
-    )
-    supplier_products_result = await db.execute(supplier_products_query)
-    supplier_products_map = {
-        f"1688_{sp.id}": sp for sp in supplier_products_result.scalars().all()
-    }
-
     # Create Excel workbook
     wb = Workbook()
     wb.remove(wb.active)  # Remove default sheet
@@ -958,34 +719,21 @@ async def export_low_stock_by_supplier(
                     cell.fill = low_stock_fill
 
             # Insert product image in first column
-            if product.image_url:
+            thumbnail = thumbnails.get(product.image_url) if product.image_url else None
+            if thumbnail:
                 try:
-                    # Download image
-                    response = requests.get(product.image_url, timeout=5)
-                    if response.status_code == 200:
-                        img_data = BytesIO(response.content)
-                        img = Image.open(img_data)
-
-                        # Resize image to fit in cell (max 80x80 pixels)
-                        img.thumbnail((183, 183), Image.Resampling.LANCZOS)
-
-                        # Save to BytesIO
-                        img_buffer = BytesIO()
-                        img.save(img_buffer, format='PNG')
-                        img_buffer.seek(0)
-
-                        # Create Excel image
-                        excel_img = ExcelImage(img_buffer)
-                        excel_img.width = 183
-                        excel_img.height = 183
-
-                        # Add image to cell
-                        ws.add_image(excel_img, f"A{row_num}")
-
-                        # Set row height to accommodate image
-                        ws.row_dimensions[row_num].height = 139
+                    # Create Excel image from the cached thumbnail
+                    excel_img = ExcelImage(BytesIO(thumbnail))
+                    excel_img.width = 183
+                    excel_img.height = 183
+
+                    # Add image to cell
+                    ws.add_image(excel_img, f"A{row_num}")
+
+                    # Set row height to accommodate image
+                    ws.row_dimensions[row_num].height = 139
                 except Exception as e:
-                    # If image download/processing fails, continue without image
+                    # If image processing fails, continue without image
                     logging.warning(f"Failed to process image for product {product.sku}: {e}")
 
             row_num += 1
@@ -1026,6 +774,127 @@ async def export_low_stock_by_supplier(
     excel_file = BytesIO()
     wb.save(excel_file)
     excel_file.seek(0)
+    return excel_file
+
+
+@router.post("/export/low-stock-by-supplier")
+async def export_low_stock_by_supplier(
+    selected_products: list[dict] = Body(
+        ..., description="List of products with selected supplier IDs"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Export low stock products grouped by selected suppliers to Excel.
+
+    Request body format:
+    [
+        {
+            "product_id": 123,
+            "sku": "PROD-001",
+            "supplier_id": "sheet_45",
+            "reorder_quantity": 50
+        },
+        ...
+    ]
+
+    Creates separate sheets for each supplier in the Excel file.
+    """
+
+    # Validation: Check Excel library
+    if not EXCEL_AVAILABLE:
+        raise HTTPException(
+            status_code=500,
+            detail="Excel export not available. Please install openpyxl",
+        )
+
+    # Validation: Check if products selected
+    if not selected_products:
+        raise HTTPException(status_code=400, detail="No products selected for export")
+
+    # Validation: Check reasonable limit (prevent abuse)
+    if len(selected_products) > 1000:
+        raise HTTPException(
+            status_code=400,
+            detail="Too many products selected. Maximum 1000 products per export",
+        )
+
+    # First pass: collect all supplier IDs and map to names
+    supplier_id_to_name = {}
+    for item in selected_products:
+        supplier_id = item.get("supplier_id")
+        supplier_name = item.get("supplier_name", "Unknown")
+        if supplier_id:
+            supplier_id_to_name[supplier_id] = supplier_name
+
+    # Group products by supplier NAME (not ID) to merge same suppliers from different sources
+    products_by_supplier_name = {}
+    for item in selected_products:
+        supplier_id = item.get("supplier_id")
+        supplier_name = item.get("supplier_name", "Unknown")
+
+        if supplier_name:
+            if supplier_name not in products_by_supplier_name:
+                products_by_supplier_name[supplier_name] = {
+                    "products": [],
+                    "supplier_ids": [],  # Track all IDs for this supplier
+                }
+            products_by_supplier_name[supplier_name]["products"].append(item)
+            if (
+                supplier_id
+                not in products_by_supplier_name[supplier_name]["supplier_ids"]
+            ):
+                products_by_supplier_name[supplier_name]["supplier_ids"].append(
+                    supplier_id
+                )
+
+    # Get product and supplier details from database
+    product_ids = [item["product_id"] for item in selected_products]
+
+    # Get products with inventory
+    products_query = (
+        select(Product, InventoryItem, Warehouse)
+        .join(InventoryItem, Product.id == InventoryItem.product_id)
+        .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
+        .where(Product.id.in_(product_ids))
+    )
+    products_result = await db.execute(products_query)
+    products_data = {p.id: (p, inv, wh) for p, inv, wh in products_result.all()}
+
+    # Get all supplier sheet data
+    supplier_sheets_query = select(ProductSupplierSheet)
+    supplier_sheets_result = await db.execute(supplier_sheets_query)
+    supplier_sheets = {
+        f"sheet_{s.id}": s for s in supplier_sheets_result.scalars().all()
+    }
+
+    # Get all 1688 supplier data
+    supplier_products_query = select(SupplierProduct).options(
+        selectinload(SupplierProduct.supplier)
+    )
+    supplier_products_result = await db.execute(supplier_products_query)
+    supplier_products_map = {
+        f"1688_{sp.id}": sp for sp in supplier_products_result.scalars().all()
+    }
+
+    # Download (or reuse cached) product thumbnails concurrently
+    image_urls = [
+        products_data[item["product_id"]][0].image_url
+        for item in selected_products
+        if item["product_id"] in products_data
+    ]
+    thumbnails = await ThumbnailCache().get_many(image_urls)
+
+    # Build the workbook off the event loop
+    excel_file = await asyncio.to_thread(
+        _build_low_stock_workbook,
+        products_by_supplier_name,
+        products_data,
+        supplier_sheets,
+        supplier_products_map,
+        thumbnails,
+    )
 
     # Generate filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
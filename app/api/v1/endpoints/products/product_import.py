@@ -3,6 +3,7 @@ Product Import API Endpoints
 Handles importing products from Google Sheets and managing mappings
 """
 
+import asyncio
 import logging
 from datetime import datetime
 
@@ -29,6 +30,12 @@ class ImportRequest(BaseModel):
     import_suppliers: bool = Field(
         default=True, description="Import supplier data from Product_Suppliers tab"
     )
+    batch_size: int | None = Field(
+        default=500,
+        ge=1,
+        le=5000,
+        description="Rows per committed batch; null imports row by row",
+    )
 
 
 class ImportResponse(BaseModel):
@@ -208,6 +215,7 @@ async def import_from_google_sheets(
             user_email=current_user.email,
             auto_map=request.auto_map,
             import_suppliers=request.import_suppliers,
+            batch_size=request.batch_size,
         )
 
         import_duration = (datetime.now() - import_start_time).total_seconds()
@@ -647,13 +655,13 @@ async def test_google_sheets_connection(current_user: User = Depends(get_current
         service = GoogleSheetsService()
 
         # Test authentication - now raises detailed exceptions
-        service.authenticate()
+        await asyncio.to_thread(service.authenticate)
 
         # Test opening spreadsheet - now raises detailed exceptions
-        service.open_spreadsheet()
+        await asyncio.to_thread(service.open_spreadsheet)
 
         # Get statistics
-        stats = service.get_sheet_statistics()
+        stats = await asyncio.to_thread(service.get_sheet_statistics)
 
         return {
             "status": "connected",
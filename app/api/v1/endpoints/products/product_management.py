@@ -11,16 +11,17 @@ Features:
 from datetime import UTC, datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field, field_validator
 from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import noload, selectinload
 
 from app.db import get_db
+from app.middleware.cache_headers import check_not_modified
 from app.models.product import Product
 from app.models.product_history import ProductChangeLog, ProductSKUHistory
-from app.models.supplier import SupplierProduct
+from app.models.supplier import Supplier, SupplierProduct
 from app.models.user import User
 from app.security.jwt import get_current_user
 
@@ -650,6 +651,8 @@ async def get_products_statistics(
 
 @router.get("")
 async def list_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(False),
@@ -668,7 +671,15 @@ async def list_products(
     - active: Show only active products (is_active=true AND is_discontinued=false)
     - inactive: Show only inactive products (is_active=false)
     - discontinued: Show only discontinued products (is_discontinued=true)
+
+    Supports conditional GET: a matching If-None-Match is answered with
+    304 before the product query runs.
     """
+    not_modified = await check_not_modified(
+        request, response, db, Product, SupplierProduct, Supplier
+    )
+    if not_modified is not None:
+        return not_modified
 
     # Build query
     query = select(Product)
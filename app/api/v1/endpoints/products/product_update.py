@@ -3,6 +3,7 @@ Product Update API Endpoints
 Handles importing and updating products from Google Sheets
 """
 
+import asyncio
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -378,17 +379,17 @@ async def test_google_sheets_connection(current_user: User = Depends(get_current
         service = GoogleSheetsService()
 
         # Test authentication
-        if not service.authenticate():
+        if not await asyncio.to_thread(service.authenticate):
             raise HTTPException(
                 status_code=500, detail="Failed to authenticate with Google Sheets API"
             )
 
         # Test opening spreadsheet
-        if not service.open_spreadsheet():
+        if not await asyncio.to_thread(service.open_spreadsheet):
             raise HTTPException(status_code=500, detail="Failed to open spreadsheet")
 
         # Get statistics
-        stats = service.get_sheet_statistics()
+        stats = await asyncio.to_thread(service.get_sheet_statistics)
 
         return {
             "status": "connected",
@@ -432,16 +433,16 @@ async def get_google_sheets_products(
         service = GoogleSheetsService()
 
         # Authenticate and open spreadsheet
-        if not service.authenticate():
+        if not await asyncio.to_thread(service.authenticate):
             raise HTTPException(
                 status_code=500, detail="Failed to authenticate with Google Sheets API"
             )
 
-        if not service.open_spreadsheet():
+        if not await asyncio.to_thread(service.open_spreadsheet):
             raise HTTPException(status_code=500, detail="Failed to open spreadsheet")
 
-        # Get products from Google Sheets
-        sheet_products = service.get_all_products()
+        # Get products from the cached sheet snapshot (downloads only when changed)
+        sheet_products = (await service.get_products_snapshot_async()).rows
 
         # Limit results
         limited_products = sheet_products[:limit]
@@ -7,12 +7,24 @@ Provides endpoints for:
 - Price comparison across suppliers
 """
 
-
-from fastapi import APIRouter, Body, Depends, File, HTTPException, UploadFile
+import os
+import tempfile
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Body,
+    Depends,
+    File,
+    HTTPException,
+    UploadFile,
+    status,
+)
 from sqlalchemy import and_, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import get_current_active_user, get_database_session
+from app.db.session import AsyncSessionLocal
 from app.models.supplier import Supplier
 from app.models.supplier_matching import (
     MatchingStatus,
@@ -29,7 +41,12 @@ from app.schemas.supplier_matching import (
     SupplierRawProductResponse,
 )
 from app.services.product.product_matching_service import ProductMatchingService
-from app.services.suppliers.supplier_import_service import SupplierImportService
+from app.services.suppliers.supplier_import_service import (
+    SupplierImportService,
+    create_import_job,
+    get_import_job,
+    run_import_job,
+)
 
 router = APIRouter()
 
@@ -61,15 +78,12 @@ async def import_products_from_excel(
             detail="Invalid file type. Please upload an Excel file (.xlsx or .xls)",
         )
 
-    # Read file content
-    content = await file.read()
-
-    # Import products
+    # Import products; the upload is read from its spooled file in chunks
     import_service = SupplierImportService(db)
 
     try:
         result = await import_service.import_from_excel(
-            file_content=content, supplier_id=supplier_id
+            file_content=file.file, supplier_id=supplier_id
         )
         return result
     except ValueError as e:
@@ -78,6 +92,47 @@ async def import_products_from_excel(
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}") from e
 
 
+@router.post("/import/excel/background", status_code=status.HTTP_202_ACCEPTED)
+async def import_products_from_excel_in_background(
+    supplier_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    current_user=Depends(get_current_active_user),
+):
+    """Import a large supplier Excel file in the background.
+
+    Returns a job ID at once; poll ``/import/jobs/{job_id}`` for progress
+    and the import statistics.
+    """
+    if not file.filename.endswith((".xlsx", ".xls")):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Please upload an Excel file (.xlsx or .xls)",
+        )
+
+    # The upload is gone once the response is sent, so keep a copy on disk
+    suffix = os.path.splitext(file.filename)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as target:
+        while chunk := await file.read(1024 * 1024):
+            target.write(chunk)
+
+    job = await create_import_job(supplier_id, file.filename)
+    background_tasks.add_task(run_import_job, job, target.name, AsyncSessionLocal)
+    return job
+
+
+@router.get("/import/jobs/{job_id}")
+async def get_import_job_status(
+    job_id: str,
+    current_user=Depends(get_current_active_user),
+):
+    """Get the status, progress and result of a background import."""
+    job = await get_import_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
 @router.get("/import/batches", response_model=list[dict])
 async def get_import_batches(
     supplier_id: int | None = None,
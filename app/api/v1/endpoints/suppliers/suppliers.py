@@ -8,12 +8,10 @@ This module provides REST API endpoints for managing suppliers including:
 
 import csv
 import logging
-import re
 from datetime import UTC, datetime
-from io import BytesIO, StringIO
+from io import StringIO
 from typing import Any
 
-import pandas as pd
 from fastapi import (
     APIRouter,
     BackgroundTasks,
@@ -38,6 +36,7 @@ from app.services.duplicate_match_service import DuplicateMatchService
 from app.services.excel_generator import ExcelGeneratorService
 from app.services.jieba_matching_service import JiebaMatchingService
 from app.services.product.product_matching import ProductMatchingService
+from app.services.suppliers.supplier_import_service import SupplierImportService
 from app.services.suppliers.supplier_service import SupplierService
 
 logger = logging.getLogger(__name__)
@@ -1804,6 +1803,10 @@ async def import_supplier_products_from_excel(
     - url_product_scrapping: Product page URL
     - chinese_name_scrapping: Chinese product name
     - price_scrapping: Price in format "CN ¥ 2.45"
+
+    Rows without a name or URL, or with a price that is not positive, are
+    skipped, as are all but the last row of a repeated URL. Missing or
+    unparsable prices are listed in ``errors``.
     """
 
     try:
@@ -1815,90 +1818,18 @@ async def import_supplier_products_from_excel(
         if not supplier:
             raise HTTPException(status_code=404, detail="Supplier not found")
 
-        # Read Excel file
-        contents = await file.read()
-        df = pd.read_excel(BytesIO(contents))
-
-        # Validate required columns
-        required_columns = [
-            "url_image_scrapping",
-            "url_product_scrapping",
-            "chinese_name_scrapping",
-            "price_scrapping",
-        ]
-
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Missing required columns: {', '.join(missing_columns)}",
+        # Read the upload in row chunks; each chunk is checked against the
+        # existing URLs with one query and written in bulk
+        try:
+            result = await SupplierImportService(db).import_supplier_products(
+                file.file, supplier_id
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
 
-        # Process each row
-        imported_count = 0
-        skipped_count = 0
-        errors = []
-
-        for index, row in df.iterrows():
-            try:
-                # Parse price from "CN ¥ 2.45" format
-                price_str = str(row["price_scrapping"])
-                price_match = re.search(r"[\d,]+\.?\d*", price_str.replace(",", ""))
-
-                if price_match:
-                    price = float(price_match.group())
-                else:
-                    errors.append(
-                        f"Row {index + 2}: Invalid price format '{price_str}'"
-                    )
-                    skipped_count += 1
-                    continue
-
-                # Check if product already exists (by URL)
-                existing_query = select(SupplierProduct).where(
-                    and_(
-                        SupplierProduct.supplier_id == supplier_id,
-                        SupplierProduct.supplier_product_url
-                        == str(row["url_product_scrapping"]),
-                    )
-                )
-                existing_result = await db.execute(existing_query)
-                existing_product = existing_result.scalar_one_or_none()
-
-                if existing_product:
-                    # Update existing product
-                    existing_product.supplier_product_name = str(
-                        row["chinese_name_scrapping"]
-                    )
-                    existing_product.supplier_image_url = str(
-                        row["url_image_scrapping"]
-                    )
-                    existing_product.supplier_price = price
-                    existing_product.supplier_currency = "CNY"
-                    existing_product.updated_at = datetime.now(UTC).replace(tzinfo=None)
-                else:
-                    # Create new product
-                    new_product = SupplierProduct(
-                        supplier_id=supplier_id,
-                        supplier_product_name=str(row["chinese_name_scrapping"]),
-                        supplier_product_url=str(row["url_product_scrapping"]),
-                        supplier_image_url=str(row["url_image_scrapping"]),
-                        supplier_price=price,
-                        supplier_currency="CNY",
-                        is_active=True,
-                        created_at=datetime.now(UTC).replace(tzinfo=None),
-                        updated_at=datetime.now(UTC).replace(tzinfo=None),
-                    )
-                    db.add(new_product)
-
-                imported_count += 1
-
-            except Exception as e:
-                errors.append(f"Row {index + 2}: {str(e)}")
-                skipped_count += 1
-                continue
-
-        await db.commit()
+        imported_count = result["imported"]
+        skipped_count = result["skipped"]
+        errors = result["errors"]
 
         return {
             "status": "success",
@@ -1912,7 +1843,7 @@ async def import_supplier_products_from_excel(
                 ),
                 "imported_count": imported_count,
                 "skipped_count": skipped_count,
-                "total_rows": len(df),
+                "total_rows": result["total_rows"],
                 "errors": errors[:10] if errors else [],  # Return first 10 errors
             },
         }
@@ -10,6 +10,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from app.api.dependencies import require_admin_user
 from app.core.cache import get_redis
 from app.core.logging_config import get_logger
+from app.middleware.performance import latency_percentiles
 from app.models.user import User
 
 logger = get_logger(__name__)
@@ -115,6 +116,7 @@ async def get_endpoint_metrics(
                 total_duration = await redis.get(duration_key)
                 slow_key = f"metrics:slow:{endpoint_key}"
                 slow_count = await redis.get(slow_key)
+                histogram = await redis.hgetall(f"metrics:latency:{endpoint_key}")
 
                 request_count = int(request_count) if request_count else 0
                 total_duration = float(total_duration) if total_duration else 0.0
@@ -129,6 +131,7 @@ async def get_endpoint_metrics(
                         "endpoint": endpoint_key,
                         "request_count": request_count,
                         "avg_duration": round(avg_duration, 3),
+                        **latency_percentiles(histogram),
                         "slow_requests": slow_count,
                         "slow_percentage": (
                             round((slow_count / request_count) * 100, 2)
@@ -167,7 +170,7 @@ async def get_slowest_endpoints(
     current_user: User = Depends(require_admin_user),
 ):
     """
-    Obține cele mai lente endpoint-uri.
+    Obține cele mai lente endpoint-uri (după durata medie).
 
     **Necesită:** Admin role
 
@@ -201,10 +204,12 @@ async def get_slowest_endpoints(
 
                 if request_count > 0:
                     avg_duration = total_duration / request_count
+                    histogram = await redis.hgetall(f"metrics:latency:{endpoint_key}")
                     endpoints.append(
                         {
                             "endpoint": endpoint_key,
                             "avg_duration": round(avg_duration, 3),
+                            **latency_percentiles(histogram),
                             "request_count": request_count,
                         }
                     )
@@ -253,6 +258,7 @@ async def reset_metrics(
             "metrics:requests:*",
             "metrics:duration:*",
             "metrics:slow:*",
+            "metrics:latency:*",
             "metrics:status:*",
         ]:
             cursor = 0
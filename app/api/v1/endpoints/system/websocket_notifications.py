@@ -16,77 +16,74 @@ from datetime import UTC, datetime
 from typing import Any
 
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from sqlalchemy import and_, select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.logging import get_logger
 from app.models.emag_models import EmagOrder
+from app.services.infrastructure.change_feed import (
+    ORDER_EVENTS,
+    SYNC_PROGRESS,
+    FanoutConnectionManager,
+    get_change_feed,
+)
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
-# Store active WebSocket connections
-active_connections: set[WebSocket] = set()
 
-
-class ConnectionManager:
+class ConnectionManager(FanoutConnectionManager):
     """Manages WebSocket connections and broadcasts."""
 
     def __init__(self):
-        self.active_connections: dict[str, set[WebSocket]] = {
-            "orders": set(),
-            "sync": set(),
-            "all": set(),
-        }
-
-    async def connect(self, websocket: WebSocket, channel: str = "all"):
-        """Accept and register a new WebSocket connection."""
-        await websocket.accept()
-        self.active_connections[channel].add(websocket)
-        self.active_connections["all"].add(websocket)
-        logger.info(f"New WebSocket connection on channel: {channel}")
-
-    def disconnect(self, websocket: WebSocket):
-        """Remove a WebSocket connection from all channels."""
-        for channel in self.active_connections.values():
-            channel.discard(websocket)
-        logger.info("WebSocket connection closed")
-
-    async def send_personal_message(
-        self, message: dict[str, Any], websocket: WebSocket
-    ):
-        """Send a message to a specific WebSocket."""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Failed to send personal message: {e}")
-            self.disconnect(websocket)
-
-    async def broadcast(self, message: dict[str, Any], channel: str = "all"):
-        """Broadcast a message to all connections on a channel."""
-        disconnected = set()
-
-        for websocket in self.active_connections.get(channel, set()):
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to broadcast to connection: {e}")
-                disconnected.add(websocket)
-
-        # Clean up disconnected clients
-        for websocket in disconnected:
-            self.disconnect(websocket)
-
-    def get_connection_count(self, channel: str = "all") -> int:
-        """Get the number of active connections on a channel."""
-        return len(self.active_connections.get(channel, set()))
+        super().__init__(channels=("orders", "sync"))
 
 
 # Global connection manager
 manager = ConnectionManager()
 
+_feed_lock = asyncio.Lock()
+_feed_subscribed = False
+
+
+async def _ensure_feed_subscription():
+    """Relay change feed events to the connected clients, once per process."""
+    global _feed_subscribed
+
+    async with _feed_lock:
+        if _feed_subscribed:
+            return
+        feed = get_change_feed()
+        feed.subscribe(ORDER_EVENTS, _on_order_event)
+        feed.subscribe(SYNC_PROGRESS, _on_sync_progress)
+        _feed_subscribed = True
+
+
+async def _on_order_event(topic: str, event: dict[str, Any]):
+    await manager.broadcast(event, channel="orders")
+
+
+async def _on_sync_progress(topic: str, event: dict[str, Any]):
+    progress = event.get("processed_items") or 0
+    total = event.get("total_items") or 0
+    await manager.broadcast(
+        {
+            "type": "sync_progress",
+            "data": {
+                "account_type": event.get("account_type"),
+                "progress": progress,
+                "total": total,
+                "percentage": (progress / total * 100) if total > 0 else 0,
+                "message": event.get("message")
+                or f"{event.get('sync_type', 'sync')} {event.get('status', 'running')}",
+            },
+            "timestamp": event.get("timestamp", datetime.now(UTC).isoformat()),
+        },
+        channel="sync",
+    )
+
 
 @router.websocket("/ws/notifications")
 async def websocket_notifications(
@@ -111,6 +108,8 @@ async def websocket_notifications(
     await manager.connect(websocket, channel)
 
     try:
+        await _ensure_feed_subscription()
+
         # Send initial connection confirmation
         await manager.send_personal_message(
             {
@@ -168,16 +167,17 @@ async def websocket_orders(websocket: WebSocket, db: AsyncSession = Depends(get_
     - Order status changes
     - AWB is generated
     - Invoice is attached
+
+    Updates are pushed by order ingestion through the change feed; the
+    database is only queried once, for the initial statistics.
     """
     await manager.connect(websocket, "orders")
 
     try:
-        # Send initial order statistics
-        from sqlalchemy import func
+        await _ensure_feed_subscription()
 
-        result = await db.execute(
-            select(func.count(EmagOrder.id)).where(EmagOrder.status == 1)
-        )
+        # Send initial order statistics
+        result = await db.execute(select(func.count(EmagOrder.id)).where(EmagOrder.status == 1))
         new_orders_count = result.scalar()
 
         await manager.send_personal_message(
@@ -189,53 +189,26 @@ async def websocket_orders(websocket: WebSocket, db: AsyncSession = Depends(get_
             websocket,
         )
 
-        # Monitor for new orders (polling every 10 seconds)
-        last_check = datetime.now(UTC)
-
+        # Keep the connection open until the client leaves
         while True:
-            try:
-                await asyncio.sleep(10)  # Check every 10 seconds
-
-                # Check for new orders since last check
-                result = await db.execute(
-                    select(EmagOrder).where(
-                        and_(EmagOrder.status == 1, EmagOrder.created_at > last_check)
-                    )
+            data = await websocket.receive_text()
+            if data == "ping":
+                await manager.send_personal_message(
+                    {"type": "pong", "timestamp": datetime.now(UTC).isoformat()},
+                    websocket,
                 )
-                new_orders = result.scalars().all()
-
-                if new_orders:
-                    for order in new_orders:
-                        await manager.broadcast(
-                            {
-                                "type": "order_new",
-                                "data": {
-                                    "order_id": order.emag_order_id,
-                                    "customer_name": order.customer_name,
-                                    "total_amount": float(order.total_amount)
-                                    if order.total_amount
-                                    else 0,
-                                    "currency": order.currency,
-                                    "account_type": order.account_type,
-                                },
-                                "timestamp": datetime.now(UTC).isoformat(),
-                            },
-                            channel="orders",
-                        )
 
-                last_check = datetime.now(UTC)
-
-            except WebSocketDisconnect:
-                break
-            except Exception as e:
-                logger.error(f"Error monitoring orders: {e}")
-                await asyncio.sleep(5)  # Wait before retrying
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Error in orders WebSocket: {e}")
 
     finally:
         manager.disconnect(websocket)
 
 
-# Helper functions to send notifications from other parts of the application
+# Helper functions to send notifications from other parts of the application.
+# They publish to the change feed, which reaches the clients of every process.
 
 
 async def notify_new_order(order_data: dict[str, Any]):
@@ -245,13 +218,12 @@ async def notify_new_order(order_data: dict[str, Any]):
     Args:
         order_data: Dictionary with order information
     """
-    await manager.broadcast(
+    await get_change_feed().publish(
+        ORDER_EVENTS,
         {
             "type": "order_new",
             "data": order_data,
-            "timestamp": datetime.now(UTC).isoformat(),
         },
-        channel="orders",
     )
 
 
@@ -273,7 +245,8 @@ async def notify_order_status_change(order_id: int, old_status: int, new_status:
         5: "returned",
     }
 
-    await manager.broadcast(
+    await get_change_feed().publish(
+        ORDER_EVENTS,
         {
             "type": "order_status_change",
             "data": {
@@ -283,9 +256,7 @@ async def notify_order_status_change(order_id: int, old_status: int, new_status:
                 "new_status": new_status,
                 "new_status_name": status_names.get(new_status, "unknown"),
             },
-            "timestamp": datetime.now(UTC).isoformat(),
         },
-        channel="orders",
     )
 
 
@@ -297,16 +268,15 @@ async def notify_awb_generated(order_id: int, awb_number: str):
         order_id: eMAG order ID
         awb_number: Generated AWB number
     """
-    await manager.broadcast(
+    await get_change_feed().publish(
+        ORDER_EVENTS,
         {
             "type": "awb_generated",
             "data": {
                 "order_id": order_id,
                 "awb_number": awb_number,
             },
-            "timestamp": datetime.now(UTC).isoformat(),
         },
-        channel="orders",
     )
 
 
@@ -318,16 +288,15 @@ async def notify_invoice_generated(order_id: int, invoice_number: str):
         order_id: eMAG order ID
         invoice_number: Generated invoice number
     """
-    await manager.broadcast(
+    await get_change_feed().publish(
+        ORDER_EVENTS,
         {
             "type": "invoice_generated",
             "data": {
                 "order_id": order_id,
                 "invoice_number": invoice_number,
             },
-            "timestamp": datetime.now(UTC).isoformat(),
         },
-        channel="orders",
     )
 
 
@@ -343,19 +312,14 @@ async def notify_sync_progress(
         total: Total items to sync
         message: Progress message
     """
-    await manager.broadcast(
+    await get_change_feed().publish(
+        SYNC_PROGRESS,
         {
-            "type": "sync_progress",
-            "data": {
-                "account_type": account_type,
-                "progress": progress,
-                "total": total,
-                "percentage": (progress / total * 100) if total > 0 else 0,
-                "message": message,
-            },
-            "timestamp": datetime.now(UTC).isoformat(),
+            "account_type": account_type,
+            "processed_items": progress,
+            "total_items": total,
+            "message": message,
         },
-        channel="sync",
     )
 
 
@@ -367,5 +331,7 @@ async def get_websocket_stats():
         "total_connections": manager.get_connection_count("all"),
         "orders_channel": manager.get_connection_count("orders"),
         "sync_channel": manager.get_connection_count("sync"),
+        "evicted_slow_clients": manager.evicted,
+        "change_feed": get_change_feed().get_stats(),
         "timestamp": datetime.now(UTC).isoformat(),
     }
@@ -3,80 +3,123 @@ WebSocket endpoints for real-time eMAG sync progress.
 
 This module provides WebSocket connections for live sync progress updates,
 eliminating the need for polling and providing instant feedback to users.
+
+Sync services publish their progress to the change feed. This module keeps
+the state of the running syncs in ``sync_progress_cache``, updated once per
+event, and fans every change out to the connected clients; the database is
+only read once per process to learn about syncs started before it.
 """
 
 import asyncio
 import json
+import time
 from datetime import UTC, datetime
+from typing import Any
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from sqlalchemy import text
 
 from app.core.database import get_async_session
 from app.core.logging import get_logger
+from app.services.infrastructure.change_feed import (
+    SYNC_EVENTS,
+    SYNC_PROGRESS,
+    FanoutConnectionManager,
+    get_change_feed,
+)
 
 logger = get_logger(__name__)
 router = APIRouter()
 
-# Active WebSocket connections
-active_connections: set[WebSocket] = set()
-# Sync progress cache
+# Running syncs by sync id, as sent to clients
 sync_progress_cache: dict[str, dict] = {}
+# When each cached sync last reported, and the last milestone announced for it
+_last_reported: dict[str, float] = {}
+_milestones: dict[str, int] = {}
 
+# A running sync that has not reported for this long is assumed dead
+SYNC_PROGRESS_STALE_AFTER = 300
 
-class ConnectionManager:
-    """Manages WebSocket connections for sync progress updates."""
+MILESTONES = (25, 50, 75, 100)
 
-    def __init__(self):
-        self.active_connections: set[WebSocket] = set()
-
-    async def connect(self, websocket: WebSocket):
-        """Accept and register a new WebSocket connection."""
-        await websocket.accept()
-        self.active_connections.add(websocket)
-        logger.info(
-            f"WebSocket connected. Total connections: {len(self.active_connections)}"
-        )
+_feed_lock = asyncio.Lock()
+_feed_subscribed = False
+_cache_seeded = False
 
-    def disconnect(self, websocket: WebSocket):
-        """Remove a WebSocket connection."""
-        self.active_connections.discard(websocket)
-        logger.info(
-            f"WebSocket disconnected. Total connections: {len(self.active_connections)}"
-        )
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Send a message to a specific WebSocket."""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Error sending message to websocket: {e}")
-            self.disconnect(websocket)
-
-    async def broadcast(self, message: dict):
-        """Broadcast a message to all connected WebSockets."""
-        disconnected = set()
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to websocket: {e}")
-                disconnected.add(connection)
-
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+class ConnectionManager(FanoutConnectionManager):
+    """Manages WebSocket connections for sync progress updates.
+
+    ``progress`` clients receive the full progress snapshot on every change,
+    ``events`` clients receive start, milestone and completion notices.
+    """
+
+    def __init__(self):
+        super().__init__(channels=("progress", "events"))
 
 
 manager = ConnectionManager()
 
 
+def _progress_entry(
+    sync_type: str,
+    account_type: str,
+    status: str,
+    processed_items: int | None,
+    total_items: int | None,
+    started_at: datetime | None,
+    current_page: int | None = 0,
+    total_pages: int | None = 0,
+    error_message: str | None = None,
+) -> dict[str, Any]:
+    """Build the progress entry sent to clients for one sync."""
+    items_processed = processed_items or 0
+    items_total = total_items or 0
+    duration = 0.0
+    if started_at is not None:
+        now = datetime.now(UTC) if started_at.tzinfo else datetime.now(UTC).replace(tzinfo=None)
+        duration = max(0.0, (now - started_at).total_seconds())
+
+    # Calculate metrics
+    throughput = items_processed / duration if duration > 0 else 0
+    remaining_items = max(0, items_total - items_processed)
+    eta_seconds = remaining_items / throughput if throughput > 0 else 0
+    progress_pct = int((items_processed / items_total * 100) if items_total > 0 else 0)
+
+    return {
+        "sync_type": sync_type,
+        "account_type": account_type,
+        "status": status,
+        "current_page": current_page or 0,
+        "total_pages": total_pages or 0,
+        "processed_items": items_processed,
+        "total_items": items_total,
+        "progress_percentage": progress_pct,
+        "started_at": started_at.isoformat() if started_at else None,
+        "duration_seconds": int(duration),
+        "throughput_per_second": round(throughput, 2),
+        "estimated_time_remaining_seconds": int(eta_seconds),
+        "error_message": error_message,
+    }
+
+
+def _progress_snapshot(active_syncs: list[dict], status: str | None = None) -> dict[str, Any]:
+    return {
+        "is_running": len(active_syncs) > 0,
+        "active_syncs": active_syncs,
+        "total_active": len(active_syncs),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "status": status or ("syncing" if active_syncs else "idle"),
+    }
+
+
 async def get_sync_progress_from_db():
     """Fetch current sync progress from database."""
     try:
         async for async_db in get_async_session():
             query = """
                 SELECT
+                    id,
                     sync_type,
                     account_type,
                     status,
@@ -84,7 +127,6 @@ async def get_sync_progress_from_db():
                     started_at,
                     processed_items,
                     total_items,
-                    EXTRACT(EPOCH FROM (NOW() - started_at)) as duration_seconds,
                     COALESCE(
                         ARRAY_TO_STRING(
                             ARRAY(SELECT jsonb_array_elements_text(errors)), ', '
@@ -103,64 +145,170 @@ async def get_sync_progress_from_db():
             progress_data = []
             for sync in active_syncs:
                 sync_params = sync.sync_params or {}
-                items_processed = sync.processed_items or 0
-                items_total = sync.total_items or 0
-                duration = sync.duration_seconds or 0
-
-                # Calculate metrics
-                throughput = items_processed / duration if duration > 0 else 0
-                remaining_items = max(0, items_total - items_processed)
-                eta_seconds = remaining_items / throughput if throughput > 0 else 0
-                progress_pct = int(
-                    (items_processed / items_total * 100) if items_total > 0 else 0
-                )
-
-                progress_data.append(
-                    {
-                        "sync_type": sync.sync_type,
-                        "account_type": sync.account_type,
-                        "status": sync.status,
-                        "current_page": sync_params.get("current_page", 0),
-                        "total_pages": sync_params.get("max_pages_per_account", 0),
-                        "processed_items": items_processed,
-                        "total_items": items_total,
-                        "progress_percentage": progress_pct,
-                        "started_at": sync.started_at.isoformat()
-                        if sync.started_at
-                        else None,
-                        "duration_seconds": int(duration),
-                        "throughput_per_second": round(throughput, 2),
-                        "estimated_time_remaining_seconds": int(eta_seconds),
-                        "error_message": sync.error_message,
-                    }
+                entry = _progress_entry(
+                    sync_type=sync.sync_type,
+                    account_type=sync.account_type,
+                    status=sync.status,
+                    processed_items=sync.processed_items,
+                    total_items=sync.total_items,
+                    started_at=sync.started_at,
+                    current_page=sync_params.get("current_page", 0),
+                    total_pages=sync_params.get("max_pages_per_account", 0),
+                    error_message=sync.error_message,
                 )
+                progress_data.append({"sync_id": str(sync.id), **entry})
 
-            return {
-                "is_running": len(progress_data) > 0,
-                "active_syncs": progress_data,
-                "total_active": len(progress_data),
-                "timestamp": datetime.now(UTC).isoformat(),
-                "status": "syncing" if progress_data else "idle",
-            }
+            return _progress_snapshot(progress_data)
 
     except Exception as e:
         logger.error(f"Error fetching sync progress: {e}", exc_info=True)
         return {
-            "is_running": False,
-            "active_syncs": [],
-            "total_active": 0,
-            "timestamp": datetime.now(UTC).isoformat(),
-            "status": "error",
+            **_progress_snapshot([], status="error"),
             "error": str(e),
         }
 
 
+def get_sync_progress() -> dict[str, Any]:
+    """Current progress of the running syncs, from the cache."""
+    cutoff = time.monotonic() - SYNC_PROGRESS_STALE_AFTER
+    for sync_id in [key for key, seen in _last_reported.items() if seen < cutoff]:
+        logger.warning(f"Sync {sync_id} stopped reporting progress, dropping it")
+        _forget(sync_id)
+
+    active_syncs = sorted(
+        sync_progress_cache.values(),
+        key=lambda sync: sync["started_at"] or "",
+        reverse=True,
+    )
+    return _progress_snapshot(active_syncs)
+
+
+def _forget(sync_id: str) -> None:
+    sync_progress_cache.pop(sync_id, None)
+    _last_reported.pop(sync_id, None)
+    _milestones.pop(sync_id, None)
+
+
+async def _ensure_progress_feed():
+    """Subscribe to the change feed and seed the cache, once per process."""
+    global _feed_subscribed, _cache_seeded
+
+    async with _feed_lock:
+        if not _feed_subscribed:
+            feed = get_change_feed()
+            feed.subscribe(SYNC_PROGRESS, _on_sync_progress)
+            feed.subscribe(SYNC_EVENTS, _on_sync_event)
+            _feed_subscribed = True
+
+        if not _cache_seeded:
+            # Syncs started before this process subscribed only exist in the DB
+            progress = await get_sync_progress_from_db()
+            if progress["status"] == "error":
+                return
+            for sync in progress["active_syncs"]:
+                sync_id = sync["sync_id"]
+                sync_progress_cache.setdefault(sync_id, sync)
+                _last_reported.setdefault(sync_id, time.monotonic())
+                _milestones.setdefault(sync_id, sync["progress_percentage"])
+            _cache_seeded = True
+
+
+async def _on_sync_progress(topic: str, event: dict[str, Any]):
+    """Apply one progress event to the cache and notify the clients."""
+    sync_id = event.get("sync_id")
+    if not sync_id:
+        return
+
+    started_at = event.get("started_at")
+    entry = _progress_entry(
+        sync_type=event.get("sync_type", "unknown"),
+        account_type=event.get("account_type", "unknown"),
+        status=event.get("status", "running"),
+        processed_items=event.get("processed_items"),
+        total_items=event.get("total_items"),
+        started_at=datetime.fromisoformat(started_at) if started_at else None,
+        current_page=event.get("current_page"),
+        total_pages=event.get("total_pages"),
+        error_message=event.get("error_message"),
+    )
+    entry = {"sync_id": sync_id, **entry}
+    details = {
+        "sync_type": entry["sync_type"],
+        "account_type": entry["account_type"],
+        "timestamp": datetime.now(UTC).isoformat(),
+    }
+
+    if entry["status"] != "running":
+        _forget(sync_id)
+        await manager.broadcast(get_sync_progress(), channel="progress")
+        if entry["status"] == "completed":
+            await manager.broadcast(
+                {"type": "completed", "message": "Sync completed successfully", **details},
+                channel="events",
+            )
+        else:
+            await manager.broadcast(
+                {
+                    "type": "failed",
+                    "message": f"Sync {entry['status']}: {entry['error_message'] or ''}".strip(),
+                    **details,
+                },
+                channel="events",
+            )
+        return
+
+    if sync_id not in sync_progress_cache:
+        await manager.broadcast(
+            {"type": "started", "message": f"{entry['sync_type']} sync started", **details},
+            channel="events",
+        )
+    sync_progress_cache[sync_id] = entry
+    _last_reported[sync_id] = time.monotonic()
+
+    # Check for milestones
+    last_progress = _milestones.get(sync_id, 0)
+    current_progress = entry["progress_percentage"]
+    for milestone in MILESTONES:
+        if last_progress < milestone <= current_progress:
+            await manager.broadcast(
+                {
+                    "type": "milestone",
+                    "milestone": milestone,
+                    "message": f"Sync progress: {milestone}% complete",
+                    **details,
+                },
+                channel="events",
+            )
+    _milestones[sync_id] = max(last_progress, current_progress)
+
+    await manager.broadcast(get_sync_progress(), channel="progress")
+
+
+async def _on_sync_event(topic: str, event: dict[str, Any]):
+    await manager.broadcast(event)
+
+
+async def _receive_loop(websocket: WebSocket):
+    """Answer client pings until the client disconnects."""
+    while True:
+        data = await websocket.receive_text()
+        try:
+            message = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(message, dict) and message.get("type") == "ping":
+            await manager.send_personal_message(
+                {"type": "pong", "timestamp": datetime.now(UTC).isoformat()}, websocket
+            )
+
+
 @router.websocket("/ws/sync-progress")
 async def websocket_sync_progress(websocket: WebSocket):
     """
     WebSocket endpoint for real-time sync progress updates.
 
-    Provides live updates every second with:
+    Sends the progress of all running syncs on connect and again whenever a
+    sync reports progress, with:
     - Current sync status
     - Progress percentage
     - Throughput metrics
@@ -174,43 +322,22 @@ async def websocket_sync_progress(websocket: WebSocket):
             console.log('Sync progress:', progress);
         };
     """
-    await manager.connect(websocket)
+    await manager.connect(websocket, "progress")
 
     try:
         # Send initial status
-        initial_progress = await get_sync_progress_from_db()
-        await manager.send_personal_message(initial_progress, websocket)
-
-        # Keep connection alive and send updates
-        while True:
-            try:
-                # Check for client messages (ping/pong)
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
-
-                # Handle client messages
-                try:
-                    message = json.loads(data)
-                    if message.get("type") == "ping":
-                        await websocket.send_json(
-                            {"type": "pong", "timestamp": datetime.now(UTC).isoformat()}
-                        )
-                except json.JSONDecodeError:
-                    pass
-
-            except TimeoutError:
-                # No message from client, send progress update
-                progress = await get_sync_progress_from_db()
-                await manager.send_personal_message(progress, websocket)
-
-            # Small delay to prevent overwhelming
-            await asyncio.sleep(1)
+        await _ensure_progress_feed()
+        await manager.send_personal_message(get_sync_progress(), websocket)
+
+        await _receive_loop(websocket)
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         logger.info("Client disconnected from sync progress WebSocket")
 
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
+
+    finally:
         manager.disconnect(websocket)
 
 
@@ -232,9 +359,11 @@ async def websocket_sync_events(websocket: WebSocket):
             showNotification(notification.message);
         };
     """
-    await manager.connect(websocket)
+    await manager.connect(websocket, "events")
 
     try:
+        await _ensure_progress_feed()
+
         # Send welcome message
         await manager.send_personal_message(
             {
@@ -245,55 +374,15 @@ async def websocket_sync_events(websocket: WebSocket):
             websocket,
         )
 
-        last_progress = 0
-
-        while True:
-            try:
-                # Wait for messages with timeout
-                await asyncio.wait_for(websocket.receive_text(), timeout=2.0)
-            except TimeoutError:
-                # Check for sync events
-                progress = await get_sync_progress_from_db()
-
-                if progress["is_running"] and progress["active_syncs"]:
-                    current_sync = progress["active_syncs"][0]
-                    current_progress = current_sync["progress_percentage"]
-
-                    # Check for milestones
-                    milestones = [25, 50, 75, 100]
-                    for milestone in milestones:
-                        if last_progress < milestone <= current_progress:
-                            await manager.send_personal_message(
-                                {
-                                    "type": "milestone",
-                                    "milestone": milestone,
-                                    "message": f"Sync progress: {milestone}% complete",
-                                    "sync_type": current_sync["sync_type"],
-                                    "account_type": current_sync["account_type"],
-                                    "timestamp": datetime.now(UTC).isoformat(),
-                                },
-                                websocket,
-                            )
-
-                    last_progress = current_progress
-                elif not progress["is_running"] and last_progress > 0:
-                    # Sync completed
-                    await manager.send_personal_message(
-                        {
-                            "type": "completed",
-                            "message": "Sync completed successfully",
-                            "timestamp": datetime.now(UTC).isoformat(),
-                        },
-                        websocket,
-                    )
-                    last_progress = 0
+        await _receive_loop(websocket)
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         logger.info("Client disconnected from sync events WebSocket")
 
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
+
+    finally:
         manager.disconnect(websocket)
 
 
@@ -301,15 +390,10 @@ async def broadcast_sync_update(sync_data: dict):
     """
     Broadcast sync update to all connected clients.
 
-    This function can be called from sync services to push updates.
+    This function can be called from sync services to push updates; it
+    reaches the clients of every API process through the change feed.
     """
-    await manager.broadcast(
-        {
-            "type": "sync_update",
-            "data": sync_data,
-            "timestamp": datetime.now(UTC).isoformat(),
-        }
-    )
+    await get_change_feed().publish(SYNC_EVENTS, {"type": "sync_update", "data": sync_data})
 
 
 async def broadcast_sync_event(event_type: str, message: str, **kwargs):
@@ -321,11 +405,4 @@ async def broadcast_sync_event(event_type: str, message: str, **kwargs):
         message: Human-readable message
         **kwargs: Additional event data
     """
-    await manager.broadcast(
-        {
-            "type": event_type,
-            "message": message,
-            "timestamp": datetime.now(UTC).isoformat(),
-            **kwargs,
-        }
-    )
+    await get_change_feed().publish(SYNC_EVENTS, {"type": event_type, "message": message, **kwargs})
@@ -1,6 +1,9 @@
 """
 Redis caching utilities for MagFlow ERP.
 
+The decorators and helpers store their values in the tiered cache
+(``app.core.tiered_cache``): process memory in front of Redis.
+
 Provides caching decorators and utilities for:
 - API response caching
 - Database query caching
@@ -10,8 +13,7 @@ Provides caching decorators and utilities for:
 
 from __future__ import annotations
 
-import json
-import pickle
+import asyncio
 from collections.abc import Callable
 from functools import wraps
 from typing import Any
@@ -24,18 +26,28 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
-# Global Redis client
+# Global Redis client and the event loop its connections belong to
 _redis_client: Redis | None = None
+_redis_loop: asyncio.AbstractEventLoop | None = None
 
 
 async def get_redis() -> Redis:
     """
     Get or create Redis client.
 
+    The client is bound to the running event loop. Celery tasks each run
+    their own ``asyncio.run``, so a client left over from a previous task
+    is replaced instead of failing with "Event loop is closed".
+
     Returns:
         Redis client instance
     """
-    global _redis_client
+    global _redis_client, _redis_loop
+
+    loop = asyncio.get_running_loop()
+    if _redis_client is not None and _redis_loop is not loop:
+        # Its connections died with their loop and cannot be closed from here
+        _redis_client = None
 
     if _redis_client is None:
         redis_url = getattr(settings, "REDIS_URL", "redis://redis:6379/0")
@@ -46,6 +58,7 @@ async def get_redis() -> Redis:
             socket_connect_timeout=5,
             socket_keepalive=True,
         )
+        _redis_loop = loop
         logger.info(f"Redis client initialized: {redis_url}")
 
     return _redis_client
@@ -53,10 +66,11 @@ async def get_redis() -> Redis:
 
 async def close_redis():
     """Close Redis connection."""
-    global _redis_client
+    global _redis_client, _redis_loop
     if _redis_client:
         await _redis_client.close()
         _redis_client = None
+        _redis_loop = None
         logger.info("Redis client closed")
 
 
@@ -76,65 +90,47 @@ def cache_key(*args, **kwargs) -> str:
     return ":".join(key_parts)
 
 
+def _tiered_cache(binary: bool = False):
+    # Imported here: the tiered cache itself builds on get_redis
+    from app.core.tiered_cache import get_pickle_cache, get_tiered_cache
+
+    return get_pickle_cache() if binary else get_tiered_cache()
+
+
 def cache_result(
-    ttl: int = 300, prefix: str = "cache", key_func: Callable | None = None
+    ttl: int = 300,
+    prefix: str = "cache",
+    key_func: Callable | None = None,
+    stale_ttl: int = 0,
+    tags: list[str] | None = None,
 ):
     """
-    Decorator to cache function results in Redis.
+    Decorator to cache function results in the tiered cache.
+
+    Warm results are served from process memory, concurrent misses share one
+    call of the function and, with ``stale_ttl``, expired results keep being
+    served while they are refreshed in the background.
 
     Args:
         ttl: Time to live in seconds (default 5 minutes)
         prefix: Cache key prefix
         key_func: Optional function to generate cache key
+        stale_ttl: Seconds an expired result is still served while refreshed
+        tags: Invalidation tags (default: the prefix), see ``invalidate_tags``
 
     Usage:
         @cache_result(ttl=300, prefix="products")
         async def get_products(category: str):
             return await fetch_products(category)
     """
-
-    def decorator(func: Callable):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Generate cache key
-            if key_func:
-                cache_key_str = key_func(*args, **kwargs)
-            else:
-                cache_key_str = cache_key(*args, **kwargs)
-
-            full_key = f"{prefix}:{func.__name__}:{cache_key_str}"
-
-            try:
-                redis_client = await get_redis()
-
-                # Try to get from cache
-                cached = await redis_client.get(full_key)
-                if cached:
-                    logger.debug(f"Cache HIT: {full_key}")
-                    return json.loads(cached)
-
-                # Cache miss - execute function
-                logger.debug(f"Cache MISS: {full_key}")
-                result = await func(*args, **kwargs)
-
-                # Store in cache
-                await redis_client.setex(full_key, ttl, json.dumps(result, default=str))
-
-                return result
-
-            except Exception as e:
-                logger.error(f"Cache error: {e}", exc_info=True)
-                # If cache fails, execute function normally
-                return await func(*args, **kwargs)
-
-        return wrapper
-
-    return decorator
+    return _cached(ttl, prefix, key_func, stale_ttl, tags, binary=False)
 
 
 def cache_result_binary(
     ttl: int = 300,
     prefix: str = "cache",
+    stale_ttl: int = 0,
+    tags: list[str] | None = None,
 ):
     """
     Decorator to cache function results using pickle (for complex objects).
@@ -142,44 +138,59 @@ def cache_result_binary(
     Args:
         ttl: Time to live in seconds
         prefix: Cache key prefix
+        stale_ttl: Seconds an expired result is still served while refreshed
+        tags: Invalidation tags (default: the prefix)
     """
+    return _cached(ttl, prefix, None, stale_ttl, tags, binary=True)
+
+
+def _cached(
+    ttl: int,
+    prefix: str,
+    key_func: Callable | None,
+    stale_ttl: int,
+    tags: list[str] | None,
+    binary: bool,
+):
+    tags = [prefix] if tags is None else tags
 
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            cache_key_str = cache_key(*args, **kwargs)
-            full_key = f"{prefix}:{func.__name__}:{cache_key_str}"
-
-            try:
-                redis_client = await get_redis()
-
-                # Try to get from cache
-                cached = await redis_client.get(full_key)
-                if cached:
-                    logger.debug(f"Cache HIT (binary): {full_key}")
-                    return pickle.loads(cached)
+            if key_func:
+                cache_key_str = key_func(*args, **kwargs)
+            else:
+                cache_key_str = cache_key(*args, **kwargs)
 
-                # Cache miss
-                logger.debug(f"Cache MISS (binary): {full_key}")
-                result = await func(*args, **kwargs)
+            return await _tiered_cache(binary).get_or_load(
+                f"{prefix}:{func.__name__}:{cache_key_str}",
+                lambda: func(*args, **kwargs),
+                ttl,
+                stale_ttl=stale_ttl,
+                tags=tags,
+            )
 
-                # Store in cache
-                await redis_client.setex(full_key, ttl, pickle.dumps(result))
+        return wrapper
 
-                return result
+    return decorator
 
-            except Exception as e:
-                logger.error(f"Cache error (binary): {e}", exc_info=True)
-                return await func(*args, **kwargs)
 
-        return wrapper
+async def invalidate_tags(*tags: str):
+    """
+    Invalidate every cached entry carrying one of the tags, in every process.
 
-    return decorator
+    Args:
+        tags: Tags given to ``cache_result``/``set_cache`` (e.g. "products")
+    """
+    await _tiered_cache().invalidate_tags(*tags)
 
 
 async def invalidate_cache(pattern: str):
     """
-    Invalidate cache entries matching a pattern.
+    Invalidate raw Redis keys matching a pattern.
+
+    This scans the keyspace; entries of the tiered cache are dropped with
+    ``invalidate_tags`` instead.
 
     Args:
         pattern: Redis key pattern (e.g., "products:*")
@@ -201,7 +212,7 @@ async def invalidate_cache(pattern: str):
         logger.error(f"Cache invalidation error: {e}", exc_info=True)
 
 
-async def set_cache(key: str, value: Any, ttl: int = 300):
+async def set_cache(key: str, value: Any, ttl: int = 300, tags: list[str] | None = None):
     """
     Set a value in cache.
 
@@ -209,47 +220,33 @@ async def set_cache(key: str, value: Any, ttl: int = 300):
         key: Cache key
         value: Value to cache
         ttl: Time to live in seconds
+        tags: Invalidation tags, see ``invalidate_tags``
     """
-    try:
-        redis_client = await get_redis()
-        await redis_client.setex(key, ttl, json.dumps(value, default=str))
-    except Exception as e:
-        logger.error(f"Failed to set cache: {e}", exc_info=True)
+    await _tiered_cache().set(key, value, ttl, tags=tags or ())
 
 
-async def get_cache(key: str) -> Any | None:
+async def get_cache(key: str, tags: list[str] | None = None) -> Any | None:
     """
     Get a value from cache.
 
     Args:
         key: Cache key
+        tags: Invalidation tags the value was stored with
 
     Returns:
         Cached value or None
     """
-    try:
-        redis_client = await get_redis()
-        cached = await redis_client.get(key)
-        if cached:
-            return json.loads(cached)
-        return None
-    except Exception as e:
-        logger.error(f"Failed to get cache: {e}", exc_info=True)
-        return None
+    return await _tiered_cache().get(key, tags=tags or ())
 
 
 async def delete_cache(key: str):
     """
-    Delete a value from cache.
+    Delete a value from cache, in every process.
 
     Args:
         key: Cache key
     """
-    try:
-        redis_client = await get_redis()
-        await redis_client.delete(key)
-    except Exception as e:
-        logger.error(f"Failed to delete cache: {e}", exc_info=True)
+    await _tiered_cache().delete(key)
 
 
 async def get_cache_stats() -> dict:
@@ -283,34 +280,38 @@ async def get_cache_stats() -> dict:
 # Specific cache utilities for eMAG integration
 
 
+def _emag_tags(account_type: str) -> list[str]:
+    return ["emag", f"emag:{account_type}"]
+
+
 async def cache_courier_accounts(account_type: str, data: list, ttl: int = 3600):
     """Cache courier accounts (1 hour TTL)."""
-    await set_cache(f"emag:couriers:{account_type}", data, ttl)
+    await set_cache(f"emag:couriers:{account_type}", data, ttl, _emag_tags(account_type))
 
 
 async def get_cached_courier_accounts(account_type: str) -> list | None:
     """Get cached courier accounts."""
-    return await get_cache(f"emag:couriers:{account_type}")
+    return await get_cache(f"emag:couriers:{account_type}", _emag_tags(account_type))
 
 
 async def cache_product_categories(account_type: str, data: list, ttl: int = 86400):
     """Cache product categories (24 hour TTL)."""
-    await set_cache(f"emag:categories:{account_type}", data, ttl)
+    await set_cache(f"emag:categories:{account_type}", data, ttl, _emag_tags(account_type))
 
 
 async def get_cached_categories(account_type: str) -> list | None:
     """Get cached product categories."""
-    return await get_cache(f"emag:categories:{account_type}")
+    return await get_cache(f"emag:categories:{account_type}", _emag_tags(account_type))
 
 
 async def cache_order_statistics(account_type: str, data: dict, ttl: int = 300):
     """Cache order statistics (5 minute TTL)."""
-    await set_cache(f"emag:stats:orders:{account_type}", data, ttl)
+    await set_cache(f"emag:stats:orders:{account_type}", data, ttl, _emag_tags(account_type))
 
 
 async def get_cached_order_statistics(account_type: str) -> dict | None:
     """Get cached order statistics."""
-    return await get_cache(f"emag:stats:orders:{account_type}")
+    return await get_cache(f"emag:stats:orders:{account_type}", _emag_tags(account_type))
 
 
 async def invalidate_emag_cache(account_type: str | None = None):
@@ -320,7 +321,4 @@ async def invalidate_emag_cache(account_type: str | None = None):
     Args:
         account_type: Optional account type to invalidate specific cache
     """
-    if account_type:
-        await invalidate_cache(f"emag:*:{account_type}")
-    else:
-        await invalidate_cache("emag:*")
+    await invalidate_tags(f"emag:{account_type}" if account_type else "emag")
@@ -7,6 +7,8 @@ This module defines the periodic task schedule for automated eMAG synchronizatio
 - Auto-acknowledgment of new orders
 - Cleanup of old sync logs
 - Health checks
+- Delta refresh of the local eMAG category mirror
+- Perceptual hashing of new supplier images
 """
 
 import os
@@ -69,6 +71,25 @@ CELERY_BEAT_SCHEDULE = {
         },
         "enabled": True,
     },
+    # eMAG category mirror delta refresh - runs every 6 hours
+    "sync-emag-category-mirror-6h": {
+        "task": "emag.sync_category_mirror",
+        "schedule": 21600.0,  # 6 hours
+        "options": {
+            "expires": 3600,
+        },
+        "enabled": True,
+    },
+    # Supplier image hashing - runs every hour; failed images back off
+    "compute-supplier-image-hashes-hourly": {
+        "task": "supplier_matching.compute_image_hashes",
+        "schedule": 3600.0,  # 1 hour
+        "kwargs": {"limit": 5000},
+        "options": {
+            "expires": 3600,
+        },
+        "enabled": True,
+    },
     # Full product sync - runs daily at 2 AM (for comprehensive sync)
     "full-product-sync-daily": {
         "task": "emag.sync_products",
@@ -173,6 +173,13 @@ class Settings(BaseSettings):
     # Cache settings
     CACHE_ENABLED: bool = True
     CACHE_DEFAULT_TTL: int = 3600  # 1 hour in seconds
+    # Entries kept in each process in front of Redis (see app/core/tiered_cache.py)
+    CACHE_L1_MAX_ENTRIES: int = 2048
+
+    # Product image thumbnails used by Excel exports
+    THUMBNAIL_CACHE_DIR: str = ".cache/thumbnails"
+    THUMBNAIL_FETCH_CONCURRENCY: int = 8
+    THUMBNAIL_REVALIDATE_AFTER: int = 86400  # seconds before re-checking the ETag
 
     # Rate limiting settings
     RATE_LIMIT_ENABLED: bool = True
@@ -190,6 +197,9 @@ class Settings(BaseSettings):
     EMAG_RETRY_DELAY: int = 1  # second
     EMAG_RATE_LIMIT: int = 10  # requests per second
     EMAG_CACHE_TTL: int = 86400  # 24 hours in seconds
+    # Share eMAG API quotas across workers through Redis
+    EMAG_DISTRIBUTED_RATE_LIMIT: bool = True
+    EMAG_RATE_LIMIT_THROTTLE_BACKOFF: float = 5.0  # seconds paused after a 429
     emag_main_username: str = ""
     emag_main_password: str = ""
     emag_fbe_username: str = ""
@@ -315,6 +325,10 @@ class Settings(BaseSettings):
     EMAG_RATE_LIMIT_INVOICES: int = 3
     EMAG_RATE_LIMIT_OTHER: int = 3
 
+    # eMAG product sync pipeline
+    EMAG_SYNC_FETCH_CONCURRENCY: int = 3  # Concurrent page downloads (all accounts)
+    EMAG_SYNC_PAGE_QUEUE_SIZE: int = 4  # Fetched pages buffered ahead of DB writes
+
     # eMAG API Timeouts
     EMAG_REQUEST_TIMEOUT: int = 30
     EMAG_CONNECT_TIMEOUT: int = 10
@@ -355,6 +369,9 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # Access tokens default 24 hours
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # Refresh tokens default 30 days
     JWT_KEY_EXPIRE_DAYS: int = 30  # JWT keys expire after 30 days
+    # Verified tokens cached per process (see app/security/principal_cache.py)
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 10000
+    AUTH_PRINCIPAL_CACHE_TTL: int = 300  # seconds, never past the token's exp
 
     # Additional settings for tests
     ALLOWED_HOSTS: list[str] = ["*"]
@@ -0,0 +1,330 @@
+"""
+Cluster-wide eMAG API rate limiter.
+
+eMAG enforces its quotas (12 requests/second for orders, 3 requests/second
+for everything else) per API account, not per process. With several API
+workers and Celery processes each keeping their own token bucket, the
+combined traffic regularly exceeds the quota and eMAG answers with 429.
+
+This limiter keeps one bucket per ``(account, resource)`` in Redis and
+updates it with an atomic Lua script implementing the generic cell rate
+algorithm (GCRA). Instead of polling for a free token, every caller
+reserves the next free slot and sleeps exactly once until it comes up, so
+waiting callers are served in arrival order without extra Redis traffic.
+
+A 429 from eMAG pauses the bucket for every process until the
+``Retry-After`` delay has passed. When Redis is unreachable the limiter
+falls back to the same algorithm in process memory.
+"""
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.emag_constants import RateLimits
+from app.core.emag_errors import RateLimitError
+from app.core.logging import get_logger
+from app.telemetry.emag_metrics import EMAG_RATE_LIMIT_HITS_TOTAL, EMAG_RATE_LIMIT_WAIT_TIME
+
+logger = get_logger(__name__)
+
+# Reserve the next free slot of a bucket.
+# KEYS[1]: theoretical arrival time of the next request (ms)
+# KEYS[2]: time until which the bucket is paused after a 429 (ms)
+# ARGV[1]: emission interval (ms between requests at the sustained rate)
+# ARGV[2]: burst tolerance (ms the schedule may run ahead of now)
+# ARGV[3]: longest wait the caller accepts (ms)
+# Returns {granted, wait_ms}. Refused reservations leave the bucket untouched.
+_RESERVE_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or 0), now)
+local paused_until = tonumber(redis.call('GET', KEYS[2]) or 0)
+if paused_until > now then
+    tat = math.max(tat, paused_until + tolerance)
+end
+
+local wait = math.max(tat - tolerance, now) - now
+if wait > max_wait then
+    return {0, wait}
+end
+
+local next_tat = tat + interval
+redis.call('SET', KEYS[1], next_tat, 'PX', math.ceil(next_tat - now) + 1000)
+return {1, wait}
+"""
+
+# Pause a bucket after a 429, never shortening an existing pause.
+# KEYS[1]: pause key, ARGV[1]: pause duration (ms). Returns the pause end (ms).
+_PAUSE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local paused_until = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or 0)
+if paused_until > current then
+    redis.call('SET', KEYS[1], paused_until, 'PX', tonumber(ARGV[1]))
+    return paused_until
+end
+return current
+"""
+
+# Sustained rate (requests/second) and burst size per resource
+DEFAULT_LIMITS: dict[str, tuple[float, int]] = {
+    "orders": (RateLimits.ORDERS_RPS, RateLimits.ORDERS_RPS),
+    "other": (RateLimits.OTHER_RPS, RateLimits.OTHER_RPS),
+}
+
+# Longest wait accepted by callers without a timeout (one day, in ms)
+NO_TIMEOUT_MS = 86_400_000
+
+# How long to stay on the in-process fallback before trying Redis again
+REDIS_RETRY_AFTER = 30.0
+
+# Failures that send callers to the in-process fallback. RuntimeError covers
+# a client whose event loop is gone ("Event loop is closed").
+_REDIS_ERRORS = (RedisError, OSError, RuntimeError)
+
+
+@dataclass
+class WaitStats:
+    """Queue wait statistics for one bucket."""
+
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    rejected: int = 0
+    throttled: int = 0
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class DistributedRateLimiter:
+    """Redis-backed GCRA limiter shared by every eMAG API caller."""
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        limits: dict[str, tuple[float, int]] | None = None,
+        key_prefix: str = "emag:ratelimit",
+        throttle_backoff: float | None = None,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            redis: Redis client (default: the shared application client of
+                the running event loop)
+            limits: ``{resource: (requests_per_second, burst)}``; unknown
+                resources use the ``"other"`` limit
+            key_prefix: Prefix of the Redis keys
+            throttle_backoff: Seconds to pause a bucket after a 429 without
+                ``Retry-After`` (default: EMAG_RATE_LIMIT_THROTTLE_BACKOFF)
+        """
+        self._redis = redis
+        self.limits = limits or DEFAULT_LIMITS
+        self.key_prefix = key_prefix
+        self.throttle_backoff = (
+            settings.EMAG_RATE_LIMIT_THROTTLE_BACKOFF
+            if throttle_backoff is None
+            else throttle_backoff
+        )
+        self._reserve_script = None
+        self._pause_script = None
+        self._script_client: Redis | None = None
+        self._redis_down_until = 0.0
+
+        # In-process fallback state, in milliseconds like the Redis keys
+        self._local_tat: dict[str, float] = {}
+        self._local_paused: dict[str, float] = {}
+
+        self._stats: dict[tuple[str, str], WaitStats] = {}
+
+    # ==================== BUCKETS ====================
+
+    def _resource(self, resource: str) -> str:
+        resource = resource.lower()
+        return resource if resource in self.limits else "other"
+
+    def _keys(self, account: str, resource: str) -> tuple[str, str]:
+        base = f"{self.key_prefix}:{account}:{resource}"
+        return f"{base}:tat", f"{base}:paused"
+
+    def _params(self, resource: str) -> tuple[float, float]:
+        """Return ``(interval_ms, tolerance_ms)`` for a resource."""
+        rate, burst = self.limits[resource]
+        interval = 1000.0 / rate
+        return interval, interval * (max(1, burst) - 1)
+
+    def _stats_for(self, account: str, resource: str) -> WaitStats:
+        return self._stats.setdefault((account, resource), WaitStats())
+
+    # ==================== REDIS ====================
+
+    async def _get_redis(self) -> Redis | None:
+        if time.monotonic() < self._redis_down_until:
+            return None
+        try:
+            # The shared client is per event loop, so it is looked up on
+            # every call instead of being kept across Celery tasks
+            redis = self._redis if self._redis is not None else await get_redis()
+        except _REDIS_ERRORS as e:
+            self._mark_redis_down(e)
+            return None
+        if redis is not self._script_client:
+            self._reserve_script = redis.register_script(_RESERVE_SCRIPT)
+            self._pause_script = redis.register_script(_PAUSE_SCRIPT)
+            self._script_client = redis
+        return redis
+
+    def _mark_redis_down(self, error: Exception) -> None:
+        logger.warning(
+            f"Redis unavailable for eMAG rate limiting, using in-process limits "
+            f"for {REDIS_RETRY_AFTER:.0f}s: {error}"
+        )
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    @property
+    def backend(self) -> str:
+        return "local" if time.monotonic() < self._redis_down_until else "redis"
+
+    # ==================== IN-PROCESS FALLBACK ====================
+
+    def _reserve_local(
+        self, keys: tuple[str, str], interval: float, tolerance: float, max_wait: float
+    ) -> tuple[bool, float]:
+        tat_key, paused_key = keys
+        now = time.time() * 1000
+        tat = max(self._local_tat.get(tat_key, 0.0), now)
+        paused_until = self._local_paused.get(paused_key, 0.0)
+        if paused_until > now:
+            tat = max(tat, paused_until + tolerance)
+
+        wait = max(tat - tolerance, now) - now
+        if wait > max_wait:
+            return False, wait
+
+        self._local_tat[tat_key] = tat + interval
+        return True, wait
+
+    # ==================== PUBLIC API ====================
+
+    async def reserve(
+        self, account: str, resource: str = "other", timeout: float | None = 30.0
+    ) -> float:
+        """
+        Reserve the next free slot and return the seconds until it starts.
+
+        Raises:
+            RateLimitError: If the slot is further away than ``timeout``
+        """
+        resource = self._resource(resource)
+        keys = self._keys(account, resource)
+        interval, tolerance = self._params(resource)
+        max_wait = NO_TIMEOUT_MS if timeout is None else timeout * 1000
+
+        granted = wait = None
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                granted, wait = await self._reserve_script(
+                    keys=list(keys), args=[interval, tolerance, max_wait]
+                )
+            except _REDIS_ERRORS as e:
+                self._mark_redis_down(e)
+        if granted is None:
+            granted, wait = self._reserve_local(keys, interval, tolerance, max_wait)
+
+        wait_seconds = float(wait) / 1000
+        if not granted:
+            self._stats_for(account, resource).rejected += 1
+            EMAG_RATE_LIMIT_HITS_TOTAL.labels(account_type=account, operation_type=resource).inc()
+            raise RateLimitError(
+                remaining_seconds=max(1, int(wait_seconds + 0.999)),
+                message=f"eMAG {resource} rate limit slot for {account} is "
+                f"{wait_seconds:.1f}s away (timeout {timeout}s)",
+            )
+        return wait_seconds
+
+    async def acquire(
+        self, account: str, resource: str = "other", timeout: float | None = 30.0
+    ) -> float:
+        """
+        Wait for a rate limit slot.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitError: If no slot is available within ``timeout``
+        """
+        wait = await self.reserve(account, resource, timeout)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        resource = self._resource(resource)
+        stats = self._stats_for(account, resource)
+        stats.requests += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        EMAG_RATE_LIMIT_WAIT_TIME.labels(account_type=account, operation_type=resource).observe(
+            wait
+        )
+        return wait
+
+    async def report_throttled(
+        self, account: str, resource: str = "other", retry_after: float | None = None
+    ) -> None:
+        """Pause a bucket for every process after eMAG answered 429."""
+        resource = self._resource(resource)
+        _, paused_key = self._keys(account, resource)
+        pause_ms = max(retry_after or self.throttle_backoff, 0.001) * 1000
+
+        self._stats_for(account, resource).throttled += 1
+        EMAG_RATE_LIMIT_HITS_TOTAL.labels(account_type=account, operation_type=resource).inc()
+        logger.warning(f"eMAG throttled {account}/{resource}, pausing for {pause_ms / 1000:.1f}s")
+
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                await self._pause_script(keys=[paused_key], args=[int(pause_ms)])
+                return
+            except _REDIS_ERRORS as e:
+                self._mark_redis_down(e)
+        paused_until = time.time() * 1000 + pause_ms
+        self._local_paused[paused_key] = max(self._local_paused.get(paused_key, 0.0), paused_until)
+
+    def get_metrics(self) -> dict:
+        """Queue wait statistics per ``account/resource`` bucket."""
+        return {
+            "backend": self.backend,
+            "buckets": {
+                f"{account}/{resource}": {**asdict(stats), "avg_wait": stats.avg_wait}
+                for (account, resource), stats in self._stats.items()
+            },
+        }
+
+    def reset_metrics(self) -> None:
+        self._stats.clear()
+
+
+# Global distributed limiter instance
+_distributed_limiter: DistributedRateLimiter | None = None
+
+
+def get_distributed_rate_limiter() -> DistributedRateLimiter:
+    """Get the process-wide handle on the shared eMAG rate limiter."""
+    global _distributed_limiter
+    if _distributed_limiter is None:
+        _distributed_limiter = DistributedRateLimiter()
+    return _distributed_limiter
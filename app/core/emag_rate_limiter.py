@@ -12,7 +12,12 @@ import secrets
 import time
 from collections import deque
 
+from app.core.config import settings
 from app.core.emag_constants import RateLimits
+from app.core.emag_distributed_rate_limiter import (
+    DistributedRateLimiter,
+    get_distributed_rate_limiter,
+)
 from app.core.emag_errors import RateLimitError
 
 logger = logging.getLogger(__name__)
@@ -137,10 +142,26 @@ class EmagRateLimiter:
     - 3 requests/second for other operations (180/minute)
     - Global limit tracking per minute
     - Jitter to avoid thundering herd
+
+    When a ``DistributedRateLimiter`` is given, slots are reserved in the
+    cluster-wide buckets shared by all processes instead of the local ones.
     """
 
-    def __init__(self):
-        """Initialize rate limiter with eMAG API limits."""
+    def __init__(
+        self,
+        distributed: DistributedRateLimiter | None = None,
+        account: str = "default",
+    ):
+        """
+        Initialize rate limiter with eMAG API limits.
+
+        Args:
+            distributed: Shared limiter to reserve slots from
+            account: Account used when callers do not pass one
+        """
+        self.distributed = distributed
+        self.account = account
+
         # Token buckets for per-second limits
         self.orders_bucket = TokenBucket(
             rate=RateLimits.ORDERS_RPS,
@@ -165,7 +186,10 @@ class EmagRateLimiter:
         self._stats_lock = asyncio.Lock()
 
     async def acquire(
-        self, operation_type: str = "other", timeout: float | None = 30.0
+        self,
+        operation_type: str = "other",
+        timeout: float | None = 30.0,
+        account: str | None = None,
     ):
         """
         Acquire rate limit token for an operation.
@@ -173,10 +197,15 @@ class EmagRateLimiter:
         Args:
             operation_type: Type of operation ("orders" or "other")
             timeout: Maximum wait time in seconds
+            account: eMAG account whose quota is used (distributed mode only)
 
         Raises:
             RateLimitError: If rate limit cannot be acquired within timeout
         """
+        if self.distributed is not None:
+            await self._acquire_distributed(operation_type, timeout, account)
+            return
+
         is_orders = operation_type.lower() == "orders"
         bucket = self.orders_bucket if is_orders else self.other_bucket
         window = self.orders_window if is_orders else self.other_window
@@ -226,6 +255,42 @@ class EmagRateLimiter:
             f"Rate limit acquired for {operation_type} (waited {wait_time:.3f}s)"
         )
 
+    async def _acquire_distributed(
+        self, operation_type: str, timeout: float | None, account: str | None
+    ):
+        """Wait for a slot in the cluster-wide bucket of an account."""
+        is_orders = operation_type.lower() == "orders"
+        try:
+            wait_time = await self.distributed.acquire(
+                account or self.account, "orders" if is_orders else "other", timeout
+            )
+        except RateLimitError:
+            await self._record_rate_limit_hit()
+            raise
+
+        window = self.orders_window if is_orders else self.other_window
+        await window.add_request()
+        await self._update_stats(operation_type, wait_time)
+
+    async def report_throttled(
+        self,
+        operation_type: str = "other",
+        retry_after: float | None = None,
+        account: str | None = None,
+    ):
+        """
+        Record a 429 response from eMAG.
+
+        In distributed mode the account's bucket is paused for every process
+        until ``retry_after`` seconds have passed.
+        """
+        await self._record_rate_limit_hit()
+        if self.distributed is not None:
+            resource = "orders" if operation_type.lower() == "orders" else "other"
+            await self.distributed.report_throttled(
+                account or self.account, resource, retry_after
+            )
+
     async def _update_stats(self, operation_type: str, wait_time: float):
         """Update rate limiter statistics."""
         async with self._stats_lock:
@@ -259,6 +324,11 @@ class EmagRateLimiter:
                 "other_rpm_usage": other_count / RateLimits.OTHER_RPM,
                 "orders_tokens_available": self.orders_bucket.get_available_tokens(),
                 "other_tokens_available": self.other_bucket.get_available_tokens(),
+                **(
+                    {"distributed": self.distributed.get_metrics()}
+                    if self.distributed is not None
+                    else {}
+                ),
             }
 
     async def reset_stats(self):
@@ -270,6 +340,8 @@ class EmagRateLimiter:
                 "rate_limit_hits": 0,
                 "total_wait_time": 0.0,
             }
+        if self.distributed is not None:
+            self.distributed.reset_metrics()
 
     def get_usage_percentage(self, operation_type: str = "other") -> float:
         """
@@ -303,7 +375,13 @@ def get_rate_limiter() -> EmagRateLimiter:
     """
     global _rate_limiter
     if _rate_limiter is None:
-        _rate_limiter = EmagRateLimiter()
+        _rate_limiter = EmagRateLimiter(
+            distributed=(
+                get_distributed_rate_limiter()
+                if settings.EMAG_DISTRIBUTED_RATE_LIMIT
+                else None
+            )
+        )
     return _rate_limiter
 
 
@@ -0,0 +1,557 @@
+"""Two-tier cache: a bounded per-process LRU (L1) in front of Redis (L2).
+
+Warm lookups are answered from process memory without a Redis round trip.
+On an L1 miss the entry and the versions of its tags are read from Redis in
+one pipelined round trip, and the entry is copied into L1.
+
+``get_or_load`` adds the two protections a plain read-through cache lacks:
+
+- single-flight: concurrent misses for one key in a process share a single
+  call of the loader instead of each hitting the database;
+- stale-while-revalidate: for ``stale_ttl`` seconds after an entry stops
+  being fresh it is still served, while one background task per deployment
+  (guarded by a short Redis lock) reloads it.
+
+Entries are invalidated by tag instead of by scanning key patterns. Every
+tag has a version counter in Redis and every entry records the versions of
+its tags when it was loaded; ``invalidate_tags`` increments the counters, so
+older entries stop matching wherever they are stored. The new versions are
+published on the change feed, which makes every process drop its L1 copies
+at once.
+
+When Redis is disabled or unreachable the cache keeps working on L1 alone,
+and invalidations reach the processes of the local host only.
+"""
+
+import asyncio
+import json
+import pickle
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from prometheus_client import Counter
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.infrastructure.change_feed import CACHE_EVENTS, get_change_feed
+
+logger = get_logger(__name__)
+
+TIERED_CACHE_REQUESTS = Counter(
+    "tiered_cache_requests_total",
+    "Lookups in the tiered cache",
+    ["namespace", "result"],  # l1_hit, l2_hit, stale, miss, coalesced
+)
+
+TIERED_CACHE_INVALIDATIONS = Counter(
+    "tiered_cache_invalidations_total",
+    "Cache tags and keys invalidated",
+    ["kind"],  # tag, key
+)
+
+# Redis keys holding the version counter of each tag, shared by all namespaces
+TAG_KEY_PREFIX = "cache:tag:"
+
+# How long Redis is bypassed after a failed call
+REDIS_RETRY_AFTER = 30.0
+
+# Failures that make the cache serve from process memory. RuntimeError covers
+# a client whose event loop is gone ("Event loop is closed").
+_REDIS_ERRORS = (RedisError, OSError, RuntimeError)
+
+# Longest time (seconds) one process may hold the right to refresh a stale entry
+REFRESH_LOCK_TTL = 30
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+class _Entry:
+    """Encoded value with its freshness deadlines and tag versions."""
+
+    __slots__ = ("payload", "fresh_until", "expires_at", "tags")
+
+    def __init__(
+        self, payload: bytes, fresh_until: float, expires_at: float, tags: dict[str, int]
+    ):
+        self.payload = payload
+        self.fresh_until = fresh_until
+        self.expires_at = expires_at
+        self.tags = tags
+
+    def encode(self) -> bytes:
+        header = json.dumps({"f": self.fresh_until, "e": self.expires_at, "t": self.tags})
+        return header.encode() + b"\n" + self.payload
+
+    @classmethod
+    def decode(cls, raw: bytes) -> "_Entry":
+        header, _, payload = raw.partition(b"\n")
+        meta = json.loads(header)
+        return cls(payload, meta["f"], meta["e"], meta["t"])
+
+
+class TieredCache:
+    """Per-process LRU backed by Redis, invalidated by tag versions."""
+
+    def __init__(
+        self,
+        namespace: str = "tc",
+        redis: Redis | None = None,
+        use_redis: bool | None = None,
+        max_entries: int | None = None,
+        dumps: Callable[[Any], bytes] | None = None,
+        loads: Callable[[bytes], Any] | None = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            namespace: Prefix of the Redis keys of the entries
+            redis: Redis client (default: the shared application client)
+            use_redis: Whether to use Redis as L2 (default: REDIS_ENABLED)
+            max_entries: Size of the per-process LRU (default: CACHE_L1_MAX_ENTRIES)
+            dumps: Serializer of cached values (default: JSON)
+            loads: Deserializer of cached values (default: JSON)
+        """
+        self.namespace = namespace
+        self._redis = redis
+        self.use_redis = settings.REDIS_ENABLED if use_redis is None else use_redis
+        self.max_entries = (
+            settings.CACHE_L1_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self._dumps = dumps or _json_dumps
+        self._loads = loads or json.loads
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._tag_versions: dict[str, int] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._refreshing: set[asyncio.Task] = set()
+        self._redis_down_until = 0.0
+        self._subscribed = False
+        self.stats = dict.fromkeys(
+            ("l1_hits", "l2_hits", "stale_hits", "misses", "coalesced", "loads"), 0
+        )
+
+    def full_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    # ==================== READING ====================
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Loader,
+        ttl: int,
+        *,
+        stale_ttl: int = 0,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """Return the cached value of ``key``, calling ``loader`` on a miss.
+
+        Args:
+            key: Cache key (without namespace)
+            loader: Coroutine function producing the value
+            ttl: Seconds the value is fresh
+            stale_ttl: Seconds a value is still served, and refreshed in the
+                background, after it stops being fresh
+            tags: Tags whose invalidation drops the value
+        """
+        self.ensure_subscribed()
+        full_key = self.full_key(key)
+        tags = tuple(tags)
+
+        entry = await self._lookup(full_key, tags)
+        if entry is not None:
+            if entry.fresh_until <= time.time():
+                self._count("stale_hits", "stale")
+                self._refresh_in_background(full_key, loader, ttl, stale_ttl, tags)
+            return self._loads(entry.payload)
+
+        self._count("misses", "miss")
+        return await self._single_flight(full_key, loader, ttl, stale_ttl, tags)
+
+    async def get(self, key: str, tags: Iterable[str] = ()) -> Any | None:
+        """Return the fresh cached value of ``key``, or None."""
+        self.ensure_subscribed()
+        entry = await self._lookup(self.full_key(key), tuple(tags))
+        if entry is None:
+            self._count("misses", "miss")
+            return None
+        if entry.fresh_until <= time.time():
+            return None
+        return self._loads(entry.payload)
+
+    async def _lookup(self, full_key: str, tags: tuple[str, ...]) -> _Entry | None:
+        entry = self._get_local(full_key)
+        if entry is not None:
+            self._count("l1_hits", "l1_hit")
+            return entry
+
+        entry = await self._get_remote(full_key, tags)
+        if entry is not None:
+            self._count("l2_hits", "l2_hit")
+            self._put_local(full_key, entry)
+        return entry
+
+    def _is_current(self, entry: _Entry) -> bool:
+        return all(
+            self._tag_versions.get(tag) == version for tag, version in entry.tags.items()
+        )
+
+    def _get_local(self, full_key: str) -> _Entry | None:
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time() or not self._is_current(entry):
+            del self._entries[full_key]
+            return None
+        self._entries.move_to_end(full_key)
+        return entry
+
+    async def _get_remote(self, full_key: str, tags: tuple[str, ...]) -> _Entry | None:
+        redis = await self._get_redis()
+        if redis is None:
+            return None
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.get(full_key)
+                if tags:
+                    pipe.mget([TAG_KEY_PREFIX + tag for tag in tags])
+                results = await pipe.execute()
+        except _REDIS_ERRORS as e:
+            self._redis_failed(e)
+            return None
+
+        if tags:
+            self._learn_versions(dict(zip(tags, results[1], strict=True)))
+        if results[0] is None:
+            return None
+        try:
+            entry = _Entry.decode(results[0])
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring malformed cache entry {full_key}: {e}")
+            return None
+        if entry.expires_at <= time.time() or not self._is_current(entry):
+            return None
+        return entry
+
+    # ==================== LOADING ====================
+
+    async def _single_flight(
+        self,
+        full_key: str,
+        loader: Loader,
+        ttl: int,
+        stale_ttl: int,
+        tags: tuple[str, ...],
+    ) -> Any:
+        flight = self._inflight.get(full_key)
+        if flight is None:
+            flight = asyncio.ensure_future(
+                self._load(full_key, loader, ttl, stale_ttl, tags)
+            )
+            self._inflight[full_key] = flight
+            flight.add_done_callback(lambda done: self._flight_done(full_key, done))
+        else:
+            self._count("coalesced", "coalesced")
+        # A cancelled caller must not cancel the load the others wait for
+        return await asyncio.shield(flight)
+
+    def _flight_done(self, full_key: str, flight: asyncio.Future) -> None:
+        if self._inflight.get(full_key) is flight:
+            del self._inflight[full_key]
+        if not flight.cancelled():
+            # Mark the exception retrieved when every caller went away
+            flight.exception()
+
+    async def _load(
+        self,
+        full_key: str,
+        loader: Loader,
+        ttl: int,
+        stale_ttl: int,
+        tags: tuple[str, ...],
+    ) -> Any:
+        # Read before loading: an invalidation during the load makes the result stale
+        versions = await self._current_versions(tags)
+        self.stats["loads"] += 1
+        value = await loader()
+        try:
+            payload = self._dumps(value)
+        except (TypeError, ValueError, pickle.PicklingError) as e:
+            logger.warning(f"Not caching {full_key}, value is not serializable: {e}")
+            return value
+
+        await self._store(full_key, payload, ttl, stale_ttl, versions)
+        return self._loads(payload)
+
+    def _refresh_in_background(
+        self,
+        full_key: str,
+        loader: Loader,
+        ttl: int,
+        stale_ttl: int,
+        tags: tuple[str, ...],
+    ) -> None:
+        if full_key in self._inflight:
+            return
+        task = asyncio.create_task(self._refresh(full_key, loader, ttl, stale_ttl, tags))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(
+        self,
+        full_key: str,
+        loader: Loader,
+        ttl: int,
+        stale_ttl: int,
+        tags: tuple[str, ...],
+    ) -> None:
+        try:
+            # Another process may have refreshed the entry already
+            entry = await self._get_remote(full_key, tags)
+            if entry is not None and entry.fresh_until > time.time():
+                self._put_local(full_key, entry)
+                return
+            if not await self._acquire_refresh_lock(full_key, ttl):
+                return
+            await self._single_flight(full_key, loader, ttl, stale_ttl, tags)
+        except Exception as e:
+            logger.warning(f"Background refresh of {full_key} failed: {e}")
+
+    async def _acquire_refresh_lock(self, full_key: str, ttl: int) -> bool:
+        redis = await self._get_redis()
+        if redis is None:
+            return True
+        try:
+            lock_ttl = max(1, min(REFRESH_LOCK_TTL, ttl))
+            return bool(await redis.set(f"{full_key}:refresh", b"1", nx=True, ex=lock_ttl))
+        except _REDIS_ERRORS as e:
+            self._redis_failed(e)
+            return True
+
+    # ==================== WRITING ====================
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        *,
+        stale_ttl: int = 0,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """Store a value; returns False if it could not be serialized."""
+        self.ensure_subscribed()
+        full_key = self.full_key(key)
+        try:
+            payload = self._dumps(value)
+        except (TypeError, ValueError, pickle.PicklingError) as e:
+            logger.warning(f"Not caching {full_key}, value is not serializable: {e}")
+            return False
+        versions = await self._current_versions(tuple(tags))
+        await self._store(full_key, payload, ttl, stale_ttl, versions)
+        return True
+
+    async def _store(
+        self,
+        full_key: str,
+        payload: bytes,
+        ttl: int,
+        stale_ttl: int,
+        versions: dict[str, int],
+    ) -> None:
+        now = time.time()
+        entry = _Entry(payload, now + ttl, now + ttl + stale_ttl, versions)
+        if not self._is_current(entry):
+            return
+        self._put_local(full_key, entry)
+
+        redis = await self._get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(full_key, entry.encode(), ex=max(1, int(ttl + stale_ttl)))
+        except _REDIS_ERRORS as e:
+            self._redis_failed(e)
+
+    def _put_local(self, full_key: str, entry: _Entry) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[full_key] = entry
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ==================== INVALIDATION ====================
+
+    async def invalidate_tags(self, *tags: str) -> dict[str, int]:
+        """Drop every entry carrying one of ``tags``, in every process.
+
+        Returns the new version of each tag.
+        """
+        self.ensure_subscribed()
+        tags = sorted(set(tags))
+        if not tags:
+            return {}
+
+        versions = None
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for tag in tags:
+                        pipe.incr(TAG_KEY_PREFIX + tag)
+                    versions = dict(zip(tags, await pipe.execute(), strict=True))
+            except _REDIS_ERRORS as e:
+                self._redis_failed(e)
+        if versions is None:
+            versions = {tag: self._tag_versions.get(tag, 0) + 1 for tag in tags}
+
+        self._apply_versions(versions)
+        TIERED_CACHE_INVALIDATIONS.labels(kind="tag").inc(len(tags))
+        await get_change_feed().publish(CACHE_EVENTS, {"tags": versions})
+        return versions
+
+    async def tag_versions(self, *tags: str, fresh: bool = False) -> dict[str, int]:
+        """Current version of each of ``tags``, from process memory once known.
+
+        With ``fresh`` the Redis counters are read every time, so bumps whose
+        change feed notice has not arrived (or was lost) are seen as well.
+        Process memory is the fallback while Redis is unavailable.
+        """
+        self.ensure_subscribed()
+        return await self._current_versions(tags, refresh=fresh)
+
+    async def delete(self, key: str) -> None:
+        """Drop one entry, in every process."""
+        self.ensure_subscribed()
+        full_key = self.full_key(key)
+        self._entries.pop(full_key, None)
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                await redis.delete(full_key)
+            except _REDIS_ERRORS as e:
+                self._redis_failed(e)
+        TIERED_CACHE_INVALIDATIONS.labels(kind="key").inc()
+        await get_change_feed().publish(CACHE_EVENTS, {"keys": [full_key]})
+
+    def clear_local(self) -> None:
+        """Drop the L1 copies of this process."""
+        self._entries.clear()
+
+    async def _current_versions(
+        self, tags: tuple[str, ...], refresh: bool = False
+    ) -> dict[str, int]:
+        missing = [tag for tag in tags if refresh or tag not in self._tag_versions]
+        if missing:
+            redis = await self._get_redis()
+            values = [None] * len(missing)
+            if redis is not None:
+                try:
+                    values = await redis.mget([TAG_KEY_PREFIX + tag for tag in missing])
+                except _REDIS_ERRORS as e:
+                    self._redis_failed(e)
+            self._learn_versions(dict(zip(missing, values, strict=True)))
+        return {tag: self._tag_versions[tag] for tag in tags}
+
+    def _learn_versions(self, raw_versions: dict[str, Any]) -> None:
+        versions = {tag: int(value or 0) for tag, value in raw_versions.items()}
+        self._apply_versions(versions)
+
+    def _apply_versions(self, versions: dict[str, int]) -> None:
+        changed = False
+        for tag, version in versions.items():
+            current = self._tag_versions.get(tag)
+            # Counters only grow; a lower version is a late message
+            if current is None or version > current:
+                self._tag_versions[tag] = version
+                changed = changed or current is not None
+        if changed:
+            stale = [key for key, entry in self._entries.items() if not self._is_current(entry)]
+            for key in stale:
+                del self._entries[key]
+
+    def ensure_subscribed(self) -> None:
+        """Listen for invalidations made by other processes."""
+        if not self._subscribed:
+            get_change_feed().subscribe(CACHE_EVENTS, self._on_cache_event)
+            self._subscribed = True
+
+    async def _on_cache_event(self, topic: str, event: dict[str, Any]) -> None:
+        tags = event.get("tags")
+        if tags:
+            self._apply_versions({tag: int(version) for tag, version in tags.items()})
+        for full_key in event.get("keys", ()):
+            self._entries.pop(full_key, None)
+
+    # ==================== REDIS ====================
+
+    async def _get_redis(self) -> Redis | None:
+        """The L2 client, or None while Redis is disabled or backing off."""
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is not None:
+            return self._redis
+        try:
+            # The shared client is per event loop (Celery tasks each run
+            # their own), so it is looked up on every call instead of kept
+            return await get_redis()
+        except _REDIS_ERRORS as e:
+            self._redis_failed(e)
+            return None
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning(
+            f"Tiered cache lost Redis, serving from process memory for "
+            f"{REDIS_RETRY_AFTER:.0f}s: {error}"
+        )
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    # ==================== STATISTICS ====================
+
+    def _count(self, stat: str, result: str) -> None:
+        self.stats[stat] += 1
+        TIERED_CACHE_REQUESTS.labels(namespace=self.namespace, result=result).inc()
+
+    def get_stats(self) -> dict[str, Any]:
+        hits = self.stats["l1_hits"] + self.stats["l2_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            "namespace": self.namespace,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "backend": "redis"
+            if self.use_redis and time.monotonic() >= self._redis_down_until
+            else "local",
+        }
+
+
+_tiered_cache: TieredCache | None = None
+_pickle_cache: TieredCache | None = None
+
+
+def get_tiered_cache() -> TieredCache:
+    """Get the process-wide cache of JSON values."""
+    global _tiered_cache
+    if _tiered_cache is None:
+        _tiered_cache = TieredCache()
+    return _tiered_cache
+
+
+def get_pickle_cache() -> TieredCache:
+    """Get the process-wide cache of pickled values (complex objects)."""
+    global _pickle_cache
+    if _pickle_cache is None:
+        _pickle_cache = TieredCache("tc:bin", dumps=pickle.dumps, loads=pickle.loads)
+    return _pickle_cache
@@ -1,10 +1,24 @@
-"""CRUD operations for inventory management."""
-
-from datetime import datetime, timedelta
+"""CRUD operations for inventory management.
+
+Stock levels are changed by single conditional statements instead of
+read-modify-write on ORM objects: a reservation only succeeds while
+``available_quantity`` still covers it, so concurrent order ingestion can
+neither oversell nor lose updates. The reservations of all lines of an
+order, the inventory updates and their ``StockMovement`` rows are written
+by one statement (data-modifying CTEs), locking the inventory rows in id
+order so that concurrent orders cannot deadlock.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 
 from app.crud.base import CRUDBase
 from app.models.inventory import (
@@ -27,6 +41,189 @@ from app.schemas.inventory import (
 )
 
 
+class InsufficientStockError(ValueError):
+    """Raised when a reservation is not covered by the available stock."""
+
+    def __init__(self, inventory_item_ids: list[int]):
+        self.inventory_item_ids = inventory_item_ids
+        super().__init__(
+            f"Insufficient available stock for inventory items {inventory_item_ids}"
+        )
+
+
+# Reserves every (id, qty) line or, when one line is short, returns fewer rows
+_RESERVE_SQL = text(
+    """
+    WITH req AS (
+        SELECT id, qty
+        FROM unnest(CAST(:item_ids AS integer[]), CAST(:quantities AS integer[]))
+            AS r(id, qty)
+    ),
+    locked AS (
+        SELECT i.id
+        FROM app.inventory_items i
+        JOIN req ON req.id = i.id
+        ORDER BY i.id
+        FOR UPDATE OF i
+    ),
+    reserved AS (
+        UPDATE app.inventory_items i
+        SET reserved_quantity = i.reserved_quantity + req.qty,
+            available_quantity = i.available_quantity - req.qty,
+            updated_at = CAST(:now AS timestamp)
+        FROM req
+        WHERE i.id = req.id
+          AND i.id IN (SELECT id FROM locked)
+          AND i.is_active
+          AND i.available_quantity >= req.qty
+        RETURNING i.id, i.warehouse_id, i.unit_cost, req.qty,
+                  i.reserved_quantity, i.available_quantity
+    ),
+    movements AS (
+        INSERT INTO app.stock_movements (
+            inventory_item_id, warehouse_id, movement_type, quantity,
+            previous_quantity, new_quantity, reference_type, reference_id,
+            performed_by, unit_cost, total_value, created_at, updated_at
+        )
+        SELECT id, warehouse_id, 'reservation', qty,
+               available_quantity + qty, available_quantity, 'order',
+               CAST(:order_id AS varchar), CAST(:performed_by AS integer),
+               unit_cost, unit_cost * qty,
+               CAST(:now AS timestamp), CAST(:now AS timestamp)
+        FROM reserved
+    ),
+    inserted AS (
+        INSERT INTO app.stock_reservations (
+            inventory_item_id, order_id, quantity, reserved_at, expires_at,
+            is_active, created_at, updated_at
+        )
+        SELECT id, CAST(:order_id AS varchar), qty,
+               CAST(:reserved_at AS timestamp), CAST(:expires_at AS timestamp),
+               true, CAST(:now AS timestamp), CAST(:now AS timestamp)
+        FROM reserved
+        RETURNING *
+    )
+    SELECT inserted.*,
+           reserved.reserved_quantity AS item_reserved_quantity,
+           reserved.available_quantity AS item_available_quantity
+    FROM inserted
+    JOIN reserved ON reserved.id = inserted.inventory_item_id
+    """
+)
+
+# Deactivates active reservations and returns their quantities to the items,
+# locking the items in id order like _RESERVE_SQL
+_RELEASE_SQL = text(
+    """
+    WITH released AS (
+        UPDATE app.stock_reservations
+        SET is_active = false, updated_at = CAST(:now AS timestamp)
+        WHERE id = ANY(CAST(:reservation_ids AS integer[])) AND is_active
+        RETURNING inventory_item_id, order_id, quantity
+    ),
+    locked AS (
+        SELECT i.id
+        FROM app.inventory_items i
+        WHERE i.id IN (SELECT inventory_item_id FROM released)
+        ORDER BY i.id
+        FOR UPDATE OF i
+    ),
+    per_item AS (
+        SELECT inventory_item_id AS id,
+               sum(quantity) AS qty,
+               CASE WHEN count(DISTINCT order_id) = 1 THEN min(order_id) END AS order_id
+        FROM released
+        GROUP BY inventory_item_id
+    ),
+    items AS (
+        UPDATE app.inventory_items i
+        SET reserved_quantity = i.reserved_quantity - per_item.qty,
+            available_quantity = i.available_quantity + per_item.qty,
+            updated_at = CAST(:now AS timestamp)
+        FROM per_item
+        WHERE i.id = per_item.id
+          AND i.id IN (SELECT id FROM locked)
+        RETURNING i.id, i.warehouse_id, i.unit_cost, per_item.qty, per_item.order_id,
+                  i.reserved_quantity, i.available_quantity
+    ),
+    movements AS (
+        INSERT INTO app.stock_movements (
+            inventory_item_id, warehouse_id, movement_type, quantity,
+            previous_quantity, new_quantity, reference_type, reference_id,
+            performed_by, unit_cost, total_value, created_at, updated_at
+        )
+        SELECT id, warehouse_id, 'release', qty,
+               available_quantity - qty, available_quantity, 'order', order_id,
+               CAST(:performed_by AS integer), unit_cost, unit_cost * qty,
+               CAST(:now AS timestamp), CAST(:now AS timestamp)
+        FROM items
+    )
+    SELECT id, reserved_quantity, available_quantity FROM items
+    """
+)
+
+# Sets the on-hand quantity, reading the previous one under the row lock
+_SET_STOCK_SQL = text(
+    """
+    WITH previous AS (
+        SELECT id, quantity
+        FROM app.inventory_items
+        WHERE id = :item_id
+        FOR UPDATE
+    ),
+    updated AS (
+        UPDATE app.inventory_items i
+        SET quantity = CAST(:new_quantity AS integer),
+            available_quantity = CAST(:new_quantity AS integer) - i.reserved_quantity,
+            updated_at = CAST(:now AS timestamp)
+        FROM previous
+        WHERE i.id = previous.id
+        RETURNING i.id, i.warehouse_id, i.unit_cost, i.quantity,
+                  i.reserved_quantity, i.available_quantity,
+                  previous.quantity AS previous_quantity
+    ),
+    movements AS (
+        INSERT INTO app.stock_movements (
+            inventory_item_id, warehouse_id, movement_type, quantity,
+            previous_quantity, new_quantity, reference_type, reference_id,
+            performed_by, unit_cost, total_value, created_at, updated_at
+        )
+        SELECT id, warehouse_id, CAST(:movement_type AS varchar),
+               abs(quantity - previous_quantity), previous_quantity, quantity,
+               CAST(:reference_type AS varchar), CAST(:reference_id AS varchar),
+               CAST(:performed_by AS integer), unit_cost,
+               unit_cost * abs(quantity - previous_quantity),
+               CAST(:now AS timestamp), CAST(:now AS timestamp)
+        FROM updated
+    )
+    SELECT id, quantity, reserved_quantity, available_quantity FROM updated
+    """
+)
+
+
+def _utc_now() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _merge_lines(lines: Mapping[int, int] | Iterable[tuple[int, int]]) -> dict[int, int]:
+    """Sum the quantities of repeated inventory items, in id order."""
+    items = lines.items() if isinstance(lines, Mapping) else lines
+    merged: dict[int, int] = defaultdict(int)
+    for item_id, quantity in items:
+        if quantity <= 0:
+            raise ValueError("Reserved quantities must be positive")
+        merged[item_id] += quantity
+    return dict(sorted(merged.items()))
+
+
+def _sync_loaded_item(db: AsyncSession, item_id: int, **values: int) -> None:
+    """Copy new quantities onto the session's copy of an item, if it holds one."""
+    item = db.sync_session.identity_map.get(identity_key(InventoryItem, item_id))
+    if item is not None:
+        for name, value in values.items():
+            set_committed_value(item, name, value)
+
+
 class CRUDWarehouse(CRUDBase[Warehouse, WarehouseCreate, WarehouseUpdate]):
     """CRUD operations for Warehouse model."""
 
@@ -149,33 +346,33 @@ class CRUDInventoryItem(
         reference_type: str | None = None,
         reference_id: str | None = None,
         performed_by: int | None = None,
+        commit: bool = True,
     ) -> InventoryItem:
-        """Update stock level and create stock movement record."""
-        previous_quantity = inventory_item.quantity
-        inventory_item.quantity = new_quantity
-        inventory_item.available_quantity = (
-            new_quantity - inventory_item.reserved_quantity
-        )
+        """Update stock level and create stock movement record.
 
-        # Create stock movement
-        stock_movement = StockMovement(
-            inventory_item_id=inventory_item.id,
-            warehouse_id=inventory_item.warehouse_id,
-            movement_type=movement_type,
-            quantity=abs(new_quantity - previous_quantity),
-            previous_quantity=previous_quantity,
-            new_quantity=new_quantity,
-            reference_type=reference_type,
-            reference_id=reference_id,
-            performed_by=performed_by,
-            unit_cost=inventory_item.unit_cost,
-            total_value=inventory_item.unit_cost
-            * abs(new_quantity - previous_quantity),
+        The previous quantity is read under the row lock by the same
+        statement, so concurrent updates each record their own movement.
+        """
+        result = await db.execute(
+            _SET_STOCK_SQL,
+            {
+                "item_id": inventory_item.id,
+                "new_quantity": new_quantity,
+                "movement_type": movement_type,
+                "reference_type": reference_type,
+                "reference_id": reference_id,
+                "performed_by": performed_by,
+                "now": _utc_now(),
+            },
         )
+        row = result.one_or_none()
+        if row is None:
+            raise ValueError(f"Inventory item {inventory_item.id} does not exist")
 
-        db.add(stock_movement)
-        await db.commit()
-        await db.refresh(inventory_item)
+        for name in ("quantity", "reserved_quantity", "available_quantity"):
+            set_committed_value(inventory_item, name, getattr(row, name))
+        if commit:
+            await db.commit()
 
         return inventory_item
 
@@ -187,51 +384,177 @@ class CRUDInventoryItem(
         quantity: int,
         order_id: str,
         expires_at: datetime | None = None,
+        commit: bool = True,
     ) -> StockReservation:
         """Reserve stock for an order."""
-        if inventory_item.available_quantity < quantity:
-            raise ValueError("Insufficient available stock")
-
-        # Create reservation
-        reservation = StockReservation(
-            inventory_item_id=inventory_item.id,
+        reservations = await self.reserve_order(
+            db,
             order_id=order_id,
-            quantity=quantity,
-            reserved_at=datetime.now(),
-            expires_at=expires_at or (datetime.now() + timedelta(hours=24)),
-            is_active=True,
+            lines={inventory_item.id: quantity},
+            expires_at=expires_at,
+            commit=commit,
         )
+        return reservations[0]
 
-        # Update inventory
-        inventory_item.reserved_quantity += quantity
-        inventory_item.available_quantity -= quantity
-
-        db.add(reservation)
-        await db.commit()
-        await db.refresh(reservation)
+    async def reserve_order(
+        self,
+        db: AsyncSession,
+        *,
+        order_id: str,
+        lines: Mapping[int, int] | Iterable[tuple[int, int]],
+        expires_at: datetime | None = None,
+        performed_by: int | None = None,
+        commit: bool = True,
+    ) -> list[StockReservation]:
+        """Reserve stock for all lines of an order, or for none of them.
+
+        Args:
+            db: Database session
+            order_id: Order the reservations belong to
+            lines: Quantities per inventory item ID; repeated items are summed
+            expires_at: Expiry of the reservations (default: in 24 hours)
+            performed_by: User recorded on the stock movements
+            commit: Whether to commit the transaction
+
+        Returns:
+            One reservation per inventory item, in item ID order
+
+        Raises:
+            InsufficientStockError: An item is missing, inactive or short of
+                stock; nothing is reserved
+        """
+        merged = _merge_lines(lines)
+        if not merged:
+            return []
+
+        reserved_at = datetime.now()
+        params = {
+            "item_ids": list(merged),
+            "quantities": list(merged.values()),
+            "order_id": order_id,
+            "performed_by": performed_by,
+            "reserved_at": reserved_at,
+            "expires_at": expires_at or (reserved_at + timedelta(hours=24)),
+            "now": _utc_now(),
+        }
+        # The savepoint undoes the lines that were covered when one was not
+        async with db.begin_nested() as savepoint:
+            rows = (await db.execute(_RESERVE_SQL, params)).all()
+            if len(rows) < len(merged):
+                await savepoint.rollback()
+                reserved_ids = {row.inventory_item_id for row in rows}
+                raise InsufficientStockError(
+                    [item_id for item_id in merged if item_id not in reserved_ids]
+                )
+
+        reservations = []
+        for row in sorted(rows, key=lambda row: row.inventory_item_id):
+            reservation = StockReservation(
+                id=row.id,
+                inventory_item_id=row.inventory_item_id,
+                order_id=row.order_id,
+                quantity=row.quantity,
+                reserved_at=row.reserved_at,
+                expires_at=row.expires_at,
+                is_active=row.is_active,
+                notes=row.notes,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+            )
+            # Attach as already persisted: the statement inserted it
+            make_transient_to_detached(reservation)
+            db.add(reservation)
+            reservations.append(reservation)
+
+            _sync_loaded_item(
+                db,
+                row.inventory_item_id,
+                reserved_quantity=row.item_reserved_quantity,
+                available_quantity=row.item_available_quantity,
+            )
 
-        return reservation
+        if commit:
+            await db.commit()
+        return reservations
 
     async def release_reservation(
         self,
         db: AsyncSession,
         *,
         reservation: StockReservation,
+        commit: bool = True,
     ) -> None:
         """Release a stock reservation."""
-        # Get inventory item
-        inventory_item = await self.get(db, reservation.inventory_item_id)
-        if not inventory_item:
-            return
+        await self.release_reservations(db, reservations=[reservation], commit=commit)
 
-        # Update inventory
-        inventory_item.reserved_quantity -= reservation.quantity
-        inventory_item.available_quantity += reservation.quantity
+    async def release_reservations(
+        self,
+        db: AsyncSession,
+        *,
+        reservations: Iterable[StockReservation],
+        performed_by: int | None = None,
+        commit: bool = True,
+    ) -> int:
+        """Release several reservations with one statement.
+
+        Reservations that are already inactive are skipped, so releasing
+        twice never returns stock twice.
+
+        Returns:
+            Number of inventory items whose stock was returned
+        """
+        reservations = list(reservations)
+        if not reservations:
+            return 0
+
+        rows = (
+            await db.execute(
+                _RELEASE_SQL,
+                {
+                    "reservation_ids": [reservation.id for reservation in reservations],
+                    "performed_by": performed_by,
+                    "now": _utc_now(),
+                },
+            )
+        ).all()
+
+        for reservation in reservations:
+            set_committed_value(reservation, "is_active", False)
+        for row in rows:
+            _sync_loaded_item(
+                db,
+                row.id,
+                reserved_quantity=row.reserved_quantity,
+                available_quantity=row.available_quantity,
+            )
 
-        # Mark reservation as inactive
-        reservation.is_active = False
+        if commit:
+            await db.commit()
+        return len(rows)
 
-        await db.commit()
+    async def release_order(
+        self,
+        db: AsyncSession,
+        *,
+        order_id: str,
+        performed_by: int | None = None,
+        commit: bool = True,
+    ) -> int:
+        """Release all active reservations of an order."""
+        result = await db.execute(
+            select(StockReservation).where(
+                and_(
+                    StockReservation.order_id == order_id,
+                    StockReservation.is_active.is_(True),
+                )
+            )
+        )
+        return await self.release_reservations(
+            db,
+            reservations=result.scalars().all(),
+            performed_by=performed_by,
+            commit=commit,
+        )
 
 
 class CRUDStockMovement(CRUDBase[StockMovement, StockMovementCreate, None]):
@@ -33,6 +33,7 @@ from app.middleware.idempotency import IdempotencyMiddleware
 from app.middleware.logging_middleware import setup_logging_middleware
 from app.models.role import Role
 from app.models.user import User
+from app.services.infrastructure.change_feed import get_change_feed
 
 # Initialize logging
 configure_logging()
@@ -223,6 +224,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down application...")
 
+    # Stop relaying change feed events to WebSocket clients
+    await get_change_feed().close()
+
     # Close Redis connection
     if redis_client:
         await redis_client.close()
@@ -288,9 +292,10 @@ app.add_middleware(
     CORSMiddleware,
     **cors_options,
 )
+# Inside compression, so that stored idempotent responses are uncompressed
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(CompressionMiddleware)
 app.add_middleware(CorrelationIdMiddleware)
-app.add_middleware(IdempotencyMiddleware)
 
 # Setup logging middleware
 setup_logging_middleware(app)
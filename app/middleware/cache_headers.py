@@ -1,11 +1,20 @@
 """Middleware for adding cache-related headers to responses."""
 
+import asyncio
 import hashlib
 
 from fastapi import Request, Response
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.types import ASGIApp
 
+from app.core.logging import get_logger
+from app.core.tiered_cache import get_tiered_cache
+
+logger = get_logger(__name__)
+
 
 class CacheControlMiddleware(BaseHTTPMiddleware):
     """Middleware that adds Cache-Control and ETag headers to responses."""
@@ -137,3 +146,131 @@ def cache_control(
         return wrapper
 
     return decorator
+
+
+# ============================================================================
+# Version-based validators
+# ============================================================================
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ETag against an ``If-None-Match`` header."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _deleted_rows_tag(table_name: str) -> str:
+    return f"deleted-rows:{table_name}"
+
+
+async def data_version(db: AsyncSession, *models) -> str:
+    """Return a version string that changes whenever rows of ``models`` change.
+
+    Inserts and updates move ``max(updated_at)`` of the table, which the
+    ``updated_at`` indexes answer with one probe per table. Deletes do not,
+    so every commit deleting rows bumps a per-table counter (a tiered cache
+    tag kept in Redis, see the listeners below) that is read with the same
+    request. Without Redis the counters live in process memory.
+
+    ``updated_at`` is the transaction start time, so a long transaction that
+    commits after a newer one has been seen only shows up with the next write.
+    """
+    columns = [select(func.max(model.updated_at)).scalar_subquery() for model in models]
+    row = (await db.execute(select(*columns))).one()
+    tags = [_deleted_rows_tag(model.__table__.fullname) for model in models]
+    deletes = await get_tiered_cache().tag_versions(*tags, fresh=True)
+    return "|".join([*(str(value) for value in row), *(str(deletes[tag]) for tag in tags)])
+
+
+# Tables with rows deleted by the current transaction of a session
+_DELETED_TABLES = "cache_headers_deleted_tables"
+
+# Delete notices being published, kept referenced until they finish
+_pending_notices: set[asyncio.Task] = set()
+
+
+def _track_flushed_deletes(session: Session, flush_context) -> None:
+    tables = {obj.__table__.fullname for obj in session.deleted}
+    if tables:
+        session.info.setdefault(_DELETED_TABLES, set()).update(tables)
+
+
+def _track_bulk_deletes(orm_execute_state) -> None:
+    mapper = orm_execute_state.bind_mapper
+    if orm_execute_state.is_delete and mapper is not None:
+        orm_execute_state.session.info.setdefault(_DELETED_TABLES, set()).add(
+            mapper.local_table.fullname
+        )
+
+
+def _publish_deletes(session: Session) -> None:
+    """Bump the delete counters once the deleting transaction is committed.
+
+    Bumping before the commit would let a reader pair the new version with
+    the old rows and keep answering 304 for them. Sessions used outside an
+    event loop (sync scripts) cannot publish; their deletes show up with the
+    next write to the table.
+    """
+    tables = session.info.pop(_DELETED_TABLES, None)
+    if not tables:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.debug(f"No event loop to announce deletes from {sorted(tables)}")
+        return
+    task = loop.create_task(
+        get_tiered_cache().invalidate_tags(*(_deleted_rows_tag(table) for table in tables))
+    )
+    _pending_notices.add(task)
+    task.add_done_callback(_pending_notices.discard)
+
+
+def _forget_deletes(session: Session, transaction) -> None:
+    # Commits have published by now; whatever is left was rolled back
+    if transaction.parent is None:
+        session.info.pop(_DELETED_TABLES, None)
+
+
+event.listen(Session, "after_flush", _track_flushed_deletes)
+event.listen(Session, "do_orm_execute", _track_bulk_deletes)
+event.listen(Session, "after_commit", _publish_deletes)
+event.listen(Session, "after_transaction_end", _forget_deletes)
+
+
+async def check_not_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    *models,
+    cache_control: str = "private, no-cache",
+) -> Response | None:
+    """Answer a conditional GET from table versions before the real query runs.
+
+    The ETag is derived from the request path, its query parameters and
+    :func:`data_version` of ``models``, so it is cheap to compute and does
+    not need the rendered body. Returns a ``304 Not Modified`` response when
+    the client's ``If-None-Match`` still matches; otherwise sets the
+    validator headers on ``response`` and returns ``None``.
+
+    Example:
+        not_modified = await check_not_modified(request, response, db, Product)
+        if not_modified is not None:
+            return not_modified
+    """
+    version = await data_version(db, *models)
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.md5(
+        f"{request.url.path}|{query}|{version}".encode(), usedforsecurity=False
+    ).hexdigest()
+    headers = {"ETag": f'W/"{digest}"', "Cache-Control": cache_control}
+
+    if etag_matches(request.headers.get("If-None-Match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -1,103 +1,275 @@
-"""Response compression middleware for FastAPI."""
+"""Response compression middleware for FastAPI.
 
-import gzip
+Pure ASGI middleware: response bodies are compressed chunk by chunk as the
+application sends them, so ``StreamingResponse`` bodies are compressed too
+and nothing is buffered beyond what the encoder keeps internally.
+
+The encoding is negotiated from ``Accept-Encoding`` among ``zstd``, ``br``
+and ``gzip``. Brotli and Zstandard are optional dependencies and are only
+offered when ``brotli`` / ``zstandard`` are installed. Compression levels
+can be tuned per content type, and chunks above ``offload_threshold`` are
+compressed in a worker thread to keep the event loop responsive.
+"""
+
+import asyncio
 import logging
-from collections.abc import Callable
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import StreamingResponse
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_COMPRESS_TYPES = {
+    "text/plain",
+    "text/html",
+    "text/css",
+    "text/javascript",
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "text/xml",
+    "application/octet-stream",
+}
+
+# Compression levels per content type and encoding; "*" applies to all types.
+# Levels favour speed for dynamic responses: JSON lists compress well enough
+# at moderate levels and the higher ones cost far more CPU than they save.
+DEFAULT_LEVELS: dict[str, dict[str, int]] = {
+    "*": {"zstd": 3, "br": 4, "gzip": 6},
+    "application/json": {"zstd": 6, "br": 5, "gzip": 6},
+}
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31 writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> dict[str, type]:
+    """Supported encodings in server preference order."""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = _ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = _BrotliEncoder
+    encoders["gzip"] = _GzipEncoder
+    return encoders
+
+
+def negotiate_encoding(accept_encoding: str, supported: list[str]) -> str | None:
+    """Pick the encoding to use from an ``Accept-Encoding`` header.
+
+    The client's quality values decide; ties go to the first entry of
+    ``supported``. Returns ``None`` when the response should stay identity.
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip()] = quality
 
-class CompressionMiddleware(BaseHTTPMiddleware):
-    """Middleware to compress HTTP responses using gzip."""
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Middleware to compress HTTP responses with zstd, brotli or gzip."""
 
     def __init__(
         self,
-        app: Callable,
+        app: ASGIApp,
         minimum_size: int = 1024,  # Only compress responses larger than 1KB
-        compress_types: set = None,
+        compress_types: set | None = None,
+        levels: dict[str, dict[str, int]] | None = None,
+        offload_threshold: int = 256 * 1024,
     ):
         """Initialize compression middleware.
 
         Args:
-            app: The FastAPI application
+            app: The ASGI application
             minimum_size: Minimum response size to compress (bytes)
             compress_types: Set of content types to compress
+            levels: Compression level per content type and encoding, merged
+                over ``DEFAULT_LEVELS``
+            offload_threshold: Chunks at least this large (bytes) are
+                compressed in a worker thread
 
         """
-        super().__init__(app)
+        self.app = app
         self.minimum_size = minimum_size
-        self.compress_types = compress_types or {
-            "text/plain",
-            "text/html",
-            "text/css",
-            "text/javascript",
-            "application/json",
-            "application/xml",
-            "application/javascript",
-            "text/xml",
-            "application/octet-stream",
-        }
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Process request and compress response if applicable."""
-        response = await call_next(request)
-
-        # Skip compression for non-GET requests or responses that are already compressed
+        self.compress_types = compress_types or DEFAULT_COMPRESS_TYPES
+        self.levels = {key: dict(value) for key, value in DEFAULT_LEVELS.items()}
+        for content_type, encoding_levels in (levels or {}).items():
+            self.levels.setdefault(content_type, {}).update(encoding_levels)
+        self.offload_threshold = offload_threshold
+        self.encoders = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, list(self.encoders))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def level_for(self, content_type: str, encoding: str) -> int:
+        levels = self.levels.get(content_type, {})
+        return levels.get(encoding, self.levels["*"][encoding])
+
+
+class _CompressionResponder:
+    """Wraps ``send`` for a single response."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Message | None = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Hold the headers until the first body chunk shows the size;
+            # copied because responses hand over their own header list
+            self.start_message = {**message, "headers": list(message.get("headers", []))}
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        if self.encoder is None:
+            await self._begin(message)
+            return
+
+        await self._send_compressed(message)
+
+    async def _begin(self, message: Message) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+
+        if content_type not in self.middleware.compress_types:
+            await self._pass_through(message)
+            return
+        # Caches must keep identity and compressed variants apart
+        headers.add_vary_header("Accept-Encoding")
+
         if (
-            request.method != "GET"
-            or response.headers.get("content-encoding")
-            or response.headers.get("transfer-encoding") == "chunked"
-            or not hasattr(response, "body")
+            headers.get("content-encoding")
+            or "no-transform" in headers.get("cache-control", "")
+            or self.start_message["status"] in (204, 206, 304)
+            or (not more_body and len(body) < self.middleware.minimum_size)
         ):
-            return response
-
-        # Get response body
-        if isinstance(response, StreamingResponse):
-            # For streaming responses, we can't easily compress
-            return response
-
-        body = b""
-        if hasattr(response, "body"):
-            body = response.body
-
-        # Skip compression for small responses
-        if len(body) < self.minimum_size:
-            return response
-
-        # Check content type
-        content_type = response.headers.get("content-type", "").split(";")[0].strip()
-        if content_type not in self.compress_types:
-            return response
-
-        # Compress the response
-        try:
-            compressed_body = gzip.compress(body)
-
-            # Update response
-            response.body = compressed_body
-            response.headers["Content-Encoding"] = "gzip"
-            response.headers["Content-Length"] = str(len(compressed_body))
-
-            # Add Vary header to indicate compression
-            existing_vary = response.headers.get("Vary", "")
-            if existing_vary:
-                if "Accept-Encoding" not in existing_vary:
-                    response.headers["Vary"] = f"{existing_vary}, Accept-Encoding"
-            else:
-                response.headers["Vary"] = "Accept-Encoding"
+            await self._pass_through(message)
+            return
+
+        level = self.middleware.level_for(content_type, self.encoding)
+        self.encoder = self.middleware.encoders[self.encoding](level)
 
+        headers["Content-Encoding"] = self.encoding
+        if "content-length" in headers:
+            del headers["content-length"]
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed bytes are a different representation
+            headers["ETag"] = f"W/{etag}"
+
+        if not more_body:
+            compressed = await self._compress(body, finish=True)
+            headers["Content-Length"] = str(len(compressed))
             logger.debug(
-                f"Compressed response: {len(body)} -> {len(compressed_body)} bytes "
-                f"({content_type})",
+                f"Compressed response: {len(body)} -> {len(compressed)} bytes "
+                f"({content_type}, {self.encoding})",
+            )
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        await self._send(self.start_message)
+        await self._send_compressed(message)
+
+    async def _pass_through(self, message: Message) -> None:
+        self.passthrough = True
+        await self._send(self.start_message)
+        await self._send(message)
+
+    async def _send_compressed(self, message: Message) -> None:
+        more_body = message.get("more_body", False)
+        compressed = await self._compress(message.get("body", b""), finish=not more_body)
+        if compressed or not more_body:
+            await self._send(
+                {"type": "http.response.body", "body": compressed, "more_body": more_body}
             )
 
-        except Exception as e:
-            logger.warning(f"Failed to compress response: {e!s}")
-            # Return original response if compression fails
-            return response
+    async def _compress(self, data: bytes, finish: bool) -> bytes:
+        if len(data) >= self.middleware.offload_threshold:
+            return await asyncio.to_thread(self._encode, data, finish)
+        return self._encode(data, finish)
 
-        return response
+    def _encode(self, data: bytes, finish: bool) -> bytes:
+        output = self.encoder.compress(data) if data else b""
+        if finish:
+            output += self.encoder.finish()
+        return output
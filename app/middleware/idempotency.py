@@ -1,45 +1,379 @@
+"""Idempotency-Key support for POST, PUT and PATCH requests.
+
+A request carrying an ``Idempotency-Key`` header is recorded together with
+a hash of its method, path and body. Repeating the key with the same
+payload replays the stored response; repeating it with a different payload
+is rejected with 409 Conflict, and so is a repeat arriving while the first
+request is still being processed (with ``Retry-After``). A request that
+fails without a response gives its key up so the client can retry.
+
+Records live in three tiers. A bounded in-process LRU answers repeats
+handled by the same worker, Redis answers them for every worker, and
+``app.idempotency_keys`` keeps the durable copy. Writes go through all
+tiers, the database ones through the application's shared engine instead
+of a new connection per request. Reads stop at the first tier holding the
+key; a Redis miss is trusted because Redis receives every record with the
+same TTL as the table, so the table is only read while Redis is
+unavailable.
+
+The middleware is pure ASGI: the response is streamed to the client as the
+handler produces it and captured on the side for storage.
+"""
+
 import hashlib
 import json
 import logging
-import os
+import time
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
-import asyncpg
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from redis.asyncio import Redis
+from sqlalchemy import text
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.cache import get_redis
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+IDEMPOTENT_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+# Responses larger than this are passed through but not stored
+DEFAULT_MAX_CAPTURE_BYTES = 1024 * 1024
+
+# Seconds the store stays off Redis after a failed call
+REDIS_RETRY_AFTER = 30.0
+
+# Seconds a client is asked to wait before repeating a request still in flight
+IN_FLIGHT_RETRY_AFTER = 1
+
+
+class IdempotencyStore:
+    """Tiered storage of idempotency records: LRU, Redis, database."""
+
+    def __init__(
+        self,
+        ttl_hours: int = 24,
+        redis: Redis | None = None,
+        use_redis: bool | None = None,
+        use_database: bool | None = None,
+        max_memory_entries: int = 10000,
+        key_prefix: str = "idempotency",
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            ttl_hours: How long records are kept
+            redis: Redis client (default: the shared application client)
+            use_redis: Whether to use Redis (default: REDIS_ENABLED, off in tests)
+            use_database: Whether to use the database (default: off in tests)
+            max_memory_entries: Records kept in the in-process LRU
+            key_prefix: Prefix of the Redis keys
+        """
+        self.ttl = timedelta(hours=ttl_hours)
+        self._redis = redis
+        if use_redis is None:
+            use_redis = redis is not None or (settings.REDIS_ENABLED and not settings.TESTING)
+        self.use_redis = use_redis
+        self.use_database = not settings.TESTING if use_database is None else use_database
+        self.max_memory_entries = max_memory_entries
+        self.key_prefix = key_prefix
+        self._memory: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._redis_down_until = 0.0
+        self._engine = None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    # ==================== MEMORY TIER ====================
+
+    def _remember(self, record: dict[str, Any]) -> None:
+        self._memory[record["key"]] = record
+        self._memory.move_to_end(record["key"])
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _recall(self, key: str) -> dict[str, Any] | None:
+        record = self._memory.get(key)
+        if record is None:
+            return None
+        if record["ttl_at"] <= datetime.now(UTC):
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return record
+
+    # ==================== REDIS TIER ====================
+
+    async def _get_redis(self) -> Redis | None:
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            try:
+                self._redis = await get_redis()
+            except Exception as e:
+                self._redis_failed(e)
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning(
+            f"Idempotency store skipping Redis for {REDIS_RETRY_AFTER:.0f}s: {error}"
+        )
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    @staticmethod
+    def _dump(record: dict[str, Any]) -> str:
+        return json.dumps({**record, "ttl_at": record["ttl_at"].isoformat()})
+
+    @staticmethod
+    def _load(raw: bytes | str) -> dict[str, Any]:
+        record = json.loads(raw)
+        record["ttl_at"] = datetime.fromisoformat(record["ttl_at"])
+        return record
+
+    # ==================== DATABASE TIER ====================
+
+    def _get_engine(self):
+        if self._engine is None:
+            from app.db.session import async_engine
+
+            self._engine = async_engine
+        return self._engine
+
+    async def _fetch_from_database(self, key: str) -> dict[str, Any] | None:
+        try:
+            async with self._get_engine().connect() as conn:
+                result = await conn.execute(
+                    text(
+                        """
+                        SELECT key, method, path, req_hash, status_code, response_body, ttl_at
+                        FROM app.idempotency_keys
+                        WHERE key = :key AND ttl_at > now()
+                        """
+                    ),
+                    {"key": key},
+                )
+                row = result.mappings().first()
+        except Exception as e:
+            logger.error(f"Error fetching idempotency record: {e}")
+            return None
+        if row is None:
+            return None
+        return {**dict(row), "content_type": None}
+
+    async def _write_to_database(self, record: dict[str, Any], completed: bool) -> bool:
+        """Store a claim or its response; returns False when the claim was taken."""
+        if completed:
+            statement = text(
+                """
+                UPDATE app.idempotency_keys
+                SET status_code = :status_code, response_body = :response_body
+                WHERE key = :key
+                """
+            )
+            params = {
+                "key": record["key"],
+                "status_code": record["status_code"],
+                "response_body": record["response_body"],
+            }
+        else:
+            statement = text(
+                """
+                INSERT INTO app.idempotency_keys (key, method, path, req_hash, ttl_at)
+                VALUES (:key, :method, :path, :req_hash, :ttl_at)
+                ON CONFLICT (key) DO NOTHING
+                RETURNING key
+                """
+            )
+            params = {
+                "key": record["key"],
+                "method": record["method"],
+                "path": record["path"],
+                "req_hash": record["req_hash"],
+                "ttl_at": record["ttl_at"],
+            }
+        try:
+            async with self._get_engine().begin() as conn:
+                result = await conn.execute(statement, params)
+                return completed or result.first() is not None
+        except Exception as e:
+            logger.error(f"Error storing idempotency record: {e}")
+            return True
+
+    async def _delete_claim_from_database(self, key: str) -> None:
+        try:
+            async with self._get_engine().begin() as conn:
+                await conn.execute(
+                    text(
+                        """
+                        DELETE FROM app.idempotency_keys
+                        WHERE key = :key AND status_code IS NULL
+                        """
+                    ),
+                    {"key": key},
+                )
+        except Exception as e:
+            logger.error(f"Error releasing idempotency record: {e}")
+
+    # ==================== PUBLIC API ====================
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return the live record of a key, looking through every tier."""
+        record = self._recall(key)
+        if record is not None:
+            return record
+
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(self._redis_key(key))
+                if raw is None:
+                    return None
+                record = self._load(raw)
+                self._remember_completed(record)
+                return record
+            except Exception as e:
+                self._redis_failed(e)
+
+        if not self.use_database:
+            return None
+        record = await self._fetch_from_database(key)
+        if record is not None:
+            self._remember_completed(record)
+        return record
+
+    def _remember_completed(self, record: dict[str, Any]) -> None:
+        # A claim of another worker is not kept: its response may land any time
+        if record["status_code"] is not None:
+            self._remember(record)
+
+    async def claim(
+        self, key: str, method: str, path: str, req_hash: str
+    ) -> dict[str, Any] | None:
+        """Record a request about to be processed.
 
-class IdempotencyMiddleware(BaseHTTPMiddleware):
+        Returns ``None`` when the key was claimed, or the record of another
+        request that claimed it first. Redis decides between workers; while
+        it is unavailable the table's primary key does.
+        """
+        local = self._recall(key)
+        if local is not None:
+            return local
+
+        record = {
+            "key": key,
+            "method": method,
+            "path": path,
+            "req_hash": req_hash,
+            "status_code": None,
+            "response_body": None,
+            "content_type": None,
+            "ttl_at": datetime.now(UTC) + self.ttl,
+        }
+
+        decided = False
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                claimed = await redis.set(
+                    self._redis_key(key), self._dump(record), ex=self.ttl, nx=True
+                )
+                if not claimed:
+                    existing = await redis.get(self._redis_key(key))
+                    if existing is not None:
+                        return self._load(existing)
+                decided = True
+            except Exception as e:
+                self._redis_failed(e)
+
+        if self.use_database:
+            inserted = await self._write_to_database(record, completed=False)
+            if not inserted and not decided:
+                existing = await self._fetch_from_database(key)
+                if existing is not None:
+                    return existing
+        self._remember(record)
+        return None
+
+    async def complete(
+        self,
+        key: str,
+        status_code: int,
+        response_body: str,
+        content_type: str | None,
+    ) -> None:
+        """Attach the response to a claimed record."""
+        record = self._recall(key)
+        if record is None:
+            return
+        record = {
+            **record,
+            "status_code": status_code,
+            "response_body": response_body,
+            "content_type": content_type,
+        }
+        self._remember(record)
+
+        redis = await self._get_redis()
+        if redis is not None:
+            remaining = record["ttl_at"] - datetime.now(UTC)
+            try:
+                if remaining.total_seconds() > 0:
+                    await redis.set(self._redis_key(key), self._dump(record), ex=remaining)
+            except Exception as e:
+                self._redis_failed(e)
+
+        if self.use_database:
+            await self._write_to_database(record, completed=True)
+
+    async def release(self, key: str) -> None:
+        """Give up a claim whose request ended without a response."""
+        self._memory.pop(key, None)
+
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                await redis.delete(self._redis_key(key))
+            except Exception as e:
+                self._redis_failed(e)
+
+        if self.use_database:
+            await self._delete_claim_from_database(key)
+
+
+class IdempotencyMiddleware:
     """Middleware to handle idempotency keys for API requests.
 
     Supports the Idempotency-Key header to prevent duplicate requests.
     Returns 409 Conflict if the same key is used with different request payload.
     """
 
-    def __init__(self, app, ttl_hours: int = 24, redis_client=None):
-        super().__init__(app)
+    def __init__(
+        self,
+        app: ASGIApp,
+        ttl_hours: int = 24,
+        redis_client: Redis | None = None,
+        max_capture_bytes: int = DEFAULT_MAX_CAPTURE_BYTES,
+        store: IdempotencyStore | None = None,
+    ):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            ttl_hours: How long idempotency records are kept
+            redis_client: Redis client (default: the shared application client)
+            max_capture_bytes: Largest response body stored for replay
+            store: Record storage (default: an ``IdempotencyStore``)
+        """
+        self.app = app
         self.ttl_hours = ttl_hours
-        self.redis_client = redis_client
-        # In tests, use an in-memory store to avoid DB requirements
-        self._memory_store: dict[str, dict[str, Any]] = {}
-
-    async def _get_db_connection(self):
-        """Get async database connection."""
-        return await asyncpg.connect(
-            host=os.getenv("DB_HOST", "pgbouncer"),
-            port=int(os.getenv("DB_PORT", "6432")),
-            user=os.getenv("DB_USER", "app"),
-            password=os.getenv("DB_PASS", "app_password_change_me"),
-            database=os.getenv("DB_NAME", "magflow"),
-            timeout=10,
-            command_timeout=10,
-        )
+        self.max_capture_bytes = max_capture_bytes
+        self.store = store or IdempotencyStore(ttl_hours=ttl_hours, redis=redis_client)
 
     def _compute_request_hash(self, method: str, path: str, body: bytes) -> str:
         """Compute SHA-256 hash of request method, path, and body."""
@@ -73,226 +407,162 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
 
         return True, ""
 
-    def _should_process_request(self, request: Request) -> bool:
-        """Check if request should be processed for idempotency."""
-        # Only process POST, PUT, PATCH requests
-        if request.method not in ["POST", "PUT", "PATCH"]:
-            return False
-
-        # Only process if Idempotency-Key header is present
-        return "idempotency-key" in request.headers
-
-    async def _get_existing_record(
-        self,
-        idempotency_key: str,
-    ) -> dict[str, Any] | None:
-        """Check if idempotency key exists in database."""
-        # In testing environment, check memory store first
-        if settings.TESTING and idempotency_key in self._memory_store:
-            record = self._memory_store[idempotency_key]
-            # TTL check
-            if record.get("ttl_at") and record["ttl_at"] > datetime.now(UTC):
-                return record
-            return None
-        conn = None
-        try:
-            conn = await self._get_db_connection()
-            row = await conn.fetchrow(
-                """
-                SELECT key, method, path, req_hash, status_code, response_body, created_at, ttl_at
-                FROM app.idempotency_keys
-                WHERE key = $1 AND ttl_at > now()
-                """,
-                idempotency_key,
-            )
-            return dict(row) if row else None
-        except Exception as e:
-            logger.error(f"Error fetching idempotency record: {e}")
-            return None
-        finally:
-            if conn:
-                await conn.close()
-
-    async def _store_idempotency_record(
-        self,
-        idempotency_key: str,
-        method: str,
-        path: str,
-        req_hash: str,
-        status_code: int | None = None,
-        response_body: str | None = None,
-    ) -> bool:
-        """Store or update idempotency record in database."""
-        # In testing environment, write to memory store and return
-        if settings.TESTING:
-            record = self._memory_store.get(
-                idempotency_key,
-                {
-                    "key": idempotency_key,
-                    "method": method,
-                    "path": path,
-                    "req_hash": req_hash,
-                    "created_at": datetime.now(UTC),
-                    "ttl_at": datetime.now(UTC) + timedelta(hours=self.ttl_hours),
-                    "status_code": None,
-                    "response_body": None,
-                },
-            )
-            # Update with response data if provided
-            if status_code is not None:
-                record["status_code"] = status_code
-                record["response_body"] = response_body
-            self._memory_store[idempotency_key] = record
-            return True
-        try:
-            conn = await self._get_db_connection()
-            if status_code is None:
-                # Initial insert without response data
-                await conn.execute(
-                    """
-                    INSERT INTO app.idempotency_keys
-                    (key, method, path, req_hash, ttl_at)
-                    VALUES ($1, $2, $3, $4, $5)
-                    ON CONFLICT (key) DO NOTHING
-                    """,
-                    idempotency_key,
-                    method,
-                    path,
-                    req_hash,
-                    datetime.now(UTC) + timedelta(hours=self.ttl_hours),
-                )
-            else:
-                # Update with response data
-                await conn.execute(
-                    """
-                    UPDATE app.idempotency_keys
-                    SET status_code = $1, response_body = $2
-                    WHERE key = $3
-                    """,
-                    status_code,
-                    response_body,
-                    idempotency_key,
-                )
-            return True
-        except Exception as e:
-            logger.error(f"Error storing idempotency record: {e}")
-            return False
-
-    async def dispatch(self, request: Request, call_next):
-        """Main middleware logic."""
-        if not self._should_process_request(request):
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
 
-        idempotency_key = request.headers.get("idempotency-key")
+        idempotency_key = Headers(scope=scope).get("idempotency-key")
         if not idempotency_key:
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         # Validate idempotency key format
         is_valid, error_msg = self._validate_key(idempotency_key)
         if not is_valid:
             logger.warning(f"Invalid idempotency key format: {error_msg}")
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=400,
                 content={"error": "invalid_idempotency_key", "message": error_msg},
             )
+            await response(scope, receive, send)
+            return
 
-        # Read request body
-        body = await request.body()
-        req_hash = self._compute_request_hash(
-            request.method,
-            str(request.url.path),
-            body,
-        )
-
-        # Create new receive method with cached body
-
-        async def receive():
-            return {"type": "http.request", "body": body, "more_body": False}
+        # The body is hashed before the handler runs, then handed to it again
+        body, receive = await self._buffer_body(receive)
+        method, path = scope["method"], scope["path"]
+        req_hash = self._compute_request_hash(method, path, body)
 
-        request._receive = receive
+        existing = await self.store.get(idempotency_key)
+        if existing is None:
+            existing = await self.store.claim(idempotency_key, method, path, req_hash)
 
-        # Check for existing record
-        try:
-            existing = await self._get_existing_record(idempotency_key)
-        except Exception as e:
-            if "relation " in str(e) and " does not exist" in str(e):
-                logger.warning(
-                    "Idempotency keys table does not exist. Continuing without idempotency check.",
-                )
-                return await call_next(request)
-            raise
-
-        if existing:
-            # Check if request hash matches
+        if existing is not None:
             if existing["req_hash"] != req_hash:
                 logger.warning(f"Idempotency key conflict: {idempotency_key}")
-                return JSONResponse(
+                response = JSONResponse(
                     status_code=409,
                     content={
                         "error": "Conflict",
                         "message": "Idempotency key already used with different request payload",
                     },
                 )
+                await response(scope, receive, send)
+                return
 
-            # If we have a completed response, return it
-            if existing["status_code"] is not None:
-                logger.info(
-                    f"Returning cached response for idempotency key: {idempotency_key}",
+            if existing["status_code"] is None:
+                logger.info(f"Idempotency key still in flight: {idempotency_key}")
+                response = JSONResponse(
+                    status_code=409,
+                    content={
+                        "error": "Conflict",
+                        "message": "A request with this idempotency key is still being processed",
+                    },
+                    headers={"Retry-After": str(IN_FLIGHT_RETRY_AFTER)},
                 )
-                try:
-                    response_data = (
-                        json.loads(existing["response_body"])
-                        if existing["response_body"]
-                        else {}
-                    )
-                    return JSONResponse(
-                        status_code=existing["status_code"],
-                        content=response_data,
-                    )
-                except json.JSONDecodeError:
-                    # If response body is not JSON, return as text
-                    return Response(
-                        content=existing["response_body"] or "",
-                        status_code=existing["status_code"],
-                        media_type="text/plain",
-                    )
-
-        # Store initial record (without response data)
+                await response(scope, receive, send)
+                return
+
+            logger.info(f"Returning cached response for idempotency key: {idempotency_key}")
+            await self._replay(existing)(scope, receive, send)
+            return
+
+        await self._process(scope, receive, send, idempotency_key)
+
+    async def _buffer_body(self, receive: Receive) -> tuple[bytes, Receive]:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before sending the whole body
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        replayed = False
+
+        async def replay_receive() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return body, replay_receive
+
+    def _replay(self, record: dict[str, Any]) -> Response:
+        headers = {"Idempotent-Replayed": "true"}
+        body = record["response_body"] or ""
+        if record.get("content_type"):
+            return Response(
+                content=body,
+                status_code=record["status_code"],
+                media_type=record["content_type"],
+                headers=headers,
+            )
+        # Records read back from the table carry no content type
         try:
-            await self._store_idempotency_record(
-                idempotency_key,
-                request.method,
-                str(request.url.path),
-                req_hash,
+            return JSONResponse(
+                status_code=record["status_code"],
+                content=json.loads(body) if body else {},
+                headers=headers,
+            )
+        except json.JSONDecodeError:
+            return Response(
+                content=body,
+                status_code=record["status_code"],
+                media_type="text/plain",
+                headers=headers,
             )
-        except Exception as e:
-            if "relation " in str(e) and " does not exist" in str(e):
-                logger.warning(
-                    (
-                        "Idempotency keys table does not exist. Continuing without "
-                        "idempotency tracking."
-                    ),
-                )
-                return await call_next(request)
-            raise
 
-        # Process the request
-        response = await call_next(request)
+    async def _process(self, scope: Scope, receive: Receive, send: Send, key: str) -> None:
+        status_code: int | None = None
+        content_type: str | None = None
+        captured: list[bytes] | None = []
+        captured_size = 0
+        finished = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, content_type, captured, captured_size, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type")
+                # Compressed or otherwise encoded bodies are not replayable as text
+                if headers.get("content-encoding"):
+                    captured = None
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                if captured is not None:
+                    captured_size += len(chunk)
+                    if captured_size > self.max_capture_bytes:
+                        captured = None
+                    else:
+                        captured.append(chunk)
+                if not message.get("more_body", False):
+                    finished = True
+            await send(message)
 
-        # Store response data
-        if hasattr(response, "body"):
-            response_body = response.body.decode("utf-8", errors="ignore")
-        else:
-            response_body = ""
-
-        await self._store_idempotency_record(
-            idempotency_key,
-            request.method,
-            str(request.url.path),
-            req_hash,
-            response.status_code,
-            response_body,
-        )
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            await self.store.release(key)
+            raise
 
-        logger.info(f"Processed request with idempotency key: {idempotency_key}")
-        return response
+        if not finished or status_code is None:
+            await self.store.release(key)
+            return
+        if captured is None:
+            logger.info(f"Response for idempotency key {key} not stored: too large or encoded")
+            return
+
+        # The client already has the response; storing it does not delay it
+        await self.store.complete(
+            key,
+            status_code,
+            b"".join(captured).decode("utf-8", errors="ignore"),
+            content_type,
+        )
+        logger.info(f"Processed request with idempotency key: {key}")
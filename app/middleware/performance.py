@@ -2,35 +2,221 @@
 Performance Monitoring Middleware
 
 Tracks request performance and identifies slow endpoints.
+
+Requests are aggregated in process: recording one costs a few dictionary
+and integer updates, with no I/O on the request path. Every endpoint,
+identified by its route template (``GET:/api/v1/products/{product_id}``)
+rather than the raw path, gets a request count, total and slow-request
+counters and a fixed-bucket latency histogram from which p50/p95/p99 are
+estimated. A background task flushes the accumulated deltas to Redis in a
+single pipeline every ``flush_interval`` seconds, so histograms from all
+workers add up to cluster-wide percentiles.
 """
 
+import asyncio
 import contextlib
 import time
-from collections.abc import Callable
+from bisect import bisect_left
+from collections.abc import Sequence
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.cache import get_redis
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Upper bounds (seconds) of the latency histogram buckets; a final bucket
+# counts everything slower than the last bound
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+# Redis hash field of each bucket
+BUCKET_FIELDS: tuple[str, ...] = (*(str(bound) for bound in LATENCY_BUCKETS), "+Inf")
+
+# Keep metrics for 24 hours
+METRICS_TTL = 86400
+
+# Requests that matched no route share one endpoint instead of one per path
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def estimate_percentile(
+    counts: Sequence[int], quantile: float, bounds: Sequence[float] = LATENCY_BUCKETS
+) -> float:
+    """Estimate a latency percentile (seconds) from histogram bucket counts.
+
+    Interpolates linearly inside the bucket holding the requested rank.
+    Requests slower than the last bound are reported at that bound.
+    """
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+
+    rank = quantile * total
+    cumulative = 0
+    lower = 0.0
+    for index, count in enumerate(counts):
+        upper = bounds[index] if index < len(bounds) else bounds[-1]
+        if count and cumulative + count >= rank:
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = upper
+    return bounds[-1]
+
+
+def latency_percentiles(histogram: dict) -> dict[str, float]:
+    """p50/p95/p99 in seconds from a histogram hash read from Redis."""
+    counts = []
+    for field in BUCKET_FIELDS:
+        value = histogram.get(field, histogram.get(field.encode(), 0))
+        counts.append(int(value or 0))
+    return {
+        f"p{int(quantile * 100)}": round(estimate_percentile(counts, quantile), 4)
+        for quantile in (0.5, 0.95, 0.99)
+    }
+
+
+class _EndpointStats:
+    __slots__ = ("count", "total", "slow", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slow = 0
+        self.buckets = [0] * len(BUCKET_FIELDS)
+
+
+class RequestMetrics:
+    """Request metrics accumulated in process between flushes.
+
+    Only the event loop thread records and drains, and neither yields in
+    between, so the counters need no lock.
+    """
+
+    def __init__(self, slow_request_threshold: float = 1.0):
+        self.slow_request_threshold = slow_request_threshold
+        self._endpoints: dict[str, _EndpointStats] = {}
+        self._status_codes: dict[int, int] = {}
+
+    def record(self, endpoint: str, duration: float, status_code: int) -> None:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = _EndpointStats()
+        stats.count += 1
+        stats.total += duration
+        stats.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        if duration > self.slow_request_threshold:
+            stats.slow += 1
+        self._status_codes[status_code] = self._status_codes.get(status_code, 0) + 1
+
+    def drain(self) -> tuple[dict[str, _EndpointStats], dict[int, int]]:
+        """Take the metrics recorded since the last drain."""
+        endpoints, status_codes = self._endpoints, self._status_codes
+        self._endpoints, self._status_codes = {}, {}
+        return endpoints, status_codes
+
+    def restore(self, endpoints: dict[str, _EndpointStats], status_codes: dict[int, int]) -> None:
+        """Put drained metrics back after a failed flush."""
+        for endpoint, drained in endpoints.items():
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                self._endpoints[endpoint] = drained
+                continue
+            stats.count += drained.count
+            stats.total += drained.total
+            stats.slow += drained.slow
+            stats.buckets = [a + b for a, b in zip(stats.buckets, drained.buckets, strict=True)]
+        for code, count in status_codes.items():
+            self._status_codes[code] = self._status_codes.get(code, 0) + count
+
+    def snapshot(self) -> dict[str, dict]:
+        """Statistics of the metrics not flushed yet, per endpoint."""
+        return {
+            endpoint: {
+                "request_count": stats.count,
+                "avg_duration": round(stats.total / stats.count, 3),
+                "slow_requests": stats.slow,
+                **{
+                    f"p{int(q * 100)}": round(estimate_percentile(stats.buckets, q), 4)
+                    for q in (0.5, 0.95, 0.99)
+                },
+            }
+            for endpoint, stats in self._endpoints.items()
+        }
+
+    async def flush(self, redis) -> int:
+        """Write the pending metrics to Redis in one pipelined batch.
 
-class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
+        Returns the number of requests flushed. On failure the metrics are
+        kept for the next flush and the error is raised.
+        """
+        endpoints, status_codes = self.drain()
+        if not endpoints and not status_codes:
+            return 0
+
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for endpoint, stats in endpoints.items():
+                    pipe.incrby(f"metrics:requests:{endpoint}", stats.count)
+                    pipe.incrbyfloat(f"metrics:duration:{endpoint}", stats.total)
+                    if stats.slow:
+                        pipe.incrby(f"metrics:slow:{endpoint}", stats.slow)
+                        pipe.expire(f"metrics:slow:{endpoint}", METRICS_TTL)
+                    for field, count in zip(BUCKET_FIELDS, stats.buckets, strict=True):
+                        if count:
+                            pipe.hincrby(f"metrics:latency:{endpoint}", field, count)
+                    pipe.expire(f"metrics:requests:{endpoint}", METRICS_TTL)
+                    pipe.expire(f"metrics:duration:{endpoint}", METRICS_TTL)
+                    pipe.expire(f"metrics:latency:{endpoint}", METRICS_TTL)
+                for code, count in status_codes.items():
+                    pipe.incrby(f"metrics:status:{code}", count)
+                await pipe.execute()
+        except Exception:
+            self.restore(endpoints, status_codes)
+            raise
+
+        return sum(stats.count for stats in endpoints.values())
+
+
+class PerformanceMonitoringMiddleware:
     """Middleware to monitor request performance."""
 
-    def __init__(self, app, slow_request_threshold: float = 1.0):
+    def __init__(
+        self,
+        app: ASGIApp,
+        slow_request_threshold: float = 1.0,
+        flush_interval: float = 10.0,
+    ):
         """
         Initialize performance monitoring middleware.
 
         Args:
             app: FastAPI application
             slow_request_threshold: Threshold in seconds for slow requests
+            flush_interval: Seconds between flushes of the metrics to Redis
         """
-        super().__init__(app)
+        self.app = app
         self.slow_request_threshold = slow_request_threshold
+        self.flush_interval = flush_interval
+        self.metrics = RequestMetrics(slow_request_threshold)
         self._redis = None
+        self._flush_task: asyncio.Task | None = None
 
     async def _get_redis(self):
         """Get Redis client lazily."""
@@ -39,86 +225,79 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
                 self._redis = await get_redis()
         return self._redis
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """
-        Process request and track performance.
-
-        Args:
-            request: Incoming request
-            call_next: Next middleware/handler
-
-        Returns:
-            Response
-        """
-        start_time = time.time()
-
-        # Process request
-        response = await call_next(request)
-
-        # Calculate duration
-        duration = time.time() - start_time
-
-        # Add performance header
-        response.headers["X-Process-Time"] = str(duration)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Copied because responses hand over their own header list
+                message = {**message, "headers": list(message.get("headers", []))}
+                headers = MutableHeaders(raw=message["headers"])
+                headers["X-Process-Time"] = str(time.perf_counter() - start_time)
+            await send(message)
 
-        # Log slow requests
-        if duration > self.slow_request_threshold:
-            logger.warning(
-                f"Slow request detected: {request.method} {request.url.path} "
-                f"took {duration:.2f}s"
-            )
-
-        # Track metrics in Redis
-        await self._track_metrics(
-            method=request.method,
-            path=request.url.path,
-            duration=duration,
-            status_code=response.status_code,
-        )
-
-        return response
-
-    async def _track_metrics(
-        self, method: str, path: str, duration: float, status_code: int
-    ):
-        """
-        Track request metrics in Redis.
-
-        Args:
-            method: HTTP method
-            path: Request path
-            duration: Request duration
-            status_code: Response status code
-        """
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            endpoint = f"{scope['method']}:{route}"
+            self.metrics.record(endpoint, duration, status_code)
+
+            # Log slow requests
+            if duration > self.slow_request_threshold:
+                logger.warning(
+                    f"Slow request detected: {scope['method']} {scope['path']} took {duration:.2f}s"
+                )
+
+    def _lifespan_receive(self, receive: Receive) -> Receive:
+        async def wrapped() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.shutdown":
+                # Don't lose the last interval's metrics
+                await self.close()
+            return message
+
+        return wrapped
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stop the flush task and flush the remaining metrics."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Flush the pending metrics to Redis; returns the number of requests."""
         try:
             redis = await self._get_redis()
             if not redis:
-                return
-
-            # Create metric key
-            endpoint_key = f"{method}:{path}"
-
-            # Track request count
-            await redis.incr(f"metrics:requests:{endpoint_key}")
-
-            # Track total duration (for average calculation)
-            await redis.incrbyfloat(f"metrics:duration:{endpoint_key}", duration)
-
-            # Track status codes
-            await redis.incr(f"metrics:status:{status_code}")
-
-            # Track slow requests
-            if duration > self.slow_request_threshold:
-                await redis.incr(f"metrics:slow:{endpoint_key}")
-
-            # Set expiry (keep metrics for 24 hours)
-            await redis.expire(f"metrics:requests:{endpoint_key}", 86400)
-            await redis.expire(f"metrics:duration:{endpoint_key}", 86400)
-            await redis.expire(f"metrics:slow:{endpoint_key}", 86400)
-
+                return 0
+            return await self.metrics.flush(redis)
         except Exception as e:
-            # Don't fail the request if metrics tracking fails
-            logger.debug(f"Failed to track metrics: {e}")
+            # Metrics are kept (one entry per endpoint) and retried on the next flush
+            logger.debug(f"Failed to flush metrics: {e}")
+            return 0
 
     async def get_endpoint_stats(self, method: str, path: str) -> dict:
         """
@@ -126,7 +305,7 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
 
         Args:
             method: HTTP method
-            path: Request path
+            path: Route template (e.g. ``/api/v1/products/{product_id}``)
 
         Returns:
             Dictionary with endpoint statistics
@@ -139,9 +318,12 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
             endpoint_key = f"{method}:{path}"
 
             # Get metrics
-            request_count = await redis.get(f"metrics:requests:{endpoint_key}")
-            total_duration = await redis.get(f"metrics:duration:{endpoint_key}")
-            slow_count = await redis.get(f"metrics:slow:{endpoint_key}")
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.get(f"metrics:requests:{endpoint_key}")
+                pipe.get(f"metrics:duration:{endpoint_key}")
+                pipe.get(f"metrics:slow:{endpoint_key}")
+                pipe.hgetall(f"metrics:latency:{endpoint_key}")
+                request_count, total_duration, slow_count, histogram = await pipe.execute()
 
             request_count = int(request_count) if request_count else 0
             total_duration = float(total_duration) if total_duration else 0.0
@@ -153,11 +335,10 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
                 "endpoint": endpoint_key,
                 "request_count": request_count,
                 "avg_duration": round(avg_duration, 3),
+                **latency_percentiles(histogram),
                 "slow_requests": slow_count,
                 "slow_percentage": (
-                    round((slow_count / request_count) * 100, 2)
-                    if request_count > 0
-                    else 0.0
+                    round((slow_count / request_count) * 100, 2) if request_count > 0 else 0.0
                 ),
             }
 
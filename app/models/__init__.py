@@ -14,9 +14,15 @@ from app.models.cancellation import (
 )
 from app.models.category import Category
 
+# Build markers of derived tables (token index, sales rollup)
+from app.models.derived_table_build import DerivedTableBuild
+
 # eMAG product models
 from app.models.emag_models import EmagProductV2
 from app.models.emag_offers import EmagOfferSync, EmagProductOffer
+
+# Daily eMAG sales per product reference (sales statistics)
+from app.models.emag_sales_daily import EmagSalesDaily
 from app.models.inventory import InventoryItem, StockMovement, Warehouse
 from app.models.invoice import Invoice, InvoiceItem
 
@@ -36,6 +42,9 @@ from app.models.product import Product
 # Product mapping models (Google Sheets integration)
 from app.models.product_mapping import GoogleSheetsProductMapping, ImportLog
 
+# Jieba token index (supplier matching search)
+from app.models.product_name_token import ProductNameToken
+
 # Product relationship models
 from app.models.product_relationships import (
     ProductCompetitionLog,
@@ -43,6 +52,9 @@ from app.models.product_relationships import (
     ProductPNKTracking,
     ProductVariant,
 )
+
+# Daily sales rollup (low stock / sales statistics)
+from app.models.product_sales_daily import ProductSalesDaily
 from app.models.product_supplier_sheet import ProductSupplierSheet
 
 # Purchase models (purchase order management)
@@ -138,6 +150,10 @@ MODEL_CLASSES: list[type[Any]] = [
     GoogleSheetsProductMapping,
     ImportLog,
     ProductSupplierSheet,
+    ProductNameToken,
+    ProductSalesDaily,
+    EmagSalesDaily,
+    DerivedTableBuild,
     # eMAG product models
     EmagProductV2,
     # Product relationship models
@@ -216,6 +232,10 @@ __all__ = [
     "GoogleSheetsProductMapping",
     "ImportLog",
     "ProductSupplierSheet",
+    "ProductNameToken",
+    "ProductSalesDaily",
+    "EmagSalesDaily",
+    "DerivedTableBuild",
     # eMAG product models
     "EmagProductV2",
     # Product relationship models
@@ -0,0 +1,38 @@
+"""Derived Table Build Model
+
+Records that a table derived from other tables (the jieba token index, the
+daily sales rollup) has been built from the full history. Incremental
+maintenance starts writing such tables before the first full build runs, so
+"the table has rows" cannot tell whether the history was ever loaded.
+"""
+
+from sqlalchemy import Column, Integer, String
+
+from app.db.base_class import Base
+
+
+class DerivedTableBuild(Base):
+    """
+    Completed full build of a derived table (or of one part of it).
+
+    Attributes:
+        name: Built table or part, e.g. ``product_name_tokens:product``
+        row_count: Rows written by the build
+        updated_at: When the last full build completed
+    """
+
+    __tablename__ = "derived_table_builds"
+
+    name = Column(String(100), primary_key=True)
+    row_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = ({"schema": "app"},)
+
+    def __repr__(self):
+        return (
+            f"<DerivedTableBuild("
+            f"name={self.name}, "
+            f"row_count={self.row_count}, "
+            f"updated_at={self.updated_at}"
+            f")>"
+        )
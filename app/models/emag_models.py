@@ -95,6 +95,7 @@ class EmagProductV2(Base):
     last_synced_at = Column(DateTime, nullable=True)
     sync_error = Column(Text, nullable=True)
     sync_attempts = Column(Integer, nullable=False, default=0)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of raw_emag_data
 
     # Timestamps
     created_at = Column(DateTime, nullable=False, default=utc_now)
@@ -229,6 +230,15 @@ class EmagProductV2(Base):
         Index(
             "idx_emag_products_validation", "validation_status"
         ),  # Filter by validation status
+        Index(
+            "idx_emag_products_updated_at", "updated_at"
+        ),  # Cheap max(updated_at) for list ETags
+        Index(
+            "idx_emag_products_stock",
+            "account_type",
+            "stock_quantity",
+            postgresql_include=["price"],
+        ),  # Index-only inventory statistics and low stock scans
         UniqueConstraint("sku", "account_type", name="uq_emag_products_sku_account"),
         CheckConstraint(
             "account_type IN ('main', 'fbe')", name="ck_emag_products_account_type"
@@ -555,12 +565,15 @@ class EmagCategory(Base):
         DateTime, nullable=False, default=utc_now, onupdate=utc_now
     )
     last_synced_at = Column(DateTime, nullable=True)
+    # When characteristics and family types were last read from category/read
+    characteristics_synced_at = Column(DateTime, nullable=True)
 
     # Indexes
     __table_args__ = (
         Index("idx_emag_categories_parent", "parent_id"),
         Index("idx_emag_categories_allowed", "is_allowed"),
         Index("idx_emag_categories_name", "name"),
+        {"schema": "app"},
     )
 
 
@@ -589,6 +602,7 @@ class EmagVatRate(Base):
     __table_args__ = (
         Index("idx_emag_vat_country", "country"),
         Index("idx_emag_vat_active", "is_active"),
+        {"schema": "app"},
     )
 
 
@@ -616,6 +630,55 @@ class EmagHandlingTime(Base):
     __table_args__ = (
         Index("idx_emag_handling_time_value", "value"),
         Index("idx_emag_handling_time_active", "is_active"),
+        {"schema": "app"},
+    )
+
+
+class EmagSyncCursor(Base):
+    """High-water mark of incremental eMAG synchronization.
+
+    One row per account and resource (e.g. ``orders`` or ``orders:status=1``)
+    holding the latest eMAG ``modified`` timestamp fully ingested, so the next
+    run only requests records changed after it.
+    """
+
+    __tablename__ = "emag_sync_cursors"
+
+    account_type = Column(String(10), primary_key=True)
+    resource = Column(String(50), primary_key=True)
+    high_water_mark = Column(DateTime, nullable=True)  # eMAG time, naive
+    last_run_at = Column(DateTime, nullable=True)
+    last_run_items = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = ({"schema": "app"},)
+
+
+class EmagOfferOutbox(Base):
+    """Pending eMAG offer change waiting to be sent through ``offer/save``.
+
+    One row per account and offer: a new change is merged into the pending
+    payload field by field (last write wins) and bumps ``version``, so an
+    offer edited several times before dispatch costs a single API item.
+    Rows are deleted once eMAG has accepted the version that was sent.
+    """
+
+    __tablename__ = "emag_offer_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_type = Column(String(10), nullable=False)
+    offer_id = Column(Integer, nullable=False)  # Seller internal product ID
+    payload = Column(JSONB, nullable=False)  # offer/save fields, without "id"
+    version = Column(Integer, nullable=False, default=1)
+    status = Column(String(20), nullable=False, default="pending")  # pending, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    claimed_until = Column(DateTime, nullable=True)  # Lease of the dispatcher sending it
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("account_type", "offer_id", name="uq_emag_offer_outbox_offer"),
+        Index("idx_emag_offer_outbox_due", "account_type", "status", "next_attempt_at"),
+        {"schema": "app"},
     )
 
 
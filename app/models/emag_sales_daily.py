@@ -0,0 +1,45 @@
+"""eMAG Sales Daily Model
+
+Per-day sold quantities of eMAG order lines, keyed by the product reference
+the order carries (``part_number_key`` or SKU) rather than by local product.
+Orders often arrive before the product or its eMAG mapping exists locally;
+resolving the reference when the rollup is read means such sales are
+counted as soon as the mapping appears, without re-deriving old days.
+"""
+
+from sqlalchemy import Column, Date, Index, Integer, String
+
+from app.db.base_class import Base
+
+
+class EmagSalesDaily(Base):
+    """
+    Quantity sold through eMAG on one day under one product reference.
+
+    Attributes:
+        sale_key: ``part_number_key`` (or SKU) of the order line
+        sale_date: Day of the order date
+        quantity: Units sold on that day under that reference
+    """
+
+    __tablename__ = "emag_sales_daily"
+
+    sale_key = Column(String(100), primary_key=True)
+    sale_date = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Primary key serves per-reference range reads; this one serves the
+        # per-day refresh done after order writes
+        Index("idx_emag_sales_daily_day", "sale_date"),
+        {"schema": "app"},
+    )
+
+    def __repr__(self):
+        return (
+            f"<EmagSalesDaily("
+            f"sale_key={self.sale_key}, "
+            f"sale_date={self.sale_date}, "
+            f"quantity={self.quantity}"
+            f")>"
+        )
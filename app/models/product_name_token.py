@@ -0,0 +1,45 @@
+"""Product Name Token Model
+
+Inverted index over the names used by jieba matching. Each row links one
+token produced by ``JiebaMatchingService.tokenize_clean`` to a local product
+or a supplier product, so searches only need to read the posting lists of
+the search tokens instead of tokenizing the whole catalogue.
+"""
+
+from sqlalchemy import Column, Index, Integer, String
+
+from app.db.base_class import Base
+
+
+class ProductNameToken(Base):
+    """
+    Posting-list entry of the jieba token index.
+
+    Attributes:
+        entity_type: ``product`` (``products.chinese_name``/``name``) or
+            ``supplier_product`` (``supplier_products.supplier_product_chinese_name``/
+            ``supplier_product_name``)
+        token: Cleaned jieba token
+        entity_id: ID of the indexed product or supplier product
+    """
+
+    __tablename__ = "product_name_tokens"
+
+    entity_type = Column(String(20), primary_key=True)
+    token = Column(String(100), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        # Primary key serves token lookups; this one serves reindexing
+        Index("idx_product_name_tokens_entity", "entity_type", "entity_id"),
+        {"schema": "app"},
+    )
+
+    def __repr__(self):
+        return (
+            f"<ProductNameToken("
+            f"entity_type={self.entity_type}, "
+            f"entity_id={self.entity_id}, "
+            f"token={self.token}"
+            f")>"
+        )
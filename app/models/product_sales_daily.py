@@ -0,0 +1,49 @@
+"""Product Sales Daily Model
+
+Per-product, per-day sold quantities split by order source. The rollup is
+maintained by ``app.services.inventory.sales_rollup_service`` whenever sales
+orders or generic orders are written, so sales statistics (e.g. the low
+stock report) need a single indexed range query instead of re-reading the
+order history. eMAG orders are rolled up separately, per product reference
+(see ``EmagSalesDaily``).
+"""
+
+from sqlalchemy import Column, Date, Index, Integer, String
+
+from app.db.base_class import Base
+
+
+class ProductSalesDaily(Base):
+    """
+    Quantity of a product sold on one day through one source.
+
+    Attributes:
+        product_id: Local product ID
+        sale_date: Day of the order date
+        source: ``sales_orders`` or ``orders``
+        quantity: Units sold on that day through that source
+    """
+
+    __tablename__ = "product_sales_daily"
+
+    product_id = Column(Integer, primary_key=True)
+    sale_date = Column(Date, primary_key=True)
+    source = Column(String(20), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Primary key serves per-product range reads; this one serves the
+        # per-day refresh done after order writes
+        Index("idx_product_sales_daily_day", "sale_date", "source"),
+        {"schema": "app"},
+    )
+
+    def __repr__(self):
+        return (
+            f"<ProductSalesDaily("
+            f"product_id={self.product_id}, "
+            f"sale_date={self.sale_date}, "
+            f"source={self.source}, "
+            f"quantity={self.quantity}"
+            f")>"
+        )
@@ -17,6 +17,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
@@ -122,7 +123,11 @@ class SupplierProduct(Base, TimestampMixin):
     """
 
     __tablename__ = "supplier_products"
-    __table_args__ = {"schema": "app", "extend_existing": True}
+    __table_args__ = (
+        # Duplicate URL lookups of the Excel import
+        Index("idx_supplier_products_url", "supplier_product_url", postgresql_using="hash"),
+        {"schema": "app", "extend_existing": True},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -10,6 +10,7 @@ from typing import Optional
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Boolean,
     DateTime,
     Float,
@@ -52,6 +53,8 @@ class SupplierRawProduct(Base, TimestampMixin):
         Index("idx_supplier_raw_supplier", "supplier_id"),
         Index("idx_supplier_raw_status", "matching_status"),
         Index("idx_supplier_raw_active", "is_active"),
+        # Duplicate URL lookups of the Excel import
+        Index("idx_supplier_raw_product_url", "product_url", postgresql_using="hash"),
         {"schema": "app", "extend_existing": True},
     )
 
@@ -74,6 +77,14 @@ class SupplierRawProduct(Base, TimestampMixin):
 
     # Image Analysis
     image_hash: Mapped[str | None] = mapped_column(String(64))  # Perceptual hash
+    image_dhash: Mapped[int | None] = mapped_column(BigInteger)  # 64-bit dHash (signed)
+    image_phash: Mapped[int | None] = mapped_column(BigInteger)  # 64-bit pHash (signed)
+    image_hash_attempts: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0"
+    )  # Failed hashing runs in a row
+    image_hash_retry_at: Mapped[datetime | None] = mapped_column(
+        DateTime
+    )  # Skipped by the hashing stage until then
     image_features: Mapped[dict | None] = mapped_column(JSON)  # ML features
     image_downloaded: Mapped[bool] = mapped_column(Boolean, default=False)
     image_local_path: Mapped[str | None] = mapped_column(String(500))
@@ -2,11 +2,16 @@
 
 from typing import Any
 
-from sqlalchemy import insert, select, update
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.product import Product
 from app.repositories.base_repository import BaseRepository
+from app.services.jieba_matching_service import ENTITY_PRODUCT, JiebaTokenIndex
+
+# Columns the jieba token index is built from
+_INDEXED_FIELDS = {"name", "chinese_name"}
 
 
 class ProductRepository(BaseRepository):
@@ -65,8 +70,10 @@ class ProductRepository(BaseRepository):
                 "updated_at",
             ]
 
+        stmt = pg_insert(Product).values(products)
+
         # Generate the ON CONFLICT UPDATE clause
-        update_dict = {field: getattr(Product, field) for field in update_fields}
+        update_dict = {field: stmt.excluded[field] for field in update_fields}
 
         # Add current timestamp for updated_at if it's in update_fields
         if "updated_at" in update_fields:
@@ -75,15 +82,16 @@ class ProductRepository(BaseRepository):
             update_dict["updated_at"] = func.now()
 
         # Execute the bulk upsert
-        stmt = (
-            insert(Product)
-            .values(products)
-            .on_conflict_do_update(index_elements=[Product.sku], set_=update_dict)
-        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.sku], set_=update_dict
+        ).returning(Product.id)
 
-        result = await self.db.execute(stmt)
+        product_ids = list((await self.db.execute(stmt)).scalars())
+
+        # Bulk statements bypass the ORM flush hook keeping the name index current
+        await JiebaTokenIndex(self.db).reindex(ENTITY_PRODUCT, product_ids)
         await self.db.commit()
-        return result.rowcount
+        return len(product_ids)
 
     async def get_all(self) -> list[Product]:
         """Return all products."""
@@ -94,11 +102,18 @@ class ProductRepository(BaseRepository):
     async def update_by_sku(self, sku: str, values: dict[str, Any]) -> int:
         """Update a product identified by SKU."""
 
-        stmt = update(Product).where(Product.sku == sku).values(**values)
+        stmt = (
+            update(Product)
+            .where(Product.sku == sku)
+            .values(**values)
+            .returning(Product.id)
+        )
 
-        result = await self.db.execute(stmt)
+        product_ids = list((await self.db.execute(stmt)).scalars())
+        if product_ids and _INDEXED_FIELDS.intersection(values):
+            await JiebaTokenIndex(self.db).reindex(ENTITY_PRODUCT, product_ids)
         await self.db.commit()
-        return result.rowcount
+        return len(product_ids)
 
 
 # Factory function to get a product repository instance
@@ -12,6 +12,7 @@ from app.schemas.user import UserInDB
 
 from ..core.config import settings
 from .keys import get_key_manager
+from .principal_cache import get_principal_cache
 
 # Supported JWT algorithms (normalised to uppercase)
 SUPPORTED_ALGORITHMS = sorted(
@@ -294,6 +295,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Tokens verified recently resolve without signature check or query
+    principal_cache = get_principal_cache()
+    if isinstance(token, str):
+        principal_cache.ensure_subscribed()
+        cached_user = principal_cache.get(token)
+        if cached_user is not None:
+            return cached_user
+
     try:
         # Decode and verify the JWT token
         payload = decode_token(token)
@@ -315,6 +324,8 @@ async def get_current_user(
         from app.db.session import AsyncSessionLocal
         from app.models.user import User as UserModel
 
+        # Read before the query so that a concurrent change is not cached
+        generation = principal_cache.generation(username)
         async with AsyncSessionLocal() as session:
             result = await session.execute(
                 select(UserModel).where(UserModel.email == username)
@@ -343,6 +354,7 @@ async def get_current_user(
                 avatar_url=db_user.avatar_url,
             )
 
+            principal_cache.put(token, user_data, payload.get("exp"), generation)
             return user_data
 
     except HTTPException:
@@ -0,0 +1,231 @@
+"""Cache of verified access tokens and the users they resolve to.
+
+``get_current_user`` verifies the token signature and loads the user from
+the database on every request. This cache maps the SHA-256 digest of a
+verified token to the resolved ``UserInDB`` so that warm requests skip both.
+
+Entries live at most ``AUTH_PRINCIPAL_CACHE_TTL`` seconds and never past the
+token's ``exp`` claim; the least recently used entry is dropped when the
+cache is full. Committing a change to a ``User`` row (deactivation, role or
+password change, ...) drops that user's entries in the committing process
+at once and in every other process through the change feed.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+
+from prometheus_client import Counter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.user import User
+from app.schemas.user import UserInDB
+from app.services.infrastructure.change_feed import USER_EVENTS, get_change_feed
+
+logger = get_logger(__name__)
+
+PRINCIPAL_CACHE_REQUESTS = Counter(
+    "auth_principal_cache_requests_total",
+    "Token lookups in the verified principal cache",
+    ["result"],  # hit, miss
+)
+
+PRINCIPAL_CACHE_INVALIDATIONS = Counter(
+    "auth_principal_cache_invalidations_total",
+    "Principal cache entries dropped because their user changed",
+)
+
+
+class PrincipalCache:
+    """Bounded LRU cache of token digest -> ``UserInDB``."""
+
+    def __init__(self, maxsize: int | None = None, ttl: float | None = None):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of cached tokens (default: AUTH_PRINCIPAL_CACHE_SIZE)
+            ttl: Longest time (seconds) a token stays cached
+                (default: AUTH_PRINCIPAL_CACHE_TTL)
+        """
+        self.maxsize = settings.AUTH_PRINCIPAL_CACHE_SIZE if maxsize is None else maxsize
+        self.ttl = settings.AUTH_PRINCIPAL_CACHE_TTL if ttl is None else ttl
+        # digest -> (expires_at as epoch seconds, user)
+        self._entries: OrderedDict[str, tuple[float, UserInDB]] = OrderedDict()
+        self._digests_by_email: dict[str, set[str]] = {}
+        # Bumped on every invalidation, to refuse users loaded before it
+        self._generations: dict[str, int] = {}
+        self._subscribed = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> UserInDB | None:
+        """Return a copy of the cached user for a token, if still valid."""
+        digest = self.digest(token)
+        entry = self._entries.get(digest)
+        if entry is not None and entry[0] > time.time():
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            PRINCIPAL_CACHE_REQUESTS.labels(result="hit").inc()
+            # Callers may modify the user they receive
+            return entry[1].model_copy()
+
+        if entry is not None:
+            self._drop(digest)
+        self.misses += 1
+        PRINCIPAL_CACHE_REQUESTS.labels(result="miss").inc()
+        return None
+
+    def generation(self, email: str) -> int:
+        """Current invalidation generation of a user, see ``put``."""
+        return self._generations.get(email, 0)
+
+    def put(
+        self,
+        token: str,
+        user: UserInDB,
+        expires_at: float | None,
+        generation: int | None = None,
+    ) -> None:
+        """Cache the user resolved from a verified token.
+
+        Args:
+            token: The verified token
+            user: The user it resolved to
+            expires_at: The token's ``exp`` claim (epoch seconds)
+            generation: ``generation(user.email)`` read before the user was
+                loaded; the user is not cached if it was invalidated since
+        """
+        if self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation(user.email):
+            return
+
+        expiry = time.time() + self.ttl
+        if expires_at is not None:
+            expiry = min(expiry, float(expires_at))
+        if expiry <= time.time():
+            return
+
+        digest = self.digest(token)
+        self._drop(digest)
+        self._entries[digest] = (expiry, user.model_copy())
+        self._digests_by_email.setdefault(user.email, set()).add(digest)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, email: str) -> int:
+        """Drop every cached token of a user; returns how many were dropped."""
+        self._generations[email] = self.generation(email) + 1
+        digests = self._digests_by_email.pop(email, set())
+        for digest in digests:
+            self._entries.pop(digest, None)
+        if digests:
+            PRINCIPAL_CACHE_INVALIDATIONS.inc(len(digests))
+            logger.debug(f"Dropped {len(digests)} cached tokens of {email}")
+        return len(digests)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._digests_by_email.clear()
+
+    def _drop(self, digest: str) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self._digests_by_email.get(entry[1].email)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._digests_by_email[entry[1].email]
+
+    def ensure_subscribed(self) -> None:
+        """Listen for user changes committed by other processes."""
+        if not self._subscribed:
+            get_change_feed().subscribe(USER_EVENTS, self._on_user_event)
+            self._subscribed = True
+
+    async def _on_user_event(self, topic: str, event: dict[str, Any]) -> None:
+        for email in event.get("emails", ()):
+            self.invalidate_user(email)
+
+    def get_stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_principal_cache: PrincipalCache | None = None
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Get the process-wide principal cache."""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache()
+    return _principal_cache
+
+
+# Keeps scheduled invalidation broadcasts alive until they complete
+_pending_broadcasts: set[asyncio.Task] = set()
+
+_CHANGED_EMAILS_KEY = "principal_cache_changed_emails"
+
+
+def _collect_changed_users(session: Session, flush_context) -> None:
+    """Remember the users changed by a flush until the transaction commits."""
+    emails: set[str] = session.info.setdefault(_CHANGED_EMAILS_KEY, set())
+    for obj in (*session.dirty, *session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        # A changed address leaves tokens issued for the old one behind
+        emails.update(email for email in state.attrs.email.history.deleted if email)
+        if obj.email:
+            emails.add(obj.email)
+
+
+def _invalidate_changed_users(session: Session) -> None:
+    emails = session.info.pop(_CHANGED_EMAILS_KEY, None)
+    if not emails:
+        return
+
+    cache = get_principal_cache()
+    for email in emails:
+        cache.invalidate_user(email)
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Outside an event loop other processes rely on the TTL
+        return
+    task = loop.create_task(
+        get_change_feed().publish(USER_EVENTS, {"emails": sorted(emails)})
+    )
+    _pending_broadcasts.add(task)
+    task.add_done_callback(_pending_broadcasts.discard)
+
+
+def _discard_changed_users(session: Session) -> None:
+    session.info.pop(_CHANGED_EMAILS_KEY, None)
+
+
+event.listen(Session, "after_flush", _collect_changed_users)
+event.listen(Session, "after_commit", _invalidate_changed_users)
+event.listen(Session, "after_rollback", _discard_changed_users)
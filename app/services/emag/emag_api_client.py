@@ -21,6 +21,15 @@ from app.core.emag_rate_limiter import get_rate_limiter
 logger = logging.getLogger(__name__)
 
 
+def _parse_retry_after(headers) -> float | None:
+    """Return the ``Retry-After`` delay in seconds, if given as a number."""
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
 class EmagApiError(Exception):
     """Base exception for eMAG API errors."""
 
@@ -82,6 +91,7 @@ class EmagApiClient:
         timeout: int = 60,
         max_retries: int = 3,
         use_rate_limiter: bool = True,
+        account: str | None = None,
     ):
         """Initialize the eMAG API client.
 
@@ -92,8 +102,11 @@ class EmagApiClient:
             timeout: Request timeout in seconds (default 60s for large product lists)
             max_retries: Maximum number of retry attempts
             use_rate_limiter: Whether to use the new rate limiter
+            account: Rate limit bucket to draw from (default: username, as
+                eMAG applies its quotas per API user)
         """
         self.username = username
+        self.account = account or username
         self.password = password
         self.base_url = base_url.rstrip("/")
         self.timeout = aiohttp.ClientTimeout(total=timeout, connect=10, sock_read=timeout)
@@ -145,12 +158,15 @@ class EmagApiClient:
         if self._session is None or self._session.closed:
             await self.start()
 
+        # Determine operation type based on endpoint
+        operation_type = "orders" if "/order" in endpoint.lower() else "other"
+
         # Apply rate limiting if enabled
         if self._rate_limiter:
-            # Determine operation type based on endpoint
-            operation_type = "orders" if "/order" in endpoint.lower() else "other"
             try:
-                await self._rate_limiter.acquire(operation_type, timeout=30.0)
+                await self._rate_limiter.acquire(
+                    operation_type, timeout=30.0, account=self.account
+                )
             except NewRateLimitError as e:
                 logger.warning(f"Rate limit exceeded: {e}")
                 raise
@@ -199,6 +215,14 @@ class EmagApiClient:
                 return data
 
         except ClientResponseError as e:
+            if e.status == 429 and self._rate_limiter:
+                # Pause this account's bucket for every worker
+                await self._rate_limiter.report_throttled(
+                    operation_type,
+                    retry_after=_parse_retry_after(e.headers),
+                    account=self.account,
+                )
+
             error_msg = str(e)
             # Try to parse error response, but don't fail if connection is closed
             try:
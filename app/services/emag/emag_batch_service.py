@@ -7,17 +7,21 @@ Implements rate limiting and optimal batch sizes according to eMAG API guideline
 
 from __future__ import annotations
 
-import asyncio
 from collections.abc import Callable
 from datetime import UTC, datetime
 from typing import Any
 
 from app.config.emag_config import get_emag_config
+from app.core.emag_constants import RateLimits
 from app.core.emag_monitoring import get_monitor
 from app.core.emag_validator import validate_emag_response
 from app.core.exceptions import ServiceError
 from app.core.logging import get_logger
 from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+from app.services.emag.emag_offer_outbox_service import (
+    EmagOfferOutboxService,
+    coalesce_offer_updates,
+)
 
 logger = get_logger(__name__)
 monitor = get_monitor()
@@ -29,7 +33,8 @@ class EmagBatchService:
 
     Features:
     - Optimal batch sizing (100 items per batch)
-    - Rate limiting (3 requests/second)
+    - Rate limiting through the shared eMAG rate limiter
+    - Price and stock updates coalesced through the offer outbox
     - Progress tracking
     - Error handling per batch
     - Performance monitoring
@@ -38,9 +43,6 @@ class EmagBatchService:
     # Optimal batch size according to eMAG API guidelines
     OPTIMAL_BATCH_SIZE = 100
 
-    # Rate limiting: 3 requests per second for batch operations
-    RATE_LIMIT_DELAY = 0.4  # seconds between requests
-
     def __init__(self, account_type: str = "main"):
         """
         Initialize Batch Processing Service.
@@ -127,6 +129,11 @@ class EmagBatchService:
         if not offers:
             raise ServiceError("No offers provided for batch update")
 
+        # Several changes to one offer become one item, the latest value winning
+        offers = [
+            {"id": offer_id, **fields}
+            for offer_id, fields in coalesce_offer_updates(offers).items()
+        ]
         batches = self._create_batches(offers)
         results = {
             "total_items": len(offers),
@@ -201,10 +208,6 @@ class EmagBatchService:
                     if progress_callback:
                         progress_callback(batch_idx, len(batches))
 
-                    # Rate limiting: wait between requests
-                    if batch_idx < len(batches):
-                        await asyncio.sleep(self.RATE_LIMIT_DELAY)
-
                 except EmagApiError as e:
                     results["failed_batches"] += 1
                     error_msg = f"Batch {batch_idx} API error: {str(e)}"
@@ -242,7 +245,9 @@ class EmagBatchService:
         """
         Update prices for multiple products in batches.
 
-        Optimized for price-only updates using Light Offer API.
+        Optimized for price-only updates using Light Offer API: the updates
+        are queued in the offer outbox and sent in batched offer/save
+        requests. Updates that cannot be sent now stay queued for retry.
 
         Args:
             price_updates: List of price update dictionaries
@@ -265,7 +270,7 @@ class EmagBatchService:
                 }
             )
 
-        return await self.batch_update_offers(offers, progress_callback)
+        return await self._update_through_outbox(offers, progress_callback)
 
     async def batch_update_stock(
         self,
@@ -275,7 +280,8 @@ class EmagBatchService:
         """
         Update stock for multiple products in batches.
 
-        Optimized for stock-only updates using Light Offer API.
+        Optimized for stock-only updates using Light Offer API, through the
+        offer outbox like ``batch_update_prices``.
 
         Args:
             stock_updates: List of stock update dictionaries
@@ -287,17 +293,46 @@ class EmagBatchService:
         if not stock_updates:
             raise ServiceError("No stock updates provided")
 
-        # Transform to offer format
+        # Transform to offer format (Light Offer API takes stock per warehouse)
         offers = []
         for update in stock_updates:
             offers.append(
                 {
                     "id": update["product_id"],
-                    "stock": update["stock"],
+                    "stock": [
+                        {
+                            "warehouse_id": update.get("warehouse_id", 1),
+                            "value": update["stock"],
+                        }
+                    ],
                 }
             )
 
-        return await self.batch_update_offers(offers, progress_callback)
+        return await self._update_through_outbox(offers, progress_callback)
+
+    async def _update_through_outbox(
+        self,
+        offers: list[dict[str, Any]],
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> dict[str, Any]:
+        """Queue offer changes in the outbox and dispatch them now."""
+        start_time = datetime.now(UTC).isoformat()
+        outbox = EmagOfferOutboxService(self.account_type, client=self.client)
+        results = await outbox.enqueue_and_dispatch(offers)
+
+        if progress_callback:
+            progress_callback(results["successful"] + results["failed"], results["total"])
+
+        return {
+            "total_items": results["total"],
+            "successful_items": results["successful"],
+            "failed_items": results["failed"],
+            "queued_items": results["queued"],
+            "total_requests": results["requests"],
+            "errors": results["errors"],
+            "start_time": start_time,
+            "end_time": datetime.now(UTC).isoformat(),
+        }
 
     async def get_batch_status(self) -> dict[str, Any]:
         """
@@ -312,7 +347,7 @@ class EmagBatchService:
         return {
             "account_type": self.account_type,
             "batch_size": self.OPTIMAL_BATCH_SIZE,
-            "rate_limit_delay": self.RATE_LIMIT_DELAY,
+            "max_requests_per_second": RateLimits.OTHER_RPS,
             "metrics": {
                 "total_requests": metrics.total_requests,
                 "successful_requests": metrics.successful_requests,
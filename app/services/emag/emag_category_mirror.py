@@ -0,0 +1,586 @@
+"""
+Local mirror of eMAG categories and reference data.
+
+The category tree, the characteristics of each category with their allowed
+values, the family types, VAT rates and handling times are stored in
+``app.emag_categories``, ``app.emag_vat_rates`` and ``app.emag_handling_times``
+and served from an in-memory index shared by the whole process, so product
+publishing no longer spends the 3 requests/second ``category/read`` budget
+on lookups.
+
+``EmagCategoryMirrorSync`` (the ``emag.sync_category_mirror`` beat task)
+keeps the tables current with a delta job: the category list is read page
+by page and only new or changed categories are written; characteristics are
+re-read for allowed categories that changed, were never read or are older
+than ``DETAILS_MAX_AGE``, a bounded number per run. When the tables change
+it publishes a ``CACHE_EVENTS`` notice and every process rebuilds its index
+from the database on the next lookup.
+"""
+
+import asyncio
+import time
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config.emag_config import get_emag_config
+from app.core.database import async_session_factory
+from app.core.logging import get_logger
+from app.db.base_class import utc_now
+from app.models.emag_models import EmagCategory, EmagHandlingTime, EmagVatRate
+from app.services.emag.emag_api_client import EmagApiClient
+from app.services.infrastructure.change_feed import CACHE_EVENTS, get_change_feed
+
+logger = get_logger(__name__)
+
+# Name of the mirror in CACHE_EVENTS notices
+MIRROR_NAME = "emag_categories"
+
+# Language of the mirrored names; lookups in other languages go to the API
+MIRROR_LANGUAGE = "ro"
+
+# Seconds an index is used before it is rebuilt from the database
+INDEX_MAX_AGE = 900
+
+# Seconds before retrying a failed index load
+INDEX_RETRY_AFTER = 60
+
+# eMAG page sizes of category/read
+CATEGORIES_PER_PAGE = 100
+VALUES_PER_PAGE = 256
+
+# Safety limits of one sync run
+MAX_CATEGORY_PAGES = 200
+MAX_VALUE_PAGES = 40
+
+# Category details (characteristics, family types) read per run and their age
+MAX_DETAILS_PER_RUN = 200
+DETAILS_MAX_AGE = timedelta(days=7)
+
+# Categories per INSERT statement
+UPSERT_CHUNK_SIZE = 1000
+
+# Category list fields; a change to any of them triggers a details refresh
+CATEGORY_FIELDS = (
+    "name",
+    "parent_id",
+    "is_allowed",
+    "is_ean_mandatory",
+    "is_warranty_mandatory",
+)
+
+
+def normalize_name(name: str | None) -> str:
+    """Case- and accent-insensitive form of a category name."""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def merge_characteristic_values(
+    characteristics: list[dict[str, Any]], more: Iterable[dict[str, Any]]
+) -> bool:
+    """Append the values of a further values page to ``characteristics``.
+
+    Returns:
+        Whether any characteristic got a full page, i.e. may have more values
+    """
+    by_id = {characteristic.get("id"): characteristic for characteristic in characteristics}
+    full_page = False
+    for characteristic in more:
+        values = characteristic.get("values") or []
+        target = by_id.get(characteristic.get("id"))
+        if target is not None and values:
+            target.setdefault("values", []).extend(values)
+        full_page = full_page or len(values) >= VALUES_PER_PAGE
+    return full_page
+
+
+class EmagCategoryIndex:
+    """Immutable in-memory snapshot of the mirror tables."""
+
+    def __init__(
+        self,
+        categories: Iterable[dict[str, Any]] = (),
+        vat_rates: Iterable[dict[str, Any]] = (),
+        handling_times: Iterable[dict[str, Any]] = (),
+    ):
+        self.by_id: dict[int, dict[str, Any]] = {}
+        self.by_parent: dict[int | None, list[int]] = defaultdict(list)
+        self.by_name: dict[str, list[int]] = defaultdict(list)
+        for category in categories:
+            self.by_id[category["id"]] = category
+            self.by_parent[category.get("parent_id")].append(category["id"])
+            self.by_name[normalize_name(category.get("name"))].append(category["id"])
+
+        self.vat_rates = list(vat_rates)
+        self.handling_times = list(handling_times)
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, category_id: int) -> dict[str, Any] | None:
+        return self.by_id.get(category_id)
+
+    def get_details(self, category_id: int) -> dict[str, Any] | None:
+        """The category if its characteristics have been mirrored."""
+        category = self.by_id.get(category_id)
+        if category is None or category.get("characteristics") is None:
+            return None
+        return category
+
+    def children(self, parent_id: int | None) -> list[dict[str, Any]]:
+        return [self.by_id[category_id] for category_id in self.by_parent.get(parent_id, ())]
+
+    def find_by_name(self, name: str) -> list[dict[str, Any]]:
+        category_ids = self.by_name.get(normalize_name(name), ())
+        return [self.by_id[category_id] for category_id in category_ids]
+
+    def path(self, category_id: int) -> list[dict[str, Any]]:
+        """The category and its ancestors, root first."""
+        path: list[dict[str, Any]] = []
+        category = self.by_id.get(category_id)
+        while category is not None and len(path) <= len(self.by_id):
+            path.append(category)
+            category = self.by_id.get(category.get("parent_id"))
+        return path[::-1]
+
+    def allowed(self) -> list[dict[str, Any]]:
+        return [category for category in self.by_id.values() if category.get("is_allowed") == 1]
+
+    def characteristic(self, category_id: int, characteristic_id: int) -> dict[str, Any] | None:
+        category = self.get_details(category_id)
+        for characteristic in (category or {}).get("characteristics") or ():
+            if characteristic.get("id") == characteristic_id:
+                return characteristic
+        return None
+
+    def allowed_values(self, category_id: int, characteristic_id: int) -> list[Any] | None:
+        characteristic = self.characteristic(category_id, characteristic_id)
+        return None if characteristic is None else characteristic.get("values", [])
+
+    def vat_rate(self, vat_id: int) -> dict[str, Any] | None:
+        return next((vat for vat in self.vat_rates if vat.get("id") == vat_id), None)
+
+    def handling_time(self, value: int) -> dict[str, Any] | None:
+        return next((ht for ht in self.handling_times if ht.get("value") == value), None)
+
+
+def _category_payload(row: EmagCategory) -> dict[str, Any]:
+    """The mirrored category in the shape of a category/read result."""
+    category = {
+        "id": row.id,
+        "name": row.name,
+        "parent_id": row.parent_id,
+        "is_allowed": row.is_allowed,
+        "is_ean_mandatory": row.is_ean_mandatory,
+        "is_warranty_mandatory": row.is_warranty_mandatory,
+    }
+    if row.characteristics_synced_at is not None:
+        category["characteristics"] = row.characteristics or []
+        category["family_types"] = row.family_types or []
+    return category
+
+
+class EmagCategoryMirror:
+    """Process-wide holder of the current ``EmagCategoryIndex``."""
+
+    def __init__(self, session_factory=None, max_age: float = INDEX_MAX_AGE):
+        self.session_factory = session_factory or async_session_factory
+        self.max_age = max_age
+        self._index: EmagCategoryIndex | None = None
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._subscribed = False
+        self.loads = 0
+
+    def ensure_subscribed(self) -> None:
+        """Rebuild the index when another process changed the tables."""
+        if not self._subscribed:
+            get_change_feed().subscribe(CACHE_EVENTS, self._on_cache_event)
+            self._subscribed = True
+
+    async def _on_cache_event(self, topic: str, event: dict[str, Any]) -> None:
+        if MIRROR_NAME in event.get("mirrors", ()):
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """Rebuild the index from the database on the next lookup."""
+        self._index = None
+        self._retry_at = 0.0
+
+    def _is_current(self) -> bool:
+        index = self._index
+        if index is None:
+            return False
+        if len(index) == 0 and time.monotonic() >= self._retry_at:
+            return False
+        return time.monotonic() - index.loaded_at < self.max_age
+
+    async def index(self) -> EmagCategoryIndex:
+        """The current index, loading it if it is missing or too old.
+
+        Never raises: while the tables cannot be read the index is empty and
+        callers fall back to the eMAG API.
+        """
+        self.ensure_subscribed()
+        if self._is_current():
+            return self._index
+        async with self._lock:
+            if not self._is_current():
+                await self._load()
+        return self._index
+
+    async def _load(self) -> None:
+        try:
+            async with self.session_factory() as session:
+                categories = (await session.execute(select(EmagCategory))).scalars().all()
+                vat_rates = (
+                    await session.execute(
+                        select(EmagVatRate).where(EmagVatRate.is_active.is_(True))
+                    )
+                ).scalars().all()
+                handling_times = (
+                    await session.execute(
+                        select(EmagHandlingTime)
+                        .where(EmagHandlingTime.is_active.is_(True))
+                        .order_by(EmagHandlingTime.value)
+                    )
+                ).scalars().all()
+        except Exception as e:
+            logger.warning(f"eMAG category mirror could not be loaded: {e}")
+            if self._index is None:
+                self._index = EmagCategoryIndex()
+            self._retry_at = time.monotonic() + INDEX_RETRY_AFTER
+            return
+
+        self._index = EmagCategoryIndex(
+            (_category_payload(row) for row in categories),
+            (
+                {"id": vat.id, "vat_id": vat.id, "name": vat.name, "vat_rate": vat.rate}
+                for vat in vat_rates
+            ),
+            ({"id": ht.id, "value": ht.value, "name": ht.name} for ht in handling_times),
+        )
+        self._retry_at = time.monotonic() + INDEX_RETRY_AFTER
+        self.loads += 1
+        logger.info(f"Loaded eMAG category mirror: {len(self._index)} categories")
+
+    def get_stats(self) -> dict[str, Any]:
+        index = self._index
+        return {
+            "loaded": index is not None,
+            "categories": len(index) if index is not None else 0,
+            "vat_rates": len(index.vat_rates) if index is not None else 0,
+            "handling_times": len(index.handling_times) if index is not None else 0,
+            "age_seconds": round(time.monotonic() - index.loaded_at, 1) if index else None,
+            "loads": self.loads,
+        }
+
+
+_mirror: EmagCategoryMirror | None = None
+
+
+def get_category_mirror() -> EmagCategoryMirror:
+    """The process-wide category mirror."""
+    global _mirror
+    if _mirror is None:
+        _mirror = EmagCategoryMirror()
+    return _mirror
+
+
+class EmagCategoryMirrorSync:
+    """Delta synchronization of the mirror tables from the eMAG API.
+
+    Categories, VAT rates and handling times are the same for every seller
+    account, so one account's credentials are used to read them.
+    """
+
+    def __init__(
+        self,
+        account_type: str = "main",
+        session_factory=None,
+        client: EmagApiClient | None = None,
+        language: str = MIRROR_LANGUAGE,
+    ):
+        self.account_type = account_type
+        self.session_factory = session_factory or async_session_factory
+        self.language = language
+        self._client = client
+        self._owns_client = client is None
+
+    async def __aenter__(self):
+        """Async context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.close()
+
+    async def close(self):
+        """Close the API client if the sync created it."""
+        if self._owns_client and self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def _get_client(self) -> EmagApiClient:
+        if self._client is None:
+            config = get_emag_config(self.account_type)
+            self._client = EmagApiClient(
+                username=config.api_username,
+                password=config.api_password,
+                base_url=config.base_url or "https://marketplace-api.emag.ro/api-3",
+                timeout=config.api_timeout,
+                max_retries=config.max_retries,
+            )
+        return self._client
+
+    async def _read_categories(self, payload: dict[str, Any]) -> list[dict[str, Any]]:
+        response = await self._get_client()._request(
+            "POST", f"category/read?language={self.language}", json=payload
+        )
+        results = response.get("results") or []
+        return results if isinstance(results, list) else []
+
+    async def run(
+        self, max_details: int = MAX_DETAILS_PER_RUN, full: bool = False
+    ) -> dict[str, Any]:
+        """
+        Bring the mirror tables up to date.
+
+        Args:
+            max_details: Categories whose characteristics are read at most
+            full: Re-read the characteristics of every allowed category,
+                still at most ``max_details`` per run
+
+        Returns:
+            Summary of the changes
+        """
+        summary = {
+            "vat_rates": await self.sync_vat_rates(),
+            "handling_times": await self.sync_handling_times(),
+        }
+        summary.update(await self.sync_categories())
+        summary["details"] = await self.sync_details(max_details, full)
+
+        changed = (
+            summary["vat_rates"]
+            or summary["handling_times"]
+            or summary["changed"]
+            or summary["removed"]
+            or summary["details"]
+        )
+        if changed:
+            await get_change_feed().publish(CACHE_EVENTS, {"mirrors": [MIRROR_NAME]})
+            get_category_mirror().invalidate()
+        return summary
+
+    # ==================== REFERENCE DATA ====================
+
+    async def sync_vat_rates(self) -> int:
+        """Mirror vat/read; returns the number of rows written."""
+        response = await self._get_client().get_vat_rates()
+        rows = [
+            {
+                "id": int(vat.get("vat_id", vat.get("id"))),
+                "name": str(vat.get("name") or vat.get("vat_rate")),
+                "rate": float(vat.get("vat_rate") or 0),
+            }
+            for vat in response.get("results") or []
+        ]
+        return await self._replace(EmagVatRate, rows, ("name", "rate"))
+
+    async def sync_handling_times(self) -> int:
+        """Mirror handling_time/read; returns the number of rows written."""
+        response = await self._get_client().get_handling_times()
+        rows = [
+            {
+                "id": int(ht.get("id", ht.get("value"))),
+                "value": int(ht["value"]),
+                "name": str(ht.get("name") or ht["value"]),
+            }
+            for ht in response.get("results") or []
+        ]
+        return await self._replace(EmagHandlingTime, rows, ("value", "name"))
+
+    async def _replace(self, model, rows: list[dict[str, Any]], fields: tuple[str, ...]) -> int:
+        """Upsert changed ``rows`` and deactivate the ones eMAG dropped."""
+        if not rows:
+            return 0
+        now = utc_now()
+        statement = pg_insert(model).values(
+            [{**row, "is_active": True, "last_synced_at": now} for row in rows]
+        )
+        changed = or_(
+            model.is_active.is_(False),
+            *(
+                getattr(model, field).is_distinct_from(statement.excluded[field])
+                for field in fields
+            ),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[model.id],
+            set_={
+                **{field: statement.excluded[field] for field in fields},
+                "is_active": True,
+                "last_synced_at": now,
+                "updated_at": now,
+            },
+            where=changed,
+        )
+        async with self.session_factory() as session:
+            written = (await session.execute(statement)).rowcount or 0
+            removed = await session.execute(
+                update(model)
+                .where(model.id.not_in([row["id"] for row in rows]), model.is_active.is_(True))
+                .values(is_active=False, updated_at=now)
+            )
+            await session.commit()
+        return written + (removed.rowcount or 0)
+
+    # ==================== CATEGORIES ====================
+
+    async def sync_categories(self) -> dict[str, int]:
+        """Mirror the category list, writing only new and changed categories."""
+        remote: dict[int, dict[str, Any]] = {}
+        complete = False
+        for page in range(1, MAX_CATEGORY_PAGES + 1):
+            results = await self._read_categories(
+                {"currentPage": page, "itemsPerPage": CATEGORIES_PER_PAGE}
+            )
+            for category in results:
+                if "id" in category:
+                    remote[int(category["id"])] = {
+                        "id": int(category["id"]),
+                        "name": str(category.get("name") or ""),
+                        "parent_id": category.get("parent_id"),
+                        "is_allowed": int(category.get("is_allowed") or 0),
+                        "is_ean_mandatory": int(category.get("is_ean_mandatory") or 0),
+                        "is_warranty_mandatory": int(category.get("is_warranty_mandatory") or 0),
+                    }
+            if len(results) < CATEGORIES_PER_PAGE:
+                complete = True
+                break
+
+        columns = [getattr(EmagCategory, field) for field in CATEGORY_FIELDS]
+        async with self.session_factory() as session:
+            rows = (await session.execute(select(EmagCategory.id, *columns))).all()
+            stored = {row.id: row for row in rows}
+            changed = [
+                category
+                for category_id, category in remote.items()
+                if category_id not in stored
+                or any(getattr(stored[category_id], f) != category[f] for f in CATEGORY_FIELDS)
+            ]
+
+            now = utc_now()
+            for start in range(0, len(changed), UPSERT_CHUNK_SIZE):
+                statement = pg_insert(EmagCategory).values(
+                    [
+                        {**category, "language": self.language, "last_synced_at": now}
+                        for category in changed[start : start + UPSERT_CHUNK_SIZE]
+                    ]
+                )
+                await session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[EmagCategory.id],
+                        set_={
+                            **{f: statement.excluded[f] for f in CATEGORY_FIELDS},
+                            "last_synced_at": now,
+                            "updated_at": now,
+                            # Read the characteristics again
+                            "characteristics_synced_at": None,
+                        },
+                    )
+                )
+
+            removed = 0
+            # Only a complete listing shows which categories eMAG dropped
+            if complete and remote:
+                result = await session.execute(
+                    delete(EmagCategory).where(EmagCategory.id.not_in(list(remote)))
+                )
+                removed = result.rowcount or 0
+            await session.commit()
+
+        logger.info(
+            f"eMAG category mirror: {len(remote)} categories, "
+            f"{len(changed)} new or changed, {removed} removed"
+        )
+        return {"categories": len(remote), "changed": len(changed), "removed": removed}
+
+    async def _read_details(self, category_id: int) -> dict[str, Any] | None:
+        """One category with its characteristics and all their allowed values."""
+        results = await self._read_categories(
+            {"id": category_id, "valuesCurrentPage": 1, "valuesPerPage": VALUES_PER_PAGE}
+        )
+        if not results:
+            return None
+        category = results[0]
+        characteristics = category.get("characteristics") or []
+
+        more = any(len(c.get("values") or []) >= VALUES_PER_PAGE for c in characteristics)
+        page = 2
+        while more and page <= MAX_VALUE_PAGES:
+            results = await self._read_categories(
+                {"id": category_id, "valuesCurrentPage": page, "valuesPerPage": VALUES_PER_PAGE}
+            )
+            if not results:
+                break
+            more = merge_characteristic_values(
+                characteristics, results[0].get("characteristics") or []
+            )
+            page += 1
+
+        category["characteristics"] = characteristics
+        return category
+
+    async def sync_details(self, max_details: int = MAX_DETAILS_PER_RUN, full: bool = False) -> int:
+        """Read the characteristics of allowed categories that need them."""
+        now = utc_now()
+        query = select(EmagCategory.id).where(EmagCategory.is_allowed == 1)
+        if not full:
+            query = query.where(
+                or_(
+                    EmagCategory.characteristics_synced_at.is_(None),
+                    EmagCategory.characteristics_synced_at < now - DETAILS_MAX_AGE,
+                )
+            )
+        query = query.order_by(
+            EmagCategory.characteristics_synced_at.asc().nulls_first(), EmagCategory.id
+        ).limit(max_details)
+
+        async with self.session_factory() as session:
+            category_ids = (await session.execute(query)).scalars().all()
+
+        updated = 0
+        for category_id in category_ids:
+            try:
+                category = await self._read_details(category_id)
+            except Exception as e:
+                # Leave the rest for the next run rather than hammer a failing API
+                logger.warning(f"Reading eMAG category {category_id} failed: {e}")
+                break
+            async with self.session_factory() as session:
+                await session.execute(
+                    update(EmagCategory)
+                    .where(EmagCategory.id == category_id)
+                    .values(
+                        characteristics=(category or {}).get("characteristics") or [],
+                        family_types=(category or {}).get("family_types") or [],
+                        characteristics_synced_at=utc_now(),
+                        updated_at=utc_now(),
+                    )
+                )
+                await session.commit()
+            updated += 1
+
+        if updated:
+            logger.info(f"eMAG category mirror: read characteristics of {updated} categories")
+        return updated
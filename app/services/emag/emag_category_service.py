@@ -2,6 +2,8 @@
 eMAG Category Service - v4.4.9
 
 Handles fetching and caching eMAG categories, characteristics, and family types.
+Lookups are served from the shared local mirror (``emag_category_mirror``)
+when it holds the data, and only fall back to ``category/read`` otherwise.
 """
 
 import asyncio
@@ -13,6 +15,12 @@ from app.core.emag_validator import validate_emag_response
 from app.core.exceptions import ServiceError
 from app.core.logging import get_logger
 from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+from app.services.emag.emag_category_mirror import (
+    MIRROR_LANGUAGE,
+    EmagCategoryIndex,
+    EmagCategoryMirror,
+    get_category_mirror,
+)
 
 logger = get_logger(__name__)
 
@@ -29,14 +37,16 @@ class EmagCategoryService:
     - Multi-language support
     """
 
-    def __init__(self, account_type: str = "main"):
+    def __init__(self, account_type: str = "main", mirror: EmagCategoryMirror | None = None):
         """
         Initialize Category Service.
 
         Args:
             account_type: Type of eMAG account ('main' or 'fbe')
+            mirror: Local category mirror (default: the shared one)
         """
         self.account_type = account_type
+        self.mirror = mirror or get_category_mirror()
         self.config = get_emag_config(account_type)
         self.client = EmagApiClient(
             username=self.config.api_username,
@@ -74,6 +84,13 @@ class EmagCategoryService:
             return False
         return datetime.now() - self._cache_timestamp < self._cache_ttl
 
+    async def _mirror_index(self, language: str) -> EmagCategoryIndex | None:
+        """The local mirror, if it can answer lookups in ``language``."""
+        if language != MIRROR_LANGUAGE:
+            return None
+        index = await self.mirror.index()
+        return index if len(index) else None
+
     async def get_categories(
         self,
         current_page: int = 1,
@@ -145,6 +162,12 @@ class EmagCategoryService:
         Raises:
             ServiceError: If fetching fails
         """
+        if use_cache and (index := await self._mirror_index(language)):
+            category = index.get_details(category_id)
+            if category is not None:
+                logger.debug("Returning mirrored category %d", category_id)
+                return {"isError": False, "results": [category]}
+
         # Check cache first
         if use_cache and self._is_cache_valid() and category_id in self._category_cache:
             cached = self._category_cache[category_id]
@@ -200,6 +223,16 @@ class EmagCategoryService:
         Raises:
             ServiceError: If fetching fails
         """
+        index = await self._mirror_index(language)
+        values = index.allowed_values(category_id, characteristic_id) if index else None
+        if values is not None:
+            start = (current_page - 1) * min(items_per_page, 256)
+            return {
+                "characteristic_id": characteristic_id,
+                "values": values[start : start + min(items_per_page, 256)],
+                "total_values": len(values),
+            }
+
         try:
             logger.info(
                 "Fetching characteristic %d values for category %d (page %d)",
@@ -333,6 +366,10 @@ class EmagCategoryService:
         Raises:
             ServiceError: If fetching fails
         """
+        index = await self._mirror_index(language)
+        if index is not None:
+            return index.allowed()
+
         all_categories = await self.get_all_categories(language=language)
 
         allowed = [cat for cat in all_categories if cat.get("is_allowed") == 1]
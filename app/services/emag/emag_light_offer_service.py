@@ -5,7 +5,6 @@ Provides simplified offer updates using the new Light Offer API endpoint.
 This is faster and more efficient than the traditional product_offer/save endpoint.
 """
 
-import asyncio
 from typing import Any
 
 from app.config.emag_config import get_emag_config
@@ -13,6 +12,7 @@ from app.core.emag_validator import validate_emag_response
 from app.core.exceptions import ServiceError
 from app.core.logging import get_logger
 from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+from app.services.emag.emag_offer_outbox_service import EmagOfferOutboxService
 
 logger = get_logger(__name__)
 
@@ -243,37 +243,27 @@ class EmagLightOfferService:
         """
         Bulk update prices for multiple offers.
 
+        The updates go through the offer outbox: repeated updates of an offer
+        are merged, and the offers are sent in batched offer/save requests
+        paced by the shared rate limiter. Updates that cannot be sent now stay
+        queued and are retried by the outbox dispatcher.
+
         Args:
             updates: List of dicts with 'id' and 'sale_price' keys
-            batch_size: Number of updates per batch (default: 25, optimal)
+            batch_size: NOT USED (kept for compatibility, see MAX_OFFERS_PER_REQUEST)
 
         Returns:
             Summary of results
         """
-        results = {"total": len(updates), "successful": 0, "failed": 0, "errors": []}
-
-        for i in range(0, len(updates), batch_size):
-            batch = updates[i : i + batch_size]
-
-            for update in batch:
-                try:
-                    await self.update_offer_price(
-                        product_id=update["id"], sale_price=update["sale_price"]
-                    )
-                    results["successful"] += 1
-                except Exception as e:
-                    results["failed"] += 1
-                    results["errors"].append(
-                        {"product_id": update["id"], "error": str(e)}
-                    )
-
-                # Small delay between requests
-                await asyncio.sleep(0.4)  # ~3 RPS
+        results = await self._outbox().enqueue_and_dispatch(
+            [{"id": update["id"], "sale_price": update["sale_price"]} for update in updates]
+        )
 
         logger.info(
-            "Bulk price update completed: %d successful, %d failed",
+            "Bulk price update completed: %d successful, %d failed, %d queued",
             results["successful"],
             results["failed"],
+            results["queued"],
         )
 
         return results
@@ -284,43 +274,40 @@ class EmagLightOfferService:
         """
         Bulk update stock for multiple offers.
 
+        Sent through the offer outbox like ``bulk_update_prices``.
+
         Args:
             updates: List of dicts with 'id' and 'stock' keys
-            batch_size: Number of updates per batch (default: 25, optimal)
+            batch_size: NOT USED (kept for compatibility, see MAX_OFFERS_PER_REQUEST)
 
         Returns:
             Summary of results
         """
-        results = {"total": len(updates), "successful": 0, "failed": 0, "errors": []}
-
-        for i in range(0, len(updates), batch_size):
-            batch = updates[i : i + batch_size]
-
-            for update in batch:
-                try:
-                    await self.update_offer_stock(
-                        product_id=update["id"],
-                        stock=update["stock"],
-                        warehouse_id=update.get("warehouse_id", 1),
-                    )
-                    results["successful"] += 1
-                except Exception as e:
-                    results["failed"] += 1
-                    results["errors"].append(
-                        {"product_id": update["id"], "error": str(e)}
-                    )
-
-                # Small delay between requests
-                await asyncio.sleep(0.4)  # ~3 RPS
+        results = await self._outbox().enqueue_and_dispatch(
+            [
+                {
+                    "id": update["id"],
+                    "stock": [
+                        {"warehouse_id": update.get("warehouse_id", 1), "value": update["stock"]}
+                    ],
+                }
+                for update in updates
+            ]
+        )
 
         logger.info(
-            "Bulk stock update completed: %d successful, %d failed",
+            "Bulk stock update completed: %d successful, %d failed, %d queued",
             results["successful"],
             results["failed"],
+            results["queued"],
         )
 
         return results
 
+    def _outbox(self) -> EmagOfferOutboxService:
+        """Offer outbox of this account, sending through this service's client."""
+        return EmagOfferOutboxService(self.account_type, client=self.client)
+
     def _validate_response(
         self, response: dict[str, Any], operation: str
     ) -> dict[str, Any]:
@@ -0,0 +1,414 @@
+"""
+Outbox for eMAG offer price and stock updates.
+
+Price and stock changes are written to ``app.emag_offer_outbox`` instead of
+being sent one request at a time. Each offer has at most one pending row
+per account; a new change is merged into its payload field by field, so an
+offer repriced several times before dispatch is sent once, with the latest
+values.
+
+The dispatcher claims due rows with ``FOR UPDATE SKIP LOCKED`` under a short
+lease, so several workers can drain the same account without sending an
+offer twice. Claimed rows are packed into ``offer/save`` requests of up to
+``MAX_OFFERS_PER_REQUEST`` offers and sent through ``EmagApiClient``, whose
+shared rate limiter paces the requests; there are no fixed sleeps.
+
+A row is deleted once eMAG accepts the version that was sent; a change that
+arrived in the meantime keeps the row pending. Transient failures are
+retried with exponential backoff. When eMAG rejects a request, the batch is
+split in halves until the offending offers are isolated, so one invalid
+offer does not hold back the others. Rows that keep failing are parked as
+``failed``; a new change to the offer makes them pending again.
+
+Because pending changes live in the database, a restart loses nothing: the
+``emag.dispatch_offer_outbox`` beat task resumes where dispatch stopped.
+"""
+
+import asyncio
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.config.emag_config import get_emag_config
+from app.core.database import async_session_factory
+from app.core.logging import get_logger
+from app.db.base_class import utc_now
+from app.models.emag_models import EmagOfferOutbox
+from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+
+logger = get_logger(__name__)
+
+# eMAG accepts at most 50 entities per save request
+MAX_OFFERS_PER_REQUEST = 50
+
+# Offers per INSERT statement when queueing
+ENQUEUE_CHUNK_SIZE = 1000
+
+# Requests in flight per dispatcher; the rate limiter sets the actual pace
+DISPATCH_CONCURRENCY = 3
+
+# How long a dispatcher owns the rows it claimed
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Retry schedule of transient failures
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+MAX_ATTEMPTS = 8
+
+STATUS_PENDING = "pending"
+STATUS_FAILED = "failed"
+
+
+def coalesce_offer_updates(updates: Iterable[dict[str, Any]]) -> dict[int, dict[str, Any]]:
+    """Merge updates per offer ``id``; later values win field by field."""
+    merged: dict[int, dict[str, Any]] = {}
+    for update_data in updates:
+        fields = {key: value for key, value in update_data.items() if key != "id"}
+        merged.setdefault(int(update_data["id"]), {}).update(fields)
+    return merged
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt after ``attempts`` failures."""
+    return min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+
+
+def _is_rejection(error: Exception) -> bool:
+    """Whether eMAG refused the payload, as opposed to a transient failure."""
+    if not isinstance(error, EmagApiError):
+        return False
+    if error.is_rate_limit_error or error.is_auth_error:
+        return False
+    response = error.response if isinstance(error.response, dict) else {}
+    return bool(error.is_validation_error or response.get("isError"))
+
+
+class EmagOfferOutboxService:
+    """Queue and dispatch coalesced ``offer/save`` updates for one account."""
+
+    def __init__(
+        self,
+        account_type: str = "main",
+        session_factory=None,
+        client: EmagApiClient | None = None,
+    ):
+        """
+        Initialize the outbox.
+
+        Args:
+            account_type: Type of eMAG account ('main' or 'fbe')
+            session_factory: Async session factory (default: the application's)
+            client: eMAG API client (default: one built from the account config)
+        """
+        self.account_type = account_type
+        self.session_factory = session_factory or async_session_factory
+        self._client = client
+        self._owns_client = client is None
+
+    async def __aenter__(self):
+        """Async context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit."""
+        await self.close()
+
+    async def close(self):
+        """Close the API client if the outbox created it."""
+        if self._owns_client and self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def _get_client(self) -> EmagApiClient:
+        if self._client is None:
+            config = get_emag_config(self.account_type)
+            self._client = EmagApiClient(
+                username=config.api_username,
+                password=config.api_password,
+                base_url=config.base_url or "https://marketplace-api.emag.ro/api-3",
+                timeout=config.api_timeout,
+                max_retries=config.max_retries,
+            )
+        return self._client
+
+    # ==================== ENQUEUE ====================
+
+    async def enqueue(self, updates: Iterable[dict[str, Any]]) -> int:
+        """Queue offer changes; returns the number of distinct offers.
+
+        Args:
+            updates: ``offer/save`` items, each with the offer ``id`` and the
+                fields to change (``sale_price``, ``stock``, ...)
+        """
+        merged = coalesce_offer_updates(updates)
+        if not merged:
+            return 0
+
+        now = utc_now()
+        rows = [
+            {
+                "account_type": self.account_type,
+                "offer_id": offer_id,
+                "payload": payload,
+                "version": 1,
+                "status": STATUS_PENDING,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for offer_id, payload in merged.items()
+        ]
+        async with self.session_factory() as session:
+            # Chunked to stay below the bind parameter limit of asyncpg
+            for start in range(0, len(rows), ENQUEUE_CHUNK_SIZE):
+                stmt = pg_insert(EmagOfferOutbox).values(rows[start : start + ENQUEUE_CHUNK_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[EmagOfferOutbox.account_type, EmagOfferOutbox.offer_id],
+                    set_={
+                        # JSONB concatenation: the new fields replace the pending ones
+                        "payload": EmagOfferOutbox.payload.concat(stmt.excluded.payload),
+                        "version": EmagOfferOutbox.version + 1,
+                        "status": STATUS_PENDING,
+                        "attempts": 0,
+                        "next_attempt_at": now,
+                        "last_error": None,
+                        "updated_at": now,
+                    },
+                )
+                await session.execute(stmt)
+            await session.commit()
+
+        logger.info(
+            "Queued %d offer updates for %s account", len(merged), self.account_type
+        )
+        return len(merged)
+
+    # ==================== DISPATCH ====================
+
+    async def _claim_batch(
+        self, limit: int = MAX_OFFERS_PER_REQUEST, offer_ids: Iterable[int] | None = None
+    ) -> list[dict[str, Any]]:
+        """Lease up to ``limit`` due rows to this dispatcher.
+
+        ``offer_ids`` restricts the claim to those offers.
+        """
+        now = utc_now()
+        due = select(EmagOfferOutbox.id).where(
+            EmagOfferOutbox.account_type == self.account_type,
+            EmagOfferOutbox.status == STATUS_PENDING,
+            EmagOfferOutbox.next_attempt_at <= now,
+            (EmagOfferOutbox.claimed_until.is_(None)) | (EmagOfferOutbox.claimed_until < now),
+        )
+        if offer_ids is not None:
+            due = due.where(EmagOfferOutbox.offer_id.in_(list(offer_ids)))
+        due = (
+            due.order_by(EmagOfferOutbox.next_attempt_at, EmagOfferOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(EmagOfferOutbox)
+            .where(EmagOfferOutbox.id.in_(due))
+            .values(claimed_until=now + CLAIM_LEASE)
+            .returning(
+                EmagOfferOutbox.id,
+                EmagOfferOutbox.offer_id,
+                EmagOfferOutbox.version,
+                EmagOfferOutbox.attempts,
+                EmagOfferOutbox.payload,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(stmt)
+            rows = [dict(row) for row in result.mappings()]
+            await session.commit()
+        return rows
+
+    async def _mark_sent(self, rows: list[dict[str, Any]]) -> None:
+        """Delete the rows whose sent version is still current."""
+        async with self.session_factory() as session:
+            # Core executemany: one statement, a parameter set per row
+            connection = await session.connection()
+            await connection.execute(
+                delete(EmagOfferOutbox)
+                .where(
+                    EmagOfferOutbox.id == bindparam("row_id"),
+                    EmagOfferOutbox.version == bindparam("row_version"),
+                ),
+                [{"row_id": row["id"], "row_version": row["version"]} for row in rows],
+            )
+            # Rows changed while in flight stay pending with their new payload
+            await session.execute(
+                update(EmagOfferOutbox)
+                .where(EmagOfferOutbox.id.in_([row["id"] for row in rows]))
+                .values(claimed_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def _mark_failed(
+        self, rows: list[dict[str, Any]], error: str, permanent: bool = False
+    ) -> None:
+        """Schedule a retry, or park rows that used up their attempts.
+
+        ``permanent`` parks the rows at once, for payloads eMAG rejected.
+        """
+        now = utc_now()
+        params = []
+        for row in rows:
+            attempts = MAX_ATTEMPTS if permanent else row["attempts"] + 1
+            params.append(
+                {
+                    "row_id": row["id"],
+                    "row_version": row["version"],
+                    "new_attempts": attempts,
+                    "new_status": STATUS_FAILED if attempts >= MAX_ATTEMPTS else STATUS_PENDING,
+                    "retry_at": now + retry_delay(attempts),
+                }
+            )
+
+        async with self.session_factory() as session:
+            connection = await session.connection()
+            await connection.execute(
+                update(EmagOfferOutbox)
+                .where(
+                    EmagOfferOutbox.id == bindparam("row_id"),
+                    EmagOfferOutbox.version == bindparam("row_version"),
+                )
+                .values(
+                    attempts=bindparam("new_attempts"),
+                    status=bindparam("new_status"),
+                    next_attempt_at=bindparam("retry_at"),
+                    last_error=error[:2000],
+                    updated_at=now,
+                ),
+                params,
+            )
+            await session.execute(
+                update(EmagOfferOutbox)
+                .where(EmagOfferOutbox.id.in_([row["id"] for row in rows]))
+                .values(claimed_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def _send(self, rows: list[dict[str, Any]], summary: dict[str, Any]) -> None:
+        """Send one batch, isolating offers that eMAG rejects."""
+        payload = [{"id": row["offer_id"], **row["payload"]} for row in rows]
+        try:
+            await self._get_client()._request("POST", "offer/save", json=payload)
+        except Exception as e:
+            rejected = _is_rejection(e)
+            if rejected and len(rows) > 1:
+                middle = len(rows) // 2
+                await self._send(rows[:middle], summary)
+                await self._send(rows[middle:], summary)
+                return
+
+            logger.warning(
+                "offer/save failed for %d offers of %s account: %s",
+                len(rows),
+                self.account_type,
+                str(e),
+            )
+            await self._mark_failed(rows, str(e), permanent=rejected)
+            summary["failed"] += len(rows)
+            for row in rows:
+                summary["failed_offers"][row["offer_id"]] = str(e)
+            return
+        finally:
+            summary["requests"] += 1
+
+        await self._mark_sent(rows)
+        summary["sent"] += len(rows)
+        summary["sent_offers"].update(row["offer_id"] for row in rows)
+
+    async def dispatch(
+        self, max_requests: int | None = None, offer_ids: Iterable[int] | None = None
+    ) -> dict[str, Any]:
+        """Send due changes until the outbox is drained.
+
+        Args:
+            max_requests: Stop claiming new batches after this many requests
+            offer_ids: Only send these offers (default: every due offer)
+
+        Returns:
+            Summary with counts and the offer IDs sent or failed in this run
+        """
+        summary: dict[str, Any] = {
+            "account_type": self.account_type,
+            "requests": 0,
+            "sent": 0,
+            "failed": 0,
+            "sent_offers": set(),
+            "failed_offers": {},
+        }
+        in_flight: set[asyncio.Task] = set()
+        claimed_batches = 0
+
+        while max_requests is None or claimed_batches < max_requests:
+            if len(in_flight) >= DISPATCH_CONCURRENCY:
+                _, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+            rows = await self._claim_batch(offer_ids=offer_ids)
+            if not rows:
+                break
+            claimed_batches += 1
+            in_flight.add(asyncio.create_task(self._send(rows, summary)))
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+        if summary["requests"]:
+            logger.info(
+                "Offer outbox dispatch for %s account: %d sent, %d failed in %d requests",
+                self.account_type,
+                summary["sent"],
+                summary["failed"],
+                summary["requests"],
+            )
+        return summary
+
+    async def enqueue_and_dispatch(self, updates: list[dict[str, Any]]) -> dict[str, Any]:
+        """Queue changes, send them now and report on these offers.
+
+        Only the offers of ``updates`` are sent; the rest of the account's
+        outbox is left to the ``emag.dispatch_offer_outbox`` task. Offers
+        claimed by another dispatcher at the same time are reported as
+        ``queued``; they are delivered by that dispatcher.
+        """
+        offer_ids = set(coalesce_offer_updates(updates))
+        await self.enqueue(updates)
+        summary = await self.dispatch(offer_ids=offer_ids)
+
+        errors = [
+            {"product_id": offer_id, "error": error}
+            for offer_id, error in summary["failed_offers"].items()
+            if offer_id in offer_ids
+        ]
+        successful = len(offer_ids & summary["sent_offers"])
+        return {
+            "total": len(offer_ids),
+            "successful": successful,
+            "failed": len(errors),
+            "queued": len(offer_ids) - successful - len(errors),
+            "requests": summary["requests"],
+            "errors": errors,
+        }
+
+    async def get_status(self) -> dict[str, int]:
+        """Number of queued offers per status."""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(EmagOfferOutbox.status, func.count())
+                .where(EmagOfferOutbox.account_type == self.account_type)
+                .group_by(EmagOfferOutbox.status)
+            )
+            return dict(result.all())
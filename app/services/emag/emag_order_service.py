@@ -10,18 +10,24 @@ This service handles complete order lifecycle management including:
 """
 
 import asyncio
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime, timedelta
 from typing import Any
 
 from sqlalchemy import and_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.emag_config import get_emag_config
 from app.core.database import async_session_factory
 from app.core.exceptions import ServiceError
 from app.core.logging import get_logger
-from app.models.emag_models import EmagOrder
+from app.models.emag_models import EmagOrder, EmagSyncCursor
 from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+from app.services.infrastructure.change_feed import ORDER_EVENTS, get_change_feed
+
+# Registers the flush listener keeping the daily sales rollup in sync with
+# order writes (also needed in Celery workers, which never load the API)
+from app.services.inventory import sales_rollup_service
 
 logger = get_logger(__name__)
 
@@ -43,6 +49,16 @@ PAYMENT_METHODS = {
     3: "online_card",
 }
 
+# eMAG API datetime format ("YYYY-mm-dd HH:ii:ss")
+EMAG_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Orders requested per page (eMAG maximum)
+ORDERS_PAGE_SIZE = 100
+
+# Incremental runs re-read this much before the high-water mark so orders
+# modified while the previous run was paging are not missed
+CURSOR_OVERLAP = timedelta(minutes=5)
+
 
 class EmagOrderService:
     """Complete order management service for eMAG integration."""
@@ -101,9 +117,14 @@ class EmagOrderService:
         status_filter: int | None = 1,  # 1 = new orders
         max_pages: int = 10,
         days_back: int | None = None,
+        incremental: bool = False,
     ) -> dict[str, Any]:
         """Sync new orders from eMAG.
 
+        Orders are processed page by page: each page is written with a single
+        ``INSERT ... ON CONFLICT (emag_order_id, account_type) DO UPDATE`` and
+        committed, all through one database session per run.
+
         Order Statuses:
         - 0: Canceled
         - 1: New (awaiting acknowledgment)
@@ -116,36 +137,59 @@ class EmagOrderService:
             status_filter: Order status to filter (default: 1 for new orders)
             max_pages: Maximum pages to fetch
             days_back: Number of days to look back for orders (optional)
+            incremental: Only request orders modified since the high-water mark
+                stored by the previous complete run (per account and status
+                filter), and advance it when this run completes
 
         Returns:
             Dictionary with sync results
         """
         logger.info(
-            "Syncing orders from %s account with status=%s, days_back=%s",
+            "Syncing orders from %s account with status=%s, days_back=%s, incremental=%s",
             self.account_type,
             status_filter,
             days_back,
+            incremental,
         )
 
-        orders = []
-        page = 1
+        filters: dict[str, Any] = {}
+        if status_filter is not None:
+            filters["status"] = status_filter
+
+        cutoff_date = None
+        if days_back is not None:
+            cutoff_date = datetime.now() - timedelta(days=days_back)
+            filters["createdAfter"] = cutoff_date.strftime(EMAG_DATETIME_FORMAT)
+
+        resource = self._cursor_resource(status_filter)
         created_count = 0
         updated_count = 0
+        orders_fetched = 0
+        new_orders = 0
+        pages_processed = 0
+        high_water_mark = None
+        complete = False
 
-        while page <= max_pages:
-            try:
-                # Build filters
-                filters = {}
-                if status_filter is not None:
-                    filters["status"] = status_filter
-
-                # Note: eMAG API doesn't support date filtering directly
-                # We'll filter after fetching if days_back is specified
+        async with async_session_factory() as session:
+            since = None
+            if incremental:
+                since = await self._load_cursor(session, resource)
+                if since is not None:
+                    filters["modifiedAfter"] = (since - CURSOR_OVERLAP).strftime(
+                        EMAG_DATETIME_FORMAT
+                    )
+                    logger.info("Fetching %s orders modified after %s", self.account_type, since)
 
-                # Get orders page
-                response = await self.client.get_orders(
-                    page=page, items_per_page=100, filters=filters
-                )
+            page = 1
+            while page <= max_pages:
+                try:
+                    response = await self.client.get_orders(
+                        page=page, items_per_page=ORDERS_PAGE_SIZE, filters=filters
+                    )
+                except EmagApiError as e:
+                    logger.error("API error on page %d: %s", page, str(e))
+                    self._metrics["errors"] += 1
+                    break
 
                 if not response or "results" not in response:
                     logger.warning("No results in response for page %d", page)
@@ -153,119 +197,80 @@ class EmagOrderService:
 
                 page_orders = response["results"]
                 if not page_orders:
+                    complete = True
                     break
 
-                orders.extend(page_orders)
+                if cutoff_date is not None:
+                    page_orders = [
+                        order for order in page_orders if self._is_after(order, cutoff_date)
+                    ]
+
+                try:
+                    page_created, page_updated, events = await self._upsert_orders(
+                        session, page_orders
+                    )
+                    await session.commit()
+                except Exception as save_error:
+                    await session.rollback()
+                    logger.error(
+                        "Error saving orders page %d: %s",
+                        page,
+                        str(save_error),
+                        exc_info=True,
+                    )
+                    self._metrics["errors"] += 1
+                    break
+
+                # Announced once the page is committed, for WebSocket clients
+                await get_change_feed().publish_many(ORDER_EVENTS, events)
+
+                pages_processed += 1
+                orders_fetched += len(page_orders)
+                created_count += page_created
+                updated_count += page_updated
+                new_orders += sum(1 for order in page_orders if order.get("status") == 1)
+                for order in page_orders:
+                    modified = self._modified_at(order)
+                    if modified and (high_water_mark is None or modified > high_water_mark):
+                        high_water_mark = modified
 
                 logger.info(
-                    "Fetched page %d with %d orders from %s account (total so far: %d)",
+                    "Page %d from %s account: %d orders (%d created, %d updated so far)",
                     page,
-                    len(page_orders),
                     self.account_type,
-                    len(orders),
+                    len(response["results"]),
+                    created_count,
+                    updated_count,
                 )
 
-                # Check pagination
-                pagination = response.get("pagination", {})
-                total_pages = pagination.get("totalPages", 1)
-                current_page = pagination.get("currentPage", page)
-
-                logger.info(
-                    "Pagination info: currentPage=%d, totalPages=%d, max_pages=%d, "
-                    "orders_in_page=%d",
-                    current_page,
-                    total_pages,
-                    max_pages,
-                    len(page_orders),
-                )
+                # eMAG API doesn't return correct totalPages, so we rely on page size
+                if len(response["results"]) < ORDERS_PAGE_SIZE:
+                    complete = True
+                    break
 
-                # Check if we've reached max_pages limit
                 if page >= max_pages:
                     logger.info("Reached max_pages limit (%d)", max_pages)
                     break
 
-                # Continue to next page if current page was full (100 items)
-                # eMAG API doesn't return correct totalPages, so we rely on page size
-                if len(page_orders) < 100:
-                    logger.info(
-                        "Last page detected: only %d orders (less than 100)",
-                        len(page_orders),
-                    )
-                    break
-
                 page += 1
 
                 # Small delay between requests
                 await asyncio.sleep(0.5)
 
-            except EmagApiError as e:
-                logger.error("API error on page %d: %s", page, str(e))
-                self._metrics["errors"] += 1
-                break
-
-        # Filter by date if days_back is specified
-        if days_back is not None:
-            from datetime import datetime, timedelta
-
-            cutoff_date = datetime.now() - timedelta(days=days_back)
-            filtered_orders = []
-            for order in orders:
-                order_date_str = order.get("date")
-                if order_date_str:
-                    try:
-                        order_date = datetime.strptime(
-                            order_date_str, "%Y-%m-%d %H:%M:%S"
-                        )
-                        if order_date >= cutoff_date:
-                            filtered_orders.append(order)
-                    except ValueError:
-                        # If date parsing fails, include the order
-                        filtered_orders.append(order)
+            if incremental:
+                if complete:
+                    await self._save_cursor(
+                        session, resource, high_water_mark or since, orders_fetched
+                    )
+                    await session.commit()
                 else:
-                    # If no date, include the order
-                    filtered_orders.append(order)
-
-            logger.info(
-                "Filtered orders by date: %d -> %d (last %d days)",
-                len(orders),
-                len(filtered_orders),
-                days_back,
-            )
-            orders = filtered_orders
-
-        # Save orders to database in batches for better performance
-        batch_size = 100
-        for i in range(0, len(orders), batch_size):
-            batch = orders[i:i + batch_size]
-            logger.info(
-                "Processing batch %d-%d of %d orders",
-                i + 1,
-                min(i + batch_size, len(orders)),
-                len(orders)
-            )
-
-            for order_data in batch:
-                try:
-                    is_new = await self._save_order_to_db(order_data)
-                    if is_new:
-                        created_count += 1
-                    else:
-                        updated_count += 1
-                except Exception as save_error:
-                    logger.error(
-                        "Error saving order %s: %s",
-                        order_data.get("id"),
-                        str(save_error),
-                        exc_info=True,
+                    # Pages are not ordered by modification time, so a partial
+                    # run cannot safely move the mark forward
+                    logger.warning(
+                        "Incremental order sync for %s stopped before the last page; "
+                        "high-water mark not advanced",
+                        self.account_type,
                     )
-                    self._metrics["errors"] += 1
-
-            # Log progress after each batch
-            logger.info(
-                "Batch complete: %d created, %d updated so far",
-                created_count,
-                updated_count
-            )
 
         self._metrics["orders_synced"] = created_count + updated_count
 
@@ -274,98 +279,206 @@ class EmagOrderService:
             "synced": created_count + updated_count,
             "created": created_count,
             "updated": updated_count,
-            "orders_fetched": len(orders),
-            "new_orders": len([o for o in orders if o.get("status") == 1]),
-            "pages_processed": page - 1,
+            "orders_fetched": orders_fetched,
+            "new_orders": new_orders,
+            "pages_processed": pages_processed,
+            "high_water_mark": high_water_mark.isoformat() if high_water_mark else None,
         }
 
-    async def _save_order_to_db(self, order_data: dict[str, Any]) -> bool:
-        """Save order to database.
+    def _cursor_resource(self, status_filter: int | None) -> str:
+        """Cursor key: runs with different status filters see different orders."""
+        if status_filter is None:
+            return "orders"
+        return f"orders:status={status_filter}"
+
+    async def _load_cursor(self, session: AsyncSession, resource: str) -> datetime | None:
+        """Return the stored high-water mark for this account, if any."""
+        return await session.scalar(
+            select(EmagSyncCursor.high_water_mark).where(
+                and_(
+                    EmagSyncCursor.account_type == self.account_type,
+                    EmagSyncCursor.resource == resource,
+                )
+            )
+        )
+
+    async def _save_cursor(
+        self,
+        session: AsyncSession,
+        resource: str,
+        high_water_mark: datetime | None,
+        items: int,
+    ) -> None:
+        """Store the high-water mark reached by a complete run."""
+        now = datetime.now(UTC).replace(tzinfo=None)
+        stmt = pg_insert(EmagSyncCursor).values(
+            account_type=self.account_type,
+            resource=resource,
+            high_water_mark=high_water_mark,
+            last_run_at=now,
+            last_run_items=items,
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[EmagSyncCursor.account_type, EmagSyncCursor.resource],
+                set_={
+                    "high_water_mark": stmt.excluded.high_water_mark,
+                    "last_run_at": stmt.excluded.last_run_at,
+                    "last_run_items": stmt.excluded.last_run_items,
+                    "updated_at": now,
+                },
+            )
+        )
+
+    async def _upsert_orders(
+        self, session: AsyncSession, orders: list[dict[str, Any]]
+    ) -> tuple[int, int, list[dict[str, Any]]]:
+        """Insert or update one page of orders with a single statement.
 
         Returns:
-            True if order was created (new), False if updated (existing)
+            Tuple of (created, updated) counts and the change feed events
+            for new orders and status changes
         """
-        emag_order_id = order_data.get("id")
-        if not emag_order_id:
-            return False
+        # ON CONFLICT cannot touch the same row twice in one statement
+        rows = {}
+        for order_data in orders:
+            if order_data.get("id"):
+                rows[int(order_data["id"])] = self._order_row(order_data)
+        if not rows:
+            return 0, 0, []
+
+        existing = await session.execute(
+            select(EmagOrder.emag_order_id, EmagOrder.order_date, EmagOrder.status).where(
+                and_(
+                    EmagOrder.account_type == self.account_type,
+                    EmagOrder.emag_order_id.in_(list(rows)),
+                )
+            )
+        )
+        previous = {order_id: (order_date, status) for order_id, order_date, status in existing}
+        previous_dates = {order_id: order_date for order_id, (order_date, _) in previous.items()}
+
+        stmt = pg_insert(EmagOrder).values(list(rows.values()))
+        update_columns = {
+            key: stmt.excluded[key]
+            for key in next(iter(rows.values()))
+            if key not in ("emag_order_id", "account_type")
+        }
+        update_columns["updated_at"] = datetime.now(UTC).replace(tzinfo=None)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[EmagOrder.emag_order_id, EmagOrder.account_type],
+                set_=update_columns,
+            )
+        )
 
-        # Use a new session for each order to avoid conflicts
-        async with async_session_factory() as session:
-            try:
-                # Check if order exists
-                stmt = select(EmagOrder).where(
-                    and_(
-                        EmagOrder.emag_order_id == emag_order_id,
-                        EmagOrder.account_type == self.account_type,
-                    )
+        # Core statements bypass the ORM flush hook maintaining the sales rollup
+        days: set[date] = set()
+        for order_id, row in rows.items():
+            for value in (row["order_date"], previous_dates.get(order_id)):
+                if value is not None:
+                    days.add(value.date())
+        await sales_rollup_service.SalesRollup(session).refresh_days(
+            sales_rollup_service.SOURCE_EMAG, days
+        )
+
+        created = len(rows) - len(previous_dates)
+        return created, len(previous_dates), self._order_events(rows, previous)
+
+    def _order_events(
+        self,
+        rows: dict[int, dict[str, Any]],
+        previous: dict[int, tuple[datetime | None, int | None]],
+    ) -> list[dict[str, Any]]:
+        """Change feed events for new orders and status changes in a page."""
+        events = []
+        for order_id, row in rows.items():
+            if order_id not in previous:
+                if row["status"] != 1:
+                    continue
+                events.append(
+                    {
+                        "type": "order_new",
+                        "data": {
+                            "order_id": order_id,
+                            "customer_name": row["customer_name"],
+                            "total_amount": float(row["total_amount"] or 0),
+                            "currency": row["currency"],
+                            "account_type": self.account_type,
+                        },
+                    }
                 )
-                result = await session.execute(stmt)
-                existing_order = result.scalar_one_or_none()
-
-                # Extract customer info
-                customer = order_data.get("customer", {})
-
-                # Prepare order data
-                order_dict = {
-                    "emag_order_id": emag_order_id,
-                    "account_type": self.account_type,
-                    "status": order_data.get("status"),
-                    "status_name": ORDER_STATUS.get(
-                        order_data.get("status"), "unknown"
-                    ),
-                    "customer_id": customer.get("id"),
-                    "customer_name": customer.get("name"),
-                    "customer_email": customer.get("email"),
-                    "customer_phone": customer.get("phone_1"),
-                    "order_date": self._parse_datetime(order_data.get("date")),
-                    "total_amount": self._calculate_order_total(order_data),
-                    "currency": order_data.get("currency", "RON"),
-                    "payment_method": PAYMENT_METHODS.get(
-                        order_data.get("payment_mode_id"), "unknown"
-                    ),
-                    "payment_status": order_data.get("payment_status"),
-                    "delivery_mode": order_data.get("delivery_mode"),
-                    "shipping_address": {
-                        "contact": customer.get("shipping_contact"),
-                        "phone": customer.get("shipping_phone"),
-                        "country": customer.get("shipping_country"),
-                        "city": customer.get("shipping_city"),
-                        "street": customer.get("shipping_street"),
-                        "postal_code": customer.get("shipping_postal_code"),
-                    },
-                    "billing_address": {
-                        "name": customer.get("billing_name"),
-                        "phone": customer.get("billing_phone"),
-                        "country": customer.get("billing_country"),
-                        "city": customer.get("billing_city"),
-                        "street": customer.get("billing_street"),
-                        "postal_code": customer.get("billing_postal_code"),
-                    },
-                    "products": order_data.get("products", []),
-                    "sync_status": "synced",
-                    "last_synced_at": datetime.now(UTC).replace(tzinfo=None),
-                }
+                continue
+
+            old_status = previous[order_id][1]
+            if old_status is not None and old_status != row["status"]:
+                events.append(
+                    {
+                        "type": "order_status_change",
+                        "data": {
+                            "order_id": order_id,
+                            "account_type": self.account_type,
+                            "old_status": old_status,
+                            "old_status_name": ORDER_STATUS.get(old_status, "unknown"),
+                            "new_status": row["status"],
+                            "new_status_name": row["status_name"],
+                        },
+                    }
+                )
+        return events
 
-                is_new = False
-                if existing_order:
-                    # Update existing order
-                    for key, value in order_dict.items():
-                        if key not in ["emag_order_id", "account_type"]:
-                            setattr(existing_order, key, value)
-                    existing_order.updated_at = datetime.now(UTC).replace(tzinfo=None)
-                    is_new = False
-                else:
-                    # Create new order
-                    new_order = EmagOrder(**order_dict)
-                    session.add(new_order)
-                    is_new = True
+    def _order_row(self, order_data: dict[str, Any]) -> dict[str, Any]:
+        """Map an eMAG order payload to ``EmagOrder`` column values."""
+        # Extract customer info
+        customer = order_data.get("customer") or {}
+
+        return {
+            "emag_order_id": int(order_data["id"]),
+            "account_type": self.account_type,
+            "status": order_data.get("status"),
+            "status_name": ORDER_STATUS.get(order_data.get("status"), "unknown"),
+            "customer_id": customer.get("id"),
+            "customer_name": customer.get("name"),
+            "customer_email": customer.get("email"),
+            "customer_phone": customer.get("phone_1"),
+            "order_date": self._parse_datetime(order_data.get("date")),
+            "emag_modified_at": self._parse_datetime(order_data.get("modified")),
+            "total_amount": self._calculate_order_total(order_data),
+            "currency": order_data.get("currency", "RON"),
+            "payment_method": PAYMENT_METHODS.get(
+                order_data.get("payment_mode_id"), "unknown"
+            ),
+            "payment_status": order_data.get("payment_status"),
+            "delivery_mode": order_data.get("delivery_mode"),
+            "shipping_address": {
+                "contact": customer.get("shipping_contact"),
+                "phone": customer.get("shipping_phone"),
+                "country": customer.get("shipping_country"),
+                "city": customer.get("shipping_city"),
+                "street": customer.get("shipping_street"),
+                "postal_code": customer.get("shipping_postal_code"),
+            },
+            "billing_address": {
+                "name": customer.get("billing_name"),
+                "phone": customer.get("billing_phone"),
+                "country": customer.get("billing_country"),
+                "city": customer.get("billing_city"),
+                "street": customer.get("billing_street"),
+                "postal_code": customer.get("billing_postal_code"),
+            },
+            "products": order_data.get("products", []),
+            "sync_status": "synced",
+            "last_synced_at": datetime.now(UTC).replace(tzinfo=None),
+        }
 
-                await session.commit()
-                return is_new
+    def _modified_at(self, order_data: dict[str, Any]) -> datetime | None:
+        """Last modification time of an order (falls back to its date)."""
+        return self._parse_datetime(order_data.get("modified") or order_data.get("date"))
 
-            except Exception:
-                await session.rollback()
-                raise
+    def _is_after(self, order_data: dict[str, Any], cutoff_date: datetime) -> bool:
+        """Whether an order was placed after the cutoff (undated orders are kept)."""
+        order_date = self._parse_datetime(order_data.get("date"))
+        return order_date is None or order_date >= cutoff_date
 
     async def acknowledge_order(self, order_id: int, max_retries: int = 3) -> dict[str, Any]:
         """Acknowledge order (moves from status 1 to 2).
@@ -19,10 +19,12 @@ from datetime import UTC, datetime
 from typing import Any
 from uuid import UUID, uuid4
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, case, func, select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.emag_rate_limiter import get_rate_limiter
 from app.core.exceptions import ServiceError
 from app.core.logging import get_logger
 from app.models.emag_models import (
@@ -31,6 +33,9 @@ from app.models.emag_models import (
     EmagSyncProgress,
 )
 from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+from app.services.emag.utils.helpers import compute_payload_fingerprint
+from app.services.infrastructure.change_feed import SYNC_PROGRESS, get_change_feed
+from app.services.inventory.inventory_cache_service import get_inventory_cache
 from app.telemetry.emag_metrics import (
     record_sync_duration,
     record_sync_error,
@@ -42,6 +47,13 @@ from app.telemetry.emag_metrics import (
 
 logger = get_logger(__name__)
 
+# Values accepted by the check constraints on emag_products_v2 / offers_v2.
+# Rows are validated against them before a bulk write so that a single bad
+# product cannot abort the whole page statement.
+_ALLOWED_CURRENCIES = frozenset({"RON", "EUR", "USD"})
+_ALLOWED_LEAD_TIMES = frozenset({2, 3, 5, 7, 14, 30, 60, 90, 120})
+_MAX_SKU_LENGTH = 100
+
 
 class ConflictResolutionStrategy:
     """Strategies for resolving conflicts between eMAG and local data."""
@@ -68,6 +80,8 @@ class EmagProductSyncService:
         db: AsyncSession,
         account_type: str = "main",
         conflict_strategy: str = ConflictResolutionStrategy.EMAG_PRIORITY,
+        bulk_mode: bool = True,
+        fetch_concurrency: int | None = None,
     ):
         """Initialize the product sync service.
 
@@ -75,12 +89,28 @@ class EmagProductSyncService:
             db: Database session
             account_type: 'main', 'fbe', or 'both'
             conflict_strategy: Strategy for resolving conflicts
+            bulk_mode: Write each page with set-based upserts instead of
+                one savepoint and ORM write per product
+            fetch_concurrency: Pages downloaded concurrently across all
+                accounts (defaults to ``EMAG_SYNC_FETCH_CONCURRENCY``)
         """
         self.db = db
         self.account_type = account_type.lower()
         self.conflict_strategy = conflict_strategy
+        self.bulk_mode = bulk_mode
+        # More in-flight requests than the shared limiter's burst capacity
+        # would only park in the limiter, so cap concurrency there.
+        self.fetch_concurrency = max(
+            1,
+            min(
+                fetch_concurrency or settings.EMAG_SYNC_FETCH_CONCURRENCY,
+                int(get_rate_limiter().other_bucket.capacity),
+            ),
+        )
+        self.page_queue_size = max(1, settings.EMAG_SYNC_PAGE_QUEUE_SIZE)
         self._clients: dict[str, EmagApiClient] = {}
         self._sync_log_id: UUID | None = None
+        self._sync_started_at: datetime | None = None
         self._sync_stats = {
             "total_processed": 0,
             "created": 0,
@@ -247,6 +277,8 @@ class EmagProductSyncService:
         # Create sync log
         sync_log = await self._create_sync_log(mode)
         self._sync_log_id = sync_log.id
+        self._sync_started_at = sync_log.started_at
+        await self._publish_progress("running")
 
         # Mark sync as in progress
         set_sync_in_progress(self.account_type, "products", 1)
@@ -279,6 +311,9 @@ class EmagProductSyncService:
             record_sync_products(
                 self.account_type, "updated", self._sync_stats["updated"]
             )
+            record_sync_products(
+                self.account_type, "unchanged", self._sync_stats["unchanged"]
+            )
             record_sync_products(
                 self.account_type, "failed", self._sync_stats["failed"]
             )
@@ -322,18 +357,53 @@ class EmagProductSyncService:
         items_per_page: int,
         include_inactive: bool,
     ):
-        """Sync products for all configured accounts."""
-        for account, client in self._clients.items():
-            logger.info(f"Syncing products for {account} account")
-
-            await self._sync_account_products(
-                account=account,
-                client=client,
-                mode=mode,
-                max_pages=max_pages,
-                items_per_page=items_per_page,
-                include_inactive=include_inactive,
+        """Sync products for all configured accounts.
+
+        Page downloads for every account run as producers that feed a bounded
+        queue; a single consumer writes the pages. API latency therefore
+        overlaps with DB writes, while the session is only ever used by one
+        coroutine. The shared rate limiter inside ``EmagApiClient`` keeps the
+        combined request rate within the eMAG budget.
+        """
+        if not self._clients:
+            return
+
+        page_queue: asyncio.Queue = asyncio.Queue(maxsize=self.page_queue_size)
+        fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+
+        consumer = asyncio.create_task(self._consume_product_pages(page_queue))
+        producers = [
+            asyncio.create_task(
+                self._sync_account_products(
+                    account=account,
+                    client=client,
+                    mode=mode,
+                    max_pages=max_pages,
+                    items_per_page=items_per_page,
+                    include_inactive=include_inactive,
+                    page_queue=page_queue,
+                    fetch_slots=fetch_slots,
+                )
+            )
+            for account, client in self._clients.items()
+        ]
+
+        producing = asyncio.gather(*producers)
+        try:
+            await asyncio.wait(
+                {producing, consumer}, return_when=asyncio.FIRST_COMPLETED
             )
+            if consumer.done():
+                # Nothing reads the queue any more: producers would block on it
+                consumer.result()
+                raise ServiceError("Product page writer stopped before the last page")
+            await producing
+            await page_queue.put(None)
+            await consumer
+        finally:
+            for task in [*producers, consumer]:
+                task.cancel()
+            await asyncio.gather(producing, consumer, return_exceptions=True)
 
     async def _sync_account_products(
         self,
@@ -343,101 +413,121 @@ class EmagProductSyncService:
         max_pages: int | None,
         items_per_page: int,
         include_inactive: bool,
+        page_queue: asyncio.Queue,
+        fetch_slots: asyncio.Semaphore,
     ):
-        """Sync products for a specific account."""
-        page = 1
-        has_more = True
-        skipped_pages = 0
-        max_skipped_pages = 3  # Allow skipping up to 3 pages before stopping
+        """Download the product pages of one account into ``page_queue``.
 
-        while has_more and (max_pages is None or page <= max_pages):
-            try:
-                logger.info(f"Fetching page {page} for {account} account")
+        Several workers claim page numbers from a shared cursor. eMAG does not
+        return a page count, so the first short or empty page marks the end of
+        the listing and no worker claims pages past it.
+        """
+        logger.info(f"Syncing products for {account} account")
 
-                # Prepare filters
-                filters = {}
-                if not include_inactive:
-                    filters["status"] = "active"
+        filters = {}
+        if not include_inactive:
+            filters["status"] = "active"
 
-                # Fetch products from eMAG with retry logic
-                response = await self._fetch_products_with_retry(
-                    client=client,
-                    page=page,
-                    items_per_page=items_per_page,
-                    filters=filters,
-                    account=account,
-                    max_retries=5,
-                )
+        cursor = {"next_page": 1, "last_page": max_pages, "skipped_pages": 0}
+        max_skipped_pages = 3  # Allow skipping up to 3 pages before stopping
+
+        def end_reached() -> bool:
+            last_page = cursor["last_page"]
+            return (
+                last_page is not None and cursor["next_page"] > last_page
+            ) or cursor["skipped_pages"] >= max_skipped_pages
+
+        def mark_last_page(page: int):
+            last_page = cursor["last_page"]
+            cursor["last_page"] = page if last_page is None else min(last_page, page)
+
+        async def worker():
+            while not end_reached():
+                page = cursor["next_page"]
+                cursor["next_page"] += 1
+
+                try:
+                    async with fetch_slots:
+                        # The end may have been found while waiting for a slot
+                        last_page = cursor["last_page"]
+                        if last_page is not None and page > last_page:
+                            return
+                        logger.info(f"Fetching page {page} for {account} account")
+                        response = await self._fetch_products_with_retry(
+                            client=client,
+                            page=page,
+                            items_per_page=items_per_page,
+                            filters=filters,
+                            account=account,
+                            max_retries=5,
+                        )
+                except EmagApiError as e:
+                    # This should rarely happen now since _fetch_products_with_retry handles most errors
+                    logger.error(
+                        f"Unhandled API error on page {page} for {account}: {e}",
+                        exc_info=True,
+                    )
+                    self._sync_stats["errors"].append(
+                        f"{account} page {page}: Unhandled API error - {str(e)}"
+                    )
+                    cursor["skipped_pages"] += 1
+                    if cursor["skipped_pages"] >= max_skipped_pages:
+                        logger.error(
+                            f"Too many errors ({cursor['skipped_pages']}), "
+                            f"aborting sync for {account}"
+                        )
+                        raise
+                    continue
 
                 # If response is None, the page was skipped after max retries
                 if response is None:
-                    skipped_pages += 1
+                    cursor["skipped_pages"] += 1
                     logger.warning(
                         f"Skipped page {page} for {account} after retries "
-                        f"({skipped_pages}/{max_skipped_pages} pages skipped)"
+                        f"({cursor['skipped_pages']}/{max_skipped_pages} pages skipped)"
                     )
-
-                    if skipped_pages >= max_skipped_pages:
+                    if cursor["skipped_pages"] >= max_skipped_pages:
                         logger.error(
-                            f"Too many skipped pages ({skipped_pages}), stopping sync for {account}"
+                            f"Too many skipped pages ({cursor['skipped_pages']}), "
+                            f"stopping sync for {account}"
                         )
-                        break
-
-                    # Move to next page
-                    page += 1
-                    await asyncio.sleep(1)  # Brief pause before next page
                     continue
 
                 # Reset skipped pages counter on success
-                skipped_pages = 0
+                cursor["skipped_pages"] = 0
 
-                # Process products
                 products = response.get("results", [])
                 if not products:
                     logger.info(f"No more products found on page {page} for {account}")
-                    break
-
-                # Log progress
-                logger.info(
-                    f"Processing {len(products)} products from page {page} for {account}"
-                )
-
-                await self._process_products_batch(products, account)
+                    mark_last_page(page - 1)
+                    continue
 
-                # Check if there are more pages
-                # eMAG API doesn't return total_pages, so we continue until we get empty results
-                # If we got less than items_per_page, this is likely the last page
+                # eMAG API doesn't return total_pages, so a page shorter than
+                # items_per_page is the last one
                 if len(products) < items_per_page:
                     logger.info(
-                        f"Last page reached for {account} (got {len(products)} < {items_per_page})"
+                        f"Last page reached for {account} "
+                        f"(got {len(products)} < {items_per_page})"
                     )
-                    has_more = False
-                else:
-                    has_more = True
-                    page += 1
+                    mark_last_page(page)
 
-                # Small delay to respect rate limits
-                await asyncio.sleep(0.2)
+                await page_queue.put((account, page, products))
 
-            except EmagApiError as e:
-                # This should rarely happen now since _fetch_products_with_retry handles most errors
-                logger.error(
-                    f"Unhandled API error on page {page} for {account}: {e}",
-                    exc_info=True,
-                )
-                self._sync_stats["errors"].append(
-                    f"{account} page {page}: Unhandled API error - {str(e)}"
-                )
-                # Skip to next page
-                skipped_pages += 1
-                if skipped_pages >= max_skipped_pages:
-                    logger.error(
-                        f"Too many errors ({skipped_pages}), aborting sync for {account}"
-                    )
-                    raise
-                page += 1
-                await asyncio.sleep(2)
+        await asyncio.gather(*(worker() for _ in range(self.fetch_concurrency)))
+
+    async def _consume_product_pages(self, page_queue: asyncio.Queue):
+        """Write pages from ``page_queue`` until the ``None`` sentinel arrives."""
+        while True:
+            item = await page_queue.get()
+            if item is None:
+                return
 
+            account, page, products = item
+            logger.info(
+                f"Processing {len(products)} products from page {page} for {account}"
+            )
+            try:
+                await self._process_products_batch(products, account)
             except Exception as e:
                 logger.error(
                     f"Unexpected error on page {page} for {account}: {e}",
@@ -446,15 +536,11 @@ class EmagProductSyncService:
                 self._sync_stats["errors"].append(
                     f"{account} page {page}: {type(e).__name__}: {str(e)[:100]}"
                 )
-                # Skip to next page
-                skipped_pages += 1
-                if skipped_pages >= max_skipped_pages:
-                    logger.error(
-                        f"Too many errors ({skipped_pages}), aborting sync for {account}"
-                    )
-                    raise
-                page += 1
-                await asyncio.sleep(2)
+
+            try:
+                await self._publish_progress("running", current_page=page)
+            except Exception as e:
+                logger.warning(f"Failed to publish progress for page {page}: {e}")
 
     async def _process_products_batch(
         self,
@@ -462,6 +548,111 @@ class EmagProductSyncService:
         account: str,
     ):
         """Process a batch of products from eMAG."""
+        if self.bulk_mode:
+            await self._process_products_batch_bulk(products, account)
+        else:
+            await self._process_products_batch_per_row(products, account)
+
+    async def _process_products_batch_bulk(
+        self,
+        products: list[dict[str, Any]],
+        account: str,
+    ):
+        """Process a page of products with set-based statements.
+
+        Every product is mapped and validated in Python first, so a malformed
+        row is counted as failed on its own. Existing ``(sku, account_type)``
+        rows for the page are resolved with one query and the page is written
+        with a single ``INSERT ... ON CONFLICT DO UPDATE`` per table inside one
+        savepoint. If the database still rejects the page, it is replayed
+        through the per-row path so the error stays isolated to the bad row.
+        """
+        page_rows: dict[str, tuple[dict[str, Any], dict[str, Any]]] = {}
+        processed = 0
+        failed: list[str] = []
+
+        for product_data in products:
+            sku = product_data.get("part_number")
+            if not sku:
+                logger.warning("Product missing part_number, skipping")
+                processed += 1
+                continue
+            try:
+                row = self._build_product_row(product_data, account)
+                self._validate_product_row(row)
+            except Exception as e:
+                logger.error(f"Failed to sync product {sku}: {e}")
+                failed.append(f"Product {sku}: {str(e)[:200]}")
+                continue
+            # eMAG may repeat a SKU across a page; the last occurrence wins,
+            # as it would with sequential per-row writes.
+            page_rows[sku] = (row, product_data)
+
+        existing = await self._get_existing_products(list(page_rows), account)
+
+        rows_to_write: list[dict[str, Any]] = []
+        identical: set[str] = set()
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+        for sku, (row, product_data) in page_rows.items():
+            current = existing.get(sku)
+            if current is None:
+                rows_to_write.append(row)
+                counts["created"] += 1
+            elif current.content_hash == row["content_hash"]:
+                # Same payload as the stored one: neither the product nor the
+                # offer derived from it would change
+                identical.add(sku)
+                counts["unchanged"] += 1
+            elif await self._should_update_product(current, product_data):
+                rows_to_write.append(row)
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+
+        try:
+            async with self.db.begin_nested():
+                product_ids = {sku: row.id for sku, row in existing.items()}
+                product_ids.update(await self._bulk_upsert_products(rows_to_write))
+
+                offer_rows = []
+                for sku, (_, product_data) in page_rows.items():
+                    if sku in identical:
+                        continue
+                    offer_row = self._build_offer_row(
+                        product_ids[sku], sku, account, product_data
+                    )
+                    try:
+                        self._validate_offer_row(offer_row)
+                    except ValueError as e:
+                        logger.warning(f"Skipping offer for SKU {sku}: {e}")
+                        continue
+                    offer_rows.append(offer_row)
+                await self._bulk_upsert_offers(offer_rows)
+        except Exception as e:
+            logger.warning(
+                f"Bulk upsert of {len(page_rows)} {account} products failed, "
+                f"retrying page per row: {str(e)[:200]}"
+            )
+            self._sync_stats["total_processed"] += processed
+            self._sync_stats["failed"] += len(failed)
+            self._sync_stats["errors"].extend(failed)
+            await self._process_products_batch_per_row(
+                [product_data for _, product_data in page_rows.values()], account
+            )
+            return
+
+        self._sync_stats["total_processed"] += processed + len(page_rows)
+        self._sync_stats["failed"] += len(failed)
+        self._sync_stats["errors"].extend(failed)
+        for key, value in counts.items():
+            self._sync_stats[key] += value
+
+    async def _process_products_batch_per_row(
+        self,
+        products: list[dict[str, Any]],
+        account: str,
+    ):
+        """Process a batch of products one savepoint per product."""
         for product_data in products:
             try:
                 # Use a nested transaction (savepoint) for each product
@@ -508,7 +699,13 @@ class EmagProductSyncService:
         existing_product = await self._get_existing_product(sku, account)
 
         product_instance = None
-        if existing_product:
+        if existing_product and (
+            existing_product.content_hash == compute_payload_fingerprint(product_data)
+        ):
+            # Payload identical to the stored one, nothing to write
+            self._sync_stats["unchanged"] += 1
+            return
+        elif existing_product:
             # Update existing product
             should_update = await self._should_update_product(
                 existing_product, product_data
@@ -546,6 +743,131 @@ class EmagProductSyncService:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def _get_existing_products(
+        self,
+        skus: list[str],
+        account: str,
+    ) -> dict[str, Any]:
+        """Resolve existing products for a page of SKUs in one query.
+
+        Only the columns needed to link offers, compare content fingerprints
+        and apply the conflict strategy are loaded; the heavy JSONB columns
+        stay in the database.
+        """
+        if not skus:
+            return {}
+
+        stmt = select(
+            EmagProductV2.id,
+            EmagProductV2.sku,
+            EmagProductV2.emag_modified_at,
+            EmagProductV2.content_hash,
+        ).where(
+            and_(
+                EmagProductV2.account_type == account,
+                EmagProductV2.sku.in_(skus),
+            )
+        )
+        result = await self.db.execute(stmt)
+        return {row.sku: row for row in result}
+
+    def _build_products_upsert(self, rows: list[dict[str, Any]]):
+        """Build the ``INSERT ... ON CONFLICT DO UPDATE`` for product rows.
+
+        The update set mirrors ``_update_product``: fields eMAG omitted or sent
+        empty keep their stored value.
+        """
+        stmt = insert(EmagProductV2).values(rows)
+        excluded = stmt.excluded
+
+        def keep_if_empty(column: str, empty: Any = ""):
+            return func.coalesce(
+                func.nullif(excluded[column], empty), getattr(EmagProductV2, column)
+            )
+
+        return stmt.on_conflict_do_update(
+            index_elements=["sku", "account_type"],
+            set_={
+                "emag_id": excluded.emag_id,
+                "name": keep_if_empty("name"),
+                "description": keep_if_empty("description"),
+                "brand": keep_if_empty("brand"),
+                "manufacturer": func.coalesce(
+                    excluded.manufacturer, EmagProductV2.manufacturer
+                ),
+                "price": keep_if_empty("price", 0),
+                # A payload without a currency keeps the stored one
+                "currency": case(
+                    (excluded.raw_emag_data.has_key("currency"), excluded.currency),
+                    else_=EmagProductV2.currency,
+                ),
+                "stock_quantity": excluded.stock_quantity,
+                "category_id": func.coalesce(
+                    excluded.category_id, EmagProductV2.category_id
+                ),
+                "emag_category_id": func.coalesce(
+                    excluded.emag_category_id, EmagProductV2.emag_category_id
+                ),
+                "emag_category_name": case(
+                    (
+                        excluded.emag_category_id.is_not(None),
+                        excluded.emag_category_name,
+                    ),
+                    else_=EmagProductV2.emag_category_name,
+                ),
+                "is_active": excluded.is_active,
+                "status": excluded.status,
+                "images": case(
+                    (excluded.main_image_url.is_not(None), excluded.images),
+                    else_=EmagProductV2.images,
+                ),
+                "main_image_url": func.coalesce(
+                    excluded.main_image_url, EmagProductV2.main_image_url
+                ),
+                "validation_status": func.coalesce(
+                    excluded.validation_status, EmagProductV2.validation_status
+                ),
+                "number_of_offers": keep_if_empty("number_of_offers", 0),
+                "buy_button_rank": keep_if_empty("buy_button_rank", 0),
+                "sync_status": excluded.sync_status,
+                "last_synced_at": excluded.last_synced_at,
+                "updated_at": excluded.updated_at,
+                "emag_modified_at": excluded.emag_modified_at,
+                "raw_emag_data": excluded.raw_emag_data,
+                "content_hash": excluded.content_hash,
+            },
+        ).returning(EmagProductV2.id, EmagProductV2.sku)
+
+    async def _bulk_upsert_products(
+        self, rows: list[dict[str, Any]]
+    ) -> dict[str, UUID]:
+        """Write product rows in one statement and return their ids by SKU."""
+        if not rows:
+            return {}
+        result = await self.db.execute(self._build_products_upsert(rows))
+        return {row.sku: row.id for row in result}
+
+    def _build_offers_upsert(self, rows: list[dict[str, Any]]):
+        """Build the ``INSERT ... ON CONFLICT DO UPDATE`` for offer rows."""
+        from app.models.emag_models import EmagProductOfferV2
+
+        stmt = insert(EmagProductOfferV2).values(rows)
+        immutable = {"id", "sku", "account_type", "sync_attempts"}
+        set_ = {
+            key: stmt.excluded[key] for key in rows[0] if key not in immutable
+        }
+        set_["sync_attempts"] = EmagProductOfferV2.sync_attempts + 1
+        set_["updated_at"] = datetime.now(UTC).replace(tzinfo=None)
+        return stmt.on_conflict_do_update(
+            index_elements=["sku", "account_type"], set_=set_
+        )
+
+    async def _bulk_upsert_offers(self, rows: list[dict[str, Any]]):
+        """Write offer rows in one statement."""
+        if not rows:
+            return
+        await self.db.execute(self._build_offers_upsert(rows))
+
     async def _should_update_product(
         self,
         existing: EmagProductV2,
@@ -578,98 +900,118 @@ class EmagProductSyncService:
         account: str,
     ):
         """Create a new product in the database."""
-        product = EmagProductV2(
-            id=uuid4(),
-            emag_id=str(product_data.get("id")),
-            sku=product_data.get("part_number"),
-            name=product_data.get("name", ""),
-            account_type=account,
-            source_account=account,
+        product = EmagProductV2(**self._build_product_row(product_data, account))
+
+        self.db.add(product)
+        logger.debug(f"Created product: {product.sku}")
+        return product
+
+    def _build_product_row(
+        self,
+        product_data: dict[str, Any],
+        account: str,
+    ) -> dict[str, Any]:
+        """Map an eMAG product payload to ``emag_products_v2`` column values."""
+        now = datetime.now(UTC).replace(tzinfo=None)
+        return {
+            "id": uuid4(),
+            "emag_id": str(product_data.get("id")),
+            "sku": product_data.get("part_number"),
+            "name": product_data.get("name", ""),
+            "account_type": account,
+            "source_account": account,
             # Basic information
-            description=product_data.get("description"),
-            brand=product_data.get("brand"),
-            manufacturer=self._safe_string(product_data.get("manufacturer")),
+            "description": product_data.get("description"),
+            "brand": product_data.get("brand"),
+            "manufacturer": self._safe_string(product_data.get("manufacturer")),
             # Pricing
-            price=self._extract_price(product_data),
-            currency=product_data.get("currency", "RON"),
+            "price": self._extract_price(product_data),
+            "currency": product_data.get("currency", "RON"),
             # Inventory - stock is an array of warehouse objects
-            stock_quantity=self._extract_stock_quantity(product_data),
+            "stock_quantity": self._extract_stock_quantity(product_data),
             # Categories
-            category_id=str(product_data.get("category_id"))
+            "category_id": str(product_data.get("category_id"))
             if product_data.get("category_id")
             else None,
-            emag_category_id=str(product_data.get("category", {}).get("id"))
+            "emag_category_id": str(product_data.get("category", {}).get("id"))
             if product_data.get("category")
             else None,
-            emag_category_name=product_data.get("category", {}).get("name"),
+            "emag_category_name": product_data.get("category", {}).get("name"),
             # Status
-            is_active=product_data.get("status") == 1,
-            status=self._map_status(product_data.get("status")),
+            "is_active": product_data.get("status") == 1,
+            "status": self._map_status(product_data.get("status")),
             # Images
-            images=self._extract_images(product_data),
-            images_overwrite=product_data.get("images_overwrite", False),
-            main_image_url=self._extract_main_image(product_data),
+            "images": self._extract_images(product_data),
+            "images_overwrite": product_data.get("images_overwrite", False),
+            "main_image_url": self._extract_main_image(product_data),
             # eMAG specific fields
-            green_tax=product_data.get("green_tax"),
-            supply_lead_time=product_data.get("supply_lead_time"),
+            "green_tax": product_data.get("green_tax"),
+            "supply_lead_time": product_data.get("supply_lead_time"),
             # GPSR fields
-            safety_information=product_data.get("safety_information"),
-            manufacturer_info=product_data.get("manufacturer"),
-            eu_representative=product_data.get("eu_representative"),
-            has_manufacturer_info=bool(product_data.get("manufacturer")),
-            has_eu_representative=bool(product_data.get("eu_representative")),
+            "safety_information": product_data.get("safety_information"),
+            "manufacturer_info": product_data.get("manufacturer"),
+            "eu_representative": product_data.get("eu_representative"),
+            "has_manufacturer_info": bool(product_data.get("manufacturer")),
+            "has_eu_representative": bool(product_data.get("eu_representative")),
             # Characteristics
-            emag_characteristics=product_data.get("characteristics"),
-            attributes=product_data.get("attributes"),
-            specifications=product_data.get("specifications"),
+            "emag_characteristics": product_data.get("characteristics"),
+            "attributes": product_data.get("attributes"),
+            "specifications": product_data.get("specifications"),
             # Validation - extract status code from array if needed
-            validation_status=self._extract_validation_status(product_data),
-            validation_status_description=product_data.get(
+            "validation_status": self._extract_validation_status(product_data),
+            "validation_status_description": product_data.get(
                 "validation_status_description"
             ),
-            ownership=product_data.get("ownership"),
+            "ownership": product_data.get("ownership"),
             # Competition
-            number_of_offers=product_data.get("number_of_offers"),
-            buy_button_rank=product_data.get("buy_button_rank"),
-            best_offer_sale_price=product_data.get("best_offer_sale_price"),
+            "number_of_offers": product_data.get("number_of_offers"),
+            "buy_button_rank": product_data.get("buy_button_rank"),
+            "best_offer_sale_price": product_data.get("best_offer_sale_price"),
             # Stock
-            general_stock=product_data.get("general_stock"),
-            estimated_stock=product_data.get("estimated_stock"),
+            "general_stock": product_data.get("general_stock"),
+            "estimated_stock": product_data.get("estimated_stock"),
             # Measurements
-            length_mm=product_data.get("length"),
-            width_mm=product_data.get("width"),
-            height_mm=product_data.get("height"),
-            weight_g=product_data.get("weight"),
+            "length_mm": product_data.get("length"),
+            "width_mm": product_data.get("width"),
+            "height_mm": product_data.get("height"),
+            "weight_g": product_data.get("weight"),
             # Genius
-            genius_eligibility=product_data.get("genius_eligibility"),
-            genius_eligibility_type=product_data.get("genius_eligibility_type"),
-            genius_computed=product_data.get("genius_computed"),
+            "genius_eligibility": product_data.get("genius_eligibility"),
+            "genius_eligibility_type": product_data.get("genius_eligibility_type"),
+            "genius_computed": product_data.get("genius_computed"),
             # Family
-            family_id=product_data.get("family_id"),
-            family_name=product_data.get("family_name"),
-            family_type_id=product_data.get("family_type_id"),
+            "family_id": product_data.get("family_id"),
+            "family_name": product_data.get("family_name"),
+            "family_type_id": product_data.get("family_type_id"),
             # Additional fields
-            part_number_key=product_data.get("part_number_key"),
-            url=product_data.get("url"),
-            warranty=product_data.get("warranty"),
-            vat_id=product_data.get("vat_id"),
-            ean=product_data.get("ean"),
+            "part_number_key": product_data.get("part_number_key"),
+            "url": product_data.get("url"),
+            "warranty": product_data.get("warranty"),
+            "vat_id": product_data.get("vat_id"),
+            "ean": product_data.get("ean"),
             # Sync tracking
-            sync_status="synced",
-            last_synced_at=datetime.now(UTC).replace(tzinfo=None),
-            sync_attempts=0,
+            "sync_status": "synced",
+            "last_synced_at": now,
+            "sync_attempts": 0,
             # Timestamps
-            created_at=datetime.now(UTC).replace(tzinfo=None),
-            updated_at=datetime.now(UTC).replace(tzinfo=None),
-            emag_created_at=self._parse_datetime(product_data.get("created")),
-            emag_modified_at=self._parse_datetime(product_data.get("modified")),
+            "created_at": now,
+            "updated_at": now,
+            "emag_created_at": self._parse_datetime(product_data.get("created")),
+            "emag_modified_at": self._parse_datetime(product_data.get("modified")),
             # Raw data for debugging
-            raw_emag_data=product_data,
-        )
+            "raw_emag_data": product_data,
+            "content_hash": compute_payload_fingerprint(product_data),
+        }
 
-        self.db.add(product)
-        logger.debug(f"Created product: {product.sku}")
-        return product
+    def _validate_product_row(self, row: dict[str, Any]):
+        """Reject rows the table constraints would refuse."""
+        if len(row["sku"]) > _MAX_SKU_LENGTH:
+            raise ValueError(f"SKU longer than {_MAX_SKU_LENGTH} characters")
+        if row["currency"] not in _ALLOWED_CURRENCIES:
+            raise ValueError(f"Unsupported currency {row['currency']!r}")
+        lead_time = row["supply_lead_time"]
+        if lead_time is not None and lead_time not in _ALLOWED_LEAD_TIMES:
+            raise ValueError(f"Invalid supply_lead_time {lead_time!r}")
 
     async def _update_product(
         self,
@@ -730,6 +1072,7 @@ class EmagProductSyncService:
         product.updated_at = datetime.now(UTC).replace(tzinfo=None)
         product.emag_modified_at = self._parse_datetime(product_data.get("modified"))
         product.raw_emag_data = product_data
+        product.content_hash = compute_payload_fingerprint(product_data)
 
         logger.debug(f"Updated product: {product.sku}")
 
@@ -785,6 +1128,36 @@ class EmagProductSyncService:
 
         # Flush instead of commit (endpoint will handle final commit)
         await self.db.flush()
+        await self._publish_progress(status, error=error)
+
+        # Stock and prices changed: drop cached inventory statistics and lists
+        if self._sync_stats["created"] or self._sync_stats["updated"]:
+            await get_inventory_cache().invalidate_on_update(self.account_type)
+
+    async def _publish_progress(
+        self, status: str, current_page: int = 0, error: str | None = None
+    ):
+        """Publish the sync progress to the change feed for WebSocket clients."""
+        if not self._sync_log_id:
+            return
+
+        await get_change_feed().publish(
+            SYNC_PROGRESS,
+            {
+                "sync_id": str(self._sync_log_id),
+                "sync_type": "products",
+                "account_type": self.account_type,
+                "status": status,
+                "processed_items": self._sync_stats["total_processed"],
+                # eMAG does not report the number of products up front
+                "total_items": self._sync_stats["total_processed"] if status != "running" else 0,
+                "current_page": current_page,
+                "started_at": self._sync_started_at.isoformat()
+                if self._sync_started_at
+                else None,
+                "error_message": error,
+            },
+        )
 
     async def _update_sync_progress(self, current_page: int, total_pages: int):
         """Update sync progress tracking."""
@@ -882,38 +1255,10 @@ class EmagProductSyncService:
             result = await self.db.execute(stmt)
             existing_offer = result.scalar_one_or_none()
 
-            # Convert status to string (eMAG API returns int: 1=active, 0=inactive)
-            status_value = product_data.get("status")
-            if isinstance(status_value, int):
-                status_str = "active" if status_value == 1 else "inactive"
-            else:
-                status_str = str(status_value) if status_value else "active"
-
-            # Calculate stock values
-            stock_value = self._extract_stock_quantity(product_data)
-
-            offer_data = {
-                "sku": sku,
-                "account_type": product.account_type,
-                "product_id": product.id,
-                "emag_offer_id": str(product_data.get("id")),
-                "price": self._extract_price(product_data),
-                "sale_price": self._extract_price(product_data),
-                "min_sale_price": product_data.get("min_sale_price"),
-                "max_sale_price": product_data.get("max_sale_price"),
-                "recommended_price": product_data.get("recommended_price"),
-                "currency": product_data.get("currency", "RON"),
-                "stock": stock_value,
-                "reserved_stock": 0,
-                "available_stock": stock_value,
-                "status": status_str,
-                "is_available": product_data.get("status") == 1
-                or product_data.get("status") == "active",
-                "visibility": "visible",
-                "last_synced_at": datetime.now(UTC).replace(tzinfo=None),
-                "sync_status": "synced",
-                "sync_attempts": 0,
-            }
+            offer_data = self._build_offer_row(
+                product.id, sku, product.account_type, product_data
+            )
+            offer_data.pop("id")
 
             if existing_offer:
                 # Update existing offer
@@ -934,6 +1279,57 @@ class EmagProductSyncService:
                 "Error upserting offer for SKU %s: %s", sku, str(e), exc_info=True
             )
 
+    def _build_offer_row(
+        self,
+        product_id: UUID,
+        sku: str,
+        account: str,
+        product_data: dict[str, Any],
+    ) -> dict[str, Any]:
+        """Map an eMAG product payload to ``emag_product_offers_v2`` values."""
+        # Convert status to string (eMAG API returns int: 1=active, 0=inactive)
+        status_value = product_data.get("status")
+        if isinstance(status_value, int):
+            status_str = "active" if status_value == 1 else "inactive"
+        else:
+            status_str = str(status_value) if status_value else "active"
+
+        # Calculate stock values
+        stock_value = self._extract_stock_quantity(product_data)
+
+        return {
+            "id": uuid4(),
+            "sku": sku,
+            "account_type": account,
+            "product_id": product_id,
+            "emag_offer_id": str(product_data.get("id")),
+            "price": self._extract_price(product_data),
+            "sale_price": self._extract_price(product_data),
+            "min_sale_price": product_data.get("min_sale_price"),
+            "max_sale_price": product_data.get("max_sale_price"),
+            "recommended_price": product_data.get("recommended_price"),
+            "currency": product_data.get("currency", "RON"),
+            "stock": stock_value,
+            "reserved_stock": 0,
+            "available_stock": stock_value,
+            "status": status_str,
+            "is_available": product_data.get("status") == 1
+            or product_data.get("status") == "active",
+            "visibility": "visible",
+            "last_synced_at": datetime.now(UTC).replace(tzinfo=None),
+            "sync_status": "synced",
+            "sync_attempts": 0,
+        }
+
+    def _validate_offer_row(self, row: dict[str, Any]):
+        """Reject offer rows the table constraints would refuse."""
+        if row["price"] is None:
+            raise ValueError("missing price")
+        if row["stock"] < 0:
+            raise ValueError(f"negative stock {row['stock']}")
+        if row["currency"] not in _ALLOWED_CURRENCIES:
+            raise ValueError(f"Unsupported currency {row['currency']!r}")
+
     def _parse_datetime(self, dt_str: str | None) -> datetime | None:
         """Parse datetime string from eMAG."""
         if not dt_str:
@@ -2,7 +2,8 @@
 eMAG Reference Data Service - v4.4.9
 
 Handles fetching and caching VAT rates and handling times.
-These are required for creating offers.
+These are required for creating offers. They are served from the shared
+local mirror (``emag_category_mirror``) when it holds them.
 """
 
 from datetime import datetime, timedelta
@@ -13,6 +14,7 @@ from app.core.emag_validator import validate_emag_response
 from app.core.exceptions import ServiceError
 from app.core.logging import get_logger
 from app.services.emag.emag_api_client import EmagApiClient, EmagApiError
+from app.services.emag.emag_category_mirror import EmagCategoryMirror, get_category_mirror
 
 logger = get_logger(__name__)
 
@@ -25,14 +27,16 @@ class EmagReferenceDataService:
     so it's cached for performance.
     """
 
-    def __init__(self, account_type: str = "main"):
+    def __init__(self, account_type: str = "main", mirror: EmagCategoryMirror | None = None):
         """
         Initialize Reference Data Service.
 
         Args:
             account_type: Type of eMAG account ('main' or 'fbe')
+            mirror: Local reference data mirror (default: the shared one)
         """
         self.account_type = account_type
+        self.mirror = mirror or get_category_mirror()
         self.config = get_emag_config(account_type)
         self.client = EmagApiClient(
             username=self.config.api_username,
@@ -84,6 +88,9 @@ class EmagReferenceDataService:
         Raises:
             ServiceError: If fetching fails
         """
+        if use_cache and (vat_rates := (await self.mirror.index()).vat_rates):
+            return vat_rates
+
         # Return cached data if valid
         if use_cache and self._is_cache_valid() and self._vat_cache:
             logger.debug("Returning cached VAT rates")
@@ -145,6 +152,9 @@ class EmagReferenceDataService:
         Raises:
             ServiceError: If fetching fails
         """
+        if use_cache and (handling_times := (await self.mirror.index()).handling_times):
+            return handling_times
+
         # Return cached data if valid
         if use_cache and self._is_cache_valid() and self._handling_time_cache:
             logger.debug("Returning cached handling times")
@@ -2,7 +2,12 @@
 Utility modules for eMAG integration services.
 """
 
-from .helpers import build_api_url, format_date, format_price
+from .helpers import (
+    build_api_url,
+    compute_payload_fingerprint,
+    format_date,
+    format_price,
+)
 from .transformers import transform_order_response, transform_product_response
 from .validators import validate_credentials, validate_order_data, validate_product_data
 
@@ -15,4 +20,5 @@ __all__ = [
     "build_api_url",
     "format_price",
     "format_date",
+    "compute_payload_fingerprint",
 ]
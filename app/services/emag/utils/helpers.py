@@ -4,6 +4,8 @@ Helper utilities for eMAG integration.
 Provides general helper functions for eMAG API operations.
 """
 
+import hashlib
+import json
 from datetime import datetime
 from decimal import Decimal
 
@@ -231,3 +233,27 @@ def get_account_display_name(account_type: str) -> str:
     }
 
     return names.get(account_type.lower(), account_type)
+
+
+def compute_payload_fingerprint(payload: dict) -> str:
+    """
+    Compute a stable content fingerprint for an eMAG API payload.
+
+    The payload is serialized as canonical JSON (sorted keys, no whitespace)
+    so that two responses with the same content always produce the same hash,
+    regardless of key order.
+
+    Args:
+        payload: Raw eMAG payload
+
+    Returns:
+        SHA-256 hex digest (64 characters)
+    """
+    canonical = json.dumps(
+        payload,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -3,9 +3,12 @@ Google Sheets Service for MagFlow ERP
 Handles authentication and data retrieval from Google Sheets
 """
 
+import asyncio
 import logging
+import threading
 import time
-from typing import Any
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
 
 import gspread
 from gspread.exceptions import APIError
@@ -23,6 +26,8 @@ class GoogleSheetsConfig(BaseModel):
     products_sheet_tab: str = "Products"
     suppliers_sheet_tab: str = "Product_Suppliers"
     service_account_file: str = "service_account.json"
+    # Seconds a parsed sheet snapshot is served before checking the revision
+    snapshot_ttl: int = 300
     scopes: list[str] = [
         "https://spreadsheets.google.com/feeds",
         "https://www.googleapis.com/auth/drive",
@@ -80,8 +85,49 @@ class SupplierFromSheet(BaseModel):
     raw_data: dict[str, Any] = {}
 
 
+RowT = TypeVar("RowT", ProductFromSheet, SupplierFromSheet)
+
+
+class SheetSnapshot(Generic[RowT]):
+    """Parsed rows of one worksheet, indexed by SKU
+
+    Rows keep their sheet order; ``by_sku`` maps each SKU to all of its rows
+    (a product SKU normally has one row, a supplier SKU can have many).
+    """
+
+    def __init__(self, rows: list[RowT], revision: str | None):
+        self.rows = rows
+        self.revision = revision
+        self.checked_at = time.monotonic()
+        self.by_sku: dict[str, list[RowT]] = {}
+        for row in rows:
+            self.by_sku.setdefault(row.sku, []).append(row)
+
+    def find(self, sku: str) -> list[RowT]:
+        """Rows for one SKU (empty if unknown)"""
+        return self.by_sku.get(sku, [])
+
+    def find_many(self, skus: list[str]) -> list[RowT]:
+        """Rows for several SKUs, in sheet order"""
+        found = [row for sku in set(skus) for row in self.by_sku.get(sku, [])]
+        return sorted(found, key=lambda row: row.row_number)
+
+
 class GoogleSheetsService:
-    """Service for interacting with Google Sheets"""
+    """Service for interacting with Google Sheets
+
+    ``get_all_products`` / ``get_all_suppliers`` always download the
+    worksheet. Lookups by SKU go through process-wide snapshots instead:
+    parsed rows are kept in memory for ``snapshot_ttl`` seconds, then the
+    spreadsheet revision (Drive ``modifiedTime``) is checked and rows are only
+    downloaded again when the sheet actually changed. The ``*_async`` variants
+    run any network access in a worker thread.
+    """
+
+    # Snapshots shared by all service instances, keyed by (sheet name, tab)
+    _snapshots: dict[tuple[str, str], SheetSnapshot] = {}
+    _snapshot_locks: dict[tuple[str, str], threading.Lock] = {}
+    _snapshot_locks_guard = threading.Lock()
 
     def __init__(self, config: GoogleSheetsConfig | None = None):
         """Initialize Google Sheets service"""
@@ -485,6 +531,88 @@ class GoogleSheetsService:
             logger.error(f"Failed to retrieve products from Google Sheets: {e}")
             raise
 
+    # ==================== SNAPSHOTS ====================
+
+    def get_spreadsheet_revision(self) -> str | None:
+        """
+        Get the spreadsheet revision (Drive ``modifiedTime``)
+
+        Returns:
+            Optional[str]: Revision marker, or None if it could not be read
+        """
+        try:
+            if not self._spreadsheet:
+                self.open_spreadsheet()
+            return self._spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logger.warning(f"Could not read spreadsheet revision: {e}")
+            return None
+
+    def _get_snapshot(
+        self, tab: str, loader: Callable[[], list[RowT]], force_refresh: bool
+    ) -> SheetSnapshot[RowT]:
+        """Return a fresh enough snapshot of one tab, reloading it if needed"""
+        key = (self.config.sheet_name, tab)
+        with GoogleSheetsService._snapshot_locks_guard:
+            lock = GoogleSheetsService._snapshot_locks.setdefault(key, threading.Lock())
+
+        # Concurrent callers wait for one download instead of starting their own
+        with lock:
+            snapshot = GoogleSheetsService._snapshots.get(key)
+            if snapshot is not None and not force_refresh:
+                if time.monotonic() - snapshot.checked_at < self.config.snapshot_ttl:
+                    return snapshot
+
+                revision = self.get_spreadsheet_revision()
+                if revision is not None and revision == snapshot.revision:
+                    snapshot.checked_at = time.monotonic()
+                    return snapshot
+            else:
+                revision = self.get_spreadsheet_revision()
+
+            # Revision is read before the rows, so edits made during the
+            # download are picked up by the next check
+            snapshot = SheetSnapshot(loader(), revision)
+            GoogleSheetsService._snapshots[key] = snapshot
+            logger.info(
+                f"Loaded '{tab}' snapshot: {len(snapshot.rows)} rows, "
+                f"{len(snapshot.by_sku)} SKUs (revision {revision})"
+            )
+            return snapshot
+
+    def get_products_snapshot(
+        self, force_refresh: bool = False
+    ) -> SheetSnapshot[ProductFromSheet]:
+        """Get the cached products snapshot, refreshing it when stale"""
+        return self._get_snapshot(
+            self.config.products_sheet_tab, self.get_all_products, force_refresh
+        )
+
+    def get_suppliers_snapshot(
+        self, force_refresh: bool = False
+    ) -> SheetSnapshot[SupplierFromSheet]:
+        """Get the cached suppliers snapshot, refreshing it when stale"""
+        return self._get_snapshot(
+            self.config.suppliers_sheet_tab, self.get_all_suppliers, force_refresh
+        )
+
+    @classmethod
+    def clear_snapshots(cls) -> None:
+        """Drop all cached snapshots (next lookup downloads the sheets again)"""
+        cls._snapshots.clear()
+
+    async def get_products_snapshot_async(
+        self, force_refresh: bool = False
+    ) -> SheetSnapshot[ProductFromSheet]:
+        """Async variant of ``get_products_snapshot``"""
+        return await asyncio.to_thread(self.get_products_snapshot, force_refresh)
+
+    async def get_suppliers_snapshot_async(
+        self, force_refresh: bool = False
+    ) -> SheetSnapshot[SupplierFromSheet]:
+        """Async variant of ``get_suppliers_snapshot``"""
+        return await asyncio.to_thread(self.get_suppliers_snapshot, force_refresh)
+
     def get_product_by_sku(self, sku: str) -> ProductFromSheet | None:
         """
         Get a specific product by SKU
@@ -495,11 +623,8 @@ class GoogleSheetsService:
         Returns:
             Optional[ProductFromSheet]: Product if found, None otherwise
         """
-        products = self.get_all_products()
-        for product in products:
-            if product.sku == sku:
-                return product
-        return None
+        products = self.get_products_snapshot().find(sku)
+        return products[0] if products else None
 
     def get_products_by_skus(self, skus: list[str]) -> list[ProductFromSheet]:
         """
@@ -511,10 +636,16 @@ class GoogleSheetsService:
         Returns:
             List[ProductFromSheet]: List of found products
         """
-        all_products = self.get_all_products()
-        sku_set = set(skus)
+        return self.get_products_snapshot().find_many(skus)
+
+    async def get_product_by_sku_async(self, sku: str) -> ProductFromSheet | None:
+        """Async variant of ``get_product_by_sku``"""
+        products = (await self.get_products_snapshot_async()).find(sku)
+        return products[0] if products else None
 
-        return [p for p in all_products if p.sku in sku_set]
+    async def get_products_by_skus_async(self, skus: list[str]) -> list[ProductFromSheet]:
+        """Async variant of ``get_products_by_skus``"""
+        return (await self.get_products_snapshot_async()).find_many(skus)
 
     def get_all_suppliers(self, max_retries: int = 3) -> list[SupplierFromSheet]:
         """
@@ -749,8 +880,7 @@ class GoogleSheetsService:
         Returns:
             List[SupplierFromSheet]: List of suppliers for the SKU
         """
-        all_suppliers = self.get_all_suppliers()
-        return [s for s in all_suppliers if s.sku == sku]
+        return list(self.get_suppliers_snapshot().find(sku))
 
     def get_suppliers_by_skus(
         self, skus: list[str]
@@ -764,15 +894,15 @@ class GoogleSheetsService:
         Returns:
             Dict mapping SKU to list of suppliers
         """
-        all_suppliers = self.get_all_suppliers()
-        sku_set = set(skus)
+        snapshot = self.get_suppliers_snapshot()
+        return {sku: list(snapshot.find(sku)) for sku in skus}
 
-        result: dict[str, list[SupplierFromSheet]] = {sku: [] for sku in skus}
-        for supplier in all_suppliers:
-            if supplier.sku in sku_set:
-                result[supplier.sku].append(supplier)
-
-        return result
+    async def get_suppliers_by_skus_async(
+        self, skus: list[str]
+    ) -> dict[str, list[SupplierFromSheet]]:
+        """Async variant of ``get_suppliers_by_skus``"""
+        snapshot = await self.get_suppliers_snapshot_async()
+        return {sku: list(snapshot.find(sku)) for sku in skus}
 
     def get_sheet_statistics(self) -> dict[str, Any]:
         """
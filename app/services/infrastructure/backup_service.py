@@ -3,17 +3,48 @@ Backup and Recovery Service for eMAG Integration.
 
 Handles scheduled backups and recovery operations for eMAG data
 conforming to Section 2.6 from eMAG API guide.
+
+A backup is a directory ``emag_backup_<timestamp>`` holding one CSV file per
+table, produced by ``COPY ... TO STDOUT`` and optionally gzipped, plus a
+``manifest.json`` describing the files, their row counts and the
+``updated_at`` watermark of every table. Nothing is materialized in Python:
+COPY streams each table from the server in chunks, and the chunks are
+compressed and written to disk in a worker thread, so memory stays flat and
+the event loop is never blocked on zlib or file I/O.
+
+Tables are dumped in parallel on separate connections. All of them read the
+same snapshot (``pg_export_snapshot``), so the backup is consistent across
+tables even though the dumps run concurrently.
+
+An incremental backup only dumps rows whose ``updated_at`` is at or after
+the watermark recorded by the previous backup, and names that backup as its
+parent. Deleted rows are not captured; take full backups periodically.
+
+A row can carry an ``updated_at`` older than the snapshot yet commit after
+it (long sync transactions stamp rows in Python). Such a row is missing from
+this backup, so the watermark must not pass it: it is held at the start of
+the oldest transaction still running when the snapshot is exported, minus
+``WATERMARK_OVERLAP``. Seeing ``xact_start`` of other roles' sessions needs
+the ``pg_read_all_stats`` role. Rows dumped twice are harmless, restore
+upserts them.
+
+Restore walks the chain from the last full backup to the requested one and,
+in a single transaction, COPYs each file into a temporary staging table and
+upserts it into the live table on the primary key.
 """
 
+import asyncio
 import gzip
 import json
 import logging
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Table
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from app.models.emag_models import (
     EmagOrder,
@@ -24,21 +55,202 @@ from app.models.emag_models import (
 
 logger = logging.getLogger(__name__)
 
+BACKUP_FORMAT_VERSION = "2.0"
+BACKUP_PREFIX = "emag_backup_"
+MANIFEST_NAME = "manifest.json"
+
+# Bytes buffered before a chunk is handed to the writer thread
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Bytes read per chunk when streaming a file back for restore
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Tables dumped at the same time, each on its own connection
+DEFAULT_PARALLEL_TABLES = 4
+
+# Days of sync logs included in a full backup
+SYNC_LOG_RETENTION_DAYS = 30
+
+# Re-read before the oldest running transaction, for Python-side timestamps
+# taken just before their transaction began and for app server clock skew
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Start of the oldest other transaction running now (UTC, like updated_at)
+_SNAPSHOT_HORIZON_SQL = """
+SELECT least(coalesce(min(xact_start), now()), now()) AT TIME ZONE 'UTC'
+FROM pg_stat_activity
+WHERE xact_start IS NOT NULL
+  AND pid <> pg_backend_pid()
+  AND datname = current_database()
+"""
+
+
+@dataclass(frozen=True)
+class BackupTable:
+    """A table included in backups."""
+
+    name: str  # Key in manifests and results ("products", ...)
+    table: Table
+    restore_order: int  # Parents before children (offers reference products)
+
+    @property
+    def qualified_name(self) -> str:
+        if self.table.schema:
+            return f'"{self.table.schema}"."{self.table.name}"'
+        return f'"{self.table.name}"'
+
+    @property
+    def columns(self) -> list[str]:
+        return [column.name for column in self.table.columns]
+
+    @property
+    def primary_key(self) -> list[str]:
+        return [column.name for column in self.table.primary_key.columns]
+
+
+BACKUP_TABLES: dict[str, BackupTable] = {
+    "products": BackupTable("products", EmagProductV2.__table__, 0),
+    "offers": BackupTable("offers", EmagProductOfferV2.__table__, 1),
+    "orders": BackupTable("orders", EmagOrder.__table__, 2),
+    "sync_logs": BackupTable("sync_logs", EmagSyncLog.__table__, 3),
+}
+
+
+def _quote(column: str) -> str:
+    return f'"{column}"'
+
+
+def _parse_timestamp(name: str) -> datetime:
+    """Creation time encoded in a backup file or directory name."""
+    return datetime.strptime(name[len(BACKUP_PREFIX) :][:15], "%Y%m%d_%H%M%S")
+
+
+class _ChunkWriter:
+    """Buffers COPY output and writes it, compressed, from a worker thread."""
+
+    def __init__(self, path: Path, compress: bool):
+        self.path = path
+        self._file = gzip.open(path, "wb", compresslevel=6) if compress else open(path, "wb")
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self.bytes_in = 0
+
+    async def write(self, chunk: bytes) -> None:
+        self._buffer.append(chunk)
+        self._buffered += len(chunk)
+        self.bytes_in += len(chunk)
+        if self._buffered >= WRITE_BUFFER_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer, self._buffered = [], 0
+        await asyncio.to_thread(self._file.write, data)
+
+    async def close(self) -> None:
+        await self.flush()
+        await asyncio.to_thread(self._file.close)
+
+
+async def _read_chunks(path: Path) -> AsyncIterator[bytes]:
+    """Stream a backup file, decompressing in a worker thread."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    file = await asyncio.to_thread(opener, path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(file.read, READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+def _next_watermark(latest: datetime | None, horizon: datetime, since: str | None) -> str | None:
+    """Watermark for the next incremental backup of a table.
+
+    Rows stamped before ``horizon`` may still have been uncommitted when the
+    snapshot was taken, so the watermark never moves past it.
+    """
+    if latest is None:
+        return since
+    return min(latest, horizon).isoformat()
+
+
+def _copy_row_count(status: str) -> int:
+    """Row count of a ``COPY n`` command status."""
+    try:
+        return int(status.split()[-1])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
 
 class BackupService:
     """Service for backing up and restoring eMAG integration data."""
 
-    def __init__(self, db_session: AsyncSession, backup_dir: str = "backups"):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        backup_dir: str = "backups",
+        parallel_tables: int = DEFAULT_PARALLEL_TABLES,
+    ):
         """
         Initialize backup service.
 
         Args:
-            db_session: Database session
+            db_session: Database session (its engine provides the connections)
             backup_dir: Directory for storing backups
+            parallel_tables: Tables dumped concurrently
         """
         self.db_session = db_session
         self.backup_dir = Path(backup_dir)
         self.backup_dir.mkdir(exist_ok=True)
+        self.parallel_tables = parallel_tables
+
+    def _get_engine(self) -> AsyncEngine:
+        bind = self.db_session.bind if self.db_session is not None else None
+        if isinstance(bind, AsyncEngine):
+            return bind
+        from app.db.session import async_engine
+
+        return async_engine
+
+    @staticmethod
+    async def _driver_connection(connection):
+        """The asyncpg connection behind a SQLAlchemy async connection."""
+        raw = await connection.get_raw_connection()
+        return raw.driver_connection
+
+    # ==================== MANIFESTS ====================
+
+    def _backup_dirs(self) -> list[Path]:
+        """Backup directories with a manifest, oldest first."""
+        return sorted(
+            path
+            for path in self.backup_dir.glob(f"{BACKUP_PREFIX}*")
+            if path.is_dir() and (path / MANIFEST_NAME).exists()
+        )
+
+    @staticmethod
+    def read_manifest(backup_path: Path) -> dict[str, Any]:
+        with open(backup_path / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _restore_chain(self, backup_path: Path) -> list[Path]:
+        """Backups to restore, from the last full backup to ``backup_path``."""
+        chain = [backup_path]
+        manifest = self.read_manifest(backup_path)
+        while manifest["mode"] == "incremental":
+            parent = self.backup_dir / manifest["parent"]
+            if not (parent / MANIFEST_NAME).exists():
+                raise FileNotFoundError(f"Parent backup not found: {parent}")
+            chain.append(parent)
+            manifest = self.read_manifest(parent)
+        return list(reversed(chain))
+
+    # ==================== BACKUP ====================
 
     async def create_backup(
         self,
@@ -47,9 +259,10 @@ class BackupService:
         include_orders: bool = True,
         include_sync_logs: bool = True,
         compress: bool = True,
+        incremental: bool = False,
     ) -> dict[str, Any]:
         """
-        Create a complete backup of eMAG data.
+        Create a backup of eMAG data.
 
         Args:
             include_products: Include products in backup
@@ -57,64 +270,63 @@ class BackupService:
             include_orders: Include orders in backup
             include_sync_logs: Include sync logs in backup
             compress: Compress backup with gzip
+            incremental: Only back up rows changed since the previous backup
+                (falls back to a full backup when there is none)
 
         Returns:
             Dictionary with backup information
         """
+        included = {
+            "products": include_products,
+            "offers": include_offers,
+            "orders": include_orders,
+            "sync_logs": include_sync_logs,
+        }
+        tables = [BACKUP_TABLES[name] for name, include in included.items() if include]
+
+        backup_path: Path | None = None
         try:
             timestamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%S")
-            backup_data = {
+
+            parent_manifest = None
+            if incremental:
+                previous = self._backup_dirs()
+                if previous:
+                    parent_manifest = self.read_manifest(previous[-1])
+                else:
+                    logger.info("No previous backup found, creating a full backup")
+            mode = "incremental" if parent_manifest else "full"
+            # Carried forward, so tables skipped this time keep their mark
+            watermarks = dict(parent_manifest["watermarks"]) if parent_manifest else {}
+
+            # Assigned once created, so that a name clash never deletes a backup
+            new_path = self.backup_dir / f"{BACKUP_PREFIX}{timestamp}"
+            new_path.mkdir()
+            backup_path = new_path
+            logger.info(f"Starting {mode} backup at {timestamp}")
+
+            table_results = await self._dump_tables(
+                backup_path, tables, compress, watermarks if parent_manifest else {}
+            )
+            for name, result in table_results.items():
+                if result["watermark"] is not None:
+                    watermarks[name] = result["watermark"]
+
+            manifest = {
+                "version": BACKUP_FORMAT_VERSION,
                 "timestamp": timestamp,
                 "created_at": datetime.now(UTC).isoformat(),
-                "version": "1.0",
-                "data": {},
+                "mode": mode,
+                "parent": parent_manifest and f"{BACKUP_PREFIX}{parent_manifest['timestamp']}",
+                "format": "csv",
+                "compressed": compress,
+                "watermarks": watermarks,
+                "tables": table_results,
             }
+            with open(backup_path / MANIFEST_NAME, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
 
-            logger.info(f"Starting backup at {timestamp}")
-
-            # Backup products
-            if include_products:
-                logger.info("Backing up products...")
-                products = await self._backup_products()
-                backup_data["data"]["products"] = products
-                logger.info(f"Backed up {len(products)} products")
-
-            # Backup offers
-            if include_offers:
-                logger.info("Backing up offers...")
-                offers = await self._backup_offers()
-                backup_data["data"]["offers"] = offers
-                logger.info(f"Backed up {len(offers)} offers")
-
-            # Backup orders
-            if include_orders:
-                logger.info("Backing up orders...")
-                orders = await self._backup_orders()
-                backup_data["data"]["orders"] = orders
-                logger.info(f"Backed up {len(orders)} orders")
-
-            # Backup sync logs
-            if include_sync_logs:
-                logger.info("Backing up sync logs...")
-                sync_logs = await self._backup_sync_logs()
-                backup_data["data"]["sync_logs"] = sync_logs
-                logger.info(f"Backed up {len(sync_logs)} sync logs")
-
-            # Save backup to file
-            filename = f"emag_backup_{timestamp}.json"
-            if compress:
-                filename += ".gz"
-
-            backup_path = self.backup_dir / filename
-
-            if compress:
-                with gzip.open(backup_path, "wt", encoding="utf-8") as f:
-                    json.dump(backup_data, f, indent=2, default=str)
-            else:
-                with open(backup_path, "w", encoding="utf-8") as f:
-                    json.dump(backup_data, f, indent=2, default=str)
-
-            file_size = backup_path.stat().st_size
+            file_size = sum(path.stat().st_size for path in backup_path.iterdir())
 
             logger.info(
                 f"Backup completed successfully: {backup_path} "
@@ -125,144 +337,120 @@ class BackupService:
                 "success": True,
                 "backup_path": str(backup_path),
                 "timestamp": timestamp,
+                "mode": mode,
+                "parent": manifest["parent"],
                 "file_size_bytes": file_size,
                 "compressed": compress,
-                "items": {
-                    "products": len(backup_data["data"].get("products", [])),
-                    "offers": len(backup_data["data"].get("offers", [])),
-                    "orders": len(backup_data["data"].get("orders", [])),
-                    "sync_logs": len(backup_data["data"].get("sync_logs", [])),
-                },
+                "items": {name: result["rows"] for name, result in table_results.items()},
             }
 
         except Exception as e:
             logger.error(f"Backup failed: {e}", exc_info=True)
+            # A partial backup would be picked as the parent of the next one
+            if backup_path is not None and backup_path.exists():
+                for path in backup_path.iterdir():
+                    path.unlink()
+                backup_path.rmdir()
             return {"success": False, "error": str(e)}
 
-    async def _backup_products(self) -> list[dict]:
-        """Backup all products."""
-        result = await self.db_session.execute(select(EmagProductV2))
-        products = result.scalars().all()
-
-        return [
-            {
-                "id": str(product.id),
-                "emag_id": product.emag_id,
-                "sku": product.sku,
-                "name": product.name,
-                "account_type": product.account_type,
-                "price": product.price,
-                "stock_quantity": product.stock_quantity,
-                "is_active": product.is_active,
-                "category_id": product.category_id,
-                "brand": product.brand,
-                "description": product.description,
-                "images": product.images,
-                "attributes": product.attributes,
-                "sync_status": product.sync_status,
-                "last_synced_at": product.last_synced_at.isoformat()
-                if product.last_synced_at
-                else None,
-                "created_at": product.created_at.isoformat(),
-                "updated_at": product.updated_at.isoformat(),
-            }
-            for product in products
-        ]
-
-    async def _backup_offers(self) -> list[dict]:
-        """Backup all offers."""
-        result = await self.db_session.execute(select(EmagProductOfferV2))
-        offers = result.scalars().all()
-
-        return [
-            {
-                "id": str(offer.id),
-                "emag_offer_id": offer.emag_offer_id,
-                "product_id": str(offer.product_id),
-                "sku": offer.sku,
-                "account_type": offer.account_type,
-                "price": offer.price,
-                "stock": offer.stock,
-                "status": offer.status,
-                "is_available": offer.is_available,
-                "sync_status": offer.sync_status,
-                "last_synced_at": offer.last_synced_at.isoformat()
-                if offer.last_synced_at
-                else None,
-                "created_at": offer.created_at.isoformat(),
-                "updated_at": offer.updated_at.isoformat(),
-            }
-            for offer in offers
-        ]
-
-    async def _backup_orders(self) -> list[dict]:
-        """Backup all orders."""
-        result = await self.db_session.execute(select(EmagOrder))
-        orders = result.scalars().all()
-
-        return [
-            {
-                "id": str(order.id),
-                "emag_order_id": order.emag_order_id,
-                "account_type": order.account_type,
-                "status": order.status,
-                "type": order.type,
-                "customer_name": order.customer_name,
-                "customer_email": order.customer_email,
-                "total_amount": order.total_amount,
-                "payment_mode_id": order.payment_mode_id,
-                "products": order.products,
-                "sync_status": order.sync_status,
-                "order_date": order.order_date.isoformat()
-                if order.order_date
-                else None,
-                "created_at": order.created_at.isoformat(),
-                "updated_at": order.updated_at.isoformat(),
-            }
-            for order in orders
-        ]
-
-    async def _backup_sync_logs(self, days: int = 30) -> list[dict]:
-        """
-        Backup sync logs from last N days.
-
-        Args:
-            days: Number of days to backup
-        """
-        cutoff = datetime.now(UTC) - timedelta(days=days)
-
-        result = await self.db_session.execute(
-            select(EmagSyncLog).where(EmagSyncLog.started_at >= cutoff)
-        )
-        logs = result.scalars().all()
-
-        return [
-            {
-                "id": str(log.id),
-                "sync_type": log.sync_type,
-                "account_type": log.account_type,
-                "operation": log.operation,
-                "status": log.status,
-                "total_items": log.total_items,
-                "processed_items": log.processed_items,
-                "created_items": log.created_items,
-                "updated_items": log.updated_items,
-                "failed_items": log.failed_items,
-                "duration_seconds": log.duration_seconds,
-                "started_at": log.started_at.isoformat(),
-                "completed_at": log.completed_at.isoformat()
-                if log.completed_at
-                else None,
-            }
-            for log in logs
-        ]
+    async def _dump_tables(
+        self,
+        backup_path: Path,
+        tables: list[BackupTable],
+        compress: bool,
+        since: dict[str, str],
+    ) -> dict[str, dict[str, Any]]:
+        """Dump tables concurrently from one exported snapshot."""
+        engine = self._get_engine()
+        semaphore = asyncio.Semaphore(self.parallel_tables)
+
+        async with engine.connect() as coordinator:
+            pg = await self._driver_connection(coordinator)
+            # Holding this transaction open keeps the snapshot importable
+            async with pg.transaction(isolation="repeatable_read", readonly=True):
+                snapshot = await pg.fetchval("SELECT pg_export_snapshot()")
+                horizon = await pg.fetchval(_SNAPSHOT_HORIZON_SQL) - WATERMARK_OVERLAP
+
+                async def dump(table: BackupTable) -> tuple[str, dict[str, Any]]:
+                    async with semaphore:
+                        return table.name, await self._dump_table(
+                            engine,
+                            snapshot,
+                            horizon,
+                            backup_path,
+                            table,
+                            compress,
+                            since.get(table.name),
+                        )
+
+                results = await asyncio.gather(*(dump(table) for table in tables))
+
+        return dict(results)
+
+    async def _dump_table(
+        self,
+        engine: AsyncEngine,
+        snapshot: str,
+        horizon: datetime,
+        backup_path: Path,
+        table: BackupTable,
+        compress: bool,
+        since: str | None,
+    ) -> dict[str, Any]:
+        """Stream one table to ``<name>.csv[.gz]`` with COPY."""
+        conditions, args = [], []
+        if since is not None:
+            args.append(datetime.fromisoformat(since))
+            conditions.append(f"updated_at >= ${len(args)}")
+        elif table.name == "sync_logs":
+            cutoff = datetime.now(UTC) - timedelta(days=SYNC_LOG_RETENTION_DAYS)
+            args.append(cutoff.replace(tzinfo=None))
+            conditions.append(f"started_at >= ${len(args)}")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = ", ".join(_quote(column) for column in table.columns)
+
+        filename = f"{table.name}.csv" + (".gz" if compress else "")
+        writer = _ChunkWriter(backup_path / filename, compress)
+        try:
+            async with engine.connect() as connection:
+                pg = await self._driver_connection(connection)
+                async with pg.transaction(isolation="repeatable_read", readonly=True):
+                    # snapshot comes from pg_export_snapshot(), not from user input
+                    await pg.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+                    latest = await pg.fetchval(
+                        f"SELECT max(updated_at) FROM {table.qualified_name}"
+                    )
+                    status = await pg.copy_from_query(
+                        f"SELECT {columns} FROM {table.qualified_name}{where}",
+                        *args,
+                        output=writer.write,
+                        format="csv",
+                    )
+        finally:
+            await writer.close()
+
+        rows = _copy_row_count(status)
+        logger.info(f"Backed up {rows} {table.name}")
+        return {
+            "file": filename,
+            "rows": rows,
+            "columns": table.columns,
+            "since": since,
+            "watermark": _next_watermark(latest, horizon, since),
+            "uncompressed_bytes": writer.bytes_in,
+        }
+
+    # ==================== RESTORE ====================
 
     async def restore_backup(self, backup_path: str) -> dict[str, Any]:
         """
-        Restore data from a backup file.
+        Restore data from a backup.
+
+        An incremental backup is restored together with the backups it
+        builds on, oldest first, in one transaction.
 
         Args:
-            backup_path: Path to backup file
+            backup_path: Path to the backup directory
 
         Returns:
             Dictionary with restore results
@@ -270,66 +458,110 @@ class BackupService:
         try:
             logger.info(f"Starting restore from {backup_path}")
 
-            # Load backup data
             path = Path(backup_path)
             if not path.exists():
                 raise FileNotFoundError(f"Backup file not found: {backup_path}")
+            if not path.is_dir():
+                raise ValueError(
+                    "Only backups in the streaming format (version "
+                    f"{BACKUP_FORMAT_VERSION}) can be restored: {backup_path}"
+                )
 
-            if path.suffix == ".gz":
-                with gzip.open(path, "rt", encoding="utf-8") as f:
-                    backup_data = json.load(f)
-            else:
-                with open(path, encoding="utf-8") as f:
-                    backup_data = json.load(f)
-
-            results = {"success": True, "restored": {}}
-
-            # Restore products
-            if "products" in backup_data.get("data", {}):
-                count = await self._restore_products(backup_data["data"]["products"])
-                results["restored"]["products"] = count
-                logger.info(f"Restored {count} products")
-
-            # Restore offers
-            if "offers" in backup_data.get("data", {}):
-                count = await self._restore_offers(backup_data["data"]["offers"])
-                results["restored"]["offers"] = count
-                logger.info(f"Restored {count} offers")
-
-            # Restore orders
-            if "orders" in backup_data.get("data", {}):
-                count = await self._restore_orders(backup_data["data"]["orders"])
-                results["restored"]["orders"] = count
-                logger.info(f"Restored {count} orders")
+            chain = self._restore_chain(path)
+            results = {
+                "success": True,
+                "backups": [backup.name for backup in chain],
+                "restored": {},
+            }
 
-            await self.db_session.commit()
+            async with self._get_engine().connect() as connection:
+                pg = await self._driver_connection(connection)
+                async with pg.transaction():
+                    for backup in chain:
+                        manifest = self.read_manifest(backup)
+                        tables = sorted(
+                            manifest["tables"].items(),
+                            key=lambda item: BACKUP_TABLES[item[0]].restore_order,
+                        )
+                        for name, table_manifest in tables:
+                            count = await self._restore_table(
+                                pg, backup, BACKUP_TABLES[name], table_manifest
+                            )
+                            results["restored"][name] = results["restored"].get(name, 0) + count
+                            logger.info(f"Restored {count} {name} from {backup.name}")
 
             logger.info("Restore completed successfully")
             return results
 
         except Exception as e:
             logger.error(f"Restore failed: {e}", exc_info=True)
-            await self.db_session.rollback()
             return {"success": False, "error": str(e)}
 
-    async def _restore_products(self, products: list[dict]) -> int:
-        """Restore products from backup data."""
-        # Implementation would merge/update existing products
-        # For now, just count
-        return len(products)
-
-    async def _restore_offers(self, offers: list[dict]) -> int:
-        """Restore offers from backup data."""
-        return len(offers)
+    async def _restore_table(
+        self,
+        pg,
+        backup_path: Path,
+        table: BackupTable,
+        table_manifest: dict[str, Any],
+    ) -> int:
+        """COPY one file into a staging table and upsert it into the table."""
+        columns = table_manifest["columns"]
+        column_list = ", ".join(_quote(column) for column in columns)
+        staging = f"restore_{table.table.name}"
+
+        await pg.execute(
+            f"CREATE TEMPORARY TABLE {staging} "
+            f"(LIKE {table.qualified_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        await pg.copy_to_table(
+            staging,
+            source=_read_chunks(backup_path / table_manifest["file"]),
+            columns=columns,
+            format="csv",
+        )
 
-    async def _restore_orders(self, orders: list[dict]) -> int:
-        """Restore orders from backup data."""
-        return len(orders)
+        updates = ", ".join(
+            f"{_quote(column)} = EXCLUDED.{_quote(column)}"
+            for column in columns
+            if column not in table.primary_key
+        )
+        status = await pg.execute(
+            f"INSERT INTO {table.qualified_name} ({column_list}) "
+            f"SELECT {column_list} FROM {staging} "
+            f"ON CONFLICT ({', '.join(_quote(column) for column in table.primary_key)}) "
+            f"DO UPDATE SET {updates}"
+        )
+        # A later backup of the chain reuses the staging table name
+        await pg.execute(f"DROP TABLE {staging}")
+        return _copy_row_count(status)
+
+    # ==================== MAINTENANCE ====================
+
+    def _backup_entries(self) -> list[Path]:
+        """Backup directories and legacy single-file backups."""
+        return list(self.backup_dir.glob(f"{BACKUP_PREFIX}*"))
+
+    @staticmethod
+    def _entry_size(path: Path) -> int:
+        if path.is_dir():
+            return sum(child.stat().st_size for child in path.iterdir())
+        return path.stat().st_size
+
+    @staticmethod
+    def _delete_entry(path: Path) -> None:
+        if path.is_dir():
+            for child in path.iterdir():
+                child.unlink()
+            path.rmdir()
+        else:
+            path.unlink()
 
     async def cleanup_old_backups(self, days: int = 30) -> dict[str, Any]:
         """
         Delete backups older than specified days.
 
+        Backups that a kept incremental backup builds on are kept as well.
+
         Args:
             days: Number of days to keep backups
 
@@ -337,19 +569,27 @@ class BackupService:
             Dictionary with cleanup results
         """
         try:
-            cutoff = datetime.now(UTC) - timedelta(days=days)
+            cutoff = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=days)
             deleted_files = []
             total_size = 0
 
-            for backup_file in self.backup_dir.glob("emag_backup_*.json*"):
+            # Parents of recent incremental backups are still needed to restore them
+            needed: set[str] = set()
+            for backup_dir in self._backup_dirs():
+                try:
+                    if _parse_timestamp(backup_dir.name) >= cutoff:
+                        needed.update(chain.name for chain in self._restore_chain(backup_dir))
+                except Exception as e:
+                    logger.warning(f"Could not read backup {backup_dir}: {e}")
+
+            for backup_file in self._backup_entries():
                 # Extract timestamp from filename
                 try:
-                    timestamp_str = backup_file.stem.replace("emag_backup_", "")
-                    file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
+                    file_time = _parse_timestamp(backup_file.name)
 
-                    if file_time < cutoff:
-                        file_size = backup_file.stat().st_size
-                        backup_file.unlink()
+                    if file_time < cutoff and backup_file.name not in needed:
+                        file_size = self._entry_size(backup_file)
+                        self._delete_entry(backup_file)
                         deleted_files.append(str(backup_file))
                         total_size += file_size
                         logger.info(f"Deleted old backup: {backup_file}")
@@ -377,37 +617,49 @@ class BackupService:
         """
         backups = []
 
-        for backup_file in sorted(
-            self.backup_dir.glob("emag_backup_*.json*"), reverse=True
-        ):
+        for backup_file in sorted(self._backup_entries(), reverse=True):
             try:
-                timestamp_str = backup_file.stem.replace("emag_backup_", "")
-                file_time = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                file_size = backup_file.stat().st_size
-
-                backups.append(
-                    {
-                        "filename": backup_file.name,
-                        "path": str(backup_file),
-                        "timestamp": timestamp_str,
-                        "created_at": file_time.isoformat(),
-                        "size_bytes": file_size,
-                        "size_mb": file_size / 1024 / 1024,
-                        "compressed": backup_file.suffix == ".gz",
-                    }
-                )
+                timestamp_str = backup_file.name[len(BACKUP_PREFIX) :][:15]
+                file_time = _parse_timestamp(backup_file.name)
+                file_size = self._entry_size(backup_file)
+
+                info = {
+                    "filename": backup_file.name,
+                    "path": str(backup_file),
+                    "timestamp": timestamp_str,
+                    "created_at": file_time.isoformat(),
+                    "size_bytes": file_size,
+                    "size_mb": file_size / 1024 / 1024,
+                    "compressed": backup_file.suffix == ".gz",
+                    "mode": "full",
+                    "parent": None,
+                    "restorable": False,
+                }
+                if backup_file.is_dir():
+                    manifest = self.read_manifest(backup_file)
+                    info.update(
+                        compressed=manifest["compressed"],
+                        mode=manifest["mode"],
+                        parent=manifest["parent"],
+                        restorable=True,
+                        items={
+                            name: table["rows"] for name, table in manifest["tables"].items()
+                        },
+                    )
+                backups.append(info)
             except Exception as e:
                 logger.warning(f"Could not process backup file {backup_file}: {e}")
 
         return backups
 
 
-async def scheduled_backup(db_session: AsyncSession):
+async def scheduled_backup(db_session: AsyncSession, incremental: bool = False):
     """
     Scheduled backup task to run periodically.
 
     Args:
         db_session: Database session
+        incremental: Only back up rows changed since the previous backup
     """
     try:
         backup_service = BackupService(db_session)
@@ -418,6 +670,7 @@ async def scheduled_backup(db_session: AsyncSession):
             include_orders=True,
             include_sync_logs=True,
             compress=True,
+            incremental=incremental,
         )
 
         if result["success"]:
@@ -0,0 +1,347 @@
+"""
+Change feed for real-time WebSocket updates.
+
+Sync services and order ingestion publish each change once to the feed;
+WebSocket endpoints subscribe to it and fan the events out to their
+connections. This replaces per-socket polling of ``emag_sync_logs`` and
+``emag_orders``, so database load no longer grows with the number of open
+browser tabs.
+
+Events travel over Redis pub/sub, which makes the feed cluster-wide: an
+event published by a Celery worker reaches the sockets held by every API
+process. Each process keeps a single Redis subscription, started when the
+first local subscriber registers. When Redis is disabled or unreachable,
+events are delivered to the subscribers of the publishing process only.
+
+``FanoutConnectionManager`` gives every WebSocket a bounded queue drained
+by its own sender task, so a broadcast never waits on a slow client. A
+client whose queue overflows, or whose send does not complete in time, is
+evicted with close code 1013 (try again later) and can reconnect.
+"""
+
+import asyncio
+import json
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import UTC, datetime
+from typing import Any
+
+from fastapi import WebSocket
+from redis.asyncio import Redis
+
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Topics
+SYNC_PROGRESS = "sync.progress"  # progress of running sync jobs
+SYNC_EVENTS = "sync.events"  # ad-hoc messages for sync progress clients
+ORDER_EVENTS = "orders"  # new orders, status changes, AWBs, invoices
+USER_EVENTS = "users"  # users whose cached credentials must be dropped
+CACHE_EVENTS = "cache"  # invalidated cache tags and keys
+
+# Seconds to wait before re-subscribing after the Redis connection drops
+RESUBSCRIBE_DELAY = 5.0
+
+# How long publishers stay local after a failed publish before trying Redis again
+REDIS_RETRY_AFTER = 30.0
+
+# Messages buffered per WebSocket before the client is evicted
+DEFAULT_QUEUE_SIZE = 100
+
+# Seconds a single send may take before the client is evicted
+DEFAULT_SEND_TIMEOUT = 10.0
+
+# WebSocket close code for evicted clients ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+Subscriber = Callable[[str, dict[str, Any]], Awaitable[None]]
+
+
+class ChangeFeed:
+    """Publish/subscribe hub shared by the processes of a deployment."""
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        channel_prefix: str = "magflow:changefeed",
+        use_redis: bool | None = None,
+    ):
+        """
+        Initialize the feed.
+
+        Args:
+            redis: Redis client (default: the shared application client of
+                the running event loop)
+            channel_prefix: Prefix of the Redis pub/sub channels
+            use_redis: Whether to go through Redis (default: REDIS_ENABLED)
+        """
+        self._redis = redis
+        self.channel_prefix = channel_prefix
+        self.use_redis = settings.REDIS_ENABLED if use_redis is None else use_redis
+        self._subscribers: dict[str, list[Subscriber]] = {}
+        self._listener: asyncio.Task | None = None
+        self._listening = False
+        self._redis_down_until = 0.0
+        self.published = 0
+        self.delivered = 0
+
+    def channel(self, topic: str) -> str:
+        return f"{self.channel_prefix}:{topic}"
+
+    async def _get_redis(self) -> Redis:
+        # The shared client is per event loop (Celery tasks each run their
+        # own), so it is looked up on every call instead of being kept
+        if self._redis is not None:
+            return self._redis
+        return await get_redis()
+
+    # ==================== PUBLISHING ====================
+
+    async def publish(self, topic: str, event: dict[str, Any]) -> None:
+        """Publish one event. Never raises: a lost update must not fail a sync."""
+        await self.publish_many(topic, [event])
+
+    async def publish_many(self, topic: str, events: Iterable[dict[str, Any]]) -> None:
+        """Publish several events of one topic in a single round trip. Never raises."""
+        timestamp = datetime.now(UTC).isoformat()
+        events = [{"timestamp": timestamp, **event} for event in events]
+        if not events:
+            return
+        self.published += len(events)
+
+        if self.use_redis and time.monotonic() >= self._redis_down_until:
+            try:
+                redis = await self._get_redis()
+                async with redis.pipeline(transaction=False) as pipe:
+                    for event in events:
+                        pipe.publish(self.channel(topic), json.dumps(event, default=str))
+                    await pipe.execute()
+                # The local listener delivers them like any other message
+                if self._listening:
+                    return
+            except Exception as e:
+                logger.warning(
+                    f"Change feed publish to Redis failed, delivering locally "
+                    f"for {REDIS_RETRY_AFTER:.0f}s: {e}"
+                )
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+        for event in events:
+            await self._dispatch(topic, event)
+
+    # ==================== SUBSCRIBING ====================
+
+    def subscribe(self, topic: str, callback: Subscriber) -> Callable[[], None]:
+        """Call ``callback(topic, event)`` for every event of ``topic``.
+
+        Callbacks run on the listener task and must not block; hand slow
+        work to a queue. Returns a function removing the subscription.
+        """
+        self._subscribers.setdefault(topic, []).append(callback)
+        # A listener started by an earlier Celery task died with its loop
+        if self.use_redis and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen())
+
+        def unsubscribe() -> None:
+            callbacks = self._subscribers.get(topic, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+        return unsubscribe
+
+    async def _dispatch(self, topic: str, event: dict[str, Any]) -> None:
+        for callback in list(self._subscribers.get(topic, ())):
+            try:
+                await callback(topic, event)
+                self.delivered += 1
+            except Exception as e:
+                logger.error(f"Change feed subscriber failed on {topic}: {e}", exc_info=True)
+
+    async def _listen(self) -> None:
+        """Relay messages from Redis to local subscribers, reconnecting on errors."""
+        prefix = self.channel("")
+        while True:
+            pubsub = None
+            try:
+                redis = await self._get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.psubscribe(f"{prefix}*")
+                self._listening = True
+                logger.info("Change feed subscribed to Redis")
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None or message["type"] != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    try:
+                        event = json.loads(message["data"])
+                    except ValueError:
+                        logger.warning(f"Ignoring malformed change feed message on {channel}")
+                        continue
+                    await self._dispatch(channel[len(prefix) :], event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Change feed lost its Redis subscription, retrying in "
+                    f"{RESUBSCRIBE_DELAY:.0f}s: {e}"
+                )
+            finally:
+                self._listening = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception as e:
+                        logger.debug(f"Error closing change feed subscription: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+    async def close(self) -> None:
+        """Stop the Redis listener."""
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "backend": "redis" if self._listening else "local",
+            "topics": {topic: len(callbacks) for topic, callbacks in self._subscribers.items()},
+            "published": self.published,
+            "delivered": self.delivered,
+        }
+
+
+_change_feed: ChangeFeed | None = None
+
+
+def get_change_feed() -> ChangeFeed:
+    """Get the process-wide change feed."""
+    global _change_feed
+    if _change_feed is None:
+        _change_feed = ChangeFeed()
+    return _change_feed
+
+
+class _Connection:
+    """A WebSocket with its outgoing queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: asyncio.Task | None = None
+
+
+class FanoutConnectionManager:
+    """WebSocket connections grouped in channels, with per-client send queues."""
+
+    def __init__(
+        self,
+        channels: Iterable[str] = (),
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        send_timeout: float = DEFAULT_SEND_TIMEOUT,
+    ):
+        self.active_connections: dict[str, set[WebSocket]] = {
+            channel: set() for channel in (*channels, "all")
+        }
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.evicted = 0
+        self._connections: dict[WebSocket, _Connection] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    async def connect(self, websocket: WebSocket, channel: str = "all"):
+        """Accept and register a new WebSocket connection."""
+        await websocket.accept()
+        connection = _Connection(websocket, self.queue_size)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        self._connections[websocket] = connection
+        self.active_connections[channel].add(websocket)
+        self.active_connections["all"].add(websocket)
+        logger.info(
+            f"WebSocket connected on channel {channel}. Total connections: {len(self._connections)}"
+        )
+
+    def disconnect(self, websocket: WebSocket):
+        """Remove a WebSocket connection from all channels."""
+        for connections in self.active_connections.values():
+            connections.discard(websocket)
+        connection = self._connections.pop(websocket, None)
+        if connection is None:
+            return
+        if connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+        logger.info(f"WebSocket disconnected. Total connections: {len(self._connections)}")
+
+    async def send_personal_message(self, message: dict[str, Any], websocket: WebSocket):
+        """Queue a message for a specific WebSocket."""
+        self._enqueue(websocket, message)
+
+    async def broadcast(self, message: dict[str, Any], channel: str = "all") -> int:
+        """Queue a message for every connection on a channel.
+
+        Returns the number of connections the message was queued for.
+        """
+        queued = 0
+        for websocket in list(self.active_connections.get(channel, ())):
+            if self._enqueue(websocket, message):
+                queued += 1
+        return queued
+
+    def get_connection_count(self, channel: str = "all") -> int:
+        """Get the number of active connections on a channel."""
+        return len(self.active_connections.get(channel, set()))
+
+    async def close(self) -> None:
+        """Drop every connection and stop their sender tasks."""
+        senders = [connection.sender for connection in self._connections.values()]
+        for websocket in list(self._connections):
+            self.disconnect(websocket)
+        await asyncio.gather(*senders, *self._closing, return_exceptions=True)
+
+    def _enqueue(self, websocket: WebSocket, message: dict[str, Any]) -> bool:
+        connection = self._connections.get(websocket)
+        if connection is None:
+            return False
+        try:
+            connection.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._evict(connection, f"{self.queue_size} messages behind")
+            return False
+        return True
+
+    def _evict(self, connection: _Connection, reason: str) -> None:
+        logger.warning(f"Evicting slow WebSocket client ({reason})")
+        self.evicted += 1
+        self.disconnect(connection.websocket)
+        task = asyncio.create_task(self._close(connection.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket) -> None:
+        try:
+            async with asyncio.timeout(self.send_timeout):
+                await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception as e:
+            logger.debug(f"Error closing evicted websocket: {e}")
+
+    async def _send_loop(self, connection: _Connection) -> None:
+        websocket = connection.websocket
+        while True:
+            message = await connection.queue.get()
+            try:
+                # Unlike wait_for, timeout() never swallows a cancellation
+                # racing with a completed send
+                async with asyncio.timeout(self.send_timeout):
+                    await websocket.send_json(message)
+            except TimeoutError:
+                self._evict(connection, f"send took over {self.send_timeout:.0f}s")
+                return
+            except Exception as e:
+                logger.error(f"Error sending message to websocket: {e}")
+                self.disconnect(websocket)
+                return
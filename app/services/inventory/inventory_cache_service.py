@@ -1,14 +1,17 @@
 """
 Inventory Caching Service
 
-Provides Redis caching for inventory statistics and frequently accessed data
-to reduce database load and improve response times.
+Caches inventory statistics and frequently accessed data in the tiered cache
+(process memory in front of Redis) to reduce database load and improve
+response times. Entries are tagged by kind and account, so invalidation
+bumps tag versions instead of scanning keys.
 """
 
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from app.core.logging import get_logger
-from app.services.infrastructure.redis_cache import RedisCache
+from app.core.tiered_cache import TieredCache, get_tiered_cache
 
 logger = get_logger(__name__)
 
@@ -22,10 +25,19 @@ class InventoryCacheService:
     SEARCH_RESULTS_TTL = 600  # 10 minutes
     PRODUCT_DETAILS_TTL = 900  # 15 minutes
 
-    def __init__(self):
+    # Seconds expired statistics are still served while they are recomputed
+    STATISTICS_STALE_TTL = 60
+
+    # Invalidation tags
+    TAG = "inventory"
+    STATISTICS_TAG = "inventory:stats"
+    LOW_STOCK_TAG = "inventory:low_stock"
+    SEARCH_TAG = "inventory:search"
+
+    def __init__(self, cache: TieredCache | None = None):
         """Initialize the cache service."""
-        self.cache = RedisCache()
-        self.cache_prefix = "inventory:"
+        self.cache = cache or get_tiered_cache()
+        self.cache_prefix = "inventory"
 
     def _make_key(self, key_type: str, *args: str) -> str:
         """
@@ -41,6 +53,10 @@ class InventoryCacheService:
         parts = [self.cache_prefix, key_type] + list(args)
         return ":".join(str(p) for p in parts if p)
 
+    def _tags(self, kind_tag: str, account_type: str | None = None) -> list[str]:
+        """Tags of an entry: all inventory, its kind and its account."""
+        return [self.TAG, kind_tag, f"{self.TAG}:account:{account_type or 'all'}"]
+
     # ========================================================================
     # Statistics Caching
     # ========================================================================
@@ -58,7 +74,7 @@ class InventoryCacheService:
             Cached statistics or None if not found
         """
         key = self._make_key("stats", account_type or "all")
-        data = await self.cache.get(key)
+        data = await self.cache.get(key, self._tags(self.STATISTICS_TAG, account_type))
 
         if data:
             logger.debug(f"Cache hit for statistics: {key}")
@@ -87,16 +103,52 @@ class InventoryCacheService:
         key = self._make_key("stats", account_type or "all")
         ttl = ttl or self.STATISTICS_TTL
 
-        success = await self.cache.set(key, statistics, ttl=ttl)
+        success = await self.cache.set(
+            key,
+            statistics,
+            ttl,
+            stale_ttl=self.STATISTICS_STALE_TTL,
+            tags=self._tags(self.STATISTICS_TAG, account_type),
+        )
         if success:
             logger.debug(f"Cached statistics: {key} (TTL: {ttl}s)")
 
         return success
 
+    async def get_or_compute_statistics(
+        self,
+        compute: Callable[[], Awaitable[dict[str, Any]]],
+        account_type: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Get cached inventory statistics, computing them on a miss.
+
+        Concurrent misses share one call of ``compute``; expired statistics
+        are served for STATISTICS_STALE_TTL more seconds while one process
+        recomputes them in the background.
+
+        Args:
+            compute: Coroutine function computing the statistics
+            account_type: Optional account type filter
+
+        Returns:
+            Statistics data
+        """
+        return await self.cache.get_or_load(
+            self._make_key("stats", account_type or "all"),
+            compute,
+            self.STATISTICS_TTL,
+            stale_ttl=self.STATISTICS_STALE_TTL,
+            tags=self._tags(self.STATISTICS_TAG, account_type),
+        )
+
     async def invalidate_statistics(self, account_type: str | None = None) -> bool:
         """
         Invalidate cached statistics.
 
+        The unfiltered statistics include every account, so they are dropped
+        together with those of ``account_type``.
+
         Args:
             account_type: Optional account type filter
 
@@ -104,12 +156,11 @@ class InventoryCacheService:
             True if invalidated successfully
         """
         if account_type:
-            key = self._make_key("stats", account_type)
-            return await self.cache.delete(key)
+            await self.cache.delete(self._make_key("stats", account_type))
+            await self.cache.delete(self._make_key("stats", "all"))
         else:
-            # Invalidate all statistics
-            pattern = self._make_key("stats", "*")
-            return await self.cache.delete_pattern(pattern)
+            await self.cache.invalidate_tags(self.STATISTICS_TAG)
+        return True
 
     # ========================================================================
     # Low Stock List Caching
@@ -142,7 +193,7 @@ class InventoryCacheService:
             str(page_size),
         )
 
-        data = await self.cache.get(key)
+        data = await self.cache.get(key, self._tags(self.LOW_STOCK_TAG, account_type))
         if data:
             logger.debug(f"Cache hit for low stock list: {key}")
             return data
@@ -181,7 +232,9 @@ class InventoryCacheService:
         )
         ttl = ttl or self.LOW_STOCK_LIST_TTL
 
-        return await self.cache.set(key, products_data, ttl=ttl)
+        return await self.cache.set(
+            key, products_data, ttl, tags=self._tags(self.LOW_STOCK_TAG, account_type)
+        )
 
     # ========================================================================
     # Search Results Caching
@@ -204,7 +257,7 @@ class InventoryCacheService:
         normalized_query = query.lower().strip()
         key = self._make_key("search", normalized_query, str(limit))
 
-        return await self.cache.get(key)
+        return await self.cache.get(key, self._tags(self.SEARCH_TAG))
 
     async def set_search_results(
         self,
@@ -229,7 +282,7 @@ class InventoryCacheService:
         key = self._make_key("search", normalized_query, str(limit))
         ttl = ttl or self.SEARCH_RESULTS_TTL
 
-        return await self.cache.set(key, results, ttl=ttl)
+        return await self.cache.set(key, results, ttl, tags=self._tags(self.SEARCH_TAG))
 
     # ========================================================================
     # Cache Invalidation
@@ -242,13 +295,10 @@ class InventoryCacheService:
         Returns:
             True if invalidated successfully
         """
-        pattern = self._make_key("*")
-        deleted = await self.cache.delete_pattern(pattern)
-
-        if deleted:
-            logger.info(f"Invalidated all inventory caches (pattern: {pattern})")
+        await self.cache.invalidate_tags(self.TAG)
+        logger.info("Invalidated all inventory caches")
 
-        return deleted
+        return True
 
     async def invalidate_on_update(self, account_type: str | None = None) -> None:
         """
@@ -257,12 +307,14 @@ class InventoryCacheService:
         Args:
             account_type: Account type that was updated
         """
-        # Invalidate statistics
-        await self.invalidate_statistics(account_type)
-
-        # Invalidate low stock lists
-        pattern = self._make_key("low_stock", "*")
-        await self.cache.delete_pattern(pattern)
+        # Statistics, low stock lists and search results of the account, plus
+        # the unfiltered ones that include it
+        tags = [f"{self.TAG}:account:all", self.SEARCH_TAG]
+        if account_type:
+            tags.append(f"{self.TAG}:account:{account_type}")
+        else:
+            tags.append(self.TAG)
+        await self.cache.invalidate_tags(*tags)
 
         logger.info(f"Invalidated caches for account: {account_type or 'all'}")
 
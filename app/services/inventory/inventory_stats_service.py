@@ -0,0 +1,223 @@
+"""
+SQL-side aggregates for eMAG inventory statistics and stock alerts.
+
+Statistics are one grouped query of ``FILTER`` aggregates over the stock,
+price and account columns, so the database returns a single row however
+large the catalogue is. Alert and export readers select only the columns
+they render instead of whole ``EmagProductV2`` rows with their JSONB
+payloads (``raw_emag_data``, ``images``, ``attributes``, ...).
+
+``idx_emag_products_stock`` (account_type, stock_quantity) INCLUDE (price)
+lets these queries run as index-only scans.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import Select, and_, func, or_, select, true
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.emag_models import EmagProductV2
+
+# Statistics buckets: 0 = out of stock, <= CRITICAL, <= LOW_STOCK
+CRITICAL_THRESHOLD = 5
+LOW_STOCK_THRESHOLD = 10
+
+# Stock alert severities: critical = 0, warning <= WARNING, info <= INFO
+ALERT_WARNING_THRESHOLD = 10
+ALERT_INFO_THRESHOLD = 50
+
+# Low stock export: products at or below this level, critical up to 10
+EXPORT_LOW_STOCK_THRESHOLD = 20
+EXPORT_CRITICAL_THRESHOLD = 10
+
+ACCOUNT_TYPES = ("main", "fbe")
+
+# Columns rendered by the stock alerts endpoint
+ALERT_COLUMNS = (
+    EmagProductV2.id,
+    EmagProductV2.emag_id,
+    EmagProductV2.name,
+    EmagProductV2.sku,
+    EmagProductV2.account_type,
+    EmagProductV2.stock_quantity,
+    EmagProductV2.price,
+    EmagProductV2.updated_at,
+)
+
+# Columns rendered by the low stock list and its Excel export
+LOW_STOCK_COLUMNS = (
+    EmagProductV2.id,
+    EmagProductV2.emag_id,
+    EmagProductV2.name,
+    EmagProductV2.sku,
+    EmagProductV2.part_number_key,
+    EmagProductV2.account_type,
+    EmagProductV2.stock_quantity,
+    EmagProductV2.price,
+    EmagProductV2.currency,
+    EmagProductV2.status,
+    EmagProductV2.brand,
+    EmagProductV2.emag_category_name,
+    EmagProductV2.ean,
+    EmagProductV2.updated_at,
+)
+
+
+def _stock():
+    return func.coalesce(EmagProductV2.stock_quantity, 0)
+
+
+def statistics_query(account_type: str | None = None) -> Select:
+    """
+    Build the single-row statistics query.
+
+    The per-account product counts cover the whole catalogue, every other
+    figure only the products of ``account_type`` (all when None).
+
+    Args:
+        account_type: Optional account type filter
+
+    Returns:
+        Select returning one row of aggregates
+    """
+    stock = _stock()
+    scope = EmagProductV2.account_type == account_type if account_type else true()
+
+    def count(*conditions):
+        return func.count().filter(and_(scope, *conditions))
+
+    columns = [
+        count().label("total_items"),
+        count(stock == 0).label("out_of_stock"),
+        count(stock != 0, stock <= CRITICAL_THRESHOLD).label("critical"),
+        count(stock > CRITICAL_THRESHOLD, stock <= LOW_STOCK_THRESHOLD).label("low_stock"),
+        func.coalesce(func.sum(stock).filter(scope), 0).label("total_stock"),
+        func.coalesce(
+            func.sum(stock * func.coalesce(EmagProductV2.price, 0)).filter(scope), 0
+        ).label("total_value"),
+    ]
+    columns += [
+        func.count().filter(EmagProductV2.account_type == account).label(f"count_{account}")
+        for account in ACCOUNT_TYPES
+    ]
+    return select(*columns).select_from(EmagProductV2)
+
+
+def statistics_from_row(row: Row | Any) -> dict[str, Any]:
+    """Turn the aggregate row into the statistics payload."""
+    total = row.total_items or 0
+    out_of_stock = row.out_of_stock or 0
+    in_stock = total - out_of_stock
+    return {
+        "total_items": total,
+        "out_of_stock": out_of_stock,
+        "critical": row.critical or 0,
+        "low_stock": row.low_stock or 0,
+        "in_stock": in_stock,
+        "needs_reorder": out_of_stock + (row.critical or 0) + (row.low_stock or 0),
+        "total_value": round(float(row.total_value or 0), 2),
+        "stock_health_percentage": round(in_stock / total * 100, 2) if total else 0,
+        "average_stock_level": round(float(row.total_stock or 0) / total, 2) if total else 0,
+        "by_account": {
+            account: getattr(row, f"count_{account}") or 0 for account in ACCOUNT_TYPES
+        },
+        "thresholds": {
+            "critical": CRITICAL_THRESHOLD,
+            "low_stock": LOW_STOCK_THRESHOLD,
+        },
+    }
+
+
+async def compute_inventory_statistics(
+    db: AsyncSession, account_type: str | None = None
+) -> dict[str, Any]:
+    """
+    Compute inventory statistics with one aggregate query.
+
+    Args:
+        db: Database session
+        account_type: Optional account type filter (normalized, lowercase)
+
+    Returns:
+        Statistics payload of the statistics endpoint
+    """
+    row = (await db.execute(statistics_query(account_type))).one()
+    return statistics_from_row(row)
+
+
+def stock_alerts_query(
+    severity: str | None = None,
+    account_type: str | None = None,
+    limit: int = 50,
+) -> Select:
+    """
+    Build the stock alerts query, lowest stock first.
+
+    Args:
+        severity: critical (no stock), warning, info or None for all alerts
+        account_type: Optional account type filter
+        limit: Maximum number of alerts
+    """
+    stock = EmagProductV2.stock_quantity
+    if severity == "critical":
+        condition = or_(stock == 0, stock.is_(None))
+    elif severity == "warning":
+        condition = and_(stock > 0, stock <= ALERT_WARNING_THRESHOLD)
+    elif severity == "info":
+        condition = and_(stock > ALERT_WARNING_THRESHOLD, stock <= ALERT_INFO_THRESHOLD)
+    else:
+        condition = or_(stock <= ALERT_INFO_THRESHOLD, stock.is_(None))
+
+    query = select(*ALERT_COLUMNS).where(condition)
+    if account_type:
+        query = query.where(EmagProductV2.account_type == account_type)
+    return query.order_by(stock.asc().nulls_first()).limit(limit)
+
+
+async def fetch_stock_alert_rows(
+    db: AsyncSession,
+    severity: str | None = None,
+    account_type: str | None = None,
+    limit: int = 50,
+) -> Sequence[Row]:
+    """Rows (``ALERT_COLUMNS``) of the products to alert on."""
+    return (await db.execute(stock_alerts_query(severity, account_type, limit))).all()
+
+
+def low_stock_export_query(
+    account_type: str | None = None, stock_status: str | None = None
+) -> Select:
+    """
+    Build the low stock export query, lowest stock first.
+
+    Args:
+        account_type: Optional account type filter
+        stock_status: out_of_stock, critical, low_stock or None for all
+    """
+    stock = EmagProductV2.stock_quantity
+    query = select(*LOW_STOCK_COLUMNS).where(
+        or_(stock <= EXPORT_LOW_STOCK_THRESHOLD, stock.is_(None))
+    )
+    if account_type:
+        query = query.where(EmagProductV2.account_type == account_type)
+
+    if stock_status == "out_of_stock":
+        query = query.where(or_(stock == 0, stock.is_(None)))
+    elif stock_status == "critical":
+        query = query.where(and_(stock > 0, stock <= EXPORT_CRITICAL_THRESHOLD))
+    elif stock_status == "low_stock":
+        query = query.where(
+            and_(stock > EXPORT_CRITICAL_THRESHOLD, stock <= EXPORT_LOW_STOCK_THRESHOLD)
+        )
+    return query.order_by(stock.asc().nulls_first())
+
+
+async def fetch_low_stock_export_rows(
+    db: AsyncSession,
+    account_type: str | None = None,
+    stock_status: str | None = None,
+) -> Sequence[Row]:
+    """Rows (``LOW_STOCK_COLUMNS``) of the products to export."""
+    return (await db.execute(low_stock_export_query(account_type, stock_status))).all()
@@ -0,0 +1,443 @@
+"""
+Daily sales rollup maintenance and queries.
+
+``app.product_sales_daily`` holds sold quantities per product, day and
+source (sales orders, generic orders). eMAG orders reference products by
+``part_number_key`` or SKU, often before the product is mapped locally, so
+``app.emag_sales_daily`` keeps their quantities per reference and readers
+resolve references to products. Days touched by an order write are
+recomputed from the source tables by an ``after_flush`` listener, inside the
+same transaction, so the rollup never drifts from the orders it summarizes.
+
+On PostgreSQL a recompute holds a transaction-level advisory lock per
+(source, day): two transactions writing orders of the same day take turns
+instead of both inserting the day's rows.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import async_session_factory
+from app.core.logging import get_logger
+from app.db.base_class import utc_now
+from app.models.derived_table_build import DerivedTableBuild
+from app.models.emag_models import EmagOrder, EmagProductV2
+from app.models.emag_sales_daily import EmagSalesDaily
+from app.models.order import Order, OrderLine
+from app.models.product import Product
+from app.models.product_sales_daily import ProductSalesDaily
+from app.models.sales import SalesOrder, SalesOrderLine
+
+logger = get_logger(__name__)
+
+SOURCE_EMAG = "emag"
+SOURCE_SALES_ORDERS = "sales_orders"
+SOURCE_ORDERS = "orders"
+
+# Order states counted as sold, per source
+EMAG_SOLD_STATUSES = [3, 4]  # 3=prepared, 4=finalized
+SALES_ORDER_SOLD_STATUSES = ["confirmed", "processing", "shipped", "delivered"]
+ORDER_SOLD_STATUSES = ["confirmed", "processing", "shipped", "delivered", "completed"]
+
+# Attributes whose change moves quantities between rollup rows
+_EMAG_ORDER_FIELDS = ("status", "products", "order_date")
+_ORDER_FIELDS = ("status", "order_date")
+_LINE_FIELDS = ("product_id", "quantity")
+
+# First key of the advisory locks serializing recomputes of one (source, day)
+_ROLLUP_LOCK_NAMESPACE = 7_204_117
+
+_LOCK_DAYS = text(
+    """
+    SELECT count(pg_advisory_xact_lock(:namespace, hashtext(day_key)))
+    FROM unnest(CAST(:day_keys AS text[])) AS day_key
+    """
+)
+
+
+def _day_filter(column, days: set[date] | None):
+    """Restrict a datetime column to the given days (None = no restriction)."""
+    if days is None:
+        return None
+    return or_(
+        *(
+            and_(
+                column >= datetime.combine(day, datetime.min.time()),
+                column < datetime.combine(day + timedelta(days=1), datetime.min.time()),
+            )
+            for day in sorted(days)
+        )
+    )
+
+
+def _emag_quantities(connection: Connection, days: set[date] | None) -> dict[tuple[str, date], int]:
+    """Sum eMAG order line quantities per (product reference, day)."""
+    stmt = select(EmagOrder.products, EmagOrder.order_date).where(
+        and_(
+            EmagOrder.status.in_(EMAG_SOLD_STATUSES),
+            EmagOrder.products.isnot(None),
+            EmagOrder.order_date.isnot(None),
+        )
+    )
+    day_filter = _day_filter(EmagOrder.order_date, days)
+    if day_filter is not None:
+        stmt = stmt.where(day_filter)
+
+    quantities: dict[tuple[str, date], int] = defaultdict(int)
+    for products_json, order_date in connection.execute(stmt):
+        if not isinstance(products_json, list):
+            continue
+        for product_item in products_json:
+            # eMAG products structure: {"part_number_key": "SKU", "quantity": 1, ...}
+            sku = product_item.get("part_number_key") or product_item.get("sku")
+            if sku:
+                quantities[(sku, order_date.date())] += int(product_item.get("quantity") or 0)
+    return quantities
+
+
+def _line_quantities(
+    connection: Connection,
+    line_model,
+    order_model,
+    order_fk,
+    statuses: list[str],
+    days: set[date] | None,
+) -> dict[tuple[int, date], int]:
+    """Sum order line quantities per (product, day) for a header/line pair."""
+    stmt = (
+        select(line_model.product_id, line_model.quantity, order_model.order_date)
+        .join(order_model, order_fk == order_model.id)
+        .where(
+            and_(
+                order_model.status.in_(statuses),
+                order_model.order_date.isnot(None),
+            )
+        )
+    )
+    day_filter = _day_filter(order_model.order_date, days)
+    if day_filter is not None:
+        stmt = stmt.where(day_filter)
+
+    quantities: dict[tuple[int, date], int] = defaultdict(int)
+    for product_id, quantity, order_date in connection.execute(stmt):
+        quantities[(product_id, order_date.date())] += int(quantity or 0)
+    return quantities
+
+
+_SOURCE_QUANTITIES = {
+    SOURCE_EMAG: _emag_quantities,
+    SOURCE_SALES_ORDERS: lambda connection, days: _line_quantities(
+        connection,
+        SalesOrderLine,
+        SalesOrder,
+        SalesOrderLine.sales_order_id,
+        SALES_ORDER_SOLD_STATUSES,
+        days,
+    ),
+    SOURCE_ORDERS: lambda connection, days: _line_quantities(
+        connection,
+        OrderLine,
+        Order,
+        OrderLine.order_id,
+        ORDER_SOLD_STATUSES,
+        days,
+    ),
+}
+
+
+def _lock_days(connection: Connection, source: str, days: set[date] | None) -> None:
+    """Serialize recomputes of the same rollup days across transactions.
+
+    Per-day recomputes take one advisory lock per day, in a fixed order; a
+    full rebuild locks the rollup table against concurrent writers instead.
+    The locks are released when the caller's transaction ends, after which a
+    waiting transaction recomputes from the orders committed meanwhile.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    if days is None:
+        table = EmagSalesDaily if source == SOURCE_EMAG else ProductSalesDaily
+        connection.execute(text(f"LOCK TABLE {table.__table__.fullname} IN EXCLUSIVE MODE"))
+        return
+    day_keys = sorted(f"{source}:{day.isoformat()}" for day in days)
+    connection.execute(_LOCK_DAYS, {"namespace": _ROLLUP_LOCK_NAMESPACE, "day_keys": day_keys})
+
+
+def refresh_sales_rollup(connection: Connection, source: str, days: set[date] | None = None) -> int:
+    """
+    Recompute rollup rows of one source from the order tables.
+
+    Args:
+        connection: Connection inside the caller's transaction
+        source: One of the ``SOURCE_*`` constants
+        days: Days to recompute; None rebuilds the whole source
+
+    Returns:
+        Number of rollup rows written
+    """
+    if days is not None and not days:
+        return 0
+
+    _lock_days(connection, source, days)
+    quantities = _SOURCE_QUANTITIES[source](connection, days)
+
+    if source == SOURCE_EMAG:
+        model = EmagSalesDaily
+        stale = delete(EmagSalesDaily)
+        rows = [
+            {"sale_key": key, "sale_date": day, "quantity": quantity}
+            for (key, day), quantity in quantities.items()
+            if quantity
+        ]
+    else:
+        model = ProductSalesDaily
+        stale = delete(ProductSalesDaily).where(ProductSalesDaily.source == source)
+        rows = [
+            {"product_id": product_id, "sale_date": day, "source": source, "quantity": quantity}
+            for (product_id, day), quantity in quantities.items()
+            if quantity
+        ]
+
+    if days is not None:
+        stale = stale.where(model.sale_date.in_(sorted(days)))
+    connection.execute(stale)
+    if rows:
+        connection.execute(insert(model), rows)
+    return len(rows)
+
+
+class SalesRollup:
+    """
+    Read and (re)build access to ``app.product_sales_daily`` and
+    ``app.emag_sales_daily``.
+
+    The rollup is built once from the whole order history (lazily, on first
+    read) and then kept current by the ``after_flush`` listener below. Core
+    ``INSERT``/``UPDATE`` statements on order tables bypass the listener;
+    callers writing orders that way should call :meth:`refresh_days` for the
+    affected days.
+
+    The listener and the order sync write rows as soon as orders change, so
+    completed builds are recorded in ``app.derived_table_builds`` rather than
+    inferred from the rollup having rows.
+    """
+
+    BUILD_NAME = ProductSalesDaily.__tablename__
+
+    # Whether the rollup is known to be built in this process
+    _built = False
+
+    def __init__(self, db: AsyncSession, session_factory=None):
+        self.db = db
+        self.session_factory = session_factory or async_session_factory
+
+    async def ensure_built(self):
+        """Build the rollup from the order history if it has never been built.
+
+        The build runs and commits in its own session, so the caller's
+        pending work is neither committed nor rolled back by it.
+        """
+        if SalesRollup._built:
+            return
+
+        if await self.db.get(DerivedTableBuild, self.BUILD_NAME) is None:
+            async with self.session_factory() as session:
+                await SalesRollup(session).rebuild()
+                await session.commit()
+        SalesRollup._built = True
+
+    async def rebuild(self) -> dict[str, int]:
+        """
+        Rebuild every source from scratch.
+
+        Records the build in ``derived_table_builds``; committing is left to
+        the caller.
+
+        Returns:
+            Number of rollup rows written per source
+        """
+        logger.info("Building daily sales rollup")
+        written = {}
+        for source in _SOURCE_QUANTITIES:
+            written[source] = await self.refresh_days(source, None)
+
+        stmt = pg_insert(DerivedTableBuild).values(
+            name=self.BUILD_NAME, row_count=sum(written.values())
+        )
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[DerivedTableBuild.name],
+                set_={"row_count": stmt.excluded.row_count, "updated_at": utc_now()},
+            )
+        )
+        logger.info(f"Daily sales rollup built: {written}")
+        return written
+
+    async def _emag_sale_keys(self, product_ids: list[int]) -> dict[str, int]:
+        """Map the references eMAG orders use for ``product_ids`` to the products."""
+        result = await self.db.execute(
+            select(Product.sku, Product.id).where(Product.id.in_(product_ids))
+        )
+        key_products = {sku: product_id for sku, product_id in result if sku}
+        # eMAG orders reference part_number_key (e.g. DVX0FSYBM), not the local SKU
+        result = await self.db.execute(
+            select(EmagProductV2.part_number_key, Product.id)
+            .join(Product, Product.sku == EmagProductV2.sku)
+            .where(
+                and_(Product.id.in_(product_ids), EmagProductV2.part_number_key.isnot(None))
+            )
+        )
+        key_products.update(dict(result.all()))
+        return key_products
+
+    async def refresh_days(self, source: str, days: set[date] | None) -> int:
+        """Recompute the given days of one source (None = all days)."""
+        return await self.db.run_sync(
+            lambda session: refresh_sales_rollup(session.connection(), source, days)
+        )
+
+    async def get_sold_quantities(
+        self, product_ids: list[int], days: int = 180
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Sold quantities over the last ``days`` days.
+
+        Returns:
+            dict: {product_id: {"total_sold": int, "avg_monthly": float, "sources": dict}}
+        """
+        sold_data = {
+            pid: {"total_sold": 0, "avg_monthly": 0.0, "sources": {}} for pid in product_ids
+        }
+        if not product_ids:
+            return sold_data
+
+        await self.ensure_built()
+
+        since = date.today() - timedelta(days=days)
+        result = await self.db.execute(
+            select(
+                ProductSalesDaily.product_id,
+                ProductSalesDaily.source,
+                func.sum(ProductSalesDaily.quantity),
+            )
+            .where(
+                and_(
+                    ProductSalesDaily.product_id.in_(product_ids),
+                    ProductSalesDaily.sale_date >= since,
+                )
+            )
+            .group_by(ProductSalesDaily.product_id, ProductSalesDaily.source)
+        )
+        for product_id, source, quantity in result:
+            qty = int(quantity or 0)
+            sold_data[product_id]["total_sold"] += qty
+            sold_data[product_id]["sources"][source] = qty
+
+        key_products = await self._emag_sale_keys(product_ids)
+        if key_products:
+            result = await self.db.execute(
+                select(EmagSalesDaily.sale_key, func.sum(EmagSalesDaily.quantity))
+                .where(
+                    and_(
+                        EmagSalesDaily.sale_key.in_(list(key_products)),
+                        EmagSalesDaily.sale_date >= since,
+                    )
+                )
+                .group_by(EmagSalesDaily.sale_key)
+            )
+            for sale_key, quantity in result:
+                qty = int(quantity or 0)
+                data = sold_data[key_products[sale_key]]
+                data["total_sold"] += qty
+                data["sources"][SOURCE_EMAG] = data["sources"].get(SOURCE_EMAG, 0) + qty
+
+        months = days / 30.0
+        for data in sold_data.values():
+            data["avg_monthly"] = round(data["total_sold"] / months, 2)
+        return sold_data
+
+
+def _day(value: datetime | None) -> date | None:
+    return value.date() if isinstance(value, datetime) else None
+
+
+def _changed(obj, fields: Iterable[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+def _order_days(obj, session: Session, fields: Iterable[str]) -> set[date]:
+    """Days an order header contributes to before and after this flush."""
+    if obj in session.new or obj in session.deleted:
+        days = {_day(obj.order_date)}
+    elif _changed(obj, fields):
+        history = inspect(obj).attrs.order_date.history
+        days = {_day(obj.order_date)} | {_day(value) for value in history.deleted}
+    else:
+        return set()
+    return {day for day in days if day is not None}
+
+
+def _line_order_ids(obj, session: Session, order_fk: str) -> set[int]:
+    """Header ids whose day totals a flushed order line affects."""
+    if obj not in session.new and obj not in session.deleted:
+        if not _changed(obj, (*_LINE_FIELDS, order_fk)):
+            return set()
+    ids = {getattr(obj, order_fk)}
+    ids.update(inspect(obj).attrs[order_fk].history.deleted or ())
+    return {order_id for order_id in ids if order_id is not None}
+
+
+_LINE_SOURCES = {
+    SalesOrderLine: (SOURCE_SALES_ORDERS, SalesOrder, "sales_order_id"),
+    OrderLine: (SOURCE_ORDERS, Order, "order_id"),
+}
+_HEADER_SOURCES = {
+    EmagOrder: (SOURCE_EMAG, _EMAG_ORDER_FIELDS),
+    SalesOrder: (SOURCE_SALES_ORDERS, _ORDER_FIELDS),
+    Order: (SOURCE_ORDERS, _ORDER_FIELDS),
+}
+
+
+def _sync_sales_rollup(session: Session, flush_context) -> None:
+    """Recompute rollup days touched by flushed order changes."""
+    days: dict[str, set[date]] = defaultdict(set)
+    line_orders: dict[type, set[int]] = defaultdict(set)
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        header = _HEADER_SOURCES.get(type(obj))
+        if header is not None:
+            source, fields = header
+            days[source].update(_order_days(obj, session, fields))
+            continue
+        line = _LINE_SOURCES.get(type(obj))
+        if line is not None:
+            line_orders[type(obj)].update(_line_order_ids(obj, session, line[2]))
+
+    if not days and not line_orders:
+        return
+
+    connection = session.connection()
+    for line_model, order_ids in line_orders.items():
+        if not order_ids:
+            continue
+        source, order_model, _ = _LINE_SOURCES[line_model]
+        for (order_date,) in connection.execute(
+            select(order_model.order_date).where(order_model.id.in_(order_ids))
+        ):
+            if _day(order_date) is not None:
+                days[source].add(_day(order_date))
+
+    for source, source_days in days.items():
+        refresh_sales_rollup(connection, source, source_days)
+
+
+event.listen(Session, "after_flush", _sync_sales_rollup)
@@ -0,0 +1,202 @@
+"""
+Disk-backed product image thumbnail cache.
+
+Used by Excel exports that embed product pictures. Images are downloaded
+with a shared async HTTP client and bounded concurrency, resized off the
+event loop and stored on local disk keyed by URL and ETag. Cached entries
+are served directly while fresh and revalidated with a conditional GET
+(``If-None-Match`` / ``If-Modified-Since``) afterwards, so repeated exports
+only transfer images that actually changed.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import Iterable
+from io import BytesIO
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Image modes PNG can store as-is
+_PNG_MODES = {"1", "L", "LA", "P", "RGB", "RGBA"}
+
+
+def make_thumbnail(image_data: bytes, size: tuple[int, int]) -> bytes:
+    """Resize image bytes to fit ``size`` and return them as PNG."""
+    with Image.open(BytesIO(image_data)) as img:
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        if img.mode not in _PNG_MODES:
+            img = img.convert("RGBA")
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+class ThumbnailCache:
+    """Fetch product image thumbnails through a local disk cache."""
+
+    def __init__(
+        self,
+        cache_dir: str | Path | None = None,
+        size: tuple[int, int] = (183, 183),
+        concurrency: int | None = None,
+        revalidate_after: int | None = None,
+        timeout: float = 5.0,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding thumbnails (default: THUMBNAIL_CACHE_DIR)
+            size: Maximum thumbnail width and height in pixels
+            concurrency: Maximum concurrent downloads
+                (default: THUMBNAIL_FETCH_CONCURRENCY)
+            revalidate_after: Seconds a cached entry is used without
+                revalidation (default: THUMBNAIL_REVALIDATE_AFTER)
+            timeout: Per-request HTTP timeout in seconds
+        """
+        self.cache_dir = Path(cache_dir or settings.THUMBNAIL_CACHE_DIR)
+        self.size = size
+        self.concurrency = max(1, concurrency or settings.THUMBNAIL_FETCH_CONCURRENCY)
+        self.revalidate_after = (
+            settings.THUMBNAIL_REVALIDATE_AFTER if revalidate_after is None else revalidate_after
+        )
+        self.timeout = timeout
+
+    # ==================== DISK LAYOUT ====================
+
+    def _key(self, url: str) -> str:
+        # Thumbnails of different sizes must not share an entry
+        raw = f"{self.size[0]}x{self.size[1]}|{url}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _meta_path(self, url: str) -> Path:
+        return self.cache_dir / f"{self._key(url)}.json"
+
+    def _image_path(self, url: str, etag: str | None) -> Path:
+        etag_key = hashlib.sha256((etag or "").encode()).hexdigest()[:16]
+        return self.cache_dir / f"{self._key(url)}-{etag_key}.png"
+
+    def _load(self, url: str) -> tuple[dict, bytes] | None:
+        """Return ``(metadata, thumbnail)`` for a cached URL, if any."""
+        try:
+            meta = json.loads(self._meta_path(url).read_text())
+            return meta, Path(meta["file"]).read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _store(self, url: str, response: httpx.Response, thumbnail: bytes) -> None:
+        """Write a thumbnail and its validators, dropping a superseded file."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        etag = response.headers.get("etag")
+        meta_path = self._meta_path(url)
+
+        previous = None
+        if meta_path.exists():
+            try:
+                previous = json.loads(meta_path.read_text()).get("file")
+            except (OSError, ValueError):
+                previous = None
+
+        image_path = self._image_path(url, etag)
+        image_path.write_bytes(thumbnail)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": response.headers.get("last-modified"),
+            "file": str(image_path),
+            "checked_at": time.time(),
+        }
+        # Write-then-rename so concurrent exports never read a partial file
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        tmp_path.replace(meta_path)
+
+        if previous and previous != str(image_path):
+            Path(previous).unlink(missing_ok=True)
+
+    def _touch(self, url: str, meta: dict) -> None:
+        """Record a successful revalidation."""
+        meta = {**meta, "checked_at": time.time()}
+        tmp_path = self._meta_path(url).with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        tmp_path.replace(self._meta_path(url))
+
+    def _process(self, url: str, response: httpx.Response) -> bytes:
+        thumbnail = make_thumbnail(response.content, self.size)
+        self._store(url, response, thumbnail)
+        return thumbnail
+
+    # ==================== FETCHING ====================
+
+    async def get_many(self, urls: Iterable[str]) -> dict[str, bytes]:
+        """
+        Return PNG thumbnails for the given image URLs.
+
+        URLs that cannot be downloaded or decoded are left out of the result.
+        """
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        if not unique_urls:
+            return {}
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            timeout=self.timeout, limits=limits, follow_redirects=True
+        ) as client:
+            results = await asyncio.gather(
+                *(self._get(client, semaphore, url) for url in unique_urls)
+            )
+
+        thumbnails = {
+            url: thumbnail
+            for url, thumbnail in zip(unique_urls, results, strict=True)
+            if thumbnail is not None
+        }
+        logger.info(f"Thumbnails ready: {len(thumbnails)}/{len(unique_urls)} images")
+        return thumbnails
+
+    async def _get(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str
+    ) -> bytes | None:
+        cached = await asyncio.to_thread(self._load, url)
+        if cached is not None:
+            meta, thumbnail = cached
+            if time.time() - meta.get("checked_at", 0) < self.revalidate_after:
+                return thumbnail
+
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            async with semaphore:
+                response = await client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to download image {url}: {e}")
+            return cached[1] if cached is not None else None
+
+        if response.status_code == 304 and cached is not None:
+            await asyncio.to_thread(self._touch, url, meta)
+            return thumbnail
+        if response.status_code != 200:
+            logger.warning(f"Failed to download image {url}: HTTP {response.status_code}")
+            return cached[1] if cached is not None else None
+
+        try:
+            # Decoding, resizing and disk writes stay off the event loop
+            return await asyncio.to_thread(self._process, url, response)
+        except (OSError, Image.DecompressionBombError) as e:
+            logger.warning(f"Failed to process image {url}: {e}")
+            return None
@@ -6,16 +6,24 @@ This service provides intelligent Chinese product matching using:
 - Token-based similarity calculation
 - Model normalization (ABC-123 -> ABC123)
 - Configurable thresholds
+- Persistent inverted token index (token -> product ids) kept in sync on flush
 """
 
 import logging
+import math
 import re
 from typing import Any
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, delete, event, func, insert, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.core.database import async_session_factory
+from app.db.base_class import utc_now
+from app.models.derived_table_build import DerivedTableBuild
 from app.models.product import Product
+from app.models.product_name_token import ProductNameToken
 from app.models.supplier import Supplier, SupplierProduct
 
 logger = logging.getLogger(__name__)
@@ -139,6 +147,19 @@ class JiebaMatchingService:
         else:
             return 0  # Not enough criteria
 
+    @staticmethod
+    def _min_required_common(
+        search_tokens: set[str], threshold: float, min_common_tokens: int
+    ) -> int:
+        """
+        Smallest common-token count satisfying both match criteria.
+
+        Similarity is ``common / len(search_tokens)``, so ``threshold`` is
+        itself a lower bound on the number of common tokens.
+        """
+        by_threshold = math.ceil(round(threshold * len(search_tokens), 9))
+        return max(min_common_tokens, by_threshold, 1)
+
     async def find_matches_for_local_product(
         self,
         local_product_id: int,
@@ -212,109 +233,108 @@ class JiebaMatchingService:
             logger.warning("Search criteria not sufficient")
             return []
 
-        # Get supplier products (default: active ones)
-        query = select(SupplierProduct).where(SupplierProduct.is_active.is_(True))
+        # Score only supplier products sharing enough tokens with the search
+        token_index = JiebaTokenIndex(self.db)
+        await token_index.ensure_built(ENTITY_SUPPLIER_PRODUCT)
+        candidates = token_index.candidates_query(
+            ENTITY_SUPPLIER_PRODUCT,
+            search_tokens,
+            self._min_required_common(search_tokens, threshold, min_common_tokens),
+        )
+
+        query = (
+            select(SupplierProduct, candidates.c.common_tokens)
+            .join(candidates, SupplierProduct.id == candidates.c.entity_id)
+            .where(SupplierProduct.is_active.is_(True))
+            .order_by(candidates.c.common_count.desc(), SupplierProduct.id)
+            .limit(limit)
+        )
 
         if supplier_id:
             query = query.where(SupplierProduct.supplier_id == supplier_id)
 
         result = await self.db.execute(query)
-        supplier_products = result.scalars().all()
+        scored = []
+        for sp, common_tokens in result.all():
+            similarity, common_tokens = self.calculate_similarity(
+                search_tokens, set(common_tokens)
+            )
+            scored.append((sp, similarity, common_tokens))
+
+        # Resolve supplier names and matched local products in two queries
+        supplier_ids = {sp.supplier_id for sp, _, _ in scored}
+        supplier_names = {}
+        if supplier_ids:
+            supplier_result = await self.db.execute(
+                select(Supplier.id, Supplier.name).where(Supplier.id.in_(supplier_ids))
+            )
+            supplier_names = dict(supplier_result.all())
 
-        logger.info(f"Checking {len(supplier_products)} supplier products")
+        local_product_ids = {
+            sp.local_product_id for sp, _, _ in scored if sp.local_product_id
+        }
+        local_products = {}
+        if local_product_ids:
+            local_product_result = await self.db.execute(
+                select(
+                    Product.id,
+                    Product.name,
+                    Product.sku,
+                    Product.brand,
+                    Product.image_url,
+                    Product.chinese_name,
+                ).where(Product.id.in_(local_product_ids))
+            )
+            local_products = {
+                row[0]: {
+                    "id": row[0],
+                    "name": row[1],
+                    "sku": row[2],
+                    "brand": row[3],
+                    "image_url": row[4],
+                    "chinese_name": row[5],
+                }
+                for row in local_product_result.all()
+            }
 
-        # Calculate similarity for each product
         matches = []
-        for sp in supplier_products:
-            # Use chinese name if available
+        for sp, similarity, common_tokens in scored:
             product_name = sp.supplier_product_chinese_name or sp.supplier_product_name
-            if not product_name:
-                continue
+            product_tokens = index_tokens(product_name)
 
-            # Tokenize product name
-            product_tokens = set(self.tokenize_clean(product_name))
-            if not product_tokens:
-                continue
-
-            # Calculate similarity
-            similarity, common_tokens = self.calculate_similarity(
-                search_tokens, product_tokens
+            matches.append(
+                {
+                    "id": sp.id,  # Pentru compatibilitate cu tabelul
+                    "supplier_product_id": sp.id,
+                    "supplier_id": sp.supplier_id,
+                    "supplier_name": supplier_names.get(sp.supplier_id),
+                    "supplier_product_name": sp.supplier_product_name,
+                    "supplier_product_chinese_name": sp.supplier_product_chinese_name,
+                    "supplier_product_specification": sp.supplier_product_specification,
+                    "supplier_product_url": sp.supplier_product_url,
+                    "supplier_image_url": sp.supplier_image_url,
+                    "supplier_price": float(sp.supplier_price)
+                    if sp.supplier_price
+                    else 0.0,
+                    "supplier_currency": sp.supplier_currency,
+                    "local_product_id": sp.local_product_id,
+                    "local_product": local_products.get(sp.local_product_id),
+                    "confidence_score": round(similarity, 4),
+                    "manual_confirmed": sp.manual_confirmed,
+                    "is_active": sp.is_active,
+                    "created_at": sp.created_at.isoformat()
+                    if sp.created_at
+                    else None,
+                    "similarity_score": round(similarity, 4),
+                    "similarity_percent": round(similarity * 100, 2),
+                    "common_tokens": list(common_tokens),
+                    "common_tokens_count": len(common_tokens),
+                    "search_tokens_count": len(search_tokens),
+                    "product_tokens_count": len(product_tokens),
+                }
             )
 
-            # Check if meets criteria
-            if similarity >= threshold and len(common_tokens) >= min_common_tokens:
-                # Get supplier name
-                supplier_query = select(Supplier.name).where(
-                    Supplier.id == sp.supplier_id
-                )
-                supplier_result = await self.db.execute(supplier_query)
-                supplier_name = supplier_result.scalar()
-
-                # Get local product if matched
-                local_product = None
-                if sp.local_product_id:
-                    local_product_query = select(
-                        Product.id,
-                        Product.name,
-                        Product.sku,
-                        Product.brand,
-                        Product.image_url,
-                        Product.chinese_name,
-                    ).where(Product.id == sp.local_product_id)
-                    local_product_result = await self.db.execute(local_product_query)
-                    local_product_row = local_product_result.first()
-
-                    if local_product_row:
-                        local_product = {
-                            "id": local_product_row[0],
-                            "name": local_product_row[1],
-                            "sku": local_product_row[2],
-                            "brand": local_product_row[3],
-                            "image_url": local_product_row[4],
-                            "chinese_name": local_product_row[5],
-                        }
-
-                matches.append(
-                    {
-                        "id": sp.id,  # Pentru compatibilitate cu tabelul
-                        "supplier_product_id": sp.id,
-                        "supplier_id": sp.supplier_id,
-                        "supplier_name": supplier_name,
-                        "supplier_product_name": sp.supplier_product_name,
-                        "supplier_product_chinese_name": sp.supplier_product_chinese_name,
-                        "supplier_product_specification": sp.supplier_product_specification,
-                        "supplier_product_url": sp.supplier_product_url,
-                        "supplier_image_url": sp.supplier_image_url,
-                        "supplier_price": float(sp.supplier_price)
-                        if sp.supplier_price
-                        else 0.0,
-                        "supplier_currency": sp.supplier_currency,
-                        "local_product_id": sp.local_product_id,
-                        "local_product": local_product,
-                        "confidence_score": round(similarity, 4),
-                        "manual_confirmed": sp.manual_confirmed,
-                        "is_active": sp.is_active,
-                        "created_at": sp.created_at.isoformat()
-                        if sp.created_at
-                        else None,
-                        "similarity_score": round(similarity, 4),
-                        "similarity_percent": round(similarity * 100, 2),
-                        "common_tokens": list(common_tokens),
-                        "common_tokens_count": len(common_tokens),
-                        "search_tokens_count": len(search_tokens),
-                        "product_tokens_count": len(product_tokens),
-                    }
-                )
-
-        # Sort by similarity (descending)
-        matches.sort(key=lambda x: x["similarity_score"], reverse=True)
-
-        # Limit results
-        if len(matches) > limit:
-            logger.info(f"Found {len(matches)} matches, limiting to {limit}")
-            matches = matches[:limit]
-        else:
-            logger.info(f"Found {len(matches)} matches")
+        logger.info(f"Found {len(matches)} matches")
 
         return matches
 
@@ -340,45 +360,43 @@ class JiebaMatchingService:
             logger.warning("Search criteria not sufficient for local product search")
             return []
 
-        query = select(Product).where(Product.is_active.is_(True))
+        token_index = JiebaTokenIndex(self.db)
+        await token_index.ensure_built(ENTITY_PRODUCT)
+        candidates = token_index.candidates_query(
+            ENTITY_PRODUCT,
+            search_tokens,
+            self._min_required_common(search_tokens, threshold, min_common_tokens),
+        )
+
+        query = (
+            select(Product, candidates.c.common_tokens)
+            .join(candidates, Product.id == candidates.c.entity_id)
+            .where(Product.is_active.is_(True))
+            .order_by(candidates.c.common_count.desc(), Product.id)
+            .limit(limit)
+        )
         result = await self.db.execute(query)
-        local_products = result.scalars().all()
 
         matches: list[dict[str, Any]] = []
 
-        for product in local_products:
-            product_name = product.chinese_name or product.name
-            if not product_name:
-                continue
-
-            product_tokens = set(self.tokenize_clean(product_name))
-            if not product_tokens:
-                continue
-
+        for product, common_tokens in result.all():
             similarity, common_tokens = self.calculate_similarity(
-                search_tokens, product_tokens
+                search_tokens, set(common_tokens)
+            )
+            matches.append(
+                {
+                    "id": product.id,
+                    "name": product.name,
+                    "chinese_name": product.chinese_name,
+                    "sku": product.sku,
+                    "brand": product.brand,
+                    "image_url": product.image_url,
+                    "similarity_score": round(similarity, 4),
+                    "similarity_percent": round(similarity * 100, 2),
+                    "common_tokens": list(common_tokens),
+                    "common_tokens_count": len(common_tokens),
+                }
             )
-
-            if similarity >= threshold and len(common_tokens) >= min_common_tokens:
-                matches.append(
-                    {
-                        "id": product.id,
-                        "name": product.name,
-                        "chinese_name": product.chinese_name,
-                        "sku": product.sku,
-                        "brand": product.brand,
-                        "image_url": product.image_url,
-                        "similarity_score": round(similarity, 4),
-                        "similarity_percent": round(similarity * 100, 2),
-                        "common_tokens": list(common_tokens),
-                        "common_tokens_count": len(common_tokens),
-                    }
-                )
-
-        matches.sort(key=lambda x: x["similarity_score"], reverse=True)
-
-        if len(matches) > limit:
-            matches = matches[:limit]
 
         if matches:
             match_ids = [match["id"] for match in matches]
@@ -691,3 +709,240 @@ class JiebaMatchingService:
             "average_confidence": round(float(avg_confidence), 4),
             "match_rate": round((matched / total * 100), 2) if total > 0 else 0.0,
         }
+
+
+# Entity types stored in the token index, with the (primary, fallback) name
+# columns that are tokenized for each of them.
+ENTITY_PRODUCT = "product"
+ENTITY_SUPPLIER_PRODUCT = "supplier_product"
+
+_INDEXED_NAMES: dict[str, tuple[type, str, str]] = {
+    ENTITY_PRODUCT: (Product, "chinese_name", "name"),
+    ENTITY_SUPPLIER_PRODUCT: (
+        SupplierProduct,
+        "supplier_product_chinese_name",
+        "supplier_product_name",
+    ),
+}
+_ENTITY_TYPES_BY_MODEL = {
+    model: entity_type for entity_type, (model, _, _) in _INDEXED_NAMES.items()
+}
+_MAX_TOKEN_LENGTH = 100
+
+
+def index_tokens(name: str | None) -> set[str]:
+    """Tokens stored in the index for a product name."""
+    if not name:
+        return set()
+    return {
+        token
+        for token in JiebaMatchingService.tokenize_clean(name)
+        if len(token) <= _MAX_TOKEN_LENGTH
+    }
+
+
+class JiebaTokenIndex:
+    """
+    Inverted index of jieba tokens stored in ``app.product_name_tokens``.
+
+    The index is built once per entity type (lazily, on first search) and is
+    then maintained incrementally by an ``after_flush`` listener whenever an
+    indexed name is inserted, changed or deleted through the ORM. Bulk
+    ``UPDATE`` statements bypass the listener; callers changing names that
+    way should call :meth:`reindex` for the affected ids.
+
+    Completed builds are recorded in ``app.derived_table_builds``: the
+    listener writes postings for every saved name, so a non-empty index does
+    not mean the existing catalogue was ever indexed.
+    """
+
+    REBUILD_CHUNK_SIZE = 5000
+
+    # Entity types known to be indexed in this process
+    _built: set[str] = set()
+
+    def __init__(self, db: AsyncSession, session_factory=None):
+        self.db = db
+        self.session_factory = session_factory or async_session_factory
+
+    @staticmethod
+    def build_name(entity_type: str) -> str:
+        """Name of the ``derived_table_builds`` marker of an entity type."""
+        return f"{ProductNameToken.__tablename__}:{entity_type}"
+
+    async def ensure_built(self, entity_type: str):
+        """Build the index for ``entity_type`` if it has never been built.
+
+        The build runs and commits in its own session, so the caller's
+        pending work is neither committed nor rolled back by it.
+        """
+        if entity_type in self._built:
+            return
+
+        if await self.db.get(DerivedTableBuild, self.build_name(entity_type)) is None:
+            async with self.session_factory() as session:
+                await JiebaTokenIndex(session).rebuild(entity_type)
+                await session.commit()
+        JiebaTokenIndex._built.add(entity_type)
+
+    async def rebuild(self, entity_type: str) -> int:
+        """
+        Rebuild the posting lists of one entity type from scratch.
+
+        Records the build in ``derived_table_builds``; committing is left to
+        the caller.
+
+        Returns:
+            Number of index rows written
+        """
+        model, primary, fallback = _INDEXED_NAMES[entity_type]
+        logger.info(f"Building jieba token index for {entity_type}")
+
+        await self.db.execute(
+            delete(ProductNameToken).where(
+                ProductNameToken.entity_type == entity_type
+            )
+        )
+        result = await self.db.execute(
+            select(model.id, getattr(model, primary), getattr(model, fallback))
+        )
+
+        written = 0
+        rows: list[dict[str, Any]] = []
+        for entity_id, primary_name, fallback_name in result:
+            for token in index_tokens(primary_name or fallback_name):
+                rows.append(
+                    {"entity_type": entity_type, "token": token, "entity_id": entity_id}
+                )
+            if len(rows) >= self.REBUILD_CHUNK_SIZE:
+                written += await self._insert_rows(rows)
+                rows = []
+        if rows:
+            written += await self._insert_rows(rows)
+
+        stmt = pg_insert(DerivedTableBuild).values(
+            name=self.build_name(entity_type), row_count=written
+        )
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[DerivedTableBuild.name],
+                set_={"row_count": stmt.excluded.row_count, "updated_at": utc_now()},
+            )
+        )
+        logger.info(f"Jieba token index for {entity_type}: {written} postings")
+        return written
+
+    async def reindex(self, entity_type: str, entity_ids: list[int]):
+        """Refresh the posting lists of specific entities."""
+        model, primary, fallback = _INDEXED_NAMES[entity_type]
+        result = await self.db.execute(
+            select(
+                model.id, getattr(model, primary), getattr(model, fallback)
+            ).where(model.id.in_(entity_ids))
+        )
+        names = {row[0]: row[1] or row[2] for row in result}
+
+        await self.db.execute(
+            delete(ProductNameToken).where(
+                and_(
+                    ProductNameToken.entity_type == entity_type,
+                    ProductNameToken.entity_id.in_(entity_ids),
+                )
+            )
+        )
+        rows = [
+            {"entity_type": entity_type, "token": token, "entity_id": entity_id}
+            for entity_id, name in names.items()
+            for token in index_tokens(name)
+        ]
+        if rows:
+            await self._insert_rows(rows)
+
+    async def _insert_rows(self, rows: list[dict[str, Any]]) -> int:
+        # Another worker may be building the same index concurrently
+        await self.db.execute(
+            pg_insert(ProductNameToken).values(rows).on_conflict_do_nothing()
+        )
+        return len(rows)
+
+    def candidates_query(
+        self,
+        entity_type: str,
+        search_tokens: set[str],
+        min_common_tokens: int,
+    ):
+        """
+        Subquery of entities sharing at least ``min_common_tokens`` tokens.
+
+        Columns: ``entity_id``, ``common_count`` and ``common_tokens``.
+        """
+        common_count = func.count().label("common_count")
+        return (
+            select(
+                ProductNameToken.entity_id,
+                common_count,
+                func.array_agg(ProductNameToken.token).label("common_tokens"),
+            )
+            .where(
+                and_(
+                    ProductNameToken.entity_type == entity_type,
+                    ProductNameToken.token.in_(search_tokens),
+                )
+            )
+            .group_by(ProductNameToken.entity_id)
+            .having(func.count() >= min_common_tokens)
+            .subquery()
+        )
+
+
+def _sync_token_index(session: Session, flush_context) -> None:
+    """Keep ``product_name_tokens`` in line with flushed name changes."""
+    changed: dict[str, dict[int, str | None]] = {}
+
+    for obj in list(session.new) + list(session.dirty):
+        entity_type = _ENTITY_TYPES_BY_MODEL.get(type(obj))
+        if entity_type is None or obj.id is None:
+            continue
+        _, primary, fallback = _INDEXED_NAMES[entity_type]
+        if obj not in session.new:
+            state = inspect(obj)
+            if not (
+                state.attrs[primary].history.has_changes()
+                or state.attrs[fallback].history.has_changes()
+            ):
+                continue
+        changed.setdefault(entity_type, {})[obj.id] = getattr(
+            obj, primary
+        ) or getattr(obj, fallback)
+
+    deleted: dict[str, list[int]] = {}
+    for obj in session.deleted:
+        entity_type = _ENTITY_TYPES_BY_MODEL.get(type(obj))
+        if entity_type is not None and obj.id is not None:
+            deleted.setdefault(entity_type, []).append(obj.id)
+
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    for entity_type in set(changed) | set(deleted):
+        names = changed.get(entity_type, {})
+        stale_ids = list(names) + deleted.get(entity_type, [])
+        connection.execute(
+            delete(ProductNameToken).where(
+                and_(
+                    ProductNameToken.entity_type == entity_type,
+                    ProductNameToken.entity_id.in_(stale_ids),
+                )
+            )
+        )
+        rows = [
+            {"entity_type": entity_type, "token": token, "entity_id": entity_id}
+            for entity_id, name in names.items()
+            for token in index_tokens(name)
+        ]
+        if rows:
+            connection.execute(insert(ProductNameToken), rows)
+
+
+event.listen(Session, "after_flush", _sync_token_index)
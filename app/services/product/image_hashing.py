@@ -0,0 +1,282 @@
+"""Perceptual image hashing and near-duplicate lookup for supplier products.
+
+Provides:
+- 64-bit difference hash (dHash) and DCT perceptual hash (pHash)
+- Pluggable image fetchers (HTTP and a local file store)
+- A BK-tree for "all hashes within Hamming distance k" queries
+
+Hashes are plain Python ints.  PostgreSQL BIGINT columns are signed, so use
+``to_signed64`` / ``from_signed64`` when storing and loading them.
+"""
+
+import asyncio
+import hashlib
+import io
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import httpx
+from PIL import Image
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+HASH_BITS = 64
+_HASH_SIZE = 8
+_PHASH_IMAGE_SIZE = 32
+_UINT64_MASK = (1 << 64) - 1
+
+
+# ==================== HASHING ====================
+
+
+def _grayscale(image: Image.Image, width: int, height: int) -> list[int]:
+    """Resize an image to ``width`` x ``height`` grayscale pixels (row-major)."""
+    resized = image.convert("L").resize((width, height), Image.Resampling.LANCZOS)
+    return list(resized.getdata())
+
+
+def _bits_to_int(bits: Iterable[bool]) -> int:
+    """Pack booleans into an int, first bit most significant."""
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image: Image.Image) -> int:
+    """Compute the 64-bit difference hash of an image.
+
+    Each bit says whether a pixel is brighter than its right-hand neighbour
+    on a 9x8 grayscale thumbnail.
+    """
+    width = _HASH_SIZE + 1
+    pixels = _grayscale(image, width, _HASH_SIZE)
+    return _bits_to_int(
+        pixels[row * width + col + 1] > pixels[row * width + col]
+        for row in range(_HASH_SIZE)
+        for col in range(_HASH_SIZE)
+    )
+
+
+def _dct_matrix(size: int, keep: int) -> list[list[float]]:
+    """Return the first ``keep`` rows of the orthonormal DCT-II matrix."""
+    return [
+        [
+            math.cos(math.pi * (2 * x + 1) * u / (2 * size))
+            * (math.sqrt(1 / size) if u == 0 else math.sqrt(2 / size))
+            for x in range(size)
+        ]
+        for u in range(keep)
+    ]
+
+
+_DCT = _dct_matrix(_PHASH_IMAGE_SIZE, _HASH_SIZE)
+
+
+def phash(image: Image.Image) -> int:
+    """Compute the 64-bit DCT perceptual hash of an image.
+
+    Takes the 8x8 lowest frequencies of a 32x32 grayscale DCT and sets each
+    bit when the coefficient is above their median.
+    """
+    size = _PHASH_IMAGE_SIZE
+    pixels = _grayscale(image, size, size)
+    rows = [pixels[r * size : (r + 1) * size] for r in range(size)]
+
+    # Separable 2D DCT, only computing the low-frequency block we keep
+    row_dct = [[sum(basis[x] * row[x] for x in range(size)) for basis in _DCT] for row in rows]
+    coefficients = [
+        sum(_DCT[u][y] * row_dct[y][v] for y in range(size))
+        for u in range(_HASH_SIZE)
+        for v in range(_HASH_SIZE)
+    ]
+
+    ordered = sorted(coefficients)
+    median = (ordered[31] + ordered[32]) / 2
+    return _bits_to_int(c > median for c in coefficients)
+
+
+def compute_image_hashes(image_data: bytes) -> tuple[int, int]:
+    """Decode image bytes and return ``(dhash, phash)``.
+
+    Raises:
+        ValueError: If the data is not a readable image
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            image.load()
+            return dhash(image), phash(image)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (hash1 ^ hash2).bit_count()
+
+
+def to_signed64(value: int) -> int:
+    """Convert an unsigned 64-bit hash to a signed BIGINT value."""
+    value &= _UINT64_MASK
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed64(value: int) -> int:
+    """Convert a signed BIGINT value back to an unsigned 64-bit hash."""
+    return value & _UINT64_MASK
+
+
+# ==================== FETCHERS ====================
+
+
+class ImageFetcher(ABC):
+    """Source of supplier image bytes."""
+
+    @abstractmethod
+    async def fetch(self, url: str) -> bytes | None:
+        """Return the image bytes for ``url``, or None if unavailable."""
+
+    async def close(self) -> None:
+        """Release any resources held by the fetcher."""
+        return None
+
+
+class HttpImageFetcher(ImageFetcher):
+    """Fetch images over HTTP with a shared connection pool.
+
+    Bodies are streamed and the download is abandoned as soon as it grows
+    past ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self._client = httpx.AsyncClient(
+            timeout=timeout, follow_redirects=True, transport=transport
+        )
+
+    async def fetch(self, url: str) -> bytes | None:
+        try:
+            async with self._client.stream("GET", url) as response:
+                if response.status_code != 200:
+                    logger.warning(f"Failed to fetch image {url}: HTTP {response.status_code}")
+                    return None
+                declared = response.headers.get("content-length")
+                if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                    logger.warning(f"Skipping oversized image {url}")
+                    return None
+
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        logger.warning(f"Skipping oversized image {url}")
+                        return None
+                return bytes(body)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to fetch image {url}: {e}")
+            return None
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class LocalFileImageFetcher(ImageFetcher):
+    """Serve images from a local directory keyed by the URL's SHA-256.
+
+    ``store`` writes images into the same layout, so the directory can be
+    pre-populated (tests, offline imports) or used as a download cache.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def path_for(self, url: str) -> Path:
+        """Return the file path used for ``url``."""
+        return self.root / hashlib.sha256(url.encode()).hexdigest()
+
+    def store(self, url: str, image_data: bytes) -> Path:
+        """Save image bytes for ``url`` and return the file path."""
+        path = self.path_for(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(image_data)
+        return path
+
+    async def fetch(self, url: str) -> bytes | None:
+        # File reads block; keep them off the event loop
+        return await asyncio.to_thread(self._read, self.path_for(url))
+
+    @staticmethod
+    def _read(path: Path) -> bytes | None:
+        if not path.is_file():
+            return None
+        return path.read_bytes()
+
+
+# ==================== NEAR-DUPLICATE INDEX ====================
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes using Hamming distance.
+
+    Items with identical hashes share a node.  A range query only descends
+    into children whose edge distance lies within ``d ± k`` of the query
+    distance, which prunes most of the tree for small ``k``.
+    """
+
+    def __init__(self):
+        # Node layout: [hash, items, {edge_distance: child_node}]
+        self._root: list | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, hash_value: int, item: Any) -> None:
+        """Insert ``item`` under ``hash_value``."""
+        self._size += 1
+        if self._root is None:
+            self._root = [hash_value, [item], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [item], {}]
+                return
+            node = child
+
+    def search(self, hash_value: int, max_distance: int) -> list[tuple[int, Any]]:
+        """Return ``(distance, item)`` for every item within ``max_distance``.
+
+        Results are sorted by distance.
+        """
+        if self._root is None:
+            return []
+
+        results = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+
+        results.sort(key=lambda result: result[0])
+        return results
@@ -0,0 +1,138 @@
+"""MinHash / LSH candidate blocking for supplier product matching.
+
+Comparing every product name against every other one is O(n²).  This module
+builds MinHash signatures over the character n-grams of each (normalized)
+name and buckets them with banded locality-sensitive hashing, so that only
+names sharing at least one band are proposed as candidate pairs.  Exact
+scoring is then done by the caller on those candidates only.
+
+The probability that two names with n-gram Jaccard similarity ``s`` become
+candidates is ``1 - (1 - s**rows) ** bands``.  ``threshold`` picks the
+bands/rows split so that this S-curve crosses 0.5 at (or just below) the
+requested similarity; lowering it trades more candidate pairs for recall.
+"""
+
+import hashlib
+import random
+from collections import defaultdict
+from collections.abc import Iterable
+
+# Mersenne prime 2**61 - 1, used for universal hashing
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def text_shingles(text: str, n: int = 2) -> set[str]:
+    """Return the character n-grams of ``text``.
+
+    Texts shorter than ``n`` characters yield themselves as a single shingle
+    so that very short names can still collide with identical names.
+    """
+    if not text:
+        return set()
+    if len(text) < n:
+        return {text}
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def optimal_band_params(threshold: float, num_perm: int) -> tuple[int, int]:
+    """Pick ``(bands, rows)`` for a target Jaccard ``threshold``.
+
+    Chooses the split whose S-curve midpoint ``(1 / bands) ** (1 / rows)`` is
+    the highest value not above ``threshold``.  Erring low keeps recall high
+    at the cost of a few more candidate pairs.
+    """
+    if num_perm < 1:
+        raise ValueError("num_perm must be positive")
+    if not 0.0 < threshold <= 1.0:
+        raise ValueError("threshold must be in (0, 1]")
+
+    best = (num_perm, 1)
+    best_midpoint = (1 / num_perm) ** 1.0
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        if midpoint <= threshold and midpoint > best_midpoint:
+            best = (bands, rows)
+            best_midpoint = midpoint
+    return best
+
+
+class MinHashLSH:
+    """Banded MinHash index producing candidate pairs of similar texts."""
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        threshold: float = 0.4,
+        ngram_size: int = 2,
+        seed: int = 1,
+    ):
+        """Initialize the index.
+
+        Args:
+            num_perm: Number of hash permutations per signature
+            threshold: Approximate n-gram Jaccard similarity above which pairs
+                are likely to be proposed (lower = higher recall)
+            ngram_size: Character n-gram size used for shingling
+            seed: Seed for the permutation coefficients
+        """
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.bands, self.rows = optimal_band_params(threshold, num_perm)
+
+        rng = random.Random(seed)  # noqa: S311 - deterministic, not security related
+        self._permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    @staticmethod
+    def _hash_shingle(shingle: str) -> int:
+        """Hash a shingle to a stable 32-bit integer."""
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+        return int.from_bytes(digest, "little")
+
+    def signature(self, text: str) -> tuple[int, ...] | None:
+        """Compute the MinHash signature of a normalized text.
+
+        Returns:
+            Tuple of ``num_perm`` minimum hash values, or None for empty text
+        """
+        shingles = text_shingles(text, self.ngram_size)
+        if not shingles:
+            return None
+
+        hashes = [self._hash_shingle(shingle) for shingle in shingles]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        )
+
+    def candidate_pairs(self, texts: Iterable[str]) -> set[tuple[int, int]]:
+        """Return index pairs ``(i, j)`` with ``i < j`` that share a band.
+
+        Args:
+            texts: Normalized texts; positions are used as identifiers
+
+        Returns:
+            Set of candidate index pairs
+        """
+        buckets: dict[tuple[int, tuple[int, ...]], list[int]] = defaultdict(list)
+        for index, text in enumerate(texts):
+            signature = self.signature(text)
+            if signature is None:
+                continue
+            for band in range(self.bands):
+                start = band * self.rows
+                buckets[(band, signature[start : start + self.rows])].append(index)
+
+        pairs: set[tuple[int, int]] = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for pos, first in enumerate(members):
+                for second in members[pos + 1 :]:
+                    pairs.add((first, second))
+        return pairs
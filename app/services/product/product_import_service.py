@@ -8,7 +8,7 @@ import logging
 from datetime import UTC, datetime
 from typing import Any
 
-from sqlalchemy import or_, select
+from sqlalchemy import insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import load_only
 
@@ -18,6 +18,7 @@ from app.models.product_mapping import GoogleSheetsProductMapping, ImportLog
 from app.models.product_supplier_sheet import ProductSupplierSheet
 from app.models.supplier import Supplier
 from app.services.google_sheets_service import GoogleSheetsService, ProductFromSheet
+from app.services.jieba_matching_service import ENTITY_PRODUCT, JiebaTokenIndex
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,9 @@ logger = logging.getLogger(__name__)
 class ProductImportService:
     """Service for importing products from Google Sheets and mapping to eMAG"""
 
+    # Maximum SKUs per IN (...) list when prefetching for a batched import
+    PREFETCH_CHUNK_SIZE = 1000
+
     def __init__(self, db_session: AsyncSession):
         """Initialize import service"""
         self.db = db_session
@@ -35,6 +39,7 @@ class ProductImportService:
         user_email: str | None = None,
         auto_map: bool = True,
         import_suppliers: bool = True,
+        batch_size: int | None = None,
     ) -> ImportLog:
         """
         Import products from Google Sheets and optionally auto-map to eMAG
@@ -43,6 +48,9 @@ class ProductImportService:
             user_email: Email of user initiating import
             auto_map: Whether to automatically map products to eMAG accounts
             import_suppliers: Whether to import supplier data from Product_Suppliers tab
+            batch_size: Rows per batch in batched mode (existing rows prefetched
+                up front, bulk writes, one commit per batch). None imports row
+                by row in a single transaction.
 
         Returns:
             ImportLog: Log of the import operation
@@ -66,47 +74,15 @@ class ProductImportService:
 
             logger.info(f"Found {len(sheet_products)} products in Google Sheets")
 
-            processed_skus = set()
-            products_created = 0
-            products_updated = 0
-
-            # Process each product
-            for sheet_product in sheet_products:
-                sku = sheet_product.sku
-                if not sku:
-                    logger.warning("Skipping product without SKU: %s", sheet_product)
-                    import_log.skipped_rows += 1
-                    continue
-
-                if sku in processed_skus:
-                    logger.debug(
-                        "Duplicate SKU '%s' detected in sheet. Skipping subsequent occurrence.",
-                        sku,
-                    )
-                    import_log.skipped_rows += 1
-                    continue
-
-                processed_skus.add(sku)
-
-                # Use nested transaction (savepoint) to handle individual product errors
-                async with self.db.begin_nested():
-                    try:
-                        created, updated = await self._import_single_product(
-                            sheet_product, import_log, auto_map
-                        )
-                        if created:
-                            products_created += 1
-                        if updated:
-                            products_updated += 1
-                        import_log.successful_imports += 1
-                    except Exception as e:
-                        logger.error(
-                            f"Failed to import product {sheet_product.sku}: {e}",
-                            exc_info=True,
-                        )
-                        import_log.failed_imports += 1
-                        # Rollback will happen automatically when exiting the nested context
-                        # but import_log remains in the parent transaction
+            unique_products = self._unique_sheet_products(sheet_products, import_log)
+            if batch_size:
+                products_created, products_updated = await self._import_products_batched(
+                    unique_products, import_log, auto_map, batch_size
+                )
+            else:
+                products_created, products_updated = await self._import_products_per_row(
+                    unique_products, import_log, auto_map
+                )
 
             # Import suppliers if requested
             if import_suppliers:
@@ -145,6 +121,374 @@ class ProductImportService:
             await self.db.commit()
             raise
 
+    def _unique_sheet_products(
+        self, sheet_products: list[ProductFromSheet], import_log: ImportLog
+    ) -> list[ProductFromSheet]:
+        """Drop rows without SKU and repeated SKUs, counting them as skipped"""
+        processed_skus = set()
+        unique_products = []
+        for sheet_product in sheet_products:
+            sku = sheet_product.sku
+            if not sku:
+                logger.warning("Skipping product without SKU: %s", sheet_product)
+                import_log.skipped_rows += 1
+                continue
+
+            if sku in processed_skus:
+                logger.debug(
+                    "Duplicate SKU '%s' detected in sheet. Skipping subsequent occurrence.",
+                    sku,
+                )
+                import_log.skipped_rows += 1
+                continue
+
+            processed_skus.add(sku)
+            unique_products.append(sheet_product)
+        return unique_products
+
+    async def _import_products_per_row(
+        self,
+        sheet_products: list[ProductFromSheet],
+        import_log: ImportLog,
+        auto_map: bool,
+    ) -> tuple[int, int]:
+        """
+        Import products one by one, each inside its own savepoint
+
+        Returns:
+            tuple[int, int]: (products_created, products_updated)
+        """
+        products_created = 0
+        products_updated = 0
+
+        for sheet_product in sheet_products:
+            # Use nested transaction (savepoint) to handle individual product errors
+            async with self.db.begin_nested():
+                try:
+                    created, updated = await self._import_single_product(
+                        sheet_product, import_log, auto_map
+                    )
+                    if created:
+                        products_created += 1
+                    if updated:
+                        products_updated += 1
+                    import_log.successful_imports += 1
+                except Exception as e:
+                    logger.error(
+                        f"Failed to import product {sheet_product.sku}: {e}",
+                        exc_info=True,
+                    )
+                    import_log.failed_imports += 1
+                    # Rollback will happen automatically when exiting the nested context
+                    # but import_log remains in the parent transaction
+
+        return products_created, products_updated
+
+    async def _import_products_batched(
+        self,
+        sheet_products: list[ProductFromSheet],
+        import_log: ImportLog,
+        auto_map: bool,
+        batch_size: int,
+    ) -> tuple[int, int]:
+        """
+        Import products in batches with bulk statements
+
+        Existing products, mappings, SKU history and eMAG matches for the
+        whole sheet are loaded up front; each batch is then written with a few
+        bulk INSERT/UPDATE statements and committed. A batch that fails is
+        rolled back and retried row by row, so failures are still reported
+        per row in the import log.
+
+        Returns:
+            tuple[int, int]: (products_created, products_updated)
+        """
+        state = await self._prefetch_import_state(
+            [p.sku for p in sheet_products], auto_map
+        )
+
+        products_created = 0
+        products_updated = 0
+        for start in range(0, len(sheet_products), batch_size):
+            batch = sheet_products[start : start + batch_size]
+            try:
+                async with self.db.begin_nested():
+                    result = await self._write_import_batch(batch, state, auto_map)
+            except Exception as e:
+                logger.warning(
+                    f"Batch of {len(batch)} products (sheet rows from "
+                    f"{batch[0].row_number}) failed, retrying row by row: {e}"
+                )
+                created, updated = await self._import_products_per_row(
+                    batch, import_log, auto_map
+                )
+            else:
+                created, updated = result["created"], result["updated"]
+                import_log.successful_imports += len(batch)
+                import_log.auto_mapped_main += result["auto_mapped_main"]
+                import_log.auto_mapped_fbe += result["auto_mapped_fbe"]
+                import_log.unmapped_products += result["unmapped"]
+                state["products"].update(result["products"])
+                state["mappings"].update(result["mappings"])
+                state["history"].update(result["history"])
+
+            products_created += created
+            products_updated += updated
+            await self.db.commit()
+            logger.info(
+                f"Imported {min(start + batch_size, len(sheet_products))}/"
+                f"{len(sheet_products)} products"
+            )
+
+        return products_created, products_updated
+
+    async def _prefetch_import_state(
+        self, skus: list[str], auto_map: bool
+    ) -> dict[str, Any]:
+        """
+        Load what a batched import needs to know about existing rows
+
+        Returns:
+            dict with:
+            - products: {sku: (product_id, name)}
+            - mappings: {sku: mapping_id}
+            - history: {(product_id, old_sku, new_sku)}
+            - emag: {(sku, account_type): (emag_product_id, emag_sku)}
+        """
+        from app.models.product import Product
+
+        state: dict[str, Any] = {
+            "products": {},
+            "mappings": {},
+            "history": set(),
+            "emag": {},
+        }
+        for start in range(0, len(skus), self.PREFETCH_CHUNK_SIZE):
+            chunk = skus[start : start + self.PREFETCH_CHUNK_SIZE]
+
+            result = await self.db.execute(
+                select(Product.sku, Product.id, Product.name).where(Product.sku.in_(chunk))
+            )
+            state["products"].update(
+                {sku: (product_id, name) for sku, product_id, name in result}
+            )
+
+            result = await self.db.execute(
+                select(
+                    GoogleSheetsProductMapping.local_sku, GoogleSheetsProductMapping.id
+                ).where(GoogleSheetsProductMapping.local_sku.in_(chunk))
+            )
+            state["mappings"].update(dict(result.all()))
+
+            result = await self.db.execute(
+                select(
+                    ProductSKUHistory.product_id,
+                    ProductSKUHistory.old_sku,
+                    ProductSKUHistory.new_sku,
+                ).where(ProductSKUHistory.new_sku.in_(chunk))
+            )
+            state["history"].update(tuple(row) for row in result)
+
+            if auto_map:
+                result = await self.db.execute(
+                    select(
+                        EmagProductV2.sku, EmagProductV2.account_type, EmagProductV2.id
+                    ).where(
+                        EmagProductV2.sku.in_(chunk),
+                        EmagProductV2.account_type.in_(("main", "fbe")),
+                    )
+                )
+                for sku, account_type, emag_id in result:
+                    state["emag"][(sku, account_type)] = (emag_id, sku)
+
+        logger.info(
+            f"Prefetched import state: {len(state['products'])} existing products, "
+            f"{len(state['mappings'])} mappings, {len(state['emag'])} eMAG matches"
+        )
+        return state
+
+    async def _write_import_batch(
+        self,
+        batch: list[ProductFromSheet],
+        state: dict[str, Any],
+        auto_map: bool,
+    ) -> dict[str, Any]:
+        """
+        Write one batch of products, mappings and SKU history
+
+        ``state`` is not modified; the new ids are returned so the caller can
+        merge them once the batch is committed.
+        """
+        from app.models.product import Product
+
+        now = datetime.now(UTC)
+        result: dict[str, Any] = {
+            "created": 0,
+            "updated": 0,
+            "auto_mapped_main": 0,
+            "auto_mapped_fbe": 0,
+            "unmapped": 0,
+            "products": {},
+            "mappings": {},
+            "history": set(),
+        }
+
+        # Products
+        new_products = []
+        product_updates = []
+        renamed_ids = []
+        for sheet_product in batch:
+            values = {
+                "name": sheet_product.romanian_name,
+                "image_url": sheet_product.image_url,
+                "brand": sheet_product.brand,
+                "ean": sheet_product.ean,
+                "weight_kg": sheet_product.weight_kg,
+            }
+            existing = state["products"].get(sheet_product.sku)
+            if existing is None:
+                new_products.append(
+                    {
+                        "sku": sheet_product.sku,
+                        "base_price": sheet_product.emag_fbe_ro_price_ron or 0.0,
+                        "currency": "RON",
+                        "is_active": True,
+                        "display_order": sheet_product.sort_product,
+                        **values,
+                    }
+                )
+                continue
+
+            product_id, current_name = existing
+            if sheet_product.emag_fbe_ro_price_ron:
+                values["base_price"] = sheet_product.emag_fbe_ro_price_ron
+            if sheet_product.sort_product is not None:
+                values["display_order"] = sheet_product.sort_product
+            product_updates.append({"id": product_id, **values})
+            if current_name != sheet_product.romanian_name:
+                renamed_ids.append(product_id)
+
+        if product_updates:
+            await self.db.execute(update(Product), product_updates)
+        if new_products:
+            inserted = await self.db.execute(
+                insert(Product).returning(Product.sku, Product.id), new_products
+            )
+            names = {p.sku: p.romanian_name for p in batch}
+            result["products"] = {
+                sku: (product_id, names[sku]) for sku, product_id in inserted
+            }
+        result["created"] = len(new_products)
+        result["updated"] = len(product_updates)
+
+        # Bulk statements bypass the ORM flush hook keeping the name index current
+        indexed_ids = renamed_ids + [pid for pid, _ in result["products"].values()]
+        if indexed_ids:
+            await JiebaTokenIndex(self.db).reindex(ENTITY_PRODUCT, indexed_ids)
+
+        # Google Sheets mappings
+        new_mappings = []
+        mapping_updates = []
+        for sheet_product in batch:
+            values = {
+                "local_product_name": sheet_product.romanian_name,
+                "local_price": sheet_product.emag_fbe_ro_price_ron,
+                "google_sheet_row": sheet_product.row_number,
+                "google_sheet_data": json.dumps(sheet_product.raw_data),
+                "last_imported_at": now,
+                "import_source": "google_sheets",
+            }
+            if auto_map:
+                values.update(self._emag_mapping_values(sheet_product.sku, state, result))
+
+            mapping_id = state["mappings"].get(sheet_product.sku)
+            if mapping_id is None:
+                new_mappings.append(
+                    {"local_sku": sheet_product.sku, "is_active": True, **values}
+                )
+            else:
+                mapping_updates.append({"id": mapping_id, **values})
+
+        if mapping_updates:
+            await self.db.execute(update(GoogleSheetsProductMapping), mapping_updates)
+        if new_mappings:
+            inserted = await self.db.execute(
+                insert(GoogleSheetsProductMapping).returning(
+                    GoogleSheetsProductMapping.local_sku, GoogleSheetsProductMapping.id
+                ),
+                new_mappings,
+            )
+            result["mappings"] = dict(inserted.all())
+
+        # SKU history
+        history_rows = []
+        for sheet_product in batch:
+            if not sheet_product.sku_history:
+                continue
+            product_id = (
+                state["products"].get(sheet_product.sku)
+                or result["products"][sheet_product.sku]
+            )[0]
+            for old_sku in sheet_product.sku_history:
+                key = (product_id, old_sku, sheet_product.sku)
+                if key in state["history"] or key in result["history"]:
+                    continue
+                result["history"].add(key)
+                # Note: changed_at must be timezone-naive to match DB column type
+                history_rows.append(
+                    {
+                        "product_id": product_id,
+                        "old_sku": old_sku,
+                        "new_sku": sheet_product.sku,
+                        "changed_at": now.replace(tzinfo=None),
+                        "changed_by_id": None,  # System import, no user
+                        "change_reason": "Imported from Google Sheets SKU_History column",
+                        "ip_address": None,
+                        "user_agent": "Google Sheets Import Service",
+                    }
+                )
+        if history_rows:
+            await self.db.execute(insert(ProductSKUHistory), history_rows)
+
+        return result
+
+    @staticmethod
+    def _emag_mapping_values(
+        sku: str, state: dict[str, Any], result: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Mapping columns for the prefetched eMAG matches of one SKU"""
+        values: dict[str, Any] = {}
+        main_product = state["emag"].get((sku, "main"))
+        fbe_product = state["emag"].get((sku, "fbe"))
+
+        if main_product:
+            values.update(
+                emag_main_id=main_product[0],
+                emag_main_part_number=main_product[1],
+                emag_main_status="mapped",
+                mapping_method="exact_sku",
+                mapping_confidence=1.0,
+            )
+            result["auto_mapped_main"] += 1
+        else:
+            values["emag_main_status"] = "not_found"
+
+        if fbe_product:
+            values.update(
+                emag_fbe_id=fbe_product[0],
+                emag_fbe_part_number=fbe_product[1],
+                emag_fbe_status="mapped",
+                mapping_method="exact_sku",
+                mapping_confidence=1.0,
+            )
+            result["auto_mapped_fbe"] += 1
+        else:
+            values["emag_fbe_status"] = "not_found"
+
+        if not main_product and not fbe_product:
+            result["unmapped"] += 1
+        return values
+
     async def _import_single_product(
         self, sheet_product: ProductFromSheet, import_log: ImportLog, auto_map: bool
     ) -> tuple[bool, bool]:
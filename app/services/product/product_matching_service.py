@@ -7,14 +7,15 @@ from different suppliers based on:
 - Price similarity (for validation)
 """
 
+import asyncio
 import hashlib
 import re
-from collections import defaultdict
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.logging import get_logger
 from app.models.supplier import Supplier
 from app.models.supplier_matching import (
     MatchingStatus,
@@ -22,6 +23,28 @@ from app.models.supplier_matching import (
     ProductMatchingScore,
     SupplierRawProduct,
 )
+from app.services.product.image_hashing import (
+    HASH_BITS,
+    BKTree,
+    ImageFetcher,
+    compute_image_hashes,
+    from_signed64,
+    hamming_distance,
+    to_signed64,
+)
+from app.services.product.minhash_lsh import MinHashLSH
+
+logger = get_logger(__name__)
+
+# Images that cannot be fetched or decoded are retried after this delay,
+# doubled on every further failure
+IMAGE_HASH_RETRY_BASE = timedelta(hours=1)
+IMAGE_HASH_RETRY_MAX = timedelta(days=7)
+
+
+def image_hash_retry_delay(attempts: int) -> timedelta:
+    """Delay before hashing an image again after ``attempts`` failures."""
+    return min(IMAGE_HASH_RETRY_BASE * 2 ** max(attempts - 1, 0), IMAGE_HASH_RETRY_MAX)
 
 
 class ProductMatchingService:
@@ -39,6 +62,13 @@ class ProductMatchingService:
         self.TEXT_WEIGHT = 0.6
         self.IMAGE_WEIGHT = 0.4
 
+        # Candidate blocking (MinHash/LSH over character bigrams). Below
+        # LSH_MIN_PRODUCTS the exhaustive comparison is cheap enough; a lower
+        # LSH_THRESHOLD raises recall at the cost of more candidate pairs.
+        self.LSH_NUM_PERM = 128
+        self.LSH_THRESHOLD = 0.4
+        self.LSH_MIN_PRODUCTS = 200
+
     # ==================== TEXT SIMILARITY ====================
 
     def normalize_chinese_text(self, text: str) -> str:
@@ -133,19 +163,17 @@ class ProductMatchingService:
 
     def calculate_image_hash(self, image_url: str | None) -> str | None:
         """
-        Calculate perceptual hash for image using difference hash (dHash).
+        Calculate a URL fingerprint in perceptual hash format.
 
-        This is a simplified implementation that uses URL-based hashing.
-        For production with actual image processing, use PIL/Pillow.
+        Only identical URLs produce identical values. Real perceptual hashes
+        are computed from the image content by ``compute_image_hashes``.
         """
         if not image_url:
             return None
 
-        # For now, use URL-based hash with better distribution
-        # In production, download image and calculate actual perceptual hash
         url_hash = hashlib.sha256(image_url.encode()).hexdigest()
 
-        # Simulate perceptual hash format (64-bit hex string)
+        # Same format as a 64-bit perceptual hash (16 hex chars)
         return url_hash[:16]
 
     def calculate_image_similarity(
@@ -164,22 +192,133 @@ class ProductMatchingService:
             return 1.0
 
         try:
-            # Convert hex strings to binary
-            bin1 = bin(int(hash1, 16))[2:].zfill(64)
-            bin2 = bin(int(hash2, 16))[2:].zfill(64)
+            distance = hamming_distance(int(hash1, 16), int(hash2, 16))
+        except (ValueError, TypeError):
+            # If hash format is invalid, return 0
+            return 0.0
 
-            # Calculate Hamming distance
-            hamming_distance = sum(c1 != c2 for c1, c2 in zip(bin1, bin2, strict=False))
+        # Lower Hamming distance = higher similarity
+        return max(0.0, 1.0 - distance / HASH_BITS)
 
-            # Convert to similarity score (0.0 to 1.0)
-            # Lower Hamming distance = higher similarity
-            similarity = 1.0 - (hamming_distance / 64.0)
+    async def compute_image_hashes(
+        self,
+        fetcher: ImageFetcher,
+        batch_size: int = 200,
+        concurrency: int = 8,
+        limit: int | None = None,
+    ) -> dict[str, int]:
+        """Fetch supplier images and store their dHash/pHash values.
+
+        Processes active products whose ``image_phash`` is still empty, in
+        batches committed one at a time. Images that cannot be fetched or
+        decoded are left unhashed, counted as failed and skipped until
+        ``image_hash_retry_at``, which backs off exponentially per failure.
 
-            return similarity
+        Args:
+            fetcher: Source of image bytes
+            batch_size: Products loaded and committed per batch
+            concurrency: Maximum concurrent image fetches
+            limit: Stop after this many products (default: all pending)
 
-        except (ValueError, TypeError):
-            # If hash format is invalid, return 0
-            return 0.0
+        Returns:
+            Counts of hashed and failed products
+        """
+        stats = {"hashed": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        started = datetime.now(UTC).replace(tzinfo=None)
+        last_id = 0
+
+        def hash_failed(product: SupplierRawProduct) -> bool:
+            product.image_hash_attempts = (product.image_hash_attempts or 0) + 1
+            product.image_hash_retry_at = started + image_hash_retry_delay(
+                product.image_hash_attempts
+            )
+            return False
+
+        async def hash_product(product: SupplierRawProduct) -> bool:
+            async with semaphore:
+                image_data = await fetcher.fetch(product.image_url)
+            if not image_data:
+                return hash_failed(product)
+            try:
+                # Decoding and the DCT are CPU bound; keep them off the loop
+                dhash_value, phash_value = await asyncio.to_thread(
+                    compute_image_hashes, image_data
+                )
+            except ValueError as e:
+                logger.warning(f"Cannot hash image for product {product.id}: {e}")
+                return hash_failed(product)
+
+            product.image_dhash = to_signed64(dhash_value)
+            product.image_phash = to_signed64(phash_value)
+            product.image_hash = f"{phash_value:016x}"
+            product.image_downloaded = True
+            product.image_hash_attempts = 0
+            product.image_hash_retry_at = None
+            return True
+
+        while limit is None or stats["hashed"] + stats["failed"] < limit:
+            size = batch_size
+            if limit is not None:
+                size = min(size, limit - stats["hashed"] - stats["failed"])
+
+            stmt = (
+                select(SupplierRawProduct)
+                .where(
+                    and_(
+                        SupplierRawProduct.id > last_id,
+                        SupplierRawProduct.is_active,
+                        SupplierRawProduct.image_phash.is_(None),
+                        SupplierRawProduct.image_url.isnot(None),
+                        or_(
+                            SupplierRawProduct.image_hash_retry_at.is_(None),
+                            SupplierRawProduct.image_hash_retry_at <= started,
+                        ),
+                    )
+                )
+                .order_by(SupplierRawProduct.id)
+                .limit(size)
+            )
+            result = await self.db.execute(stmt)
+            products = result.scalars().all()
+            if not products:
+                break
+
+            outcomes = await asyncio.gather(*(hash_product(p) for p in products))
+            stats["hashed"] += sum(outcomes)
+            stats["failed"] += len(outcomes) - sum(outcomes)
+            last_id = products[-1].id
+            await self.db.commit()
+
+        logger.info(
+            f"Image hashing finished: {stats['hashed']} hashed, {stats['failed']} failed"
+        )
+        return stats
+
+    def build_image_index(self, products: list[SupplierRawProduct]) -> BKTree:
+        """Build a BK-tree of product pHashes for near-duplicate lookup.
+
+        Items are positions in ``products``. Products without a usable hash
+        are left out.
+        """
+        tree = BKTree()
+        for index, product in enumerate(products):
+            hash_value = self._product_image_hash(product)
+            if hash_value is not None:
+                tree.add(hash_value, index)
+        return tree
+
+    @staticmethod
+    def _product_image_hash(product: SupplierRawProduct) -> int | None:
+        """Return the product's 64-bit pHash, falling back to ``image_hash``."""
+        if product.image_phash is not None:
+            return from_signed64(product.image_phash)
+        if product.image_hash:
+            try:
+                return int(product.image_hash, 16)
+            except ValueError:
+                return None
+        return None
 
     # ==================== PRICE SIMILARITY ====================
 
@@ -202,12 +341,14 @@ class ProductMatchingService:
     # ==================== MATCHING LOGIC ====================
 
     async def match_products_by_text(
-        self, threshold: float | None = None
+        self, threshold: float | None = None, use_blocking: bool | None = None
     ) -> list[ProductMatchingGroup]:
         """Match products based on text similarity.
 
         Args:
             threshold: Minimum similarity score (default: 0.70)
+            use_blocking: Score only MinHash/LSH candidate pairs instead of
+                every pair (default: automatic, based on LSH_MIN_PRODUCTS)
 
         Returns:
             List of created matching groups
@@ -227,7 +368,8 @@ class ProductMatchingService:
         if len(products) < 2:
             return []
 
-        # Calculate pairwise similarities
+        # Calculate pairwise similarities (restricted to candidates if blocking)
+        neighbors = self._candidate_neighbors(products, use_blocking)
         groups = []
         matched_products = set()
 
@@ -240,7 +382,7 @@ class ProductMatchingService:
             matched_products.add(product_a.id)
 
             # Find similar products
-            for product_b in products[i + 1 :]:
+            for product_b in self._iter_candidates(products, neighbors, i):
                 if product_b.id in matched_products:
                     continue
 
@@ -284,9 +426,14 @@ class ProductMatchingService:
     ) -> list[ProductMatchingGroup]:
         """Match products based on image similarity.
 
+        Groups products whose perceptual hashes are within the Hamming
+        distance implied by ``threshold`` (0.85 allows 9 of 64 bits to differ),
+        using a BK-tree instead of comparing every pair.
+
         Note: Requires image hashes to be pre-calculated.
         """
         threshold = threshold or self.IMAGE_SIMILARITY_THRESHOLD
+        max_distance = int((1.0 - threshold) * HASH_BITS + 1e-9)
 
         # Get products with image hashes
         stmt = select(SupplierRawProduct).where(
@@ -302,37 +449,59 @@ class ProductMatchingService:
         if len(products) < 2:
             return []
 
-        # Group by image hash
-        hash_groups = defaultdict(list)
-        for product in products:
-            if product.image_hash:
-                hash_groups[product.image_hash].append(product)
+        tree = self.build_image_index(products)
 
         # Create groups for matching images
         groups = []
-        for _image_hash, group_products in hash_groups.items():
-            if len(group_products) > 1:
-                # Skip if all from same supplier
-                supplier_ids = {p.supplier_id for p in group_products}
-                if len(supplier_ids) == 1:
-                    continue
+        matched_products = set()
+        for index, product in enumerate(products):
+            if index in matched_products:
+                continue
+            hash_value = self._product_image_hash(product)
+            if hash_value is None:
+                continue
 
-                group = await self._create_matching_group(
-                    group_products,
-                    matching_method="image",
-                    confidence_score=1.0,  # Exact hash match
-                )
-                groups.append(group)
+            neighbors = [
+                (distance, other)
+                for distance, other in tree.search(hash_value, max_distance)
+                if other != index and other not in matched_products
+            ]
+            if not neighbors:
+                continue
+
+            group_products = [product] + [products[other] for _, other in neighbors]
+
+            # Skip if all from same supplier
+            supplier_ids = {p.supplier_id for p in group_products}
+            if len(supplier_ids) == 1:
+                continue
+
+            matched_products.add(index)
+            matched_products.update(other for _, other in neighbors)
+
+            worst_distance = max(distance for distance, _ in neighbors)
+            group = await self._create_matching_group(
+                group_products,
+                matching_method="image",
+                confidence_score=1.0 - worst_distance / HASH_BITS,
+            )
+            groups.append(group)
 
         await self.db.commit()
         return groups
 
     async def match_products_hybrid(
-        self, threshold: float | None = None
+        self, threshold: float | None = None, use_blocking: bool | None = None
     ) -> list[ProductMatchingGroup]:
         """Match products using hybrid approach (text + image).
 
         This is the recommended method for best accuracy.
+
+        Args:
+            threshold: Minimum hybrid score (default: 0.75)
+            use_blocking: Score only MinHash/LSH candidate pairs (plus pairs
+                with near-duplicate images) instead of every pair (default:
+                automatic, based on LSH_MIN_PRODUCTS)
         """
         threshold = threshold or self.HYBRID_THRESHOLD
 
@@ -349,6 +518,9 @@ class ProductMatchingService:
         if len(products) < 2:
             return []
 
+        neighbors = self._candidate_neighbors(
+            products, use_blocking, include_image_hash=True
+        )
         groups = []
         matched_products = set()
 
@@ -359,7 +531,7 @@ class ProductMatchingService:
             group_products = [product_a]
             matched_products.add(product_a.id)
 
-            for product_b in products[i + 1 :]:
+            for product_b in self._iter_candidates(products, neighbors, i):
                 if product_b.id in matched_products:
                     continue
 
@@ -421,6 +593,70 @@ class ProductMatchingService:
         await self.db.commit()
         return groups
 
+    def _candidate_neighbors(
+        self,
+        products: list[SupplierRawProduct],
+        use_blocking: bool | None,
+        include_image_hash: bool = False,
+    ) -> list[list[int]] | None:
+        """Build the candidate pairs to score for a list of products.
+
+        Args:
+            products: Products in matching order
+            use_blocking: Force blocking on/off; None decides by list size
+            include_image_hash: Also pair products whose image hashes are
+                within the image matching distance (BK-tree lookup)
+
+        Returns:
+            For each product index, the sorted indices of later products that
+            should be compared with it, or None to compare every pair
+        """
+        if use_blocking is None:
+            use_blocking = len(products) >= self.LSH_MIN_PRODUCTS
+        if not use_blocking:
+            return None
+
+        lsh = MinHashLSH(num_perm=self.LSH_NUM_PERM, threshold=self.LSH_THRESHOLD)
+        pairs = lsh.candidate_pairs(
+            self.normalize_chinese_text(product.chinese_name or "")
+            for product in products
+        )
+
+        if include_image_hash:
+            max_distance = int((1.0 - self.IMAGE_SIMILARITY_THRESHOLD) * HASH_BITS + 1e-9)
+            tree = self.build_image_index(products)
+            for index, product in enumerate(products):
+                hash_value = self._product_image_hash(product)
+                if hash_value is None:
+                    continue
+                pairs.update(
+                    (index, other)
+                    for _, other in tree.search(hash_value, max_distance)
+                    if other > index
+                )
+
+        neighbors: list[list[int]] = [[] for _ in products]
+        for first, second in pairs:
+            neighbors[first].append(second)
+        for candidates in neighbors:
+            candidates.sort()
+        return neighbors
+
+    @staticmethod
+    def _iter_candidates(
+        products: list[SupplierRawProduct],
+        neighbors: list[list[int]] | None,
+        index: int,
+    ):
+        """Return an iterator over the products to compare with ``products[index]``.
+
+        Keeps the original order so that greedy grouping gives the same
+        result as the exhaustive scan whenever all true matches are candidates.
+        """
+        if neighbors is None:
+            return iter(products[index + 1 :])
+        return (products[j] for j in neighbors[index])
+
     async def _create_matching_group(
         self,
         products: list[SupplierRawProduct],
@@ -5,18 +5,207 @@ Handles the import of scraped 1688.com product data from Excel files with:
 - Prices in CNY
 - Product URLs
 - Image URLs
+
+Workbooks are read as a stream of row chunks (openpyxl read-only mode), so
+memory stays bounded by ``IMPORT_CHUNK_SIZE`` rows whatever the file size.
+Each chunk is normalized with vectorized pandas operations, checked against
+the existing product URLs with one query and written with one bulk INSERT
+plus one bulk price UPDATE, then committed. Large files can be imported by
+a background job whose progress is kept in Redis (``get_import_job``).
 """
 
+import asyncio
+import json
+import logging
+import os
+import time
 import uuid
+import zipfile
+from collections.abc import Awaitable, Callable, Iterator
 from datetime import UTC, datetime
 from io import BytesIO
+from typing import IO, Any
 
 import pandas as pd
-from sqlalchemy import select
+from openpyxl import load_workbook
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.supplier import Supplier
+from app.core.cache import get_redis
+from app.models.supplier import Supplier, SupplierProduct
 from app.models.supplier_matching import MatchingStatus, SupplierRawProduct
+from app.services.jieba_matching_service import ENTITY_SUPPLIER_PRODUCT, JiebaTokenIndex
+
+logger = logging.getLogger(__name__)
+
+# Rows read, normalized and written per step
+IMPORT_CHUNK_SIZE = 2000
+
+# How long finished import jobs can be looked up
+IMPORT_JOB_TTL = 24 * 3600
+
+# Error messages kept in import results
+MAX_ERROR_DETAILS = 10
+
+DEFAULT_COLUMN_MAPPING = {
+    "chinese_name": "Nume produs",
+    "price_cny": "Pret CNY",
+    "product_url": "URL produs",
+    "image_url": "URL imagine",
+}
+
+# Columns of the 1688 scraper export, mapped to the import fields
+SCRAPING_COLUMN_MAPPING = {
+    "chinese_name": "chinese_name_scrapping",
+    "price_cny": "price_scrapping",
+    "product_url": "url_product_scrapping",
+    "image_url": "url_image_scrapping",
+}
+
+# A number in "CN ¥ 2.45", "2,450.00" or 2.45
+_PRICE_PATTERN = r"(\d+(?:\.\d+)?)"
+
+ProgressCallback = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+def iter_excel_chunks(
+    source: bytes | str | IO[bytes], chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """Read the first sheet of a workbook in chunks of ``chunk_size`` rows.
+
+    The first non-empty row holds the column names. Every chunk has a
+    ``row_number`` column with the spreadsheet row of each record. Legacy
+    ``.xls`` files cannot be streamed and are read at once, then chunked.
+
+    Raises:
+        ValueError: The file is not a readable workbook
+    """
+    stream = BytesIO(source) if isinstance(source, bytes) else source
+    if not zipfile.is_zipfile(stream):
+        if hasattr(stream, "seek"):
+            stream.seek(0)
+        try:
+            df = pd.read_excel(stream)
+        except Exception as e:
+            raise ValueError(f"Failed to read Excel file: {str(e)}") from e
+        df["row_number"] = range(2, len(df) + 2)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start : start + chunk_size]
+        return
+
+    if hasattr(stream, "seek"):
+        stream.seek(0)
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"Failed to read Excel file: {str(e)}") from e
+
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header: list[str] | None = None
+        header_row = 0
+        for values in rows:
+            header_row += 1
+            if any(value is not None and str(value).strip() for value in values):
+                header = [str(value).strip() if value is not None else "" for value in values]
+                break
+        if header is None:
+            return
+
+        chunk: list[tuple] = []
+        numbers: list[int] = []
+        for row_number, values in enumerate(rows, start=header_row + 1):
+            if not any(value is not None for value in values):
+                continue
+            chunk.append(tuple(values[: len(header)]) + (None,) * (len(header) - len(values)))
+            numbers.append(row_number)
+            if len(chunk) >= chunk_size:
+                yield _chunk_frame(chunk, header, numbers)
+                chunk, numbers = [], []
+        if chunk:
+            yield _chunk_frame(chunk, header, numbers)
+    finally:
+        workbook.close()
+
+
+def _chunk_frame(rows: list[tuple], header: list[str], numbers: list[int]) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=header)
+    df["row_number"] = numbers
+    return df
+
+
+def missing_columns(df: pd.DataFrame, column_mapping: dict[str, str]) -> list[str]:
+    """Mapped Excel columns absent from ``df``."""
+    return [column for column in column_mapping.values() if column not in df.columns]
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.astype("string").str.strip().fillna("")
+
+
+def parse_prices(series: pd.Series) -> pd.Series:
+    """Vectorized price parsing; unparsable prices become NaN."""
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors="coerce").astype(float)
+    text = series.astype("string").str.replace(",", "", regex=False)
+    return pd.to_numeric(text.str.extract(_PRICE_PATTERN, expand=False), errors="coerce")
+
+
+def normalize_chunk(
+    df: pd.DataFrame, column_mapping: dict[str, str] | None = None
+) -> tuple[pd.DataFrame, int, list[str]]:
+    """Turn a chunk of spreadsheet rows into importable records.
+
+    Rows without a name or URL, or with a price that is not positive, are
+    skipped; rows whose price is missing or cannot be parsed are errors.
+    Rows repeating a product URL within the chunk keep the last one; the
+    earlier ones count as skipped.
+
+    Args:
+        df: Spreadsheet rows, with a ``row_number`` column
+        column_mapping: Field name -> Excel column (default: the mapped names
+            of ``DEFAULT_COLUMN_MAPPING``, or the field names themselves when
+            ``df`` already uses them)
+
+    Returns:
+        Records (chinese_name, price_cny, product_url, image_url, row_number),
+        the number of skipped rows and the error messages
+    """
+    if column_mapping is None:
+        column_mapping = {field: field for field in DEFAULT_COLUMN_MAPPING}
+
+    row_numbers = (
+        df["row_number"] if "row_number" in df else pd.Series(range(2, len(df) + 2), df.index)
+    )
+    raw_prices = df[column_mapping["price_cny"]]
+    records = pd.DataFrame(
+        {
+            "chinese_name": _text(df[column_mapping["chinese_name"]]),
+            "price_cny": parse_prices(raw_prices),
+            "product_url": _text(df[column_mapping["product_url"]]),
+            "image_url": _text(df[column_mapping["image_url"]]),
+            "row_number": row_numbers,
+        }
+    )
+
+    present = (records["chinese_name"] != "") & (records["product_url"] != "")
+    invalid_price = present & records["price_cny"].isna()
+    valid = present & (records["price_cny"] > 0)
+
+    errors = [
+        f"Row {row_number}: Missing price"
+        if pd.isna(price)
+        else f"Row {row_number}: Invalid price format '{price}'"
+        for row_number, price in zip(
+            records.loc[invalid_price, "row_number"], raw_prices[invalid_price], strict=True
+        )
+    ]
+    skipped = int((~valid & ~invalid_price).sum())
+
+    records = records[valid]
+    unique = records.drop_duplicates("product_url", keep="last")
+    skipped += len(records) - len(unique)
+    return unique, skipped, errors
 
 
 class SupplierImportService:
@@ -27,14 +216,16 @@ class SupplierImportService:
 
     async def import_from_excel(
         self,
-        file_content: bytes,
+        file_content: bytes | str | IO[bytes],
         supplier_id: int,
         column_mapping: dict[str, str] | None = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        progress: ProgressCallback | None = None,
     ) -> dict:
         """Import products from Excel file.
 
         Args:
-            file_content: Excel file content as bytes
+            file_content: Excel file content as bytes, a path or a binary file
             supplier_id: ID of the supplier
             column_mapping: Optional mapping of Excel columns to expected fields
                 Default mapping:
@@ -44,6 +235,8 @@ class SupplierImportService:
                     "product_url": "URL produs",
                     "image_url": "URL imagine"
                 }
+            chunk_size: Rows read and written per step
+            progress: Coroutine called with the running totals after each chunk
 
         Returns:
             Dict with import statistics
@@ -53,106 +246,19 @@ class SupplierImportService:
         if not supplier:
             raise ValueError(f"Supplier {supplier_id} not found")
 
-        # Default column mapping
-        if column_mapping is None:
-            column_mapping = {
-                "chinese_name": "Nume produs",
-                "price_cny": "Pret CNY",
-                "product_url": "URL produs",
-                "image_url": "URL imagine",
-            }
-
-        # Read Excel file
-        try:
-            df = pd.read_excel(BytesIO(file_content))
-        except Exception as e:
-            raise ValueError(f"Failed to read Excel file: {str(e)}") from e
-
-        # Validate columns
-        missing_columns = []
-        for expected_col in column_mapping.values():
-            if expected_col not in df.columns:
-                missing_columns.append(expected_col)
-
-        if missing_columns:
-            raise ValueError(
-                f"Missing required columns: {', '.join(missing_columns)}. "
-                f"Available columns: {', '.join(df.columns)}"
-            )
-
-        # Generate batch ID for this import
-        batch_id = f"import_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
-
-        # Import products
-        imported_count = 0
-        skipped_count = 0
-        error_count = 0
-        errors = []
-
-        for idx, row in df.iterrows():
-            try:
-                # Extract data
-                chinese_name = str(row[column_mapping["chinese_name"]]).strip()
-                price_cny = float(row[column_mapping["price_cny"]])
-                product_url = str(row[column_mapping["product_url"]]).strip()
-                image_url = str(row[column_mapping["image_url"]]).strip()
-
-                # Validate required fields
-                if not chinese_name or not product_url:
-                    skipped_count += 1
-                    continue
-
-                if price_cny <= 0:
-                    skipped_count += 1
-                    continue
-
-                # Check for duplicates (same supplier + URL)
-                existing = await self._check_duplicate(supplier_id, product_url)
-                if existing:
-                    # Update price if changed
-                    if existing.price_cny != price_cny:
-                        existing.price_cny = price_cny
-                        existing.last_price_check = datetime.now(UTC)
-                    skipped_count += 1
-                    continue
-
-                # Create new product
-                product = SupplierRawProduct(
-                    supplier_id=supplier_id,
-                    chinese_name=chinese_name,
-                    price_cny=price_cny,
-                    product_url=product_url,
-                    image_url=image_url,
-                    import_batch_id=batch_id,
-                    import_date=datetime.now(UTC),
-                    matching_status=MatchingStatus.PENDING,
-                    is_active=True,
-                )
-
-                self.db.add(product)
-                imported_count += 1
-
-            except Exception as e:
-                error_count += 1
-                errors.append(f"Row {idx + 2}: {str(e)}")
-
-        # Commit transaction
-        await self.db.commit()
-
-        return {
-            "success": True,
-            "batch_id": batch_id,
-            "supplier_id": supplier_id,
-            "supplier_name": supplier.name,
-            "total_rows": len(df),
-            "imported": imported_count,
-            "skipped": skipped_count,
-            "errors": error_count,
-            "error_details": errors[:10] if errors else [],  # First 10 errors
-        }
+        column_mapping = column_mapping or DEFAULT_COLUMN_MAPPING
+        chunks = iter_excel_chunks(file_content, chunk_size)
+        result = await self._import_chunks(
+            chunks, supplier_id, _new_batch_id(), column_mapping, progress
+        )
+        return {**result, "supplier_name": supplier.name}
 
     async def import_from_dataframe(
-        self, df: pd.DataFrame, supplier_id: int, batch_id: str | None = None
+        self,
+        df: pd.DataFrame,
+        supplier_id: int,
+        batch_id: str | None = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
     ) -> dict:
         """Import products from pandas DataFrame.
 
@@ -162,55 +268,234 @@ class SupplierImportService:
         if not supplier:
             raise ValueError(f"Supplier {supplier_id} not found")
 
-        if batch_id is None:
-            batch_id = (
-                "import_"
-                f"{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
-                f"_{uuid.uuid4().hex[:8]}"
-            )
+        chunks = (df.iloc[start : start + chunk_size] for start in range(0, len(df), chunk_size))
+        result = await self._import_chunks(chunks, supplier_id, batch_id or _new_batch_id())
+        return {
+            "success": True,
+            "batch_id": result["batch_id"],
+            "imported": result["imported"],
+            "skipped": result["skipped"] + result["errors"],
+        }
+
+    async def _import_chunks(
+        self,
+        chunks: Iterator[pd.DataFrame],
+        supplier_id: int,
+        batch_id: str,
+        column_mapping: dict[str, str] | None = None,
+        progress: ProgressCallback | None = None,
+    ) -> dict:
+        """Normalize, de-duplicate and write ``chunks``, committing each one."""
+        totals = {
+            "success": True,
+            "batch_id": batch_id,
+            "supplier_id": supplier_id,
+            "total_rows": 0,
+            "imported": 0,
+            "updated": 0,
+            "skipped": 0,
+            "errors": 0,
+            "error_details": [],
+        }
+
+        first = True
+        for chunk in chunks:
+            if first and column_mapping is not None:
+                missing = missing_columns(chunk, column_mapping)
+                if missing:
+                    raise ValueError(
+                        f"Missing required columns: {', '.join(missing)}. "
+                        f"Available columns: "
+                        f"{', '.join(str(c) for c in chunk.columns if c != 'row_number')}"
+                    )
+            first = False
+
+            records, skipped, errors = normalize_chunk(chunk, column_mapping)
+            imported, updated = await self._write_chunk(records, supplier_id, batch_id)
+            await self.db.commit()
+
+            totals["total_rows"] += len(chunk)
+            totals["imported"] += imported
+            totals["updated"] += updated
+            # Existing products count as skipped, as they always have
+            totals["skipped"] += skipped + len(records) - imported
+            totals["errors"] += len(errors)
+            room = MAX_ERROR_DETAILS - len(totals["error_details"])
+            totals["error_details"].extend(errors[: max(room, 0)])
+
+            if progress is not None:
+                await progress(dict(totals))
+            # Let other requests run between chunks
+            await asyncio.sleep(0)
+
+        return totals
+
+    async def _write_chunk(
+        self, records: pd.DataFrame, supplier_id: int, batch_id: str
+    ) -> tuple[int, int]:
+        """Insert new products and reprice existing ones.
 
-        imported_count = 0
-        skipped_count = 0
-
-        for _, row in df.iterrows():
-            try:
-                # Check for duplicates
-                existing = await self._check_duplicate(supplier_id, row["product_url"])
-
-                if existing:
-                    if existing.price_cny != row["price_cny"]:
-                        existing.price_cny = row["price_cny"]
-                        existing.last_price_check = datetime.now(UTC)
-                    skipped_count += 1
-                    continue
-
-                # Create new product
-                product = SupplierRawProduct(
-                    supplier_id=supplier_id,
-                    chinese_name=row["chinese_name"],
-                    price_cny=row["price_cny"],
-                    product_url=row["product_url"],
-                    image_url=row["image_url"],
-                    import_batch_id=batch_id,
-                    import_date=datetime.now(UTC),
-                    matching_status=MatchingStatus.PENDING,
-                    is_active=True,
+        Returns:
+            Numbers of inserted and repriced products
+        """
+        if records.empty:
+            return 0, 0
+
+        existing = {
+            row.product_url: row
+            for row in (
+                await self.db.execute(
+                    select(
+                        SupplierRawProduct.id,
+                        SupplierRawProduct.product_url,
+                        SupplierRawProduct.price_cny,
+                    ).where(
+                        SupplierRawProduct.supplier_id == supplier_id,
+                        SupplierRawProduct.is_active,
+                        SupplierRawProduct.product_url.in_(records["product_url"].tolist()),
+                    )
                 )
+            ).all()
+        }
 
-                self.db.add(product)
-                imported_count += 1
+        now = datetime.now(UTC).replace(tzinfo=None)
+        new_rows = []
+        repriced = []
+        for name, price, url, image_url in zip(
+            records["chinese_name"].tolist(),
+            records["price_cny"].tolist(),
+            records["product_url"].tolist(),
+            records["image_url"].tolist(),
+            strict=True,
+        ):
+            current = existing.get(url)
+            if current is None:
+                new_rows.append(
+                    {
+                        "supplier_id": supplier_id,
+                        "chinese_name": name,
+                        "price_cny": price,
+                        "product_url": url,
+                        "image_url": image_url,
+                        "import_batch_id": batch_id,
+                        "import_date": now,
+                        "matching_status": MatchingStatus.PENDING,
+                        "is_active": True,
+                    }
+                )
+            elif current.price_cny != price:
+                repriced.append({"id": current.id, "price_cny": price, "last_price_check": now})
 
-            except Exception:
-                skipped_count += 1
+        if new_rows:
+            await self.db.execute(insert(SupplierRawProduct), new_rows)
+        if repriced:
+            await self.db.execute(update(SupplierRawProduct), repriced)
+        return len(new_rows), len(repriced)
 
-        await self.db.commit()
+    async def import_supplier_products(
+        self,
+        file_content: bytes | str | IO[bytes],
+        supplier_id: int,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> dict:
+        """Create or update ``SupplierProduct`` rows from a scraper export.
 
-        return {
-            "success": True,
-            "batch_id": batch_id,
-            "imported": imported_count,
-            "skipped": skipped_count,
-        }
+        Products are matched on their URL; existing ones get the name, image
+        and price of the file. Columns: ``SCRAPING_COLUMN_MAPPING``.
+
+        Rows are filtered by :func:`normalize_chunk`: rows without a name or
+        URL, with a price that is not positive or repeating a URL of the same
+        chunk are skipped, and missing or unparsable prices are reported as
+        errors (and counted as skipped).
+
+        Returns:
+            Dict with imported (created or updated), skipped and error counts
+        """
+        totals = {"total_rows": 0, "imported": 0, "skipped": 0, "errors": []}
+        first = True
+        for chunk in iter_excel_chunks(file_content, chunk_size):
+            if first:
+                missing = missing_columns(chunk, SCRAPING_COLUMN_MAPPING)
+                if missing:
+                    raise ValueError(f"Missing required columns: {', '.join(missing)}")
+                first = False
+
+            records, skipped, errors = normalize_chunk(chunk, SCRAPING_COLUMN_MAPPING)
+            await self._upsert_supplier_products(records, supplier_id)
+            await self.db.commit()
+
+            totals["total_rows"] += len(chunk)
+            totals["imported"] += len(records)
+            totals["skipped"] += skipped + len(errors)
+            totals["errors"].extend(errors)
+            await asyncio.sleep(0)
+
+        return totals
+
+    async def _upsert_supplier_products(self, records: pd.DataFrame, supplier_id: int) -> None:
+        """Insert new supplier products and update existing ones by URL.
+
+        Bulk statements bypass the jieba token index flush listener, so the
+        written products are reindexed in the same transaction.
+        """
+        if records.empty:
+            return
+
+        existing = dict(
+            (
+                await self.db.execute(
+                    select(SupplierProduct.supplier_product_url, SupplierProduct.id).where(
+                        SupplierProduct.supplier_id == supplier_id,
+                        SupplierProduct.supplier_product_url.in_(
+                            records["product_url"].tolist()
+                        ),
+                    )
+                )
+            ).all()
+        )
+
+        now = datetime.now(UTC).replace(tzinfo=None)
+        new_rows = []
+        changed_rows = []
+        for name, price, url, image_url in zip(
+            records["chinese_name"].tolist(),
+            records["price_cny"].tolist(),
+            records["product_url"].tolist(),
+            records["image_url"].tolist(),
+            strict=True,
+        ):
+            values = {
+                "supplier_product_name": name,
+                "supplier_image_url": image_url,
+                "supplier_price": price,
+                "supplier_currency": "CNY",
+                "updated_at": now,
+            }
+            if url in existing:
+                changed_rows.append({"id": existing[url], **values})
+            else:
+                new_rows.append(
+                    {
+                        **values,
+                        "supplier_id": supplier_id,
+                        "supplier_product_url": url,
+                        "is_active": True,
+                        "created_at": now,
+                    }
+                )
+
+        written_ids = [row["id"] for row in changed_rows]
+        if new_rows:
+            written_ids.extend(
+                (
+                    await self.db.execute(
+                        insert(SupplierProduct).returning(SupplierProduct.id), new_rows
+                    )
+                ).scalars()
+            )
+        if changed_rows:
+            await self.db.execute(update(SupplierProduct), changed_rows)
+        await JiebaTokenIndex(self.db).reindex(ENTITY_SUPPLIER_PRODUCT, written_ids)
 
     async def get_import_statistics(self, batch_id: str) -> dict:
         """Get statistics for an import batch."""
@@ -253,18 +538,6 @@ class SupplierImportService:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def _check_duplicate(
-        self, supplier_id: int, product_url: str
-    ) -> SupplierRawProduct | None:
-        """Check if product already exists."""
-        stmt = select(SupplierRawProduct).where(
-            SupplierRawProduct.supplier_id == supplier_id,
-            SupplierRawProduct.product_url == product_url,
-            SupplierRawProduct.is_active,
-        )
-        result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
-
     async def get_supplier_products_summary(self) -> list[dict]:
         """Get summary of products per supplier."""
 
@@ -326,3 +599,111 @@ class SupplierImportService:
         await self.db.commit()
 
         return {"success": True, "batch_id": batch_id, "deleted_count": count}
+
+
+def _new_batch_id() -> str:
+    return f"import_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+# ==================== BACKGROUND IMPORT JOBS ====================
+
+# Job states this process could not store in Redis: job id -> (expiry, job)
+_local_jobs: dict[str, tuple[float, dict[str, Any]]] = {}
+
+
+def _job_key(job_id: str) -> str:
+    return f"supplier_import:job:{job_id}"
+
+
+def _evict_local_jobs() -> None:
+    now = time.monotonic()
+    for job_id in [job_id for job_id, (expires, _) in _local_jobs.items() if expires <= now]:
+        del _local_jobs[job_id]
+
+
+async def save_import_job(job: dict[str, Any]) -> None:
+    """Store the state of an import job where every process can read it.
+
+    When Redis cannot be written, the state is kept in this process for
+    ``IMPORT_JOB_TTL`` seconds instead.
+    """
+    _evict_local_jobs()
+    try:
+        redis = await get_redis()
+        await redis.set(_job_key(job["job_id"]), json.dumps(job, default=str), ex=IMPORT_JOB_TTL)
+    except Exception as e:
+        logger.warning(f"Could not store supplier import job {job['job_id']}: {e}")
+        _local_jobs[job["job_id"]] = (time.monotonic() + IMPORT_JOB_TTL, job)
+    else:
+        _local_jobs.pop(job["job_id"], None)
+
+
+async def get_import_job(job_id: str) -> dict[str, Any] | None:
+    """The state of an import job, or None if it is unknown or expired."""
+    _evict_local_jobs()
+    # Only held when the last write to Redis failed, so it is the newest state
+    if job_id in _local_jobs:
+        return _local_jobs[job_id][1]
+    try:
+        redis = await get_redis()
+        payload = await redis.get(_job_key(job_id))
+        if payload is not None:
+            return json.loads(payload)
+    except Exception as e:
+        logger.warning(f"Could not read supplier import job {job_id}: {e}")
+    return None
+
+
+async def create_import_job(supplier_id: int, filename: str | None = None) -> dict[str, Any]:
+    """Register a queued import job."""
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "supplier_id": supplier_id,
+        "filename": filename,
+        "status": "queued",
+        "created_at": datetime.now(UTC).isoformat(),
+        "finished_at": None,
+        "progress": None,
+        "result": None,
+        "error": None,
+    }
+    await save_import_job(job)
+    return job
+
+
+async def run_import_job(
+    job: dict[str, Any],
+    path: str,
+    session_factory,
+    column_mapping: dict[str, str] | None = None,
+) -> None:
+    """Import the workbook at ``path`` for ``job``, then delete the file.
+
+    Meant to run as a background task: it opens its own session, records
+    progress after every chunk and never raises.
+    """
+    job = {**job, "status": "running"}
+    await save_import_job(job)
+
+    async def report(totals: dict[str, Any]) -> None:
+        job["progress"] = {
+            key: totals[key] for key in ("total_rows", "imported", "updated", "skipped", "errors")
+        }
+        await save_import_job(job)
+
+    try:
+        async with session_factory() as session:
+            result = await SupplierImportService(session).import_from_excel(
+                path, job["supplier_id"], column_mapping, progress=report
+            )
+        job.update(status="completed", result=result)
+    except Exception as e:
+        logger.error(f"Supplier import job {job['job_id']} failed: {e}", exc_info=True)
+        job.update(status="failed", error=str(e))
+    finally:
+        job["finished_at"] = datetime.now(UTC).isoformat()
+        await save_import_job(job)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
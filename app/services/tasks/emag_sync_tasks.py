@@ -4,6 +4,8 @@ Celery tasks for automated eMAG synchronization.
 This module provides background tasks for:
 - Automatic order synchronization every 5 minutes
 - Product synchronization
+- Dispatch of queued offer price and stock updates
+- Delta refresh of the local eMAG category mirror
 - Error recovery and retry logic
 """
 
@@ -18,6 +20,8 @@ from celery.utils.log import get_task_logger
 
 from app.core.database import async_session_factory
 from app.models.emag_models import EmagOrder, EmagSyncLog
+from app.services.emag.emag_category_mirror import EmagCategoryMirrorSync
+from app.services.emag.emag_offer_outbox_service import EmagOfferOutboxService
 from app.services.emag.emag_order_service import EmagOrderService
 
 logger = get_task_logger(__name__)
@@ -134,9 +138,9 @@ async def _sync_orders_async() -> dict[str, Any]:
                 logger.info(f"Syncing orders for {account_type} account")
 
                 async with EmagOrderService(account_type, db) as order_service:
-                    # Sync new orders (status 1 = new)
+                    # Sync new orders (status 1 = new) changed since the last run
                     sync_result = await order_service.sync_new_orders(
-                        status_filter=1, max_pages=10
+                        status_filter=1, max_pages=10, incremental=True
                     )
 
                     results["accounts"][account_type] = {
@@ -524,3 +528,82 @@ async def _health_check_async() -> dict[str, Any]:
             logger.error(f"Health check failed: {e}", exc_info=True)
 
     return health
+
+
+@shared_task(
+    name="emag.dispatch_offer_outbox",
+    bind=True,
+)
+def dispatch_offer_outbox_task(self) -> dict[str, Any]:
+    """
+    Send queued eMAG offer price and stock updates for both accounts.
+
+    Picks up changes left in the offer outbox by interrupted bulk updates
+    and retries failed sends once their backoff has elapsed.
+
+    Returns:
+        Dict with dispatch statistics per account
+    """
+    try:
+        result = run_async(_dispatch_offer_outbox_async())
+        logger.info(f"Offer outbox dispatch completed: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Offer outbox dispatch failed: {exc}", exc_info=True)
+        raise
+
+
+async def _dispatch_offer_outbox_async() -> dict[str, Any]:
+    """
+    Async implementation of the offer outbox dispatch.
+
+    Returns:
+        Dict with dispatch statistics per account
+    """
+    results = {"timestamp": datetime.now(UTC).isoformat(), "accounts": {}}
+
+    for account_type in ["main", "fbe"]:
+        async with EmagOfferOutboxService(account_type) as outbox:
+            summary = await outbox.dispatch()
+            results["accounts"][account_type] = {
+                "requests": summary["requests"],
+                "sent": summary["sent"],
+                "failed": summary["failed"],
+            }
+
+    return results
+
+
+@shared_task(
+    name="emag.sync_category_mirror",
+    bind=True,
+)
+def sync_category_mirror_task(self, full: bool = False) -> dict[str, Any]:
+    """
+    Refresh the local mirror of eMAG categories, VAT rates and handling times.
+
+    Args:
+        full: Re-read the characteristics of every allowed category
+
+    Returns:
+        Dict with the mirror changes
+    """
+    try:
+        result = run_async(_sync_category_mirror_async(full))
+        logger.info(f"Category mirror sync completed: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Category mirror sync failed: {exc}", exc_info=True)
+        raise
+
+
+async def _sync_category_mirror_async(full: bool = False) -> dict[str, Any]:
+    """
+    Async implementation of the category mirror sync.
+
+    Returns:
+        Dict with the mirror changes
+    """
+    async with EmagCategoryMirrorSync("main") as mirror_sync:
+        summary = await mirror_sync.run(full=full)
+    return {"timestamp": datetime.now(UTC).isoformat(), **summary}
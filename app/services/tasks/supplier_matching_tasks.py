@@ -0,0 +1,82 @@
+"""
+Celery tasks for supplier product matching.
+
+This module provides background tasks for:
+- Fetching supplier images and computing perceptual hashes
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from celery import shared_task
+from celery.utils.log import get_task_logger
+
+from app.core.database import async_session_factory
+from app.services.product.image_hashing import (
+    HttpImageFetcher,
+    ImageFetcher,
+    LocalFileImageFetcher,
+)
+from app.services.product.product_matching_service import ProductMatchingService
+from app.services.tasks.emag_sync_tasks import run_async
+
+logger = get_task_logger(__name__)
+
+
+@shared_task(
+    name="supplier_matching.compute_image_hashes",
+    bind=True,
+    max_retries=2,
+    default_retry_delay=600,  # 10 minutes
+)
+def compute_image_hashes_task(
+    self,
+    batch_size: int = 200,
+    concurrency: int = 8,
+    limit: int | None = None,
+    image_store_dir: str | None = None,
+) -> dict[str, Any]:
+    """
+    Compute dHash/pHash values for supplier products missing them.
+
+    Args:
+        batch_size: Products processed and committed per batch
+        concurrency: Maximum concurrent image downloads
+        limit: Maximum number of products to process
+        image_store_dir: Read images from this local store instead of HTTP
+
+    Returns:
+        Dict with hashed/failed counts
+    """
+    logger.info("Starting supplier image hashing")
+
+    try:
+        result = run_async(
+            _compute_image_hashes_async(batch_size, concurrency, limit, image_store_dir)
+        )
+        logger.info(f"Supplier image hashing completed: {result}")
+        return result
+    except Exception as exc:
+        logger.error(f"Supplier image hashing failed: {exc}", exc_info=True)
+        raise self.retry(exc=exc) from exc
+
+
+async def _compute_image_hashes_async(
+    batch_size: int,
+    concurrency: int,
+    limit: int | None,
+    image_store_dir: str | None,
+) -> dict[str, Any]:
+    """Async implementation of supplier image hashing."""
+    fetcher: ImageFetcher = (
+        LocalFileImageFetcher(image_store_dir) if image_store_dir else HttpImageFetcher()
+    )
+    try:
+        async with async_session_factory() as db:
+            service = ProductMatchingService(db)
+            return await service.compute_image_hashes(
+                fetcher, batch_size=batch_size, concurrency=concurrency, limit=limit
+            )
+    finally:
+        await fetcher.close()
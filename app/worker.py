@@ -20,6 +20,7 @@ celery_app = Celery(
         "app.services.tasks.sample",
         "app.services.tasks.maintenance",
         "app.services.tasks.emag_sync_tasks",
+        "app.services.tasks.supplier_matching_tasks",
     ],
 )
 
@@ -83,6 +84,25 @@ celery_app.conf.beat_schedule = {
         "schedule": int(os.getenv("EMAG_CLEANUP_INTERVAL", "86400")),  # 24 hours
         "kwargs": {"days_to_keep": 30},
     },
+    # eMAG offer outbox (queued price/stock updates) - every minute
+    "emag.dispatch_offer_outbox": {
+        "task": "emag.dispatch_offer_outbox",
+        "schedule": int(os.getenv("EMAG_OFFER_OUTBOX_INTERVAL", "60")),  # 1 minute
+        "options": {"expires": 60},
+    },
+    # eMAG category and reference data mirror (delta refresh) - every 6 hours
+    "emag.sync_category_mirror": {
+        "task": "emag.sync_category_mirror",
+        "schedule": int(os.getenv("EMAG_CATEGORY_MIRROR_INTERVAL", "21600")),  # 6 hours
+        "options": {"expires": 3600},
+    },
+    # Supplier image hashing (perceptual hashes for matching) - every hour
+    "supplier_matching.compute_image_hashes": {
+        "task": "supplier_matching.compute_image_hashes",
+        "schedule": int(os.getenv("SUPPLIER_IMAGE_HASH_INTERVAL", "3600")),  # 1 hour
+        "kwargs": {"limit": int(os.getenv("SUPPLIER_IMAGE_HASH_LIMIT", "5000"))},
+        "options": {"expires": 3600},
+    },
     # Health check - every 15 minutes
     "emag.health_check": {
         "task": "emag.health_check",
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Response Compression Benchmark
+
+Compares the previous ``BaseHTTPMiddleware`` gzip implementation with the
+streaming ASGI ``CompressionMiddleware`` on a large product list, served
+both as a ``JSONResponse`` and as a ``StreamingResponse``. Reports p50/p99
+latency under concurrent load, process CPU time, bytes on the wire and the
+worst event loop stall observed while the requests were running.
+
+Requests are sent in-process through httpx's ASGI transport, so the numbers
+reflect middleware cost only, without network or server overhead.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+
+from app.middleware.compression import CompressionMiddleware, available_encodings
+
+
+class LegacyGzipMiddleware(BaseHTTPMiddleware):
+    """The gzip middleware this benchmark compares against."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        super().__init__(app)
+        self.minimum_size = minimum_size
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        response = await call_next(request)
+        if request.method != "GET" or response.headers.get("content-encoding"):
+            return response
+        # call_next always returns a streaming response, which the old
+        # middleware left uncompressed
+        if isinstance(response, StreamingResponse) or not hasattr(response, "body"):
+            return response
+        body = response.body
+        if len(body) < self.minimum_size:
+            return response
+        response.body = gzip.compress(body)
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Content-Length"] = str(len(response.body))
+        return response
+
+
+@dataclass
+class BenchmarkConfig:
+    """Configuration for the benchmark."""
+
+    products: int = 5000
+    requests: int = 200
+    concurrency: int = 20
+    seed: int = 42
+
+
+def generate_products(config: BenchmarkConfig) -> list[dict]:
+    rng = random.Random(config.seed)  # noqa: S311
+    return [
+        {
+            "id": i,
+            "sku": f"EMG-{i:06d}",
+            "name": f"Modul senzor {rng.choice(['temperatura', 'umiditate', 'lumina'])} {i}",
+            "part_number_key": f"D{rng.randrange(10**8):08d}",
+            "price": round(rng.uniform(5, 500), 2),
+            "stock": rng.randrange(0, 200),
+            "status": rng.choice(["active", "inactive"]),
+            "account_type": rng.choice(["main", "fbe"]),
+            "category_id": rng.randrange(1, 400),
+        }
+        for i in range(config.products)
+    ]
+
+
+def build_app(products: list[dict], middleware: str) -> FastAPI:
+    app = FastAPI()
+    if middleware == "legacy":
+        app.add_middleware(LegacyGzipMiddleware)
+    elif middleware == "streaming":
+        app.add_middleware(CompressionMiddleware)
+
+    @app.get("/products")
+    async def all_products():
+        return JSONResponse(products)
+
+    @app.get("/products/stream")
+    async def stream_products():
+        async def pages():
+            for start in range(0, len(products), 500):
+                yield json.dumps(products[start : start + 500]).encode()
+
+        return StreamingResponse(pages(), media_type="application/json")
+
+    return app
+
+
+async def _run(app: FastAPI, path: str, encoding: str, config: BenchmarkConfig) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    wire_bytes = 0
+    semaphore = asyncio.Semaphore(config.concurrency)
+
+    # Track how late a 1ms ticker wakes up, i.e. how long the loop was blocked
+    worst_stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal worst_stall
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst_stall = max(worst_stall, time.perf_counter() - before - 0.001)
+
+    async def one(client: httpx.AsyncClient):
+        nonlocal wire_bytes
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers={"Accept-Encoding": encoding})
+            latencies.append(time.perf_counter() - start)
+            wire_bytes += response.num_bytes_downloaded
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await one(client)  # warm up
+        latencies.clear()
+        wire_bytes = 0
+
+        ticker_task = asyncio.create_task(ticker())
+        cpu_start = time.process_time()
+        await asyncio.gather(*(one(client) for _ in range(config.requests)))
+        cpu = time.process_time() - cpu_start
+        running = False
+        await ticker_task
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "cpu": cpu,
+        "kb_per_response": wire_bytes / config.requests / 1024,
+        "stall": worst_stall * 1000,
+    }
+
+
+async def run_benchmark(config: BenchmarkConfig) -> None:
+    """Run every middleware variant and print a comparison."""
+    products = generate_products(config)
+    variants = [("none", "identity"), ("legacy", "gzip")]
+    variants += [("streaming", encoding) for encoding in reversed(available_encodings())]
+
+    for path in ("/products", "/products/stream"):
+        print(
+            f"\n=== GET {path} ({config.products} products, {config.requests} requests, "
+            f"concurrency {config.concurrency}) ==="
+        )
+        print(
+            f"{'middleware':18} {'p50 (ms)':>9} {'p99 (ms)':>9} {'cpu (s)':>8} "
+            f"{'KB/resp':>8} {'stall (ms)':>10}"
+        )
+        for middleware, encoding in variants:
+            app = build_app(products, middleware)
+            result = await _run(app, path, encoding, config)
+            print(
+                f"{middleware + '/' + encoding:18} {result['p50']:9.1f} {result['p99']:9.1f} "
+                f"{result['cpu']:8.2f} {result['kb_per_response']:8.1f} {result['stall']:10.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response compression middleware")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = BenchmarkConfig(
+        products=args.products,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+    )
+    asyncio.run(run_benchmark(config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Idempotency Middleware Benchmark
+
+Measures what the ``Idempotency-Key`` header adds to a POST: every request
+carries a fresh key, so each one goes through a lookup, a claim and the
+storage of its response. The same endpoint is measured without the
+middleware and with each storage tier of ``IdempotencyStore``:
+
+- ``memory``: in-process LRU only
+- ``redis``: LRU plus Redis (in-memory fakeredis unless ``--redis-url``)
+- ``database``: LRU, Redis and ``app.idempotency_keys`` through the shared
+  engine (only with ``--database``, needs a reachable database)
+
+With ``--database`` the cost of one ``asyncpg.connect`` is measured as
+well, which the previous implementation paid three times per keyed POST.
+
+Requests are sent in-process through httpx's ASGI transport, so the numbers
+reflect middleware cost only, without network or server overhead.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+
+import fakeredis
+import httpx
+from fastapi import FastAPI
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.middleware.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+@dataclass
+class BenchmarkConfig:
+    """Configuration for the benchmark."""
+
+    requests: int = 2000
+    concurrency: int = 20
+    redis_url: str | None = None
+    database: bool = False
+
+
+def build_app(store: IdempotencyStore | None):
+    app = FastAPI()
+
+    @app.post("/orders")
+    async def create_order(payload: dict):
+        return {"status": "created", **payload}
+
+    if store is None:
+        return app
+    return IdempotencyMiddleware(app, store=store)
+
+
+def build_redis(config: BenchmarkConfig) -> Redis:
+    if config.redis_url:
+        return Redis.from_url(config.redis_url)
+    return fakeredis.FakeAsyncRedis()
+
+
+async def _run(app, config: BenchmarkConfig) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(config.concurrency)
+    payload = {"sku": "EMG-000001", "quantity": 3}
+
+    async def one(client: httpx.AsyncClient):
+        async with semaphore:
+            headers = {"Idempotency-Key": uuid.uuid4().hex}
+            start = time.perf_counter()
+            response = await client.post("/orders", json=payload, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await one(client)  # warm up
+        latencies.clear()
+        await asyncio.gather(*(one(client) for _ in range(config.requests)))
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def _measure_connect(samples: int = 20) -> float:
+    """Median time (ms) of opening and closing one asyncpg connection."""
+    import asyncpg
+
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        conn = await asyncpg.connect(
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USER,
+            password=settings.DB_PASS,
+            database=settings.DB_NAME,
+        )
+        await conn.close()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def run_benchmark(config: BenchmarkConfig) -> None:
+    """Run every storage variant and print a comparison."""
+    variants = [
+        ("none", None),
+        ("memory", IdempotencyStore(use_redis=False, use_database=False)),
+        ("redis", IdempotencyStore(redis=build_redis(config), use_database=False)),
+    ]
+    if config.database:
+        variants.append(
+            ("database", IdempotencyStore(redis=build_redis(config), use_database=True))
+        )
+
+    print(
+        f"\n=== keyed POST /orders ({config.requests} requests, "
+        f"concurrency {config.concurrency}) ==="
+    )
+    print(f"{'storage':10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'overhead p50':>13}")
+    baseline = None
+    for name, store in variants:
+        result = await _run(build_app(store), config)
+        if baseline is None:
+            baseline = result["p50"]
+        print(
+            f"{name:10} {result['p50']:9.2f} {result['p99']:9.2f} "
+            f"{result['p50'] - baseline:13.2f}"
+        )
+
+    if config.database:
+        connect = await _measure_connect()
+        print(
+            f"\nasyncpg.connect: {connect:.2f} ms per connection, "
+            f"{3 * connect:.2f} ms per keyed POST in the previous implementation"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the idempotency middleware")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis server")
+    parser.add_argument(
+        "--database", action="store_true", help="Include the database tier (needs a database)"
+    )
+    args = parser.parse_args()
+
+    config = BenchmarkConfig(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        redis_url=args.redis_url,
+        database=args.database,
+    )
+    asyncio.run(run_benchmark(config))
+
+
+if __name__ == "__main__":
+    main()
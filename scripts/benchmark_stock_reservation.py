@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Stock Reservation Concurrency Benchmark
+
+Runs many concurrent order reservations against a small stock of a few
+inventory items and compares the previous read-modify-write reservation
+(load the item, check, assign the new quantities, commit) with the atomic
+``inventory_item.reserve_order`` of ``app.crud.products.inventory``.
+
+For each approach it reports throughput, p50/p99 latency, how many orders
+were accepted and whether the stock was oversold or updates were lost:
+the final available quantity must equal the initial one minus everything
+accepted, and every accepted line must have its stock movement.
+
+Needs a migrated database (DATABASE_URL); the fixtures it creates are
+removed afterwards.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+from app.crud.products.inventory import InsufficientStockError, inventory_item
+from app.db.session import AsyncSessionLocal
+from app.models.inventory import InventoryItem, StockMovement, StockReservation, Warehouse
+from app.models.product import Product
+
+
+@dataclass
+class BenchmarkConfig:
+    """Configuration for the benchmark."""
+
+    orders: int = 500
+    concurrency: int = 50
+    items: int = 5
+    initial_stock: int = 200
+    max_lines: int = 3
+    max_quantity: int = 3
+    seed: int = 42
+
+
+@dataclass
+class RunResult:
+    """Outcome of one approach."""
+
+    label: str
+    latencies: list[float] = field(default_factory=list)
+    accepted: dict[int, int] = field(default_factory=dict)
+    accepted_lines: int = 0
+    rejected: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+
+def make_orders(config: BenchmarkConfig, item_ids: list[int]) -> list[dict[int, int]]:
+    rng = random.Random(config.seed)
+    orders = []
+    for _ in range(config.orders):
+        lines = rng.sample(item_ids, rng.randint(1, min(config.max_lines, len(item_ids))))
+        orders.append({item_id: rng.randint(1, config.max_quantity) for item_id in lines})
+    return orders
+
+
+async def legacy_reserve(order_id: str, lines: dict[int, int]) -> bool:
+    """The read-modify-write reservation this benchmark compares against."""
+    async with AsyncSessionLocal() as db:
+        items = []
+        for item_id, quantity in lines.items():
+            item = await db.get(InventoryItem, item_id)
+            if item is None or item.available_quantity < quantity:
+                return False
+            items.append((item, quantity))
+
+        for item, quantity in items:
+            previous = item.available_quantity
+            item.reserved_quantity += quantity
+            item.available_quantity -= quantity
+            db.add(
+                StockReservation(
+                    inventory_item_id=item.id,
+                    order_id=order_id,
+                    quantity=quantity,
+                    reserved_at=datetime.now(),
+                )
+            )
+            db.add(
+                StockMovement(
+                    inventory_item_id=item.id,
+                    warehouse_id=item.warehouse_id,
+                    movement_type="reservation",
+                    quantity=quantity,
+                    previous_quantity=previous,
+                    new_quantity=item.available_quantity,
+                    reference_type="order",
+                    reference_id=order_id,
+                )
+            )
+        await db.commit()
+        return True
+
+
+async def atomic_reserve(order_id: str, lines: dict[int, int]) -> bool:
+    async with AsyncSessionLocal() as db:
+        try:
+            await inventory_item.reserve_order(db, order_id=order_id, lines=lines)
+        except InsufficientStockError:
+            return False
+        return True
+
+
+class StockReservationBenchmark:
+    """Benchmark concurrent reservations of a shared stock."""
+
+    def __init__(self, config: BenchmarkConfig):
+        self.config = config
+        self.tag = uuid.uuid4().hex[:8]
+        self.warehouse_id: int | None = None
+        self.product_ids: list[int] = []
+
+    async def setup(self) -> None:
+        async with AsyncSessionLocal() as db:
+            warehouse = Warehouse(name=f"Benchmark {self.tag}", code=f"BM{self.tag}")
+            db.add(warehouse)
+            await db.flush()
+            self.warehouse_id = warehouse.id
+            for index in range(self.config.items):
+                product = Product(
+                    name=f"Benchmark {self.tag} {index}", sku=f"BM-{self.tag}-{index}"
+                )
+                db.add(product)
+                await db.flush()
+                self.product_ids.append(product.id)
+            await db.commit()
+
+    async def reset_items(self) -> list[int]:
+        """(Re)create the inventory items with the initial stock."""
+        await self.delete_items()
+        async with AsyncSessionLocal() as db:
+            items = [
+                InventoryItem(
+                    product_id=product_id,
+                    warehouse_id=self.warehouse_id,
+                    quantity=self.config.initial_stock,
+                    reserved_quantity=0,
+                    available_quantity=self.config.initial_stock,
+                    unit_cost=10.0,
+                )
+                for product_id in self.product_ids
+            ]
+            db.add_all(items)
+            await db.commit()
+            return [item.id for item in items]
+
+    async def delete_items(self) -> None:
+        async with AsyncSessionLocal() as db:
+            item_ids = select(InventoryItem.id).where(
+                InventoryItem.warehouse_id == self.warehouse_id
+            )
+            await db.execute(
+                delete(StockMovement).where(StockMovement.inventory_item_id.in_(item_ids))
+            )
+            await db.execute(
+                delete(StockReservation).where(StockReservation.inventory_item_id.in_(item_ids))
+            )
+            await db.execute(
+                delete(InventoryItem).where(InventoryItem.warehouse_id == self.warehouse_id)
+            )
+            await db.commit()
+
+    async def teardown(self) -> None:
+        await self.delete_items()
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Product).where(Product.id.in_(self.product_ids)))
+            await db.execute(delete(Warehouse).where(Warehouse.id == self.warehouse_id))
+            await db.commit()
+
+    async def run_approach(self, label: str, reserve) -> RunResult:
+        item_ids = await self.reset_items()
+        orders = make_orders(self.config, item_ids)
+        result = RunResult(label)
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+
+        async def place(index: int, lines: dict[int, int]) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    accepted = await reserve(f"BM-{self.tag}-{label}-{index}", lines)
+                except Exception:
+                    result.errors += 1
+                    return
+                finally:
+                    result.latencies.append((time.perf_counter() - start) * 1000)
+                if not accepted:
+                    result.rejected += 1
+                    return
+                result.accepted_lines += len(lines)
+                for item_id, quantity in lines.items():
+                    result.accepted[item_id] = result.accepted.get(item_id, 0) + quantity
+
+        start = time.perf_counter()
+        await asyncio.gather(*(place(index, lines) for index, lines in enumerate(orders)))
+        result.elapsed = time.perf_counter() - start
+
+        await self.check(result, item_ids)
+        return result
+
+    async def check(self, result: RunResult, item_ids: list[int]) -> None:
+        async with AsyncSessionLocal() as db:
+            rows = (
+                await db.execute(
+                    select(InventoryItem.id, InventoryItem.available_quantity).where(
+                        InventoryItem.id.in_(item_ids)
+                    )
+                )
+            ).all()
+            movements = await db.scalar(
+                select(func.count()).where(StockMovement.inventory_item_id.in_(item_ids))
+            )
+
+        print(f"\n{result.label.upper()}")
+        print(f"  Orders/s:      {self.config.orders / result.elapsed:.1f}")
+        if result.latencies:
+            latencies = sorted(result.latencies)
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"  p50 latency:   {statistics.median(latencies):.2f} ms")
+            print(f"  p99 latency:   {p99:.2f} ms")
+        print(f"  Accepted:      {self.config.orders - result.rejected - result.errors}")
+        print(f"  Rejected:      {result.rejected}")
+        print(f"  Errors:        {result.errors}")
+        for item_id, available in sorted(rows):
+            expected = self.config.initial_stock - result.accepted.get(item_id, 0)
+            status = "ok" if available == expected else "LOST UPDATES"
+            if available < 0:
+                status = "OVERSOLD"
+            print(f"  Item {item_id}: available {available}, expected {expected} ({status})")
+        print(f"  Movements:     {movements}, expected {result.accepted_lines}")
+
+    async def run(self) -> None:
+        print("=" * 80)
+        print(" Stock Reservation Concurrency Benchmark ")
+        print("=" * 80)
+        print(f"Orders: {self.config.orders}  Concurrency: {self.config.concurrency}")
+        print(f"Items: {self.config.items}  Initial stock: {self.config.initial_stock}")
+
+        await self.setup()
+        try:
+            await self.run_approach("read-modify-write", legacy_reserve)
+            await self.run_approach("atomic", atomic_reserve)
+        finally:
+            await self.teardown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--initial-stock", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = BenchmarkConfig(
+        orders=args.orders,
+        concurrency=args.concurrency,
+        items=args.items,
+        initial_stock=args.initial_stock,
+        seed=args.seed,
+    )
+    asyncio.run(StockReservationBenchmark(config).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Tests for the Redis-backed eMAG rate limiter."""
+
+import asyncio
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core import cache
+from app.core.emag_distributed_rate_limiter import DistributedRateLimiter
+from app.core.emag_errors import RateLimitError
+from app.core.emag_rate_limiter import EmagRateLimiter
+
+# "other": 10 requests/second with a burst of 2, so slots 100 ms apart after the burst
+LIMITS = {"orders": (20, 4), "other": (10, 2)}
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.fixture
+def limiter(redis):
+    return DistributedRateLimiter(redis=redis, limits=LIMITS, throttle_backoff=2.0)
+
+
+async def reserve_many(limiter, count, account="main", resource="other"):
+    return [await limiter.reserve(account, resource) for _ in range(count)]
+
+
+def assert_schedule(waits, expected):
+    # Reservations run a few milliseconds apart in real time
+    assert waits == pytest.approx(expected, abs=0.03)
+
+
+async def test_callers_are_scheduled_after_the_burst(limiter):
+    waits = await reserve_many(limiter, 5)
+
+    assert_schedule(waits, [0, 0, 0.1, 0.2, 0.3])
+
+
+async def test_processes_share_one_bucket(redis):
+    worker_a = DistributedRateLimiter(redis=redis, limits=LIMITS)
+    worker_b = DistributedRateLimiter(redis=redis, limits=LIMITS)
+
+    waits = [
+        await worker_a.reserve("main"),
+        await worker_b.reserve("main"),
+        await worker_a.reserve("main"),
+        await worker_b.reserve("main"),
+    ]
+
+    assert_schedule(waits, [0, 0, 0.1, 0.2])
+
+
+async def test_accounts_and_resources_have_separate_buckets(limiter):
+    await reserve_many(limiter, 4, account="main")
+
+    assert await limiter.reserve("fbe") == 0
+    assert await limiter.reserve("main", "orders") == 0
+    # Unknown resources share the "other" bucket
+    assert await limiter.reserve("main", "product_offer") == pytest.approx(0.3, abs=0.03)
+
+
+async def test_reservation_beyond_timeout_is_refused(limiter):
+    await reserve_many(limiter, 4)
+
+    with pytest.raises(RateLimitError):
+        await limiter.reserve("main", timeout=0.1)
+
+    # The refused caller did not take a slot
+    assert await limiter.reserve("main", timeout=1) == pytest.approx(0.3, abs=0.03)
+    assert limiter.get_metrics()["buckets"]["main/other"]["rejected"] == 1
+
+
+async def test_throttling_pauses_every_process(redis, limiter):
+    other_worker = DistributedRateLimiter(redis=redis, limits=LIMITS)
+
+    await limiter.report_throttled("main", "other", retry_after=1.5)
+    waits = await reserve_many(other_worker, 2)
+
+    # After the pause requests resume at the sustained rate, not as a burst
+    assert_schedule(waits, [1.5, 1.6])
+    assert await other_worker.reserve("fbe") == 0
+
+
+async def test_throttling_without_retry_after_uses_backoff(limiter):
+    await limiter.report_throttled("main")
+
+    assert await limiter.reserve("main") == pytest.approx(2.0, abs=0.03)
+    assert limiter.get_metrics()["buckets"]["main/other"]["throttled"] == 1
+
+
+async def test_acquire_records_queue_wait(limiter):
+    for _ in range(3):
+        await limiter.acquire("main", "orders")
+
+    stats = limiter.get_metrics()["buckets"]["main/orders"]
+    assert stats["requests"] == 3
+    assert stats["max_wait"] == 0
+    await reserve_many(limiter, 1, resource="orders")
+    await limiter.acquire("main", "orders")
+
+    stats = limiter.get_metrics()["buckets"]["main/orders"]
+    assert stats["max_wait"] == pytest.approx(0.05, abs=0.03)
+    assert stats["avg_wait"] == pytest.approx(stats["total_wait"] / 4)
+
+
+@pytest.mark.parametrize(
+    "error",
+    [RedisConnectionError("connection refused"), RuntimeError("Event loop is closed")],
+    ids=["refused", "closed-loop"],
+)
+async def test_falls_back_to_local_buckets_without_redis(limiter, monkeypatch, error):
+    async def broken(*args, **kwargs):
+        raise error
+
+    await limiter._get_redis()
+    monkeypatch.setattr(limiter, "_reserve_script", broken)
+
+    waits = await reserve_many(limiter, 3)
+
+    assert_schedule(waits, [0, 0, 0.1])
+    assert limiter.get_metrics()["backend"] == "local"
+
+
+def test_each_event_loop_gets_its_own_client(monkeypatch):
+    server = fakeredis.FakeServer()
+    clients = []
+
+    def from_url(url, **kwargs):
+        clients.append(fakeredis.FakeAsyncRedis(server=server))
+        return clients[-1]
+
+    monkeypatch.setattr(cache.redis, "from_url", from_url)
+    monkeypatch.setattr(cache, "_redis_client", None)
+    limiter = DistributedRateLimiter(limits=LIMITS)
+
+    # Celery tasks each run their own event loop
+    waits = [asyncio.run(limiter.reserve("main")) for _ in range(3)]
+
+    assert len(clients) == 3
+    assert_schedule(waits, [0, 0, 0.1])
+    assert limiter.backend == "redis"
+
+
+async def test_emag_rate_limiter_delegates_to_shared_buckets(redis, limiter):
+    api_limiter = EmagRateLimiter(distributed=limiter, account="main")
+
+    await api_limiter.acquire("orders")
+    await api_limiter.report_throttled("orders", retry_after=1, account="fbe")
+
+    stats = await api_limiter.get_stats()
+    assert stats["orders_requests"] == 1
+    assert stats["rate_limit_hits"] == 1
+    assert stats["distributed"]["buckets"]["main/orders"]["requests"] == 1
+    assert await limiter.reserve("fbe", "orders") == pytest.approx(1.0, abs=0.03)
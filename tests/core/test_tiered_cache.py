@@ -0,0 +1,142 @@
+"""Tests for the two-tier (process memory + Redis) cache."""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from app.core import tiered_cache
+from app.core.tiered_cache import TieredCache
+from app.services.infrastructure.change_feed import ChangeFeed
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = ChangeFeed(use_redis=False)
+    monkeypatch.setattr(tiered_cache, "get_change_feed", lambda: feed)
+    return feed
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+def make_cache(redis, **kwargs):
+    return TieredCache("test", redis=redis, use_redis=redis is not None, **kwargs)
+
+
+class Loader:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"value": self.calls}
+
+
+async def test_warm_lookups_are_served_from_process_memory(feed, redis):
+    cache = make_cache(redis)
+    loader = Loader()
+
+    assert await cache.get_or_load("key", loader, 60) == {"value": 1}
+    await redis.flushall()
+    assert await cache.get_or_load("key", loader, 60) == {"value": 1}
+
+    assert loader.calls == 1
+    assert cache.get_stats()["l1_hits"] == 1
+
+
+async def test_other_process_reads_entry_from_redis(feed, redis):
+    first, second = make_cache(redis), make_cache(redis)
+    loader = Loader()
+
+    await first.get_or_load("key", loader, 60)
+    assert await second.get_or_load("key", loader, 60) == {"value": 1}
+
+    assert loader.calls == 1
+    assert second.get_stats()["l2_hits"] == 1
+
+
+async def test_concurrent_misses_share_one_load(feed, redis):
+    cache = make_cache(redis)
+    loader = Loader(delay=0.05)
+
+    results = await asyncio.gather(*(cache.get_or_load("key", loader, 60) for _ in range(20)))
+
+    assert loader.calls == 1
+    assert results == [{"value": 1}] * 20
+    assert cache.get_stats()["coalesced"] == 19
+
+
+async def test_stale_entry_is_served_while_refreshed(feed, redis):
+    cache = make_cache(redis)
+    loader = Loader()
+    await cache.get_or_load("key", loader, 60, stale_ttl=60)
+    for entry in cache._entries.values():
+        entry.fresh_until = time.time() - 1
+    await redis.flushall()
+
+    assert await cache.get_or_load("key", loader, 60, stale_ttl=60) == {"value": 1}
+    await asyncio.gather(*cache._refreshing)
+
+    assert loader.calls == 2
+    assert await cache.get_or_load("key", loader, 60, stale_ttl=60) == {"value": 2}
+
+
+async def test_tag_invalidation_drops_copies_in_every_process(feed, redis):
+    first, second = make_cache(redis), make_cache(redis)
+    stats_loader, orders_loader = Loader(), Loader()
+    await first.get_or_load("stats", stats_loader, 60, tags=["inventory"])
+    await second.get_or_load("stats", stats_loader, 60, tags=["inventory"])
+    await second.get_or_load("other", orders_loader, 60, tags=["orders"])
+
+    await first.invalidate_tags("inventory")
+
+    assert second.get_stats()["size"] == 1
+    assert await second.get_or_load("stats", stats_loader, 60, tags=["inventory"]) == {
+        "value": 2
+    }
+    assert await second.get_or_load("other", orders_loader, 60, tags=["orders"]) == {"value": 1}
+    assert orders_loader.calls == 1
+
+
+async def test_value_loaded_during_invalidation_is_not_cached(feed, redis):
+    cache = make_cache(redis)
+
+    async def loader():
+        await cache.invalidate_tags("inventory")
+        return "outdated"
+
+    assert await cache.get_or_load("key", loader, 60, tags=["inventory"]) == "outdated"
+    assert await cache.get("key", tags=["inventory"]) is None
+
+
+async def test_delete_drops_key_in_every_process(feed, redis):
+    first, second = make_cache(redis), make_cache(redis)
+    await first.set("key", [1, 2], 60)
+    assert await second.get("key") == [1, 2]
+
+    await first.delete("key")
+
+    assert await second.get("key") is None
+
+
+async def test_works_without_redis(feed):
+    cache = make_cache(None)
+    loader = Loader()
+
+    await cache.get_or_load("key", loader, 60, tags=["inventory"])
+    await cache.invalidate_tags("inventory")
+    assert await cache.get_or_load("key", loader, 60, tags=["inventory"]) == {"value": 2}
+
+
+async def test_least_recently_used_entry_is_evicted(feed, redis):
+    cache = make_cache(redis, max_entries=2)
+    for key in ("a", "b", "c"):
+        await cache.set(key, key, 60)
+
+    assert list(cache._entries) == ["test:b", "test:c"]
@@ -0,0 +1,97 @@
+"""Tests for the verified-token principal cache."""
+
+import time
+
+import pytest
+
+from app.schemas.user import UserInDB
+from app.security.principal_cache import PrincipalCache
+from app.services.infrastructure.change_feed import USER_EVENTS, ChangeFeed
+
+
+def make_user(email="user@example.com"):
+    return UserInDB(
+        id=1,
+        email=email,
+        full_name="Test User",
+        is_active=True,
+        is_superuser=False,
+        hashed_password="hashed",
+    )
+
+
+@pytest.fixture
+def cache():
+    return PrincipalCache(maxsize=3, ttl=300)
+
+
+def test_hit_returns_copy_of_cached_user(cache):
+    cache.put("token", make_user(), time.time() + 600)
+
+    user = cache.get("token")
+    assert user.email == "user@example.com"
+    user.is_active = False
+    assert cache.get("token").is_active is True
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_miss_for_unknown_token(cache):
+    assert cache.get("unknown") is None
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_entry_does_not_outlive_token_exp(cache):
+    cache.put("token", make_user(), time.time() + 0.05)
+    assert cache.get("token") is not None
+
+    time.sleep(0.06)
+    assert cache.get("token") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_expired_token_is_not_cached(cache):
+    cache.put("token", make_user(), time.time() - 1)
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    exp = time.time() + 600
+    for token in ("a", "b", "c"):
+        cache.put(token, make_user(f"{token}@example.com"), exp)
+    cache.get("a")
+    cache.put("d", make_user("d@example.com"), exp)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("d") is not None
+
+
+def test_invalidate_user_drops_all_of_their_tokens(cache):
+    exp = time.time() + 600
+    cache.put("first", make_user(), exp)
+    cache.put("second", make_user(), exp)
+    cache.put("other", make_user("other@example.com"), exp)
+
+    assert cache.invalidate_user("user@example.com") == 2
+    assert cache.get("first") is None
+    assert cache.get("second") is None
+    assert cache.get("other") is not None
+
+
+def test_user_loaded_before_invalidation_is_not_cached(cache):
+    generation = cache.generation("user@example.com")
+    cache.invalidate_user("user@example.com")
+
+    cache.put("token", make_user(), time.time() + 600, generation)
+    assert cache.get("token") is None
+
+
+async def test_user_events_from_other_processes_invalidate(cache, monkeypatch):
+    feed = ChangeFeed(use_redis=False)
+    monkeypatch.setattr("app.security.principal_cache.get_change_feed", lambda: feed)
+    cache.ensure_subscribed()
+    cache.put("token", make_user(), time.time() + 600)
+
+    await feed.publish(USER_EVENTS, {"emails": ["user@example.com"]})
+
+    assert cache.get("token") is None
@@ -14,6 +14,7 @@ from app.services.emag.utils.helpers import (
     chunk_list,
     mask_sensitive_data,
     get_account_display_name,
+    compute_payload_fingerprint,
 )
 
 
@@ -194,3 +195,23 @@ class TestAccountDisplayName:
         """Test display name for unknown account."""
         result = get_account_display_name("unknown")
         assert result == "unknown"
+
+
+class TestPayloadFingerprint:
+    """Test payload fingerprinting."""
+
+    def test_key_order_does_not_matter(self):
+        """Test fingerprint is independent of key order."""
+        first = {"id": 1, "name": "Produs", "stock": [{"value": 3}]}
+        second = {"stock": [{"value": 3}], "name": "Produs", "id": 1}
+        assert compute_payload_fingerprint(first) == compute_payload_fingerprint(second)
+
+    def test_content_change_changes_fingerprint(self):
+        """Test any value change produces a different fingerprint."""
+        first = {"id": 1, "sale_price": 10.0}
+        second = {"id": 1, "sale_price": 10.5}
+        assert compute_payload_fingerprint(first) != compute_payload_fingerprint(second)
+
+    def test_fingerprint_length(self):
+        """Test fingerprint fits the content_hash column."""
+        assert len(compute_payload_fingerprint({"id": 1})) == 64
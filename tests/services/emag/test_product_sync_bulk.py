@@ -0,0 +1,255 @@
+"""
+Tests for the set-based page processing in EmagProductSyncService.
+"""
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.emag.emag_product_sync_service import (
+    ConflictResolutionStrategy,
+    EmagProductSyncService,
+)
+from app.services.emag.utils.helpers import compute_payload_fingerprint
+
+
+class FakeSession:
+    """Minimal async session exposing the savepoint API used by the service."""
+
+    def __init__(self):
+        self.savepoints = 0
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        self.savepoints += 1
+        yield
+
+
+def build_product(sku: str, **overrides) -> dict:
+    payload = {
+        "id": 1000,
+        "part_number": sku,
+        "name": f"Product {sku}",
+        "sale_price": 49.9,
+        "currency": "RON",
+        "status": 1,
+        "stock": [{"warehouse_id": 1, "value": 5}],
+        "images": [{"url": f"https://img.example.com/{sku}.jpg"}],
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def service():
+    return EmagProductSyncService(db=FakeSession(), account_type="main")
+
+
+@pytest.fixture
+def captured(service, monkeypatch):
+    """Replace the DB round-trips with in-memory recorders."""
+    calls = {"existing": {}, "products": [], "offers": []}
+
+    async def get_existing(skus, account):
+        return {sku: row for sku, row in calls["existing"].items() if sku in skus}
+
+    async def upsert_products(rows):
+        # Like RETURNING after ON CONFLICT: updated rows keep their stored id
+        calls["products"].append(rows)
+        return {
+            row["sku"]: getattr(calls["existing"].get(row["sku"]), "id", row["id"])
+            for row in rows
+        }
+
+    async def upsert_offers(rows):
+        calls["offers"].append(rows)
+
+    monkeypatch.setattr(service, "_get_existing_products", get_existing)
+    monkeypatch.setattr(service, "_bulk_upsert_products", upsert_products)
+    monkeypatch.setattr(service, "_bulk_upsert_offers", upsert_offers)
+    return calls
+
+
+class TestBulkPageProcessing:
+    """Test page processing with set-based upserts."""
+
+    @pytest.mark.asyncio
+    async def test_page_written_with_single_savepoint(self, service, captured):
+        """A whole page goes through one savepoint and one upsert per table."""
+        products = [build_product(f"SKU-{i}") for i in range(5)]
+
+        await service._process_products_batch(products, "main")
+
+        assert service.db.savepoints == 1
+        assert len(captured["products"]) == 1
+        assert len(captured["products"][0]) == 5
+        assert len(captured["offers"][0]) == 5
+        assert service._sync_stats["created"] == 5
+        assert service._sync_stats["total_processed"] == 5
+
+    @pytest.mark.asyncio
+    async def test_existing_rows_counted_as_updates(self, service, captured):
+        """Existing SKUs are resolved in bulk and reported as updates."""
+        existing_id = uuid4()
+        captured["existing"]["SKU-1"] = SimpleNamespace(
+            id=existing_id, sku="SKU-1", emag_modified_at=None, content_hash=None
+        )
+
+        await service._process_products_batch(
+            [build_product("SKU-1"), build_product("SKU-2")], "main"
+        )
+
+        assert service._sync_stats["created"] == 1
+        assert service._sync_stats["updated"] == 1
+        offers = {row["sku"]: row for row in captured["offers"][0]}
+        assert offers["SKU-1"]["product_id"] == existing_id
+
+    @pytest.mark.asyncio
+    async def test_local_priority_keeps_existing_rows(self, service, captured):
+        """Rows the conflict strategy rejects are not rewritten."""
+        service.conflict_strategy = ConflictResolutionStrategy.LOCAL_PRIORITY
+        captured["existing"]["SKU-1"] = SimpleNamespace(
+            id=uuid4(), sku="SKU-1", emag_modified_at=None, content_hash=None
+        )
+
+        await service._process_products_batch([build_product("SKU-1")], "main")
+
+        assert captured["products"][0] == []
+        assert service._sync_stats["unchanged"] == 1
+        assert len(captured["offers"][0]) == 1
+
+    @pytest.mark.asyncio
+    async def test_identical_payload_skips_product_and_offer(
+        self, service, captured
+    ):
+        """Rows whose stored fingerprint matches are not written at all."""
+        unchanged = build_product("SKU-1")
+        captured["existing"]["SKU-1"] = SimpleNamespace(
+            id=uuid4(),
+            sku="SKU-1",
+            emag_modified_at=None,
+            content_hash=compute_payload_fingerprint(unchanged),
+        )
+        captured["existing"]["SKU-2"] = SimpleNamespace(
+            id=uuid4(),
+            sku="SKU-2",
+            emag_modified_at=None,
+            content_hash=compute_payload_fingerprint(build_product("SKU-2")),
+        )
+
+        await service._process_products_batch(
+            [unchanged, build_product("SKU-2", sale_price=59.9)], "main"
+        )
+
+        assert [row["sku"] for row in captured["products"][0]] == ["SKU-2"]
+        assert [row["sku"] for row in captured["offers"][0]] == ["SKU-2"]
+        assert service._sync_stats["unchanged"] == 1
+        assert service._sync_stats["updated"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bad_row_isolated_without_per_row_savepoints(
+        self, service, captured
+    ):
+        """A row violating a constraint fails alone; the page still bulk-writes."""
+        products = [
+            build_product("SKU-1"),
+            build_product("SKU-2", currency="GBP"),
+            build_product("SKU-3", supply_lead_time=4),
+        ]
+
+        await service._process_products_batch(products, "main")
+
+        assert service.db.savepoints == 1
+        assert [row["sku"] for row in captured["products"][0]] == ["SKU-1"]
+        assert service._sync_stats["failed"] == 2
+        assert service._sync_stats["created"] == 1
+        assert len(service._sync_stats["errors"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_sku_in_page_last_wins(self, service, captured):
+        """ON CONFLICT cannot touch a row twice, so duplicates are collapsed."""
+        products = [
+            build_product("SKU-1", name="old"),
+            build_product("SKU-1", name="new"),
+        ]
+
+        await service._process_products_batch(products, "main")
+
+        rows = captured["products"][0]
+        assert len(rows) == 1
+        assert rows[0]["name"] == "new"
+
+    @pytest.mark.asyncio
+    async def test_offer_without_price_is_skipped(self, service, captured):
+        """Offers without a price would violate NOT NULL and are left out."""
+        product = build_product("SKU-1")
+        del product["sale_price"]
+
+        await service._process_products_batch([product], "main")
+
+        assert len(captured["products"][0]) == 1
+        assert captured["offers"][0] == []
+
+    @pytest.mark.asyncio
+    async def test_failed_statement_falls_back_to_per_row(
+        self, service, captured, monkeypatch
+    ):
+        """A page rejected by the database is replayed through the per-row path."""
+        replayed = []
+
+        async def failing_upsert(rows):
+            raise RuntimeError("constraint violation")
+
+        async def per_row(products, account):
+            replayed.extend(products)
+
+        monkeypatch.setattr(service, "_bulk_upsert_products", failing_upsert)
+        monkeypatch.setattr(service, "_process_products_batch_per_row", per_row)
+
+        await service._process_products_batch(
+            [build_product("SKU-1"), build_product("SKU-2")], "main"
+        )
+
+        assert [p["part_number"] for p in replayed] == ["SKU-1", "SKU-2"]
+        assert service._sync_stats["created"] == 0
+
+
+class TestUpsertStatements:
+    """Test the generated upsert SQL."""
+
+    def test_products_upsert_targets_sku_account(self, service):
+        row = service._build_product_row(build_product("SKU-1"), "main")
+
+        sql = str(
+            service._build_products_upsert([row]).compile(
+                dialect=postgresql.dialect()
+            )
+        )
+
+        assert "ON CONFLICT (sku, account_type) DO UPDATE" in sql
+        assert "RETURNING" in sql
+
+    def test_products_upsert_keeps_currency_missing_from_payload(self, service):
+        row = service._build_product_row(build_product("SKU-1"), "main")
+
+        sql = str(
+            service._build_products_upsert([row]).compile(
+                dialect=postgresql.dialect()
+            )
+        )
+
+        assert "excluded.raw_emag_data ?" in sql
+        assert "ELSE app.emag_products_v2.currency" in sql
+
+    def test_offers_upsert_increments_sync_attempts(self, service):
+        row = service._build_offer_row(uuid4(), "SKU-1", "main", build_product("SKU-1"))
+
+        sql = str(
+            service._build_offers_upsert([row]).compile(dialect=postgresql.dialect())
+        )
+
+        assert "ON CONFLICT (sku, account_type) DO UPDATE" in sql
+        assert "sync_attempts = (app.emag_product_offers_v2.sync_attempts +" in sql
@@ -0,0 +1,150 @@
+"""
+Tests for the pipelined page fetching in EmagProductSyncService.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.emag.emag_product_sync_service import EmagProductSyncService
+
+
+class FakeClient:
+    """Serves a fixed number of products in pages and records concurrency."""
+
+    def __init__(self, total_products: int, latency: float = 0.01):
+        self.total_products = total_products
+        self.latency = latency
+        self.requested_pages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_products(self, page, items_per_page, filters):
+        self.requested_pages.append(page)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        start = (page - 1) * items_per_page
+        end = min(start + items_per_page, self.total_products)
+        return {
+            "results": [{"part_number": f"SKU-{i}"} for i in range(start, end)]
+        }
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = EmagProductSyncService(db=None, account_type="both", fetch_concurrency=3)
+    processed = []
+
+    async def process(products, account):
+        processed.append((account, len(products)))
+
+    monkeypatch.setattr(service, "_process_products_batch", process)
+    service.processed = processed
+    return service
+
+
+@pytest.mark.asyncio
+async def test_all_pages_of_both_accounts_processed(service):
+    """Every page of every account reaches the consumer exactly once."""
+    service._clients = {"main": FakeClient(950), "fbe": FakeClient(230)}
+
+    await service._sync_all_accounts(
+        mode="full", max_pages=None, items_per_page=100, include_inactive=False
+    )
+
+    totals = {}
+    for account, count in service.processed:
+        totals[account] = totals.get(account, 0) + count
+    assert totals == {"main": 950, "fbe": 230}
+
+
+@pytest.mark.asyncio
+async def test_fetches_run_concurrently_within_limit(service):
+    """Downloads overlap, but never beyond the configured concurrency."""
+    main, fbe = FakeClient(2000, latency=0.02), FakeClient(2000, latency=0.02)
+    service._clients = {"main": main, "fbe": fbe}
+
+    await service._sync_all_accounts(
+        mode="full", max_pages=None, items_per_page=100, include_inactive=False
+    )
+
+    assert main.max_in_flight > 1
+    assert main.max_in_flight + fbe.max_in_flight <= 2 * service.fetch_concurrency
+    assert len(service.processed) == 40
+
+
+@pytest.mark.asyncio
+async def test_max_pages_respected(service):
+    """No page past ``max_pages`` is requested."""
+    client = FakeClient(10_000)
+    service._clients = {"main": client}
+
+    await service._sync_all_accounts(
+        mode="full", max_pages=4, items_per_page=100, include_inactive=False
+    )
+
+    assert sorted(client.requested_pages) == [1, 2, 3, 4]
+    assert len(service.processed) == 4
+
+
+@pytest.mark.asyncio
+async def test_page_errors_do_not_stop_the_pipeline(service, monkeypatch):
+    """A failing page write is recorded and later pages are still written."""
+    calls = []
+
+    async def process(products, account):
+        calls.append(account)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "_process_products_batch", process)
+    service._clients = {"main": FakeClient(300)}
+
+    await service._sync_all_accounts(
+        mode="full", max_pages=None, items_per_page=100, include_inactive=False
+    )
+
+    assert len(calls) == 3
+    assert any("RuntimeError" in err for err in service._sync_stats["errors"])
+
+
+@pytest.mark.asyncio
+async def test_progress_errors_do_not_stop_the_pipeline(service, monkeypatch):
+    """A failing progress update does not end the page writer."""
+
+    async def publish_progress(status, current_page=0, error=None):
+        raise ConnectionError("feed down")
+
+    monkeypatch.setattr(service, "_publish_progress", publish_progress)
+    service._clients = {"main": FakeClient(300)}
+
+    await service._sync_all_accounts(
+        mode="full", max_pages=None, items_per_page=100, include_inactive=False
+    )
+
+    assert len(service.processed) == 3
+
+
+@pytest.mark.asyncio
+async def test_writer_failure_stops_the_producers(service, monkeypatch):
+    """Producers are cancelled instead of blocking on a queue nobody reads."""
+
+    async def consume(page_queue):
+        await page_queue.get()
+        raise RuntimeError("writer died")
+
+    monkeypatch.setattr(service, "_consume_product_pages", consume)
+    service.page_queue_size = 1
+    service._clients = {"main": FakeClient(5000)}
+
+    with pytest.raises(RuntimeError, match="writer died"):
+        await asyncio.wait_for(
+            service._sync_all_accounts(
+                mode="full", max_pages=None, items_per_page=100, include_inactive=False
+            ),
+            timeout=5,
+        )
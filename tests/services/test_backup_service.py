@@ -0,0 +1,117 @@
+"""Tests for the streaming backup format: files, manifests and chains."""
+
+import json
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from app.services.infrastructure import backup_service
+from app.services.infrastructure.backup_service import (
+    MANIFEST_NAME,
+    BackupService,
+    _ChunkWriter,
+    _next_watermark,
+    _read_chunks,
+)
+
+
+def write_backup(backup_dir, created, mode="full", parent=None, rows=3):
+    timestamp = created.strftime("%Y%m%d_%H%M%S")
+    path = backup_dir / f"emag_backup_{timestamp}"
+    path.mkdir()
+    (path / "products.csv").write_text("1,a\n" * rows)
+    manifest = {
+        "version": "2.0",
+        "timestamp": timestamp,
+        "mode": mode,
+        "parent": parent,
+        "compressed": False,
+        "watermarks": {"products": created.isoformat()},
+        "tables": {"products": {"file": "products.csv", "rows": rows, "columns": ["id"]}},
+    }
+    (path / MANIFEST_NAME).write_text(json.dumps(manifest))
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    return BackupService(None, backup_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("compress", [True, False])
+async def test_chunks_round_trip_through_writer_and_reader(tmp_path, monkeypatch, compress):
+    monkeypatch.setattr(backup_service, "WRITE_BUFFER_SIZE", 10)
+    monkeypatch.setattr(backup_service, "READ_CHUNK_SIZE", 7)
+    path = tmp_path / ("table.csv.gz" if compress else "table.csv")
+    rows = [f"{i},\"name {i}\"\n".encode() for i in range(50)]
+
+    writer = _ChunkWriter(path, compress)
+    for row in rows:
+        await writer.write(row)
+    await writer.close()
+
+    chunks = [chunk async for chunk in _read_chunks(path)]
+    assert b"".join(chunks) == b"".join(rows)
+    assert writer.bytes_in == sum(len(row) for row in rows)
+
+
+def test_restore_chain_walks_back_to_full_backup(service, tmp_path):
+    now = datetime(2026, 10, 1, 12, 0, 0)
+    full = write_backup(tmp_path, now)
+    first = write_backup(tmp_path, now + timedelta(hours=1), "incremental", full.name)
+    second = write_backup(tmp_path, now + timedelta(hours=2), "incremental", first.name)
+
+    assert service._restore_chain(second) == [full, first, second]
+    assert service._restore_chain(full) == [full]
+
+
+def test_restore_chain_requires_parent(service, tmp_path):
+    orphan = write_backup(
+        tmp_path, datetime(2026, 10, 1), "incremental", "emag_backup_20260930_000000"
+    )
+
+    with pytest.raises(FileNotFoundError):
+        service._restore_chain(orphan)
+
+
+async def test_list_backups_reads_manifests_and_legacy_files(service, tmp_path):
+    write_backup(tmp_path, datetime(2026, 10, 2), rows=5)
+    (tmp_path / "emag_backup_20260901_000000.json.gz").write_bytes(b"legacy")
+
+    backups = await service.list_backups()
+
+    assert [backup["mode"] for backup in backups] == ["full", "full"]
+    assert backups[0]["items"] == {"products": 5}
+    assert backups[0]["restorable"] is True
+    assert backups[1]["restorable"] is False
+
+
+async def test_cleanup_keeps_parents_of_recent_incremental_backups(service, tmp_path):
+    now = datetime.now(UTC).replace(tzinfo=None, microsecond=0)
+    old_full = write_backup(tmp_path, now - timedelta(days=40))
+    old_unused = write_backup(tmp_path, now - timedelta(days=39))
+    write_backup(tmp_path, now - timedelta(days=1), "incremental", old_full.name)
+
+    result = await service.cleanup_old_backups(days=30)
+
+    assert result["deleted_files"] == [str(old_unused)]
+    assert old_full.exists()
+
+
+async def test_restore_rejects_legacy_json_backups(service, tmp_path):
+    legacy = tmp_path / "emag_backup_20260901_000000.json"
+    legacy.write_text("{}")
+
+    result = await service.restore_backup(str(legacy))
+
+    assert result["success"] is False
+
+
+def test_watermark_stays_before_transactions_running_at_snapshot():
+    horizon = datetime(2026, 10, 1, 11, 55)
+    since = datetime(2026, 10, 1, 10, 0).isoformat()
+
+    # Rows stamped after the horizon may belong to transactions still running
+    assert _next_watermark(datetime(2026, 10, 1, 12, 30), horizon, since) == horizon.isoformat()
+    assert _next_watermark(datetime(2026, 10, 1, 11, 0), horizon, since) == "2026-10-01T11:00:00"
+    assert _next_watermark(None, horizon, since) == since
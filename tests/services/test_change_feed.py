@@ -0,0 +1,208 @@
+"""Tests for the change feed and the WebSocket fan-out behind it."""
+
+import asyncio
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.api.v1.endpoints.system import websocket_sync
+from app.core import cache
+from app.services.infrastructure.change_feed import (
+    SLOW_CONSUMER_CLOSE_CODE,
+    SYNC_PROGRESS,
+    ChangeFeed,
+    FanoutConnectionManager,
+)
+
+
+class FakeWebSocket:
+    """Records sent messages; ``blocked`` sockets never finish a send."""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed_with = None
+        self.unblock = asyncio.Event()
+        if not blocked:
+            self.unblock.set()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        await self.unblock.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.received = asyncio.Event()
+
+    async def __call__(self, topic, event):
+        self.events.append((topic, event))
+        self.received.set()
+
+
+async def drain():
+    """Let sender tasks run."""
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+async def test_events_reach_subscribers_of_other_processes():
+    server = fakeredis.FakeServer()
+    worker = ChangeFeed(redis=fakeredis.FakeAsyncRedis(server=server), use_redis=True)
+    api = ChangeFeed(redis=fakeredis.FakeAsyncRedis(server=server), use_redis=True)
+    recorder = Recorder()
+    api.subscribe("orders", recorder)
+    for _ in range(100):
+        if api.get_stats()["backend"] == "redis":
+            break
+        await asyncio.sleep(0.01)
+
+    await worker.publish_many("orders", [{"type": "order_new"}, {"type": "order_status_change"}])
+    await api.publish("orders", {"type": "awb_generated"})
+    while len(recorder.events) < 3:
+        await asyncio.wait_for(recorder.received.wait(), timeout=2)
+        recorder.received.clear()
+
+    assert [event["type"] for _, event in recorder.events] == [
+        "order_new",
+        "order_status_change",
+        "awb_generated",
+    ]
+    assert all(topic == "orders" and "timestamp" in event for topic, event in recorder.events)
+    await asyncio.sleep(0.05)
+    # Events published by the subscribing process are not delivered twice
+    assert len(recorder.events) == 3
+    await api.close()
+
+
+@pytest.mark.parametrize(
+    "error",
+    [RedisConnectionError("connection refused"), RuntimeError("Event loop is closed")],
+    ids=["refused", "closed-loop"],
+)
+async def test_local_delivery_when_redis_is_unavailable(error):
+    class BrokenRedis:
+        def pipeline(self, transaction=True):
+            raise error
+
+    feed = ChangeFeed(redis=BrokenRedis(), use_redis=True)
+    recorder = Recorder()
+    feed._subscribers["orders"] = [recorder]
+
+    await feed.publish("orders", {"type": "order_new"})
+
+    assert [event["type"] for _, event in recorder.events] == ["order_new"]
+    assert feed.get_stats()["backend"] == "local"
+
+
+def test_each_event_loop_publishes_through_its_own_client(monkeypatch):
+    server = fakeredis.FakeServer()
+    clients = []
+
+    def from_url(url, **kwargs):
+        clients.append(fakeredis.FakeAsyncRedis(server=server))
+        return clients[-1]
+
+    monkeypatch.setattr(cache.redis, "from_url", from_url)
+    monkeypatch.setattr(cache, "_redis_client", None)
+    feed = ChangeFeed(use_redis=True)
+
+    # Celery tasks each run their own event loop
+    asyncio.run(feed.publish("orders", {"type": "order_new"}))
+    asyncio.run(feed.publish("orders", {"type": "order_new"}))
+
+    assert len(clients) == 2
+    assert feed.published == 2
+    assert feed.get_stats()["backend"] == "local"
+    assert feed._redis_down_until == 0
+
+
+@pytest.fixture
+async def manager():
+    manager = FanoutConnectionManager(channels=("orders", "sync"), queue_size=2)
+    yield manager
+    await manager.close()
+
+
+async def test_broadcast_fans_out_per_channel(manager):
+    orders, sync = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(orders, "orders")
+    await manager.connect(sync, "sync")
+
+    assert await manager.broadcast({"type": "order_new"}, channel="orders") == 1
+    assert await manager.broadcast({"type": "hello"}) == 2
+    await drain()
+
+    assert orders.sent == [{"type": "order_new"}, {"type": "hello"}]
+    assert sync.sent == [{"type": "hello"}]
+    assert manager.get_connection_count("all") == 2
+
+
+async def test_slow_consumer_is_evicted_without_delaying_others(manager):
+    fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await manager.connect(fast)
+    await manager.connect(slow)
+
+    for i in range(5):
+        await manager.broadcast({"n": i})
+        await drain()
+
+    assert [message["n"] for message in fast.sent] == [0, 1, 2, 3, 4]
+    assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    assert manager.evicted == 1
+    assert manager.get_connection_count() == 1
+
+
+@pytest.fixture
+async def sync_manager(monkeypatch):
+    manager = websocket_sync.ConnectionManager()
+    monkeypatch.setattr(websocket_sync, "manager", manager)
+    yield manager
+    await manager.close()
+
+
+async def test_sync_progress_events_update_cache_and_milestones(monkeypatch, sync_manager):
+    manager = sync_manager
+    monkeypatch.setattr(websocket_sync, "sync_progress_cache", {})
+    monkeypatch.setattr(websocket_sync, "_last_reported", {})
+    monkeypatch.setattr(websocket_sync, "_milestones", {})
+    progress, events = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(progress, "progress")
+    await manager.connect(events, "events")
+
+    base = {"sync_id": "s1", "sync_type": "products", "account_type": "main"}
+    for processed, status in [(0, "running"), (60, "running"), (100, "completed")]:
+        await websocket_sync._on_sync_progress(
+            SYNC_PROGRESS,
+            {**base, "status": status, "processed_items": processed, "total_items": 100},
+        )
+    await drain()
+
+    assert [message["active_syncs"][0]["progress_percentage"] for message in progress.sent[:2]] == [
+        0,
+        60,
+    ]
+    assert progress.sent[-1]["status"] == "idle"
+    assert [(m["type"], m.get("milestone")) for m in events.sent] == [
+        ("started", None),
+        ("milestone", 25),
+        ("milestone", 50),
+        ("completed", None),
+    ]
+    assert websocket_sync.sync_progress_cache == {}
+
+
+@pytest.mark.parametrize("event", [{"status": "running"}, {"sync_id": ""}])
+async def test_progress_without_sync_id_is_not_cached(monkeypatch, event):
+    monkeypatch.setattr(websocket_sync, "sync_progress_cache", {})
+
+    await websocket_sync._on_sync_progress(SYNC_PROGRESS, event)
+
+    assert websocket_sync.sync_progress_cache == {}
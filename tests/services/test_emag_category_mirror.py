@@ -0,0 +1,107 @@
+"""Tests for the local eMAG category and reference data mirror."""
+
+from app.services.emag import emag_category_mirror
+from app.services.emag.emag_category_mirror import (
+    MIRROR_NAME,
+    VALUES_PER_PAGE,
+    EmagCategoryIndex,
+    EmagCategoryMirror,
+    EmagCategoryMirrorSync,
+    normalize_name,
+)
+from app.services.infrastructure.change_feed import CACHE_EVENTS, ChangeFeed
+
+CATEGORIES = [
+    {"id": 1, "name": "Electronice", "parent_id": None, "is_allowed": 0},
+    {"id": 2, "name": "Căști  Audio", "parent_id": 1, "is_allowed": 1},
+    {
+        "id": 3,
+        "name": "Boxe",
+        "parent_id": 1,
+        "is_allowed": 1,
+        "characteristics": [{"id": 10, "name": "Culoare", "values": ["Negru", "Alb"]}],
+        "family_types": [],
+    },
+]
+
+
+def test_index_lookups():
+    index = EmagCategoryIndex(
+        CATEGORIES,
+        vat_rates=[{"id": 4, "vat_rate": 0.19}],
+        handling_times=[{"id": 1, "value": 1}],
+    )
+
+    assert [c["id"] for c in index.children(1)] == [2, 3]
+    assert [c["id"] for c in index.find_by_name("casti audio")] == [2]
+    assert [c["id"] for c in index.path(3)] == [1, 3]
+    assert [c["id"] for c in index.allowed()] == [2, 3]
+    assert index.get_details(2) is None
+    assert index.allowed_values(3, 10) == ["Negru", "Alb"]
+    assert index.vat_rate(4)["vat_rate"] == 0.19
+    assert index.handling_time(1)["id"] == 1
+
+
+def test_normalize_name_ignores_case_accents_and_spacing():
+    assert normalize_name("  Îmbrăcăminte   Copii ") == "imbracaminte copii"
+
+
+class FailingSessionFactory:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        raise ConnectionError("database unavailable")
+
+
+async def test_unreadable_tables_give_an_empty_index(monkeypatch):
+    feed = ChangeFeed(use_redis=False)
+    monkeypatch.setattr(emag_category_mirror, "get_change_feed", lambda: feed)
+    factory = FailingSessionFactory()
+    mirror = EmagCategoryMirror(session_factory=factory)
+
+    assert len(await mirror.index()) == 0
+    assert len(await mirror.index()) == 0
+    assert factory.calls == 1
+
+
+async def test_change_notice_drops_the_index(monkeypatch):
+    feed = ChangeFeed(use_redis=False)
+    monkeypatch.setattr(emag_category_mirror, "get_change_feed", lambda: feed)
+    mirror = EmagCategoryMirror(session_factory=FailingSessionFactory())
+    await mirror.index()
+
+    await feed.publish(CACHE_EVENTS, {"mirrors": [MIRROR_NAME]})
+
+    assert mirror.get_stats()["loaded"] is False
+
+
+class PagedValuesClient:
+    """Serves one category whose characteristic has three pages of values."""
+
+    def __init__(self):
+        self.values = [f"value {i}" for i in range(VALUES_PER_PAGE * 2 + 5)]
+        self.requests = []
+
+    async def _request(self, method, endpoint, json=None):
+        self.requests.append(json)
+        page = json.get("valuesCurrentPage", 1)
+        start = (page - 1) * VALUES_PER_PAGE
+        values = self.values[start : start + VALUES_PER_PAGE]
+        return {
+            "isError": False,
+            "results": [
+                {"id": json["id"], "characteristics": [{"id": 10, "values": values}]}
+            ],
+        }
+
+
+async def test_details_read_every_values_page():
+    client = PagedValuesClient()
+    mirror_sync = EmagCategoryMirrorSync(client=client)
+
+    category = await mirror_sync._read_details(3)
+
+    assert category["characteristics"][0]["values"] == client.values
+    assert len(client.requests) == 3
@@ -0,0 +1,181 @@
+"""Tests for the coalescing eMAG offer outbox dispatcher."""
+
+from datetime import timedelta
+
+import pytest
+
+from app.services.emag import emag_offer_outbox_service
+from app.services.emag.emag_api_client import EmagApiError
+from app.services.emag.emag_offer_outbox_service import (
+    MAX_ATTEMPTS,
+    EmagOfferOutboxService,
+    coalesce_offer_updates,
+    retry_delay,
+)
+
+
+class FakeClient:
+    """Records offer/save payloads; rejects batches holding a bad offer."""
+
+    def __init__(self, bad_offers=(), transient_failures=0):
+        self.bad_offers = set(bad_offers)
+        self.transient_failures = transient_failures
+        self.requests = []
+
+    async def _request(self, method, endpoint, json=None):
+        self.requests.append([item["id"] for item in json])
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise EmagApiError("HTTP 503: Service Unavailable", status_code=503)
+        if any(item["id"] in self.bad_offers for item in json):
+            raise EmagApiError(
+                "eMAG API error: Invalid price",
+                status_code=200,
+                response={"isError": True, "messages": ["Invalid price"]},
+            )
+        return {"isError": False, "results": []}
+
+
+class InMemoryOutbox(EmagOfferOutboxService):
+    """Outbox keeping its rows in a dict instead of the database."""
+
+    def __init__(self, client):
+        super().__init__("main", client=client)
+        self.rows = {}
+
+    async def enqueue(self, updates):
+        merged = coalesce_offer_updates(updates)
+        for offer_id, payload in merged.items():
+            row = self.rows.get(offer_id)
+            if row is None:
+                self.rows[offer_id] = {
+                    "id": offer_id,
+                    "offer_id": offer_id,
+                    "version": 1,
+                    "attempts": 0,
+                    "payload": payload,
+                    "status": "pending",
+                    "claimed": False,
+                }
+            else:
+                row.update(
+                    payload={**row["payload"], **payload},
+                    version=row["version"] + 1,
+                    attempts=0,
+                    status="pending",
+                )
+        return len(merged)
+
+    async def _claim_batch(
+        self, limit=emag_offer_outbox_service.MAX_OFFERS_PER_REQUEST, offer_ids=None
+    ):
+        due = [
+            row
+            for row in self.rows.values()
+            if row["status"] == "pending"
+            and not row["claimed"]
+            and row["attempts"] == 0
+            and (offer_ids is None or row["offer_id"] in offer_ids)
+        ][:limit]
+        for row in due:
+            row["claimed"] = True
+        return [dict(row) for row in due]
+
+    async def _mark_sent(self, rows):
+        for row in rows:
+            current = self.rows[row["id"]]
+            current["claimed"] = False
+            if current["version"] == row["version"]:
+                del self.rows[row["id"]]
+
+    async def _mark_failed(self, rows, error, permanent=False):
+        for row in rows:
+            current = self.rows[row["id"]]
+            current["claimed"] = False
+            if current["version"] == row["version"]:
+                current["attempts"] = MAX_ATTEMPTS if permanent else row["attempts"] + 1
+                current["status"] = "failed" if permanent else "pending"
+
+
+def test_coalesce_merges_fields_with_last_write_wins():
+    merged = coalesce_offer_updates(
+        [
+            {"id": 1, "sale_price": 10.0},
+            {"id": 2, "sale_price": 5.0},
+            {"id": 1, "stock": [{"warehouse_id": 1, "value": 3}]},
+            {"id": 1, "sale_price": 12.5},
+        ]
+    )
+
+    assert merged == {
+        1: {"sale_price": 12.5, "stock": [{"warehouse_id": 1, "value": 3}]},
+        2: {"sale_price": 5.0},
+    }
+
+
+def test_retry_delay_grows_exponentially_up_to_cap():
+    assert retry_delay(1) == timedelta(seconds=30)
+    assert retry_delay(2) == timedelta(seconds=60)
+    assert retry_delay(20) == timedelta(hours=1)
+
+
+async def test_repeated_edits_are_sent_once_in_full_batches():
+    client = FakeClient()
+    outbox = InMemoryOutbox(client)
+    updates = [{"id": i % 120, "sale_price": float(i)} for i in range(360)]
+
+    result = await outbox.enqueue_and_dispatch(updates)
+
+    assert result["total"] == result["successful"] == 120
+    assert [len(ids) for ids in client.requests] == [50, 50, 20]
+    assert outbox.rows == {}
+
+
+async def test_request_sends_only_its_own_offers():
+    client = FakeClient()
+    outbox = InMemoryOutbox(client)
+    await outbox.enqueue([{"id": i, "sale_price": 1.0} for i in range(100, 300)])
+
+    result = await outbox.enqueue_and_dispatch([{"id": 1, "sale_price": 9.5}])
+
+    assert result["successful"] == 1
+    assert client.requests == [[1]]
+    # The backlog is left to the dispatch task
+    assert len(outbox.rows) == 200
+
+
+async def test_rejected_offer_is_isolated_from_its_batch():
+    client = FakeClient(bad_offers={7})
+    outbox = InMemoryOutbox(client)
+
+    result = await outbox.enqueue_and_dispatch(
+        [{"id": i, "sale_price": 10.0} for i in range(16)]
+    )
+
+    assert result["successful"] == 15
+    assert result["errors"] == [{"product_id": 7, "error": "eMAG API error: Invalid price"}]
+    assert outbox.rows[7]["status"] == "failed"
+    assert len(client.requests) < 16
+
+
+async def test_transient_failure_keeps_changes_queued():
+    client = FakeClient(transient_failures=1)
+    outbox = InMemoryOutbox(client)
+
+    result = await outbox.enqueue_and_dispatch([{"id": 1, "sale_price": 10.0}])
+
+    assert result["failed"] == 1
+    assert outbox.rows[1]["status"] == "pending"
+    assert outbox.rows[1]["attempts"] == 1
+
+
+@pytest.mark.parametrize("max_requests", [1, 2])
+async def test_dispatch_stops_after_max_requests(max_requests):
+    client = FakeClient()
+    outbox = InMemoryOutbox(client)
+    await outbox.enqueue([{"id": i, "sale_price": 1.0} for i in range(200)])
+
+    summary = await outbox.dispatch(max_requests=max_requests)
+
+    assert summary["requests"] == max_requests
+    assert len(outbox.rows) == 200 - 50 * max_requests
@@ -0,0 +1,181 @@
+"""Tests for page-wise eMAG order ingestion with a high-water mark."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base_class import Base
+from app.models.emag_models import EmagOrder, EmagSyncCursor
+from app.models.emag_sales_daily import EmagSalesDaily
+from app.models.product import Product
+from app.services.emag import emag_order_service
+from app.services.emag.emag_order_service import EmagOrderService
+from app.services.infrastructure.change_feed import ORDER_EVENTS, ChangeFeed
+
+
+def order(order_id, status=1, modified="2026-10-10 10:00:00", date="2026-10-10 09:00:00", qty=1):
+    return {
+        "id": order_id,
+        "status": status,
+        "date": date,
+        "modified": modified,
+        "customer": {"id": 7, "name": "Ion Popescu"},
+        "products": [{"sku": "SKU-1", "quantity": qty, "sale_price": "10.00"}],
+    }
+
+
+class FakeClient:
+    """Serves queued order pages and records the filters of each request."""
+
+    def __init__(self, *pages):
+        self.pages = list(pages)
+        self.requests = []
+
+    async def get_orders(self, page=1, items_per_page=100, filters=None):
+        self.requests.append({"page": page, **(filters or {})})
+        results = self.pages[page - 1] if page <= len(self.pages) else []
+        return {"results": results}
+
+
+@pytest.fixture
+def feed():
+    return ChangeFeed(use_redis=False)
+
+
+@pytest.fixture
+async def session_factory(monkeypatch, feed):
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Product(id=1, name="Casti", sku="SKU-1"))
+        await session.commit()
+
+    monkeypatch.setattr(emag_order_service, "async_session_factory", factory)
+    monkeypatch.setattr(emag_order_service, "ORDERS_PAGE_SIZE", 2)
+    monkeypatch.setattr(emag_order_service, "get_change_feed", lambda: feed)
+    yield factory
+    await engine.dispose()
+
+
+def make_service(client) -> EmagOrderService:
+    service = EmagOrderService("fbe")
+    service.client = client
+    return service
+
+
+async def all_orders(factory):
+    async with factory() as session:
+        result = await session.execute(select(EmagOrder).order_by(EmagOrder.emag_order_id))
+        return result.scalars().all()
+
+
+async def test_pages_are_upserted(session_factory):
+    client = FakeClient([order(1), order(2)], [order(3, status=4, qty=2)])
+
+    result = await make_service(client).sync_new_orders(status_filter=None)
+
+    assert (result["created"], result["updated"], result["pages_processed"]) == (3, 0, 2)
+    orders = await all_orders(session_factory)
+    assert [o.emag_order_id for o in orders] == [1, 2, 3]
+    assert orders[0].customer_name == "Ion Popescu"
+    assert orders[0].total_amount == 10.0
+
+    # Re-sync updates in place
+    client = FakeClient([order(1, status=4), order(2)], [])
+    result = await make_service(client).sync_new_orders(status_filter=None)
+
+    assert (result["created"], result["updated"]) == (0, 2)
+    orders = await all_orders(session_factory)
+    assert len(orders) == 3
+    assert orders[0].status == 4
+
+
+async def test_upsert_refreshes_sales_rollup(session_factory):
+    client = FakeClient([order(1, status=4, qty=3)])
+    await make_service(client).sync_new_orders(status_filter=None)
+
+    async with session_factory() as session:
+        quantities = (await session.execute(select(EmagSalesDaily.quantity))).scalars().all()
+    assert quantities == [3]
+
+    # Cancelling the order removes it from the rollup
+    client = FakeClient([order(1, status=0, qty=3)])
+    await make_service(client).sync_new_orders(status_filter=None)
+
+    async with session_factory() as session:
+        assert (await session.execute(select(EmagSalesDaily))).first() is None
+
+
+async def test_incremental_run_uses_and_advances_high_water_mark(session_factory):
+    first = FakeClient([order(1, modified="2026-10-10 10:00:00")])
+    result = await make_service(first).sync_new_orders(incremental=True)
+
+    assert "modifiedAfter" not in first.requests[0]
+    assert result["high_water_mark"] == "2026-10-10T10:00:00"
+
+    second = FakeClient([order(2, modified="2026-10-11 08:30:00")])
+    await make_service(second).sync_new_orders(incremental=True)
+
+    # Re-reads a small overlap before the stored mark
+    assert second.requests[0]["modifiedAfter"] == "2026-10-10 09:55:00"
+    assert second.requests[0]["status"] == 1
+    async with session_factory() as session:
+        cursor = await session.get(EmagSyncCursor, ("fbe", "orders:status=1"))
+    assert cursor.high_water_mark == datetime(2026, 10, 11, 8, 30)
+    assert cursor.last_run_items == 1
+
+
+async def test_partial_run_keeps_high_water_mark(session_factory):
+    await make_service(FakeClient([order(1)])).sync_new_orders(incremental=True)
+
+    client = FakeClient([order(2, modified="2026-10-12 10:00:00"), order(3)], [order(4)])
+    await make_service(client).sync_new_orders(incremental=True, max_pages=1)
+
+    async with session_factory() as session:
+        cursor = await session.get(EmagSyncCursor, ("fbe", "orders:status=1"))
+    assert cursor.high_water_mark == datetime(2026, 10, 10, 10, 0)
+    assert len(await all_orders(session_factory)) == 3
+
+
+async def test_page_filtered_out_by_cutoff_is_skipped(session_factory):
+    recent = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    client = FakeClient(
+        [order(1, date="2000-01-01 09:00:00"), order(2, date="2000-01-02 09:00:00")],
+        [order(3, date=recent, modified="2026-10-12 10:00:00")],
+    )
+
+    result = await make_service(client).sync_new_orders(days_back=30, incremental=True)
+
+    assert (result["created"], result["pages_processed"]) == (1, 2)
+    assert [o.emag_order_id for o in await all_orders(session_factory)] == [3]
+    async with session_factory() as session:
+        cursor = await session.get(EmagSyncCursor, ("fbe", "orders:status=1"))
+    assert cursor.high_water_mark == datetime(2026, 10, 12, 10, 0)
+
+
+async def test_new_orders_and_status_changes_are_published(session_factory, feed):
+    events = []
+
+    async def record(topic, event):
+        events.append(event)
+
+    feed.subscribe(ORDER_EVENTS, record)
+    await make_service(FakeClient([order(1), order(2, status=4)])).sync_new_orders()
+    await make_service(FakeClient([order(1, status=2), order(2, status=4)])).sync_new_orders()
+
+    assert [(e["type"], e["data"]["order_id"]) for e in events] == [
+        ("order_new", 1),
+        ("order_status_change", 1),
+    ]
+    assert events[0]["data"]["customer_name"] == "Ion Popescu"
+    assert events[1]["data"]["new_status_name"] == "in_progress"
@@ -0,0 +1,129 @@
+"""Tests for the cached, SKU-indexed Google Sheets snapshots."""
+
+import asyncio
+
+import pytest
+
+from app.services.google_sheets_service import GoogleSheetsConfig, GoogleSheetsService
+
+
+class FakeWorksheet:
+    def __init__(self, records=None, values=None):
+        self.records = records or []
+        self.values = values or []
+        self.downloads = 0
+
+    def get_all_records(self):
+        self.downloads += 1
+        return list(self.records)
+
+    def get_all_values(self):
+        self.downloads += 1
+        return [list(row) for row in self.values]
+
+
+class FakeSpreadsheet:
+    def __init__(self, products: FakeWorksheet, suppliers: FakeWorksheet):
+        self.tabs = {"Products": products, "Product_Suppliers": suppliers}
+        self.revision = "2026-10-01T10:00:00.000Z"
+        self.revision_checks = 0
+
+    def worksheet(self, name):
+        return self.tabs[name]
+
+    def get_lastUpdateTime(self):
+        self.revision_checks += 1
+        return self.revision
+
+
+@pytest.fixture
+def sheet():
+    products = FakeWorksheet(
+        records=[
+            {"SKU": "SKU-1", "Romanian_Name": "Casti", "Emag_FBE_RO_Price_RON": "10"},
+            {"SKU": "SKU-2", "Romanian_Name": "Boxa"},
+            {"SKU": "", "Romanian_Name": "Fara SKU"},
+        ]
+    )
+    suppliers = FakeWorksheet(
+        values=[
+            ["SKU", "Supplier_Name", "Price_CNY"],
+            ["SKU-1", "Shenzhen A", "12.5"],
+            ["SKU-1", "Shenzhen B", "11,0"],
+            ["SKU-2", "Yiwu C", "3"],
+        ]
+    )
+    return FakeSpreadsheet(products, suppliers)
+
+
+@pytest.fixture
+def make_service(sheet):
+    GoogleSheetsService.clear_snapshots()
+
+    def factory(ttl: int = 300) -> GoogleSheetsService:
+        service = GoogleSheetsService(GoogleSheetsConfig(snapshot_ttl=ttl))
+        service._spreadsheet = sheet
+        return service
+
+    yield factory
+    GoogleSheetsService.clear_snapshots()
+
+
+def test_lookups_share_one_download(sheet, make_service):
+    assert make_service().get_product_by_sku("SKU-1").romanian_name == "Casti"
+    assert make_service().get_product_by_sku("missing") is None
+    assert [p.sku for p in make_service().get_products_by_skus(["SKU-2", "SKU-1", "x"])] == [
+        "SKU-1",
+        "SKU-2",
+    ]
+
+    assert sheet.tabs["Products"].downloads == 1
+    assert sheet.revision_checks == 1
+
+
+def test_unchanged_revision_keeps_snapshot(sheet, make_service):
+    service = make_service(ttl=0)
+    first = service.get_products_snapshot()
+
+    assert service.get_products_snapshot() is first
+    assert sheet.tabs["Products"].downloads == 1
+    assert sheet.revision_checks == 2
+
+
+def test_changed_revision_reloads(sheet, make_service):
+    service = make_service(ttl=0)
+    service.get_products_snapshot()
+
+    sheet.tabs["Products"].records.append({"SKU": "SKU-3", "Romanian_Name": "Mouse"})
+    sheet.revision = "2026-10-02T08:00:00.000Z"
+
+    assert service.get_product_by_sku("SKU-3") is not None
+    assert sheet.tabs["Products"].downloads == 2
+
+
+def test_force_refresh_downloads_again(sheet, make_service):
+    service = make_service()
+    service.get_products_snapshot()
+    service.get_products_snapshot(force_refresh=True)
+
+    assert sheet.tabs["Products"].downloads == 2
+
+
+def test_suppliers_are_grouped_by_sku(sheet, make_service):
+    service = make_service()
+
+    by_sku = service.get_suppliers_by_skus(["SKU-1", "SKU-9"])
+
+    assert [s.supplier_name for s in by_sku["SKU-1"]] == ["Shenzhen A", "Shenzhen B"]
+    assert by_sku["SKU-9"] == []
+    assert len(service.get_suppliers_by_sku("SKU-2")) == 1
+    assert sheet.tabs["Product_Suppliers"].downloads == 1
+
+
+async def test_async_lookups_download_once(sheet, make_service):
+    results = await asyncio.gather(
+        *(make_service().get_product_by_sku_async("SKU-2") for _ in range(5))
+    )
+
+    assert {product.romanian_name for product in results} == {"Boxa"}
+    assert sheet.tabs["Products"].downloads == 1
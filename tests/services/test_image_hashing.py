@@ -0,0 +1,252 @@
+"""Tests for perceptual image hashing and near-duplicate lookup."""
+
+import io
+import random
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from PIL import Image, ImageDraw
+
+from app.models.supplier_matching import MatchingStatus
+from app.services.product.image_hashing import (
+    BKTree,
+    HttpImageFetcher,
+    LocalFileImageFetcher,
+    compute_image_hashes,
+    dhash,
+    from_signed64,
+    hamming_distance,
+    phash,
+    to_signed64,
+)
+from app.services.product.product_matching_service import (
+    IMAGE_HASH_RETRY_MAX,
+    ProductMatchingService,
+    image_hash_retry_delay,
+)
+
+
+def _draw(seed: int, size: int = 128) -> Image.Image:
+    """Draw a deterministic test picture made of random shapes."""
+    rng = random.Random(seed)  # noqa: S311
+    image = Image.new("RGB", (size, size), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1, y1 = x0 + rng.randrange(10, size // 2), y0 + rng.randrange(10, size // 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle((x0, y0, x1, y1), fill=color)
+    return image
+
+
+def _encode(image: Image.Image, fmt: str = "PNG", **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+class _FakeResult:
+    def __init__(self, products):
+        self._products = products
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._products
+
+
+class FakeSession:
+    """Async session stand-in returning queued product batches."""
+
+    def __init__(self, *batches):
+        self._batches = list(batches)
+        self.commits = 0
+
+    async def execute(self, _stmt):
+        return _FakeResult(self._batches.pop(0) if self._batches else [])
+
+    def add(self, _obj):
+        return None
+
+    async def flush(self):
+        return None
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _product(product_id, supplier_id, image_url="", image_hash=None, image_phash=None):
+    return SimpleNamespace(
+        id=product_id,
+        supplier_id=supplier_id,
+        chinese_name=f"产品{product_id}",
+        english_name=None,
+        image_url=image_url,
+        image_hash=image_hash,
+        image_dhash=None,
+        image_phash=image_phash,
+        image_downloaded=False,
+        image_hash_attempts=0,
+        image_hash_retry_at=None,
+        price_cny=10.0,
+        product_group_id=None,
+        matching_status=None,
+    )
+
+
+class TestPerceptualHashes:
+    """Tests for dHash / pHash computation."""
+
+    def test_hashes_are_64_bit(self):
+        image = _draw(1)
+
+        assert 0 <= dhash(image) < 1 << 64
+        assert 0 <= phash(image) < 1 << 64
+
+    def test_resized_recompressed_copy_is_near_duplicate(self):
+        original = _draw(1)
+        copy = original.resize((300, 300)).convert("RGB")
+
+        dhash1, phash1 = compute_image_hashes(_encode(original))
+        dhash2, phash2 = compute_image_hashes(_encode(copy, "JPEG", quality=70))
+
+        assert hamming_distance(phash1, phash2) <= 6
+        assert hamming_distance(dhash1, dhash2) <= 10
+
+    def test_different_images_are_far_apart(self):
+        _, phash1 = compute_image_hashes(_encode(_draw(1)))
+        _, phash2 = compute_image_hashes(_encode(_draw(2)))
+
+        assert hamming_distance(phash1, phash2) > 12
+
+    def test_unreadable_data_raises_value_error(self):
+        with pytest.raises(ValueError):
+            compute_image_hashes(b"not an image")
+
+    def test_signed_round_trip(self):
+        for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+            signed = to_signed64(value)
+            assert -(1 << 63) <= signed < 1 << 63
+            assert from_signed64(signed) == value
+
+
+class TestBKTree:
+    """Tests for the Hamming-distance BK-tree."""
+
+    def test_search_matches_brute_force(self):
+        rng = random.Random(7)  # noqa: S311
+        hashes = [rng.getrandbits(64) for _ in range(500)]
+        # Add near duplicates of the first few hashes
+        hashes += [h ^ (1 << rng.randrange(64)) for h in hashes[:20]]
+        tree = BKTree()
+        for index, value in enumerate(hashes):
+            tree.add(value, index)
+
+        query = hashes[3]
+        expected = sorted(
+            index for index, value in enumerate(hashes) if hamming_distance(query, value) <= 8
+        )
+
+        assert len(tree) == len(hashes)
+        assert sorted(item for _, item in tree.search(query, 8)) == expected
+
+    def test_identical_hashes_share_node(self):
+        tree = BKTree()
+        tree.add(42, "a")
+        tree.add(42, "b")
+
+        assert tree.search(42, 0) == [(0, "a"), (0, "b")]
+
+
+class TestHttpImageFetcher:
+    """Downloads stop at the size limit."""
+
+    @staticmethod
+    def _fetcher(chunks, max_bytes=10, headers=None):
+        sent = []
+
+        async def body():
+            for chunk in chunks:
+                sent.append(chunk)
+                yield chunk
+
+        def handler(request):
+            return httpx.Response(200, headers=headers, content=body())
+
+        return HttpImageFetcher(max_bytes=max_bytes, transport=httpx.MockTransport(handler)), sent
+
+    async def test_small_image_is_returned(self):
+        fetcher, _ = self._fetcher([b"abc", b"def"])
+
+        assert await fetcher.fetch("https://img.example/1.jpg") == b"abcdef"
+        await fetcher.close()
+
+    async def test_oversized_stream_is_abandoned(self):
+        fetcher, sent = self._fetcher([b"x" * 6] * 100)
+
+        assert await fetcher.fetch("https://img.example/1.jpg") is None
+        assert len(sent) == 2
+        await fetcher.close()
+
+    async def test_declared_oversized_image_is_not_downloaded(self):
+        fetcher, sent = self._fetcher([b"x" * 6] * 100, headers={"Content-Length": "600"})
+
+        assert await fetcher.fetch("https://img.example/1.jpg") is None
+        assert sent == []
+        await fetcher.close()
+
+
+class TestImageHashingStage:
+    """Tests for ProductMatchingService image hashing and matching."""
+
+    async def test_compute_image_hashes_from_local_store(self, tmp_path):
+        fetcher = LocalFileImageFetcher(tmp_path)
+        fetcher.store("https://img.example/1.jpg", _encode(_draw(1)))
+        products = [
+            _product(1, 1, "https://img.example/1.jpg"),
+            _product(2, 1, "https://img.example/missing.jpg"),
+        ]
+        session = FakeSession(products)
+
+        stats = await ProductMatchingService(session).compute_image_hashes(fetcher)
+
+        assert stats == {"hashed": 1, "failed": 1}
+        assert session.commits == 1
+        assert products[0].image_downloaded is True
+        assert products[0].image_hash == f"{from_signed64(products[0].image_phash):016x}"
+        assert products[1].image_phash is None
+        # The missing image is skipped until its retry time
+        assert products[1].image_hash_attempts == 1
+        assert products[1].image_hash_retry_at is not None
+        assert products[0].image_hash_retry_at is None
+
+    def test_failed_images_back_off_exponentially(self):
+        assert image_hash_retry_delay(2) == 2 * image_hash_retry_delay(1)
+        assert image_hash_retry_delay(30) == IMAGE_HASH_RETRY_MAX
+
+    async def test_match_by_image_groups_near_duplicates(self):
+        _, base = compute_image_hashes(_encode(_draw(1)))
+        _, near = compute_image_hashes(_encode(_draw(1).resize((200, 200)), "JPEG"))
+        _, other = compute_image_hashes(_encode(_draw(2)))
+        products = [
+            _product(1, 1, image_hash=f"{base:016x}", image_phash=to_signed64(base)),
+            _product(2, 2, image_hash=f"{near:016x}", image_phash=to_signed64(near)),
+            _product(3, 3, image_hash=f"{other:016x}", image_phash=to_signed64(other)),
+        ]
+
+        groups = await ProductMatchingService(FakeSession(products)).match_products_by_image()
+
+        assert len(groups) == 1
+        assert groups[0].product_count == 2
+        assert products[1].matching_status == MatchingStatus.AUTO_MATCHED
+        assert products[2].matching_status is None
+
+    def test_image_similarity_uses_hamming_distance(self):
+        service = ProductMatchingService(FakeSession())
+
+        assert service.calculate_image_similarity("ffffffffffffffff", "fffffffffffffff0") == (
+            1.0 - 4 / 64
+        )
+        assert service.calculate_image_similarity("zz", "00") == 0.0
@@ -0,0 +1,73 @@
+"""Tests for the SQL-side inventory statistics and stock alert queries."""
+
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.inventory.inventory_stats_service import (
+    low_stock_export_query,
+    statistics_from_row,
+    statistics_query,
+    stock_alerts_query,
+)
+
+
+def compile_sql(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_statistics_are_one_aggregate_query_over_few_columns():
+    sql = compile_sql(statistics_query("fbe"))
+
+    assert sql.count("FILTER (WHERE") == 8
+    assert "GROUP BY" not in sql
+    for column in ("raw_emag_data", "images", "attributes", "description"):
+        assert column not in sql
+
+
+def test_statistics_from_row():
+    row = SimpleNamespace(
+        total_items=8,
+        out_of_stock=2,
+        critical=1,
+        low_stock=3,
+        total_stock=40,
+        total_value=1234.567,
+        count_main=5,
+        count_fbe=4,
+    )
+
+    statistics = statistics_from_row(row)
+
+    assert statistics["in_stock"] == 6
+    assert statistics["needs_reorder"] == 6
+    assert statistics["total_value"] == 1234.57
+    assert statistics["stock_health_percentage"] == 75.0
+    assert statistics["average_stock_level"] == 5.0
+    assert statistics["by_account"] == {"main": 5, "fbe": 4}
+
+
+def test_statistics_of_empty_catalogue():
+    row = SimpleNamespace(
+        total_items=0,
+        out_of_stock=0,
+        critical=0,
+        low_stock=0,
+        total_stock=None,
+        total_value=None,
+        count_main=0,
+        count_fbe=0,
+    )
+
+    statistics = statistics_from_row(row)
+
+    assert statistics["stock_health_percentage"] == 0
+    assert statistics["average_stock_level"] == 0
+    assert statistics["total_value"] == 0
+
+
+def test_alert_and_export_queries_select_only_rendered_columns():
+    for query in (stock_alerts_query("warning", "main"), low_stock_export_query("fbe", "critical")):
+        sql = compile_sql(query)
+        assert "raw_emag_data" not in sql
+        assert "NULLS FIRST" in sql
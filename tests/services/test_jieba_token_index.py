@@ -0,0 +1,211 @@
+"""
+Tests for the jieba inverted token index.
+"""
+
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.db.base_class import Base
+from app.models.derived_table_build import DerivedTableBuild
+from app.models.product import Product
+from app.models.product_name_token import ProductNameToken
+from app.repositories.product_repository import ProductRepository
+from app.services.jieba_matching_service import (
+    ENTITY_PRODUCT,
+    JiebaMatchingService,
+    JiebaTokenIndex,
+    index_tokens,
+)
+
+
+@pytest.fixture
+def session():
+    """SQLite session with the ``app`` schema attached."""
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def indexed_tokens(session: Session, product_id: int) -> set[str]:
+    return set(
+        session.execute(
+            select(ProductNameToken.token).where(
+                ProductNameToken.entity_type == ENTITY_PRODUCT,
+                ProductNameToken.entity_id == product_id,
+            )
+        ).scalars()
+    )
+
+
+class TestIndexMaintenance:
+    """Test the index follows name changes on flush."""
+
+    def test_new_product_is_indexed(self, session):
+        product = Product(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机 无线")
+        session.add(product)
+        session.commit()
+
+        assert indexed_tokens(session, product.id) == index_tokens("蓝牙耳机 无线")
+
+    def test_name_change_replaces_postings(self, session):
+        product = Product(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机")
+        session.add(product)
+        session.commit()
+
+        product.chinese_name = "充电器 快充"
+        session.commit()
+
+        assert indexed_tokens(session, product.id) == index_tokens("充电器 快充")
+
+    def test_fallback_name_used_without_chinese_name(self, session):
+        product = Product(name="USB-C cable 2m", sku="SKU-1")
+        session.add(product)
+        session.commit()
+
+        assert indexed_tokens(session, product.id) == index_tokens("USB-C cable 2m")
+
+    def test_unrelated_change_keeps_postings(self, session):
+        product = Product(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机")
+        session.add(product)
+        session.commit()
+        before = indexed_tokens(session, product.id)
+
+        product.brand = "Generic"
+        session.commit()
+
+        assert indexed_tokens(session, product.id) == before
+
+    def test_deleted_product_is_removed(self, session):
+        product = Product(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机")
+        session.add(product)
+        session.commit()
+        product_id = product.id
+
+        session.delete(product)
+        session.commit()
+
+        assert indexed_tokens(session, product_id) == set()
+
+
+class TestCandidateSelection:
+    """Test candidate pruning."""
+
+    @pytest.mark.parametrize(
+        ("tokens", "threshold", "min_common", "expected"),
+        [
+            (5, 0.3, 2, 2),
+            (5, 0.5, 2, 3),
+            (10, 0.3, 2, 3),
+            (1, 0.3, 1, 1),
+            (4, 0.0, 2, 2),
+        ],
+    )
+    def test_min_required_common(self, tokens, threshold, min_common, expected):
+        search_tokens = {f"token{i}" for i in range(tokens)}
+        assert (
+            JiebaMatchingService._min_required_common(
+                search_tokens, threshold, min_common
+            )
+            == expected
+        )
+
+    def test_candidates_query_reads_only_search_postings(self):
+        query = JiebaTokenIndex(db=None).candidates_query(
+            ENTITY_PRODUCT, {"蓝牙", "耳机"}, 2
+        )
+
+        sql = str(query.compile(dialect=postgresql.dialect()))
+
+        assert "app.product_name_tokens.token IN" in sql
+        assert "HAVING count(*) >=" in sql
+        assert "array_agg(app.product_name_tokens.token)" in sql
+
+
+@pytest.fixture
+async def async_session_factory():
+    """aiosqlite session factory with the ``app`` schema attached."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+class TestIndexBuild:
+    """Test the one-off full build."""
+
+    @pytest.fixture(autouse=True)
+    def forget_built(self, monkeypatch):
+        monkeypatch.setattr(JiebaTokenIndex, "_built", set())
+
+    async def test_build_runs_although_listener_already_wrote_postings(
+        self, async_session_factory
+    ):
+        async with async_session_factory() as session:
+            # Written before the index existed: no postings
+            await session.execute(
+                insert(Product).values(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机")
+            )
+            # Saved through the ORM after deploy: indexed by the listener
+            session.add(Product(name="Cablu", sku="SKU-2", chinese_name="数据线"))
+            await session.commit()
+
+            index = JiebaTokenIndex(session, session_factory=async_session_factory)
+            await index.ensure_built(ENTITY_PRODUCT)
+
+            indexed = set(
+                (await session.execute(select(ProductNameToken.entity_id))).scalars()
+            )
+            build = await session.get(DerivedTableBuild, index.build_name(ENTITY_PRODUCT))
+
+        assert indexed == {1, 2}
+        assert build.row_count == len(index_tokens("蓝牙耳机") | index_tokens("数据线"))
+
+    async def test_rebuild_leaves_commit_to_caller(self, async_session_factory):
+        async with async_session_factory() as session:
+            session.add(Product(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机"))
+            await session.commit()
+
+            await JiebaTokenIndex(session).rebuild(ENTITY_PRODUCT)
+            await session.rollback()
+
+            assert await session.get(
+                DerivedTableBuild, JiebaTokenIndex.build_name(ENTITY_PRODUCT)
+            ) is None
+
+
+class TestRepositoryWrites:
+    """Test bulk repository writes keep the index current."""
+
+    async def test_rename_by_sku_reindexes(self, async_session_factory):
+        async with async_session_factory() as session:
+            await session.execute(
+                insert(Product).values(name="Casti", sku="SKU-1", chinese_name="蓝牙耳机")
+            )
+            await session.commit()
+
+            updated = await ProductRepository(session).update_by_sku(
+                "SKU-1", {"chinese_name": "充电器 快充"}
+            )
+            tokens = set(
+                (await session.execute(select(ProductNameToken.token))).scalars()
+            )
+
+        assert updated == 1
+        assert tokens == index_tokens("充电器 快充")
@@ -0,0 +1,156 @@
+"""Tests for the batched Google Sheets product import."""
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base_class import Base
+from app.models.emag_models import EmagProductV2
+from app.models.product import Product
+from app.models.product_history import ProductSKUHistory
+from app.models.product_mapping import GoogleSheetsProductMapping
+from app.services.google_sheets_service import ProductFromSheet
+from app.services.jieba_matching_service import JiebaTokenIndex
+from app.services.product.product_import_service import ProductImportService
+
+
+def sheet_rows() -> list[ProductFromSheet]:
+    return [
+        ProductFromSheet(
+            sku="SKU-1",
+            romanian_name="Casti noi",
+            emag_fbe_ro_price_ron=55.0,
+            sku_history=["OLD-1", "OLDER-1"],
+            row_number=2,
+        ),
+        ProductFromSheet(sku="SKU-2", romanian_name="Boxa", sort_product=3, row_number=3),
+        ProductFromSheet(sku="SKU-3", romanian_name="Mouse", row_number=4),
+        ProductFromSheet(sku="SKU-2", romanian_name="Boxa duplicat", row_number=5),
+        ProductFromSheet(sku="SKU-4", romanian_name="Cablu", row_number=6),
+    ]
+
+
+@pytest.fixture
+async def session(monkeypatch):
+    reindexed: list[int] = []
+
+    async def fake_reindex(self, entity_type, entity_ids):
+        reindexed.extend(entity_ids)
+
+    monkeypatch.setattr(JiebaTokenIndex, "reindex", fake_reindex)
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(Product(sku="SKU-1", name="Casti", base_price=40.0))
+        session.add(EmagProductV2(emag_id="1", sku="SKU-1", name="Casti", account_type="main"))
+        session.add(EmagProductV2(emag_id="2", sku="SKU-2", name="Boxa", account_type="fbe"))
+        await session.commit()
+        session.info["reindexed"] = reindexed
+        yield session
+    await engine.dispose()
+
+
+def make_service(session, rows) -> ProductImportService:
+    service = ProductImportService(session)
+    service.sheets_service.get_all_products = lambda: rows
+    return service
+
+
+async def snapshot(session) -> dict:
+    fresh = {"populate_existing": True}
+    products = (
+        await session.execute(select(Product).order_by(Product.sku), execution_options=fresh)
+    ).scalars()
+    mappings = (
+        await session.execute(
+            select(GoogleSheetsProductMapping).order_by(GoogleSheetsProductMapping.local_sku),
+            execution_options=fresh,
+        )
+    ).scalars()
+    history = await session.execute(
+        select(ProductSKUHistory.old_sku, ProductSKUHistory.new_sku).order_by(
+            ProductSKUHistory.old_sku
+        )
+    )
+    return {
+        "products": [(p.sku, p.name, p.base_price, p.display_order, p.currency) for p in products],
+        "mappings": [
+            (
+                m.local_sku,
+                m.local_product_name,
+                m.google_sheet_row,
+                m.emag_main_status,
+                m.emag_fbe_status,
+                m.mapping_method,
+            )
+            for m in mappings
+        ],
+        "history": list(history.all()),
+    }
+
+
+async def test_batched_import_matches_row_by_row(session):
+    log = await make_service(session, sheet_rows()).import_from_google_sheets(
+        import_suppliers=False, batch_size=2
+    )
+    batched = await snapshot(session)
+
+    assert log.status == "completed"
+    assert (log.total_rows, log.successful_imports, log.skipped_rows) == (5, 4, 1)
+    assert (log.auto_mapped_main, log.auto_mapped_fbe) == (3, 1)  # created / updated
+    assert log.unmapped_products == 2
+    assert batched["products"] == [
+        ("SKU-1", "Casti noi", 55.0, None, "RON"),
+        ("SKU-2", "Boxa", 0.0, 3, "RON"),
+        ("SKU-3", "Mouse", 0.0, None, "RON"),
+        ("SKU-4", "Cablu", 0.0, None, "RON"),
+    ]
+    assert batched["history"] == [("OLD-1", "SKU-1"), ("OLDER-1", "SKU-1")]
+    # Renamed and created products are refreshed in the name index
+    assert len(session.info["reindexed"]) == 4
+
+    # Re-running row by row over the batched result changes nothing
+    await make_service(session, sheet_rows()).import_from_google_sheets(import_suppliers=False)
+    assert await snapshot(session) == batched
+
+
+async def test_auto_map_uses_prefetched_matches(session):
+    await make_service(session, sheet_rows()).import_from_google_sheets(
+        import_suppliers=False, batch_size=10
+    )
+
+    mappings = {m[0]: m for m in (await snapshot(session))["mappings"]}
+    assert mappings["SKU-1"][3:] == ("mapped", "not_found", "exact_sku")
+    assert mappings["SKU-2"][3:] == ("not_found", "mapped", "exact_sku")
+    assert mappings["SKU-3"][3:] == ("not_found", "not_found", None)
+
+
+async def test_failed_batch_is_retried_row_by_row(session, monkeypatch):
+    service = make_service(session, sheet_rows())
+
+    async def broken_batch(*args, **kwargs):
+        raise RuntimeError("bulk write failed")
+
+    original = service._import_single_product
+
+    async def import_single(sheet_product, import_log, auto_map):
+        if sheet_product.sku == "SKU-3":
+            raise ValueError("bad row")
+        return await original(sheet_product, import_log, auto_map)
+
+    monkeypatch.setattr(service, "_write_import_batch", broken_batch)
+    monkeypatch.setattr(service, "_import_single_product", import_single)
+
+    log = await service.import_from_google_sheets(import_suppliers=False, batch_size=2)
+
+    assert (log.successful_imports, log.failed_imports) == (3, 1)
+    skus = [p[0] for p in (await snapshot(session))["products"]]
+    assert skus == ["SKU-1", "SKU-2", "SKU-4"]
@@ -0,0 +1,165 @@
+"""Tests for MinHash/LSH candidate blocking in ProductMatchingService."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.product.minhash_lsh import (
+    MinHashLSH,
+    optimal_band_params,
+    text_shingles,
+)
+from app.services.product.product_matching_service import ProductMatchingService
+
+
+class _FakeResult:
+    def __init__(self, products):
+        self._products = products
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._products
+
+
+class FakeSession:
+    """Minimal async session returning a fixed product list."""
+
+    def __init__(self, products):
+        self._products = products
+        self.scores = []
+
+    async def execute(self, _stmt):
+        return _FakeResult(list(self._products))
+
+    def add(self, obj):
+        if hasattr(obj, "product_a_id"):
+            self.scores.append(obj)
+
+    async def flush(self):
+        return None
+
+    async def commit(self):
+        return None
+
+
+def _product(product_id, supplier_id, name, image_hash=None):
+    return SimpleNamespace(
+        id=product_id,
+        supplier_id=supplier_id,
+        chinese_name=name,
+        english_name=None,
+        image_url=None,
+        image_hash=image_hash,
+        image_phash=None,
+        price_cny=10.0 + product_id,
+        product_group_id=None,
+        matching_status=None,
+    )
+
+
+def _catalog():
+    names = [
+        "温度湿度传感器模块开发板",
+        "温度湿度传感器模块开发板套件",
+        "无线蓝牙充电线数据接口",
+        "无线蓝牙充电数据线接口",
+        "步进电机驱动控制板",
+        "步进电机驱动控制板模块",
+        "液晶显示屏触摸键盘",
+        "万用表测试夹子插头",
+    ]
+    return [_product(i + 1, i % 3 + 1, name) for i, name in enumerate(names)]
+
+
+class TestMinHashLSH:
+    """Tests for the blocking primitives."""
+
+    def test_shingles_use_bigrams_and_keep_short_text(self):
+        assert text_shingles("abcd") == {"ab", "bc", "cd"}
+        assert text_shingles("a") == {"a"}
+        assert text_shingles("") == set()
+
+    def test_band_params_stay_below_threshold(self):
+        bands, rows = optimal_band_params(0.5, 128)
+
+        assert bands * rows <= 128
+        assert (1 / bands) ** (1 / rows) <= 0.5
+
+    def test_band_params_reject_invalid_threshold(self):
+        with pytest.raises(ValueError):
+            optimal_band_params(0.0, 128)
+
+    def test_signature_is_deterministic(self):
+        lsh = MinHashLSH(num_perm=32)
+
+        assert lsh.signature("电机驱动") == MinHashLSH(num_perm=32).signature("电机驱动")
+        assert lsh.signature("") is None
+
+    def test_candidate_pairs_group_near_duplicates_only(self):
+        lsh = MinHashLSH(num_perm=128, threshold=0.4)
+        pairs = lsh.candidate_pairs(
+            ["温度湿度传感器模块", "温度湿度传感器模块板", "万用表测试夹子"]
+        )
+
+        assert (0, 1) in pairs
+        assert (0, 2) not in pairs
+        assert (1, 2) not in pairs
+
+
+class TestBlockedMatching:
+    """Blocked matching must reproduce the exhaustive result."""
+
+    @pytest.mark.parametrize("method", ["match_products_by_text", "match_products_hybrid"])
+    async def test_blocking_matches_brute_force(self, method):
+        brute_session = FakeSession(_catalog())
+        blocked_session = FakeSession(_catalog())
+
+        brute = await getattr(ProductMatchingService(brute_session), method)(use_blocking=False)
+        blocked = await getattr(ProductMatchingService(blocked_session), method)(use_blocking=True)
+
+        assert len(brute) == len(blocked) > 0
+        assert {(s.product_a_id, s.product_b_id) for s in brute_session.scores} == {
+            (s.product_a_id, s.product_b_id) for s in blocked_session.scores
+        }
+
+    def test_blocking_scores_fewer_pairs(self):
+        service = ProductMatchingService(FakeSession([]))
+        products = _catalog()
+
+        neighbors = service._candidate_neighbors(products, use_blocking=True)
+
+        assert sum(len(n) for n in neighbors) < len(products) * (len(products) - 1) / 2
+        assert 1 in neighbors[0]
+
+    def test_blocking_is_automatic_above_min_products(self):
+        service = ProductMatchingService(FakeSession([]))
+        products = _catalog()
+
+        service.LSH_MIN_PRODUCTS = len(products) + 1
+        assert service._candidate_neighbors(products, use_blocking=None) is None
+
+        service.LSH_MIN_PRODUCTS = len(products)
+        assert service._candidate_neighbors(products, use_blocking=None) is not None
+
+    def test_hybrid_blocking_pairs_near_duplicate_images(self):
+        service = ProductMatchingService(FakeSession([]))
+        products = [
+            _product(1, 1, "温度湿度传感器", image_hash="abcdabcdabcdabcd"),
+            # 4 of 64 bits differ: within the 0.85 image threshold
+            _product(2, 2, "万用表测试夹子", image_hash="abcdabcdabcdabc2"),
+            _product(3, 3, "步进电机驱动板", image_hash="abcdabcdabcdabcd"),
+            # Inverted hash: as far apart as possible
+            _product(4, 1, "液晶显示屏键盘", image_hash="5432543254325432"),
+        ]
+
+        text_only = service._candidate_neighbors(products, use_blocking=True)
+        with_images = service._candidate_neighbors(
+            products, use_blocking=True, include_image_hash=True
+        )
+
+        assert text_only[0] == []
+        assert with_images[0] == [1, 2]
+        assert with_images[1] == [2]
+        assert with_images[3] == []
@@ -0,0 +1,307 @@
+"""
+Tests for the daily sales rollup.
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.db.base_class import Base
+from app.models.derived_table_build import DerivedTableBuild
+from app.models.emag_models import EmagOrder, EmagProductV2
+from app.models.emag_sales_daily import EmagSalesDaily
+from app.models.order import Order, OrderLine
+from app.models.product import Product
+from app.models.product_sales_daily import ProductSalesDaily
+from app.models.sales import SalesOrder, SalesOrderLine
+from app.services.inventory.sales_rollup_service import (
+    SOURCE_EMAG,
+    SOURCE_ORDERS,
+    SOURCE_SALES_ORDERS,
+    SalesRollup,
+    refresh_sales_rollup,
+)
+
+DAY = datetime(2026, 9, 1, 14, 30)
+
+
+@pytest.fixture
+def session():
+    """SQLite session with the ``app`` schema attached."""
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Product(id=1, name="Casti", sku="SKU-1"))
+        session.add(Product(id=2, name="Boxa", sku="SKU-2"))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def rollup(session: Session) -> dict[tuple[int, date, str], int]:
+    rows = session.execute(
+        select(
+            ProductSalesDaily.product_id,
+            ProductSalesDaily.sale_date,
+            ProductSalesDaily.source,
+            ProductSalesDaily.quantity,
+        )
+    ).all()
+    return {(pid, day, source): qty for pid, day, source, qty in rows}
+
+
+def emag_rollup(session: Session) -> dict[tuple[str, date], int]:
+    rows = session.execute(
+        select(EmagSalesDaily.sale_key, EmagSalesDaily.sale_date, EmagSalesDaily.quantity)
+    ).all()
+    return {(key, day): qty for key, day, qty in rows}
+
+
+def add_sales_order(session: Session, order_id: int, status: str, lines, when=DAY):
+    session.add(
+        SalesOrder(
+            id=order_id,
+            order_number=f"SO-{order_id}",
+            customer_id=1,
+            order_date=when,
+            status=status,
+            total_amount=0,
+        )
+    )
+    for product_id, quantity in lines:
+        session.add(
+            SalesOrderLine(
+                sales_order_id=order_id,
+                product_id=product_id,
+                quantity=quantity,
+                unit_price=1,
+                line_total=quantity,
+            )
+        )
+
+
+class TestRollupMaintenance:
+    """The rollup follows order writes on flush."""
+
+    def test_confirmed_sales_order_is_counted(self, session):
+        add_sales_order(session, 1, "confirmed", [(1, 2), (1, 3), (2, 1)])
+        add_sales_order(session, 2, "draft", [(1, 10)])
+        session.commit()
+
+        assert rollup(session) == {
+            (1, DAY.date(), SOURCE_SALES_ORDERS): 5,
+            (2, DAY.date(), SOURCE_SALES_ORDERS): 1,
+        }
+
+    def test_status_change_updates_day(self, session):
+        add_sales_order(session, 1, "draft", [(1, 4)])
+        session.commit()
+        assert rollup(session) == {}
+
+        session.get(SalesOrder, 1).status = "shipped"
+        session.commit()
+        assert rollup(session) == {(1, DAY.date(), SOURCE_SALES_ORDERS): 4}
+
+        session.get(SalesOrder, 1).status = "cancelled"
+        session.commit()
+        assert rollup(session) == {}
+
+    def test_moving_order_date_refreshes_both_days(self, session):
+        add_sales_order(session, 1, "confirmed", [(1, 4)])
+        session.commit()
+
+        later = DAY + timedelta(days=3)
+        session.get(SalesOrder, 1).order_date = later
+        session.commit()
+
+        assert rollup(session) == {(1, later.date(), SOURCE_SALES_ORDERS): 4}
+
+    def test_line_quantity_change_and_delete(self, session):
+        add_sales_order(session, 1, "confirmed", [(1, 4)])
+        session.commit()
+
+        line = session.scalars(select(SalesOrderLine)).one()
+        line.quantity = 7
+        session.commit()
+        assert rollup(session) == {(1, DAY.date(), SOURCE_SALES_ORDERS): 7}
+
+        session.delete(line)
+        session.commit()
+        assert rollup(session) == {}
+
+    def test_generic_orders_are_counted(self, session):
+        session.add(Order(id=1, customer_id=1, order_date=DAY, status="completed"))
+        session.add(OrderLine(order_id=1, product_id=2, quantity=6))
+        session.commit()
+
+        assert rollup(session) == {(2, DAY.date(), SOURCE_ORDERS): 6}
+
+    def test_emag_orders_are_rolled_up_per_reference(self, session):
+        session.add(
+            EmagOrder(
+                emag_order_id=100,
+                account_type="main",
+                status=4,
+                order_date=DAY,
+                products=[
+                    {"part_number_key": "DVX0FSYBM", "quantity": 2},
+                    {"sku": "SKU-1", "quantity": 1},
+                    {"part_number_key": "UNKNOWN", "quantity": 9},
+                ],
+            )
+        )
+        session.commit()
+
+        # References are kept as sent; unmapped ones are resolved when read
+        assert emag_rollup(session) == {
+            ("DVX0FSYBM", DAY.date()): 2,
+            ("SKU-1", DAY.date()): 1,
+            ("UNKNOWN", DAY.date()): 9,
+        }
+        assert rollup(session) == {}
+
+        session.scalars(select(EmagOrder)).one().status = 0
+        session.commit()
+        assert emag_rollup(session) == {}
+
+    def test_full_refresh_matches_incremental(self, session):
+        add_sales_order(session, 1, "confirmed", [(1, 2)])
+        add_sales_order(session, 2, "delivered", [(1, 3)], when=DAY - timedelta(days=40))
+        session.commit()
+        incremental = rollup(session)
+
+        session.execute(ProductSalesDaily.__table__.delete())
+        refresh_sales_rollup(session.connection(), SOURCE_SALES_ORDERS)
+
+        assert rollup(session) == incremental
+
+
+class TestSoldQuantities:
+    """Reads go through the rollup only."""
+
+    @pytest.fixture
+    async def session_factory(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def attach_app_schema(dbapi_connection, connection_record):
+            dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await engine.dispose()
+
+    @pytest.fixture
+    async def async_session(self, session_factory):
+        async with session_factory() as session:
+            yield session
+
+    async def test_totals_split_by_source(self, async_session, session_factory, monkeypatch):
+        monkeypatch.setattr(SalesRollup, "_built", False)
+        today = datetime.combine(date.today(), datetime.min.time())
+        async_session.add(Product(id=1, name="Casti", sku="SKU-1"))
+        async_session.add(Order(id=1, customer_id=1, order_date=today, status="completed"))
+        async_session.add(OrderLine(order_id=1, product_id=1, quantity=6))
+        async_session.add(
+            SalesOrder(
+                id=1,
+                order_number="SO-1",
+                customer_id=1,
+                order_date=today - timedelta(days=200),
+                status="confirmed",
+                total_amount=0,
+            )
+        )
+        async_session.add(
+            SalesOrderLine(sales_order_id=1, product_id=1, quantity=50, unit_price=1, line_total=50)
+        )
+        await async_session.commit()
+
+        sold = await SalesRollup(async_session, session_factory).get_sold_quantities(
+            [1, 2], days=180
+        )
+
+        assert sold[1] == {"total_sold": 6, "avg_monthly": 1.0, "sources": {SOURCE_ORDERS: 6}}
+        assert sold[2]["total_sold"] == 0
+
+    async def test_emag_sales_count_once_the_product_is_mapped(
+        self, async_session, session_factory, monkeypatch
+    ):
+        monkeypatch.setattr(SalesRollup, "_built", True)
+        today = datetime.combine(date.today(), datetime.min.time())
+        async_session.add(Product(id=1, name="Casti", sku="SKU-1"))
+        async_session.add(Product(id=2, name="Boxa", sku="SKU-2"))
+        # Sold on eMAG before the offer was mapped to a local product
+        async_session.add(
+            EmagOrder(
+                emag_order_id=100,
+                account_type="main",
+                status=4,
+                order_date=today,
+                products=[
+                    {"part_number_key": "DVX0FSYBM", "quantity": 2},
+                    {"sku": "SKU-1", "quantity": 1},
+                ],
+            )
+        )
+        await async_session.commit()
+        rollup = SalesRollup(async_session, session_factory)
+
+        assert (await rollup.get_sold_quantities([2]))[2]["total_sold"] == 0
+
+        async_session.add(
+            EmagProductV2(
+                emag_id="1",
+                sku="SKU-2",
+                name="Boxa",
+                account_type="main",
+                part_number_key="DVX0FSYBM",
+            )
+        )
+        await async_session.commit()
+        sold = await rollup.get_sold_quantities([1, 2])
+
+        assert sold[1]["sources"] == {SOURCE_EMAG: 1}
+        assert sold[2]["sources"] == {SOURCE_EMAG: 2}
+
+    async def test_history_is_built_on_first_read(
+        self, async_session, session_factory, monkeypatch
+    ):
+        monkeypatch.setattr(SalesRollup, "_built", False)
+        async_session.add(Product(id=1, name="Casti", sku="SKU-1"))
+        # Written before the rollup existed: not in the rollup yet
+        await async_session.execute(
+            insert(Order).values(
+                id=1,
+                customer_id=1,
+                order_date=datetime.now() - timedelta(days=30),
+                status="completed",
+            )
+        )
+        await async_session.execute(insert(OrderLine).values(order_id=1, product_id=1, quantity=3))
+        # Written after deploy: added to the rollup by the listener
+        async_session.add(Order(id=2, customer_id=1, order_date=datetime.now(), status="completed"))
+        async_session.add(OrderLine(order_id=2, product_id=1, quantity=2))
+        await async_session.commit()
+
+        sold = await SalesRollup(async_session, session_factory).get_sold_quantities([1])
+
+        assert sold[1]["total_sold"] == 5
+        assert SalesRollup._built is True
+        build = await async_session.get(DerivedTableBuild, SalesRollup.BUILD_NAME)
+        assert build.row_count == 2
+
+    async def test_rebuild_leaves_commit_to_caller(self, async_session):
+        await SalesRollup(async_session).rebuild()
+        await async_session.rollback()
+
+        assert await async_session.get(DerivedTableBuild, SalesRollup.BUILD_NAME) is None
@@ -0,0 +1,181 @@
+"""Tests for the streaming, vectorized supplier Excel import."""
+
+import time
+from io import BytesIO
+
+import fakeredis
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base_class import Base
+from app.models.product_name_token import ProductNameToken
+from app.models.supplier import Supplier
+from app.services.jieba_matching_service import ENTITY_SUPPLIER_PRODUCT, index_tokens
+from app.services.suppliers import supplier_import_service
+from app.services.suppliers.supplier_import_service import (
+    DEFAULT_COLUMN_MAPPING,
+    IMPORT_JOB_TTL,
+    SCRAPING_COLUMN_MAPPING,
+    SupplierImportService,
+    create_import_job,
+    get_import_job,
+    iter_excel_chunks,
+    missing_columns,
+    normalize_chunk,
+)
+
+
+def workbook_bytes(header, rows) -> bytes:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_workbook_is_read_in_chunks_with_sheet_row_numbers():
+    header = list(DEFAULT_COLUMN_MAPPING.values())
+    rows = [[f"产品 {i}", i + 1, f"https://detail.1688.com/{i}", f"img{i}"] for i in range(5)]
+
+    chunks = list(iter_excel_chunks(workbook_bytes(header, rows), chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0]["row_number"].tolist() == [2, 3]
+    assert missing_columns(chunks[0], DEFAULT_COLUMN_MAPPING) == []
+    assert chunks[2][DEFAULT_COLUMN_MAPPING["chinese_name"]].tolist() == ["产品 4"]
+
+
+def test_scraped_rows_are_normalized_without_row_loops():
+    chunk = pd.DataFrame(
+        {
+            "chinese_name_scrapping": [" 耳机 ", "音箱", "", "鼠标", "耳机", "灯"],
+            "price_scrapping": ["CN ¥ 2.45", "n/a", "CN ¥ 3", "CN ¥ 0", "CN ¥ 1,002.50", None],
+            "url_product_scrapping": ["u1", "u2", "u3", "u4", "u1", "u5"],
+            "url_image_scrapping": ["i1", "i2", "i3", "i4", None, "i5"],
+            "row_number": [2, 3, 4, 5, 6, 7],
+        }
+    )
+
+    records, skipped, errors = normalize_chunk(chunk, SCRAPING_COLUMN_MAPPING)
+
+    # The repeated URL keeps its last row
+    assert records.to_dict("records") == [
+        {
+            "chinese_name": "耳机",
+            "price_cny": 1002.5,
+            "product_url": "u1",
+            "image_url": "",
+            "row_number": 6,
+        }
+    ]
+    # No name, zero price and the replaced duplicate
+    assert skipped == 3
+    assert errors == ["Row 3: Invalid price format 'n/a'", "Row 7: Missing price"]
+
+
+def test_dataframe_with_field_names_needs_no_mapping():
+    df = pd.DataFrame(
+        {
+            "chinese_name": ["灯"],
+            "price_cny": [4.2],
+            "product_url": ["u"],
+            "image_url": ["i"],
+        }
+    )
+
+    records, skipped, errors = normalize_chunk(df)
+
+    assert records["price_cny"].tolist() == [4.2]
+    assert records["row_number"].tolist() == [2]
+    assert (skipped, errors) == (0, [])
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Supplier(id=1, name="1688 Shop"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+
+def scraped_workbook(*rows) -> bytes:
+    header = [SCRAPING_COLUMN_MAPPING[field] for field in DEFAULT_COLUMN_MAPPING]
+    return workbook_bytes(header, rows)
+
+
+async def supplier_product_tokens(factory) -> dict[int, set[str]]:
+    async with factory() as session:
+        result = await session.execute(
+            select(ProductNameToken.entity_id, ProductNameToken.token).where(
+                ProductNameToken.entity_type == ENTITY_SUPPLIER_PRODUCT
+            )
+        )
+        tokens: dict[int, set[str]] = {}
+        for entity_id, token in result:
+            tokens.setdefault(entity_id, set()).add(token)
+        return tokens
+
+
+async def test_imported_supplier_products_are_token_indexed(session_factory):
+    async with session_factory() as session:
+        await SupplierImportService(session).import_supplier_products(
+            scraped_workbook(["蓝牙耳机", "CN ¥ 2.45", "u1", "i1"]), 1
+        )
+    assert await supplier_product_tokens(session_factory) == {1: index_tokens("蓝牙耳机")}
+
+    # A renamed product gets new postings
+    async with session_factory() as session:
+        await SupplierImportService(session).import_supplier_products(
+            scraped_workbook(["无线充电器", "CN ¥ 3", "u1", "i1"]), 1
+        )
+    assert await supplier_product_tokens(session_factory) == {1: index_tokens("无线充电器")}
+
+
+async def test_jobs_live_in_redis(monkeypatch):
+    redis = fakeredis.FakeAsyncRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(supplier_import_service, "get_redis", get_redis)
+    monkeypatch.setattr(supplier_import_service, "_local_jobs", {})
+
+    job = await create_import_job(1, "products.xlsx")
+
+    assert (await get_import_job(job["job_id"]))["status"] == "queued"
+    assert supplier_import_service._local_jobs == {}
+
+
+async def test_jobs_fall_back_to_the_process_until_they_expire(monkeypatch):
+    async def get_redis():
+        raise ConnectionError("redis unavailable")
+
+    local_jobs = {}
+    monkeypatch.setattr(supplier_import_service, "get_redis", get_redis)
+    monkeypatch.setattr(supplier_import_service, "_local_jobs", local_jobs)
+
+    job = await create_import_job(1)
+    assert (await get_import_job(job["job_id"]))["status"] == "queued"
+    expires, _ = local_jobs[job["job_id"]]
+    assert expires - time.monotonic() == pytest.approx(IMPORT_JOB_TTL, abs=5)
+
+    local_jobs[job["job_id"]] = (time.monotonic() - 1, job)
+    assert await get_import_job(job["job_id"]) is None
+    assert supplier_import_service._local_jobs == {}
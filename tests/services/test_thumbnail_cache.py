@@ -0,0 +1,112 @@
+"""Tests for the disk-backed product thumbnail cache."""
+
+import asyncio
+import io
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.services.inventory.thumbnail_cache import ThumbnailCache, make_thumbnail
+
+URL = "https://img.example/product.jpg"
+
+
+def _image_bytes(color: str = "red", size: int = 400) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ThumbnailCache(cache_dir=tmp_path, concurrency=2, revalidate_after=3600)
+
+
+class TestMakeThumbnail:
+    def test_fits_within_size(self):
+        thumbnail = make_thumbnail(_image_bytes(size=800), (183, 183))
+
+        with Image.open(io.BytesIO(thumbnail)) as img:
+            assert img.format == "PNG"
+            assert max(img.size) == 183
+
+    def test_cmyk_is_converted(self):
+        buffer = io.BytesIO()
+        Image.new("CMYK", (300, 300)).save(buffer, format="JPEG")
+
+        with Image.open(io.BytesIO(make_thumbnail(buffer.getvalue(), (50, 50)))) as img:
+            assert img.mode == "RGBA"
+
+
+class TestThumbnailCache:
+    async def test_fresh_entry_is_served_without_network(self, cache, httpx_mock):
+        httpx_mock.add_response(url=URL, content=_image_bytes(), headers={"ETag": '"v1"'})
+
+        first = await cache.get_many([URL, URL, ""])
+        second = await cache.get_many([URL])
+
+        assert list(first) == [URL]
+        assert second == first
+        assert len(httpx_mock.get_requests()) == 1
+
+    async def test_stale_entry_is_revalidated(self, tmp_path, httpx_mock):
+        cache = ThumbnailCache(cache_dir=tmp_path, revalidate_after=0)
+        httpx_mock.add_response(url=URL, content=_image_bytes(), headers={"ETag": '"v1"'})
+        httpx_mock.add_response(url=URL, status_code=304)
+
+        first = await cache.get_many([URL])
+        second = await cache.get_many([URL])
+
+        revalidation = httpx_mock.get_requests()[1]
+        assert revalidation.headers["If-None-Match"] == '"v1"'
+        assert second == first
+
+    async def test_changed_etag_replaces_file(self, tmp_path, httpx_mock):
+        cache = ThumbnailCache(cache_dir=tmp_path, revalidate_after=0)
+        httpx_mock.add_response(url=URL, content=_image_bytes("red"), headers={"ETag": '"v1"'})
+        httpx_mock.add_response(url=URL, content=_image_bytes("blue"), headers={"ETag": '"v2"'})
+
+        first = await cache.get_many([URL])
+        second = await cache.get_many([URL])
+
+        assert first[URL] != second[URL]
+        assert len(list(tmp_path.glob("*.png"))) == 1
+
+    async def test_failure_falls_back_to_stale_copy(self, tmp_path, httpx_mock):
+        cache = ThumbnailCache(cache_dir=tmp_path, revalidate_after=0)
+        httpx_mock.add_response(url=URL, content=_image_bytes(), headers={"ETag": '"v1"'})
+        httpx_mock.add_exception(httpx.ConnectTimeout("timeout"), url=URL)
+
+        first = await cache.get_many([URL])
+        second = await cache.get_many([URL])
+
+        assert second == first
+
+    async def test_broken_images_are_skipped(self, cache, httpx_mock):
+        httpx_mock.add_response(url=URL, content=b"not an image")
+        httpx_mock.add_response(url="https://img.example/missing.jpg", status_code=404)
+
+        result = await cache.get_many([URL, "https://img.example/missing.jpg"])
+
+        assert result == {}
+
+    async def test_downloads_are_bounded(self, cache, httpx_mock):
+        in_flight = 0
+        peak = 0
+
+        async def respond(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, content=_image_bytes(size=50))
+
+        httpx_mock.add_callback(respond, is_reusable=True)
+
+        urls = [f"https://img.example/{i}.jpg" for i in range(10)]
+        result = await cache.get_many(urls)
+
+        assert len(result) == 10
+        assert peak <= cache.concurrency
@@ -0,0 +1,146 @@
+"""Tests for the streaming response compression middleware."""
+
+import asyncio
+import gzip
+import json
+import zlib
+
+import pytest
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+from app.middleware import compression
+from app.middleware.compression import CompressionMiddleware, negotiate_encoding
+
+PAYLOAD = [{"sku": f"SKU-{i}", "name": f"Produs {i}", "price": i * 1.5} for i in range(500)]
+
+
+async def call(app, accept_encoding="gzip", method="GET", **options):
+    """Run a request through the middleware and collect the sent messages."""
+    middleware = CompressionMiddleware(app, **options)
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        # Streaming responses listen for a disconnect while they run
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return headers, body, messages
+
+
+def decompress(encoding: str, body: bytes) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        return pytest.importorskip("brotli").decompress(body)
+    return pytest.importorskip("zstandard").ZstdDecompressor().decompressobj().decompress(body)
+
+
+class TestNegotiation:
+    SUPPORTED = ["zstd", "br", "gzip"]
+
+    def test_server_preference_breaks_ties(self):
+        assert negotiate_encoding("gzip, deflate, br, zstd", self.SUPPORTED) == "zstd"
+        assert negotiate_encoding("gzip, br", self.SUPPORTED) == "br"
+
+    def test_client_quality_wins(self):
+        assert negotiate_encoding("br;q=0.5, gzip", self.SUPPORTED) == "gzip"
+
+    def test_wildcard_and_refusals(self):
+        assert negotiate_encoding("*", ["br", "gzip"]) == "br"
+        assert negotiate_encoding("*, br;q=0", ["br", "gzip"]) == "gzip"
+        assert negotiate_encoding("gzip;q=0, identity", self.SUPPORTED) is None
+        assert negotiate_encoding("", self.SUPPORTED) is None
+
+
+class TestCompressionMiddleware:
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    async def test_large_json_is_compressed(self, encoding):
+        if encoding not in compression.available_encodings():
+            pytest.skip(f"{encoding} support not installed")
+        app = JSONResponse(PAYLOAD, headers={"ETag": '"abc"'})
+
+        headers, body, _ = await call(app, accept_encoding=encoding)
+
+        assert headers["content-encoding"] == encoding
+        assert headers["content-length"] == str(len(body))
+        assert headers["vary"] == "Accept-Encoding"
+        assert headers["etag"] == 'W/"abc"'
+        assert json.loads(decompress(encoding, body)) == PAYLOAD
+
+    async def test_small_or_unsupported_responses_pass_through(self):
+        headers, body, _ = await call(PlainTextResponse("ok"))
+        assert "content-encoding" not in headers
+        assert body == b"ok"
+
+        image = Response(b"x" * 5000, media_type="image/png")
+        headers, body, _ = await call(image)
+        assert "content-encoding" not in headers
+
+        headers, _, _ = await call(JSONResponse(PAYLOAD), accept_encoding="identity")
+        assert "content-encoding" not in headers
+
+        headers, _, _ = await call(JSONResponse(PAYLOAD), method="POST")
+        assert "content-encoding" not in headers
+
+    async def test_already_encoded_response_is_untouched(self):
+        body = gzip.compress(b"x" * 5000)
+        app = Response(body, media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+        headers, sent, _ = await call(app, accept_encoding="br, gzip")
+
+        assert sent == body
+
+    async def test_streaming_response_is_compressed_incrementally(self):
+        async def rows():
+            for i in range(20):
+                yield json.dumps(PAYLOAD[i * 25 : (i + 1) * 25]).encode() * 20
+
+        app = StreamingResponse(rows(), media_type="application/json")
+
+        headers, body, messages = await call(app, levels={"application/json": {"gzip": 1}})
+
+        body_messages = [m for m in messages[1:] if m.get("body")]
+        assert headers["content-encoding"] == "gzip"
+        assert "content-length" not in headers
+        assert len(body_messages) > 1
+        assert messages[-1]["more_body"] is False
+        expected = b"".join(
+            json.dumps(PAYLOAD[i * 25 : (i + 1) * 25]).encode() * 20 for i in range(20)
+        )
+        assert gzip.decompress(body) == expected
+
+    async def test_levels_per_content_type(self):
+        app = JSONResponse(PAYLOAD)
+
+        _, fast, _ = await call(app, levels={"application/json": {"gzip": 1}})
+        _, small, _ = await call(app, levels={"application/json": {"gzip": 9}})
+
+        assert len(small) < len(fast)
+        assert zlib.decompress(fast, 31) == zlib.decompress(small, 31)
+
+    async def test_large_bodies_are_compressed_off_the_event_loop(self, monkeypatch):
+        offloaded = []
+
+        async def to_thread(func, *args):
+            offloaded.append(len(args[0]))
+            return func(*args)
+
+        monkeypatch.setattr(compression.asyncio, "to_thread", to_thread)
+
+        await call(JSONResponse(PAYLOAD), offload_threshold=1024)
+        await call(JSONResponse(PAYLOAD[:50]), offload_threshold=1024 * 1024)
+
+        assert offloaded == [len(JSONResponse(PAYLOAD).body)]
@@ -0,0 +1,181 @@
+"""Tests for the pure ASGI idempotency middleware and its tiered store."""
+
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.responses import StreamingResponse
+
+from app.middleware.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+def build_app(store):
+    app = FastAPI()
+    calls = []
+
+    @app.post("/orders")
+    async def create_order(payload: dict):
+        calls.append(payload)
+        return {"id": len(calls), **payload}
+
+    @app.post("/export")
+    async def export():
+        calls.append("export")
+
+        async def rows():
+            for i in range(3):
+                yield f"row-{i}\n".encode()
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return IdempotencyMiddleware(app, store=store), calls
+
+
+async def post(app, path, json=None, key="key-1"):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(path, json=json, headers={"Idempotency-Key": key})
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(use_redis=False, use_database=False)
+
+
+async def test_repeated_key_replays_stored_response(store):
+    app, calls = build_app(store)
+
+    first = await post(app, "/orders", {"sku": "EMG-1"})
+    second = await post(app, "/orders", {"sku": "EMG-1"})
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json() == {"id": 1, "sku": "EMG-1"}
+    assert second.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+async def test_different_payload_with_same_key_conflicts(store):
+    app, calls = build_app(store)
+
+    await post(app, "/orders", {"sku": "EMG-1"})
+    response = await post(app, "/orders", {"sku": "EMG-2"})
+
+    assert response.status_code == 409
+    assert len(calls) == 1
+
+
+async def test_invalid_key_is_rejected(store):
+    app, calls = build_app(store)
+
+    response = await post(app, "/orders", {"sku": "EMG-1"}, key="x" * 81)
+
+    assert response.status_code == 400
+    assert calls == []
+
+
+async def test_streaming_response_is_captured_and_replayed(store):
+    app, calls = build_app(store)
+
+    first = await post(app, "/export")
+    second = await post(app, "/export")
+
+    assert first.text == second.text == "row-0\nrow-1\nrow-2\n"
+    assert second.headers["content-type"].startswith("text/csv")
+    assert calls == ["export"]
+
+
+async def test_oversized_response_is_not_stored(store):
+    app, calls = build_app(store)
+    app.max_capture_bytes = 4
+
+    await post(app, "/export")
+    await post(app, "/export")
+
+    assert calls == ["export", "export"]
+
+
+async def test_records_are_shared_through_redis():
+    server = fakeredis.FakeServer()
+    worker_a, calls_a = build_app(
+        IdempotencyStore(redis=fakeredis.FakeAsyncRedis(server=server), use_database=False)
+    )
+    worker_b, calls_b = build_app(
+        IdempotencyStore(redis=fakeredis.FakeAsyncRedis(server=server), use_database=False)
+    )
+
+    first = await post(worker_a, "/orders", {"sku": "EMG-1"})
+    second = await post(worker_b, "/orders", {"sku": "EMG-1"})
+
+    assert second.json() == first.json()
+    assert len(calls_a) == 1
+    assert calls_b == []
+
+
+def build_slow_app(store):
+    app = FastAPI()
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = []
+
+    @app.post("/payments")
+    async def pay(payload: dict):
+        calls.append(payload)
+        started.set()
+        await release.wait()
+        if payload.get("fail"):
+            raise RuntimeError("payment provider down")
+        return {"paid": payload["amount"]}
+
+    return IdempotencyMiddleware(app, store=store), calls, started, release
+
+
+@pytest.mark.parametrize("shared", ["memory", "redis"])
+async def test_repeat_while_first_request_runs_is_refused(shared):
+    if shared == "memory":
+        store = IdempotencyStore(use_redis=False, use_database=False)
+        first_store = second_store = store
+    else:
+        server = fakeredis.FakeServer()
+        first_store, second_store = (
+            IdempotencyStore(redis=fakeredis.FakeAsyncRedis(server=server), use_database=False)
+            for _ in range(2)
+        )
+    first_app, calls, started, release = build_slow_app(first_store)
+    second_app, second_calls, _, _ = build_slow_app(second_store)
+
+    first = asyncio.create_task(post(first_app, "/payments", {"amount": 10}))
+    await started.wait()
+    overlapping = await post(second_app, "/payments", {"amount": 10})
+    release.set()
+    completed = await first
+    repeated = await post(second_app, "/payments", {"amount": 10})
+
+    assert overlapping.status_code == 409
+    assert overlapping.headers["retry-after"] == "1"
+    assert completed.json() == repeated.json() == {"paid": 10}
+    assert repeated.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+    assert second_calls == []
+
+
+async def test_failed_request_gives_its_key_up(store):
+    app, calls, _, release = build_slow_app(store)
+    release.set()
+
+    # The retry reaches the handler instead of waiting on the dead claim
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await post(app, "/payments", {"amount": 10, "fail": True})
+
+    assert len(calls) == 2
+
+
+async def test_requests_without_key_pass_through(store):
+    app, calls = build_app(store)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/orders", json={"sku": "EMG-1"})
+        await client.post("/orders", json={"sku": "EMG-1"})
+
+    assert len(calls) == 2
@@ -0,0 +1,207 @@
+"""Tests for the atomic stock reservation helpers."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401 - configures the mappers related to inventory items
+from app.crud.products.inventory import (
+    _RELEASE_SQL,
+    _RESERVE_SQL,
+    InsufficientStockError,
+    _merge_lines,
+    inventory_item,
+)
+from app.db.base_class import Base
+from app.models.inventory import InventoryItem, StockMovement, StockReservation, Warehouse
+from app.models.product import Product
+from tests.test_utils import get_test_db_url
+
+
+def test_repeated_lines_are_summed_in_item_order():
+    assert _merge_lines([(7, 2), (3, 1), (7, 1)]) == {3: 1, 7: 3}
+    assert list(_merge_lines({9: 1, 2: 4})) == [2, 9]
+
+
+def test_non_positive_quantities_are_rejected():
+    with pytest.raises(ValueError):
+        _merge_lines({1: 0})
+
+
+def test_insufficient_stock_error_names_items():
+    error = InsufficientStockError([4, 5])
+
+    assert isinstance(error, ValueError)
+    assert error.inventory_item_ids == [4, 5]
+
+
+def test_reservation_is_conditional_and_locks_in_id_order():
+    sql = _RESERVE_SQL.text
+
+    assert "ORDER BY i.id" in sql
+    assert "FOR UPDATE OF i" in sql
+    assert "available_quantity >= req.qty" in sql
+    assert "INSERT INTO app.stock_movements" in sql
+    assert "ORDER BY i.id" in _RELEASE_SQL.text
+
+
+# ---------------------------------------------------------------------------
+# Against PostgreSQL: the statements use unnest, arrays and row locks
+# ---------------------------------------------------------------------------
+
+RESERVATION_TABLES = [
+    Product.__table__,
+    Warehouse.__table__,
+    InventoryItem.__table__,
+    StockMovement.__table__,
+    StockReservation.__table__,
+]
+
+
+@pytest.fixture
+async def session_factory():
+    """Session factory on a PostgreSQL test database with the inventory tables."""
+    url = get_test_db_url().replace("postgresql://", "postgresql+asyncpg://", 1)
+    engine = create_async_engine(url, poolclass=NullPool)
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE SCHEMA IF NOT EXISTS app"))
+            await connection.run_sync(Base.metadata.create_all, tables=RESERVATION_TABLES)
+    except (OSError, SQLAlchemyError) as e:
+        await engine.dispose()
+        pytest.skip(f"PostgreSQL test database not available: {e}")
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.drop_all, tables=list(reversed(RESERVATION_TABLES))
+        )
+    await engine.dispose()
+
+
+@pytest.fixture
+async def items(session_factory):
+    """Two inventory items with 5 and 1 units available."""
+    async with session_factory() as session:
+        await session.execute(
+            insert(Product),
+            [
+                {"id": 1, "name": "Casti", "sku": "SKU-1"},
+                {"id": 2, "name": "Cablu", "sku": "SKU-2"},
+            ],
+        )
+        await session.execute(insert(Warehouse).values(id=1, name="Main", code="MAIN"))
+        await session.execute(
+            insert(InventoryItem),
+            [
+                {
+                    "id": item_id,
+                    "product_id": item_id,
+                    "warehouse_id": 1,
+                    "quantity": available,
+                    "reserved_quantity": 0,
+                    "available_quantity": available,
+                    "unit_cost": 2.0,
+                }
+                for item_id, available in ((1, 5), (2, 1))
+            ],
+        )
+        await session.commit()
+    return [1, 2]
+
+
+async def stock(session_factory, item_id: int) -> tuple[int, int]:
+    async with session_factory() as session:
+        item = await session.get(InventoryItem, item_id)
+        return item.reserved_quantity, item.available_quantity
+
+
+async def count(session_factory, model) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.database
+async def test_short_line_reserves_nothing(session_factory, items):
+    async with session_factory() as session:
+        with pytest.raises(InsufficientStockError) as exc_info:
+            await inventory_item.reserve_order(session, order_id="A-1", lines={1: 2, 2: 3})
+
+    assert exc_info.value.inventory_item_ids == [2]
+    assert await stock(session_factory, 1) == (0, 5)
+    assert await count(session_factory, StockReservation) == 0
+    assert await count(session_factory, StockMovement) == 0
+
+
+@pytest.mark.database
+async def test_order_lines_are_reserved_together(session_factory, items):
+    async with session_factory() as session:
+        reservations = await inventory_item.reserve_order(
+            session, order_id="A-1", lines=[(2, 1), (1, 2), (1, 1)]
+        )
+
+    assert [(r.inventory_item_id, r.quantity) for r in reservations] == [(1, 3), (2, 1)]
+    assert await stock(session_factory, 1) == (3, 2)
+    assert await stock(session_factory, 2) == (1, 0)
+    assert await count(session_factory, StockMovement) == 2
+
+
+@pytest.mark.database
+async def test_release_is_idempotent(session_factory, items):
+    async with session_factory() as session:
+        await inventory_item.reserve_order(session, order_id="A-1", lines={1: 2, 2: 1})
+
+        assert await inventory_item.release_order(session, order_id="A-1") == 2
+        assert await inventory_item.release_order(session, order_id="A-1") == 0
+
+    async with session_factory() as session:
+        reservation = (await session.execute(select(StockReservation))).scalars().first()
+        assert await inventory_item.release_reservations(session, reservations=[reservation]) == 0
+
+    assert await stock(session_factory, 1) == (0, 5)
+    assert await stock(session_factory, 2) == (0, 1)
+    # One reservation and one release movement per item
+    assert await count(session_factory, StockMovement) == 4
+
+
+@pytest.mark.database
+async def test_loaded_objects_see_new_quantities(session_factory, items):
+    async with session_factory() as session:
+        item = await session.get(InventoryItem, 1)
+
+        [reservation] = await inventory_item.reserve_order(
+            session, order_id="A-1", lines={1: 4}, commit=False
+        )
+        assert (item.reserved_quantity, item.available_quantity) == (4, 1)
+        assert await session.get(StockReservation, reservation.id) is reservation
+
+        await inventory_item.release_reservation(session, reservation=reservation, commit=False)
+        assert (item.reserved_quantity, item.available_quantity) == (0, 5)
+        assert reservation.is_active is False
+        await session.commit()
+
+    assert await stock(session_factory, 1) == (0, 5)
+
+
+@pytest.mark.database
+async def test_concurrent_orders_do_not_oversell(session_factory, items):
+    async def reserve(order_id: str) -> bool:
+        async with session_factory() as session:
+            try:
+                await inventory_item.reserve_order(
+                    session, order_id=order_id, lines={2: 1, 1: 3}
+                )
+            except InsufficientStockError:
+                return False
+            return True
+
+    results = await asyncio.gather(reserve("A-1"), reserve("A-2"))
+
+    assert sorted(results) == [False, True]
+    assert await stock(session_factory, 1) == (3, 2)
+    assert await stock(session_factory, 2) == (1, 0)
@@ -0,0 +1,99 @@
+"""Tests for in-process request metrics aggregation."""
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.middleware.performance import (
+    LATENCY_BUCKETS,
+    PerformanceMonitoringMiddleware,
+    RequestMetrics,
+    estimate_percentile,
+)
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.fixture
+async def middleware(redis):
+    app = FastAPI()
+
+    @app.get("/products/{product_id}")
+    async def get_product(product_id: int):
+        return {"id": product_id}
+
+    middleware = PerformanceMonitoringMiddleware(app, flush_interval=3600)
+    middleware._redis = redis
+    yield middleware
+    await middleware.close()
+
+
+async def get(middleware, path):
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path)
+
+
+def test_percentiles_from_histogram():
+    counts = [0] * (len(LATENCY_BUCKETS) + 1)
+    counts[LATENCY_BUCKETS.index(0.01)] = 50  # 5-10 ms
+    counts[LATENCY_BUCKETS.index(0.5)] = 45  # 250-500 ms
+    counts[-1] = 5  # slower than 10 s
+
+    assert estimate_percentile(counts, 0.5) == pytest.approx(0.01)
+    assert estimate_percentile(counts, 0.95) == pytest.approx(0.5)
+    assert estimate_percentile(counts, 0.99) == LATENCY_BUCKETS[-1]
+    assert estimate_percentile([0] * len(counts), 0.5) == 0.0
+
+
+async def test_requests_are_grouped_by_route_template(middleware, redis):
+    for product_id in (1, 2, 3):
+        response = await get(middleware, f"/products/{product_id}")
+        assert "x-process-time" in response.headers
+    await get(middleware, "/missing/1")
+    await get(middleware, "/missing/2")
+
+    snapshot = middleware.metrics.snapshot()
+    assert snapshot["GET:/products/{product_id}"]["request_count"] == 3
+    assert snapshot["GET:<unmatched>"]["request_count"] == 2
+    # Nothing reaches Redis until the flush
+    assert await redis.keys("metrics:*") == []
+
+
+async def test_flush_writes_one_batch_and_resets(middleware, redis):
+    for product_id in (1, 2):
+        await get(middleware, f"/products/{product_id}")
+
+    assert await middleware.flush() == 2
+    assert middleware.metrics.snapshot() == {}
+
+    stats = await middleware.get_endpoint_stats("GET", "/products/{product_id}")
+    assert stats["request_count"] == 2
+    assert 0 < stats["p50"] <= stats["p99"] <= LATENCY_BUCKETS[-1]
+    assert int(await redis.get("metrics:status:200")) == 2
+    assert await redis.ttl("metrics:latency:GET:/products/{product_id}") > 0
+
+
+async def test_failed_flush_keeps_metrics():
+    class BrokenRedis:
+        def pipeline(self, transaction=True):
+            raise RedisConnectionError("connection refused")
+
+    metrics = RequestMetrics()
+    metrics.record("GET:/x", 0.02, 200)
+
+    with pytest.raises(RedisConnectionError):
+        await metrics.flush(BrokenRedis())
+    metrics.record("GET:/x", 2.0, 500)
+
+    assert metrics.snapshot()["GET:/x"]["request_count"] == 2
+    assert metrics.snapshot()["GET:/x"]["slow_requests"] == 1
+
+    redis = fakeredis.FakeAsyncRedis()
+    assert await metrics.flush(redis) == 2
+    assert int(await redis.get("metrics:status:500")) == 1
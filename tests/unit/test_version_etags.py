@@ -0,0 +1,159 @@
+"""Tests for version-based ETags on list endpoints."""
+
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import tiered_cache
+from app.core.tiered_cache import TAG_KEY_PREFIX, TieredCache
+from app.db.base_class import Base
+from app.middleware import cache_headers
+from app.middleware.cache_headers import check_not_modified, etag_matches
+from app.models.product import Product
+from app.services.infrastructure.change_feed import ChangeFeed
+
+
+@pytest.fixture(autouse=True)
+def local_cache(monkeypatch):
+    feed = ChangeFeed(use_redis=False)
+    cache = TieredCache("test", use_redis=False)
+    monkeypatch.setattr(tiered_cache, "get_change_feed", lambda: feed)
+    monkeypatch.setattr(cache_headers, "get_tiered_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def attach_app_schema(dbapi_connection, connection_record):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS app")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all([Product(sku="SKU-1", name="Casti"), Product(sku="SKU-2", name="Boxa")])
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def client(session):
+    app = FastAPI()
+    app.state.list_queries = 0
+
+    @app.get("/products")
+    async def list_products(request: Request, response: Response, limit: int = 10):
+        not_modified = await check_not_modified(request, response, session, Product)
+        if not_modified is not None:
+            return not_modified
+
+        request.app.state.list_queries += 1
+        products = (await session.execute(select(Product.sku).limit(limit))).scalars()
+        return {"products": list(products)}
+
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://test")
+    client.app = app
+    return client
+
+
+async def revalidate(client, etag, path="/products"):
+    return await client.get(path, headers={"If-None-Match": etag})
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', 'W/"b"')
+    assert etag_matches('"b"', 'W/"b"')
+    assert etag_matches("*", 'W/"b"')
+    assert not etag_matches('"c"', 'W/"b"')
+    assert not etag_matches(None, 'W/"b"')
+
+
+async def test_unchanged_data_short_circuits_before_the_query(client):
+    first = await client.get("/products")
+    etag = first.headers["ETag"]
+
+    second = await revalidate(client, etag)
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+    assert client.app.state.list_queries == 1
+
+
+async def test_query_parameters_are_part_of_the_etag(client):
+    etag = (await client.get("/products")).headers["ETag"]
+
+    response = await revalidate(client, etag, "/products?limit=1")
+
+    assert response.status_code == 200
+    assert response.json() == {"products": ["SKU-1"]}
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda: update(Product).where(Product.sku == "SKU-1").values(name="Casti noi"),
+        lambda: delete(Product).where(Product.sku == "SKU-2"),
+    ],
+    ids=["update", "delete"],
+)
+async def test_writes_invalidate_the_etag(client, session, change):
+    etag = (await client.get("/products")).headers["ETag"]
+
+    await session.execute(change())
+    await session.commit()
+    # Deletes are announced by a task started on commit
+    await asyncio.gather(*cache_headers._pending_notices)
+    response = await revalidate(client, etag)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_deleted_instances_invalidate_the_etag(client, session):
+    etag = (await client.get("/products")).headers["ETag"]
+
+    product = (await session.execute(select(Product).where(Product.sku == "SKU-1"))).scalar_one()
+    await session.delete(product)
+    await session.commit()
+    await asyncio.gather(*cache_headers._pending_notices)
+    response = await revalidate(client, etag)
+
+    assert response.status_code == 200
+    assert response.json() == {"products": ["SKU-2"]}
+
+
+async def test_rolled_back_deletes_keep_the_etag(client, session):
+    etag = (await client.get("/products")).headers["ETag"]
+
+    await session.execute(delete(Product))
+    await session.rollback()
+    response = await revalidate(client, etag)
+
+    assert response.status_code == 304
+
+
+async def test_deletes_counted_in_redis_invalidate_the_etag(client, monkeypatch):
+    redis = fakeredis.FakeAsyncRedis()
+    cache = TieredCache("test", redis=redis, use_redis=True)
+    monkeypatch.setattr(cache_headers, "get_tiered_cache", lambda: cache)
+    etag = (await client.get("/products")).headers["ETag"]
+
+    # Another process deleted rows and its change feed notice never arrived
+    tag = cache_headers._deleted_rows_tag(Product.__table__.fullname)
+    await redis.incr(TAG_KEY_PREFIX + tag)
+    response = await revalidate(client, etag)
+
+    assert response.status_code == 200